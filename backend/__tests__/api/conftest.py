@@ -0,0 +1,16 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.dependencies import get_tenant_repo
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def tenant_member():
+    """ユーザーはヘッダーで指定したテナントのメンバーとする（所属の確認をモック化）"""
+    tenant_repo = MagicMock()
+    tenant_repo.is_member.return_value = True
+    app.dependency_overrides[get_tenant_repo] = lambda: tenant_repo
+    yield tenant_repo
+    app.dependency_overrides.pop(get_tenant_repo, None)
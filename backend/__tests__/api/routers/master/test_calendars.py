@@ -1,12 +1,20 @@
 # __tests__/api/routers/master/test_calendars.py
-from datetime import date
+from datetime import date, timedelta
 from unittest.mock import MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
 
-from app.dependencies import get_supabase_client
+from app.dependencies import (
+    get_calendar_cache,
+    get_equipment_repo,
+    get_schedule_repo,
+    get_supabase_client,
+)
 from app.main import app
+from app.services.calendar_service import DEFAULT_CALENDAR_HORIZON_DAYS
+from app.utils.calendar import CalendarConfig
 
 # テストクライアントの作成
 client = TestClient(app)
@@ -49,10 +57,17 @@ def mock_calendar_data():
     ]
 
 
+@pytest.fixture
+def mock_calendar_cache():
+    """休日情報キャッシュのモック"""
+    return MagicMock()
+
+
 @pytest.fixture(autouse=True)
-def override_dependency(mock_client):
+def override_dependency(mock_client, mock_calendar_cache):
     """依存関係をモックに差し替え"""
     app.dependency_overrides[get_supabase_client] = lambda: mock_client
+    app.dependency_overrides[get_calendar_cache] = lambda: mock_calendar_cache
     yield
     app.dependency_overrides = {}
 
@@ -66,16 +81,28 @@ class TestCalendarRouter:
         # モックの設定
         mock_response = MagicMock()
         mock_response.data = mock_calendar_data
-        mock_client.table.return_value.select.return_value.gte.return_value.lte.return_value.execute.return_value = (
-            mock_response
-        )
+        mock_client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value = mock_response
 
         response = client.get("/calendars/?year=2024&month=1", headers=headers)
 
         assert response.status_code == 200
         assert response.json() == mock_calendar_data
+        # 複数のテナントに所属するユーザーにも、指定したテナントの休日だけを返す
+        mock_client.table.return_value.select.return_value.eq.assert_called_once_with(
+            "tenant_id", "test-tenant-uuid"
+        )
+
+    def test_non_member_is_forbidden(self, headers, mock_client, tenant_member):
+        """所属していないテナントを指定した場合は403を返し、テナントのデータを読み込まない"""
+        tenant_member.is_member.return_value = False
+
+        response = client.get("/calendars/?year=2024&month=1", headers=headers)
+
+        assert response.status_code == 403
+        tenant_member.is_member.assert_called_once_with("test-tenant-uuid")
+        mock_client.table.assert_not_called()
 
-    def test_upsert_calendar(self, headers, mock_client):
+    def test_upsert_calendar(self, headers, mock_client, mock_calendar_cache):
         """POST /calendars: カレンダー作成/更新のテスト"""
         payload = {
             "date": "2024-12-31",
@@ -103,8 +130,140 @@ class TestCalendarRouter:
         assert response.status_code == 200
         assert response.json()["is_holiday"] is True
         assert response.json()["note"] == "大晦日"
+        # 更新したテナントのキャッシュが破棄される
+        mock_calendar_cache.invalidate.assert_called_once_with("test-tenant-uuid")
+
+    def test_upsert_calendar_report_impact(
+        self, headers, mock_client, mock_calendar_cache
+    ):
+        """POST /calendars?impact=report: 変更する日と重なる予約・注文を期間で引いて返す"""
+        mock_calendar_cache.get_config.return_value = CalendarConfig()
+        mock_client.table.return_value.upsert.return_value.execute.return_value.data = [
+            {"id": 1, "date": "2024-12-31", "is_holiday": True, "note": None}
+        ]
+        schedule_repo = MagicMock()
+        schedule_repo.get_plan_in_periods.return_value = [
+            {
+                "id": 10,
+                "order_id": 100,
+                "equipment_id": 1,
+                "start_datetime": "2024-12-31T09:00:00+00:00",
+                "end_datetime": "2024-12-31T10:00:00+00:00",
+            }
+        ]
+        app.dependency_overrides[get_schedule_repo] = lambda: schedule_repo
+
+        response = client.post(
+            "/calendars/?impact=report",
+            json={"date": "2024-12-31", "is_holiday": True},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        impact = response.json()["impact"]
+        assert [s["id"] for s in impact["schedules"]] == [10]
+        assert impact["order_ids"] == [100]
+        # 計画全体ではなく、変更する日の期間だけを引く
+        schedule_repo.get_plan_in_periods.assert_called_once_with(
+            [("2024-12-31T00:00:00+00:00", "2024-12-31T23:59:59.999999+00:00")]
+        )
+        schedule_repo.get_plan_from.assert_not_called()
+        schedule_repo.apply_changes.assert_not_called()
 
-    def test_batch_update_calendars(self, headers, mock_client):
+    def test_batch_update_calendars_reflow_impact(
+        self, headers, mock_client, mock_calendar_cache
+    ):
+        """POST /calendars/batch?impact=reflow: 休日にした日の予約と後続工程だけを、設備の保全を避けて再配置する"""
+        # 8〜14日後の月曜日（休日にする日）と翌日
+        holiday = date.today() + timedelta(days=14 - date.today().weekday())
+        next_day = holiday + timedelta(days=1)
+        mock_calendar_cache.get_config.side_effect = [
+            CalendarConfig(),
+            CalendarConfig(holidays={holiday}),
+        ]
+        mock_client.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value.data = []
+        mock_client.table.return_value.upsert.return_value.execute.return_value.data = [
+            {"id": 1}
+        ]
+
+        def _row(id, sequence_order, equipment_id, day, start, end):
+            return {
+                "id": id,
+                "tenant_id": "test-tenant-uuid",
+                "order_id": 100,
+                "process_routing_id": 1000 + sequence_order,
+                "sequence_order": sequence_order,
+                "equipment_id": equipment_id,
+                "start_datetime": f"{day}T{start}:00+00:00",
+                "end_datetime": f"{day}T{end}:00+00:00",
+            }
+
+        affected = _row(10, 1, 1, holiday, "15:00", "16:00")
+        successor = _row(11, 2, 2, next_day, "09:00", "10:00")
+        other = _row(20, 1, 3, next_day, "09:00", "10:00") | {"order_id": 200}
+        plan = [affected, successor, other]
+        schedule_repo = MagicMock()
+        schedule_repo.get_plan_in_periods.return_value = [affected]
+        schedule_repo.get_plan_suffix.side_effect = (
+            lambda since, *, equipment_ids, order_ids: [
+                row
+                for row in plan
+                if row["equipment_id"] in equipment_ids or row["order_id"] in order_ids
+            ]
+        )
+        # 後続工程の設備は翌日 10:00-11:00 が保全
+        equipment_repo = MagicMock()
+        equipment_repo.get_calendar_overlays.return_value = [
+            {
+                "id": 1,
+                "equipment_id": 2,
+                "start_datetime": f"{next_day}T10:00:00+00:00",
+                "end_datetime": f"{next_day}T11:00:00+00:00",
+                "kind": "maintenance",
+            }
+        ]
+        app.dependency_overrides[get_schedule_repo] = lambda: schedule_repo
+        app.dependency_overrides[get_equipment_repo] = lambda: equipment_repo
+
+        response = client.post(
+            "/calendars/batch?impact=reflow",
+            json={"dates": [holiday.isoformat()], "is_holiday": True},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        impact = response.json()["impact"]
+        assert [
+            (s["id"], s["start_datetime"], s["end_datetime"])
+            for s in impact["reflowed"]
+        ] == [
+            (10, f"{next_day}T09:00:00+00:00", f"{next_day}T10:00:00+00:00"),
+        ]
+        assert [
+            (s["id"], s["start_datetime"], s["end_datetime"]) for s in impact["rippled"]
+        ] == [
+            (11, f"{next_day}T11:00:00+00:00", f"{next_day}T12:00:00+00:00"),
+        ]
+        assert [o["order_id"] for o in impact["delayed_orders"]] == [100]
+        # 変更前のカレンダーは、書き込み前に計画の期間の先まで読み込む
+        assert mock_calendar_cache.get_config.call_args_list[0].args[3] == (
+            holiday + timedelta(days=DEFAULT_CALENDAR_HORIZON_DAYS)
+        )
+        # 計画全体ではなく、影響が及ぶ設備・注文の末尾だけを読み込む
+        schedule_repo.get_plan_from.assert_not_called()
+        assert [
+            (c.args, c.kwargs["equipment_ids"], c.kwargs["order_ids"])
+            for c in schedule_repo.get_plan_suffix.call_args_list
+        ] == [
+            ((f"{holiday}T00:00:00+00:00",), [1], [100]),
+            ((f"{holiday}T00:00:00+00:00",), [1, 2], [100]),
+        ]
+        # 変更は1回でまとめて保存する
+        updates, inserts = schedule_repo.apply_changes.call_args.args
+        assert [u["id"] for u in updates] == [10, 11]
+        assert inserts == []
+
+    def test_batch_update_calendars(self, headers, mock_client, mock_calendar_cache):
         """POST /calendars/batch: 一括更新のテスト"""
         payload = {
             "dates": ["2024-08-10", "2024-08-11", "2024-08-12"],
@@ -125,3 +284,152 @@ class TestCalendarRouter:
         result = response.json()
         assert result["updated_count"] == 3
         assert result["total_count"] == 3
+        # キャッシュの破棄は日付ごとではなく1回だけ行われる
+        mock_calendar_cache.invalidate.assert_called_once_with("test-tenant-uuid")
+
+    def test_batch_update_calendars_reports_per_date_outcomes(
+        self, headers, mock_client, mock_calendar_cache
+    ):
+        """POST /calendars/batch: 変更が必要な日付のみ1回で保存し、日付ごとの結果を返す"""
+        payload = {
+            "dates": ["2024-08-10", "2024-08-11", "2024-08-12", "2024-08-10"],
+            "is_holiday": True,
+            "note": "お盆休み",
+        }
+        mock_client.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value.data = [
+            {"date": "2024-08-11", "is_holiday": True, "note": "お盆休み"},
+            {"date": "2024-08-12", "is_holiday": False, "note": "臨時出勤"},
+        ]
+        upsert = mock_client.table.return_value.upsert
+        upsert.return_value.execute.return_value.data = [{"id": 1}, {"id": 2}]
+
+        response = client.post("/calendars/batch", json=payload, headers=headers)
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["updated_count"] == 2
+        assert result["total_count"] == 4
+        assert result["results"] == [
+            {"date": "2024-08-10", "status": "created"},
+            {"date": "2024-08-11", "status": "unchanged"},
+            {"date": "2024-08-12", "status": "updated"},
+            {"date": "2024-08-10", "status": "duplicate"},
+        ]
+        upsert.assert_called_once()
+        rows = upsert.call_args[0][0]
+        assert [row["date"] for row in rows] == ["2024-08-10", "2024-08-12"]
+        mock_calendar_cache.invalidate.assert_called_once_with("test-tenant-uuid")
+
+    def test_batch_update_calendars_all_unchanged(
+        self, headers, mock_client, mock_calendar_cache
+    ):
+        """POST /calendars/batch: 変更がなければ保存もキャッシュの破棄も行わない"""
+        mock_client.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value.data = [
+            {"date": "2024-08-10", "is_holiday": True, "note": None},
+        ]
+
+        response = client.post(
+            "/calendars/batch",
+            json={"dates": ["2024-08-10"], "is_holiday": True},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["updated_count"] == 0
+        mock_client.table.return_value.upsert.assert_not_called()
+        mock_calendar_cache.invalidate.assert_not_called()
+
+    def test_batch_update_calendars_failure(
+        self, headers, mock_client, mock_calendar_cache
+    ):
+        """POST /calendars/batch: 保存に失敗した場合は500を返し、キャッシュを破棄しない"""
+        mock_client.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value.data = []
+        mock_client.table.return_value.upsert.return_value.execute.side_effect = (
+            APIError({"message": "connection lost"})
+        )
+
+        response = client.post(
+            "/calendars/batch",
+            json={"dates": ["2024-08-10", "2024-08-11"], "is_holiday": True},
+            headers=headers,
+        )
+
+        assert response.status_code == 500
+        mock_calendar_cache.invalidate.assert_not_called()
+
+    def test_get_shift_pattern_default(self, headers, mock_client):
+        """GET /calendars/shift-pattern: 未設定の場合はデフォルトの勤務パターンを返す"""
+        query = mock_client.table.return_value.select.return_value
+        query.eq.return_value.limit.return_value.execute.return_value.data = []
+
+        response = client.get("/calendars/shift-pattern", headers=headers)
+
+        assert response.status_code == 200
+        query.eq.assert_called_once_with("tenant_id", "test-tenant-uuid")
+        data = response.json()
+        assert data["is_default"] is True
+        assert data["time_zone"] == "UTC"
+        assert data["working_intervals"] == [
+            {"start": "9:00", "end": "12:00"},
+            {"start": "13:00", "end": "17:00"},
+        ]
+
+    def test_update_shift_pattern(self, headers, mock_client, mock_calendar_cache):
+        """PUT /calendars/shift-pattern: 夜勤を含む勤務パターンを保存し、キャッシュを破棄する"""
+        mock_client.table.return_value.upsert.return_value.execute.return_value.data = [
+            {"id": 1}
+        ]
+        payload = {
+            "shifts": [{"start": "22:00", "end": "06:00"}],
+            "breaks": [{"start": "02:00", "end": "02:30"}],
+            "time_zone": "Asia/Tokyo",
+        }
+
+        response = client.put("/calendars/shift-pattern", json=payload, headers=headers)
+
+        assert response.status_code == 200
+        assert response.json()["time_zone"] == "Asia/Tokyo"
+        assert response.json()["working_intervals"] == [
+            {"start": "22:00", "end": "翌2:00"},
+            {"start": "翌2:30", "end": "翌6:00"},
+        ]
+        mock_client.table.return_value.upsert.assert_called_once_with(
+            {"tenant_id": "test-tenant-uuid", **payload}, on_conflict="tenant_id"
+        )
+        mock_calendar_cache.invalidate.assert_called_once_with("test-tenant-uuid")
+
+    def test_update_shift_pattern_invalid(
+        self, headers, mock_client, mock_calendar_cache
+    ):
+        """PUT /calendars/shift-pattern: 24時間を超える勤務パターンは保存しない"""
+        response = client.put(
+            "/calendars/shift-pattern",
+            json={
+                "shifts": [
+                    {"start": "00:00", "end": "10:00"},
+                    {"start": "20:00", "end": "01:00"},
+                ]
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 422
+        mock_client.table.return_value.upsert.assert_not_called()
+        mock_calendar_cache.invalidate.assert_not_called()
+
+    def test_update_shift_pattern_invalid_time_zone(
+        self, headers, mock_client, mock_calendar_cache
+    ):
+        """PUT /calendars/shift-pattern: 不正なタイムゾーンは保存しない"""
+        response = client.put(
+            "/calendars/shift-pattern",
+            json={
+                "shifts": [{"start": "09:00", "end": "17:00"}],
+                "time_zone": "Mars/Olympus",
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 422
+        mock_client.table.return_value.upsert.assert_not_called()
+        mock_calendar_cache.invalidate.assert_not_called()
@@ -2,10 +2,17 @@
 from unittest.mock import MagicMock
 
 import pytest
-from app.dependencies import get_equipment_repo
+from app.dependencies import (
+    get_calendar_cache,
+    get_equipment_repo,
+    get_order_repo,
+    get_product_repo,
+    get_schedule_repo,
+)
 
 # テスト対象のAPIインスタンス
 from app.main import app
+from app.services.calendar_service import CalendarCache
 from fastapi.testclient import TestClient
 
 # テストクライアントの作成
@@ -125,3 +132,215 @@ class TestEquipmentRouter:
 
         assert response.status_code == 404
         assert response.json()["detail"] == "Not found"
+
+    def test_create_equipment_calendar_overlay(self, headers, mock_repo):
+        """POST /{id}/calendar: 保全時間帯を登録する"""
+        mock_repo.create_calendar_overlay.return_value = {"id": 1}
+        payload = {
+            "kind": "maintenance",
+            "start_datetime": "2025-01-06T09:00:00+00:00",
+            "end_datetime": "2025-01-06T12:00:00+00:00",
+        }
+
+        response = client.post("/equipments/5/calendar", json=payload, headers=headers)
+
+        assert response.status_code == 200
+        data = mock_repo.create_calendar_overlay.call_args[0][0]
+        assert data["equipment_id"] == 5
+        assert data["kind"] == "maintenance"
+        assert data["tenant_id"] == headers["x-tenant-id"]
+
+    def test_create_equipment_calendar_overlay_invalid(self, headers, mock_repo):
+        """POST /{id}/calendar: 種別不正・開始が終了以降の場合は422"""
+        for payload in [
+            {
+                "kind": "holiday",
+                "start_datetime": "2025-01-06T09:00:00+00:00",
+                "end_datetime": "2025-01-06T12:00:00+00:00",
+            },
+            {
+                "kind": "extra_shift",
+                "start_datetime": "2025-01-06T12:00:00+00:00",
+                "end_datetime": "2025-01-06T09:00:00+00:00",
+            },
+        ]:
+            response = client.post(
+                "/equipments/5/calendar", json=payload, headers=headers
+            )
+            assert response.status_code == 422
+        mock_repo.create_calendar_overlay.assert_not_called()
+
+    def test_delete_equipment_calendar_overlay_not_found(self, headers, mock_repo):
+        """DELETE /{id}/calendar/{overlay_id}: 存在しない場合は404"""
+        mock_repo.delete_calendar_overlay.return_value = False
+
+        response = client.delete("/equipments/5/calendar/99", headers=headers)
+
+        assert response.status_code == 404
+        mock_repo.delete_calendar_overlay.assert_called_once_with(5, 99)
+
+
+@pytest.mark.api
+class TestEquipmentOutageRouter:
+    """POST /equipments/{id}/outage のテスト"""
+
+    @pytest.fixture
+    def mock_repo(self):
+        mock = MagicMock()
+        mock.get_by_id.return_value = {"id": 1, "name": "設備1"}
+        mock.get_calendar_overlays.return_value = []
+        mock.create_calendar_overlay.side_effect = lambda data: {"id": 5, **data}
+        return mock
+
+    @pytest.fixture
+    def mock_schedule_repo(self):
+        mock = MagicMock()
+        # 休日情報（work_calendars）は空にしておく
+        mock.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+        # 設備1の予約（停止と重なる）と、設備2の予約
+        rows = [
+            self._plan_row(1, 100, 1, "09:00", "10:00"),
+            self._plan_row(2, 200, 2, "09:00", "10:00"),
+        ]
+        mock.get_plan_suffix.side_effect = (
+            lambda since, *, equipment_ids=None, order_ids=None: [
+                row
+                for row in rows
+                if row["equipment_id"] in (equipment_ids or [])
+                or row["order_id"] in (order_ids or [])
+            ]
+        )
+        return mock
+
+    @pytest.fixture
+    def mock_product_repo(self):
+        mock = MagicMock()
+        mock.client.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {"equipment_group_id": 10, "equipment_id": 1},
+            {"equipment_group_id": 10, "equipment_id": 2},
+        ]
+        return mock
+
+    @pytest.fixture(autouse=True)
+    def override_dependency(self, mock_repo, mock_schedule_repo, mock_product_repo):
+        app.dependency_overrides[get_equipment_repo] = lambda: mock_repo
+        app.dependency_overrides[get_schedule_repo] = lambda: mock_schedule_repo
+        app.dependency_overrides[get_product_repo] = lambda: mock_product_repo
+        app.dependency_overrides[get_order_repo] = lambda: MagicMock()
+        calendar_cache = CalendarCache()
+        app.dependency_overrides[get_calendar_cache] = lambda: calendar_cache
+        yield
+        app.dependency_overrides = {}
+
+    @staticmethod
+    def _plan_row(
+        id: int, order_id: int, equipment_id: int, start: str, end: str
+    ) -> dict:
+        return {
+            "id": id,
+            "tenant_id": "tenant-a",
+            "order_id": order_id,
+            "process_routing_id": order_id * 10,
+            "sequence_order": 1,
+            "equipment_group_id": 10,
+            "equipment_id": equipment_id,
+            "start_datetime": f"2030-01-07T{start}:00+00:00",
+            "end_datetime": f"2030-01-07T{end}:00+00:00",
+        }
+
+    def test_register_outage(self, headers, mock_repo, mock_schedule_repo):
+        """停止期間を保全として登録し、重なる予約を同じ設備グループの設備へ移す"""
+        response = client.post(
+            "/equipments/1/outage",
+            json={
+                "start_datetime": "2030-01-07T09:00:00+00:00",
+                "end_datetime": "2030-01-07T17:00:00+00:00",
+                "note": "故障",
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert [
+            (s["id"], s["equipment_id"], s["start_datetime"]) for s in result["moved"]
+        ] == [(1, 2, "2030-01-07T10:00:00+00:00")]
+        assert result["overlay"]["kind"] == "maintenance"
+        assert result["overlay"]["equipment_id"] == 1
+        updates, inserts = mock_schedule_repo.apply_changes.call_args.args
+        assert [u["id"] for u in updates] == [1]
+        assert inserts == []
+
+    def test_register_outage_loads_affected_machines(
+        self, headers, mock_repo, mock_schedule_repo
+    ):
+        """計画全体ではなく、停止した設備と同じ設備グループの設備の予約だけを読み込む"""
+        response = client.post(
+            "/equipments/1/outage",
+            json={
+                "start_datetime": "2030-01-07T09:00:00+00:00",
+                "end_datetime": "2030-01-07T17:00:00+00:00",
+                "dry_run": True,
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        mock_schedule_repo.get_plan_from.assert_not_called()
+        assert mock_schedule_repo.get_plan_suffix.call_args.kwargs == {
+            "equipment_ids": [1, 2],
+            "order_ids": [100],
+        }
+
+    def test_register_outage_rolls_back_overlay(
+        self, headers, mock_repo, mock_schedule_repo
+    ):
+        """予約の変更の保存に失敗した場合は、登録した停止期間を削除する"""
+        mock_schedule_repo.apply_changes.side_effect = RuntimeError("rpc failed")
+
+        with pytest.raises(RuntimeError):
+            client.post(
+                "/equipments/1/outage",
+                json={
+                    "start_datetime": "2030-01-07T09:00:00+00:00",
+                    "end_datetime": "2030-01-07T17:00:00+00:00",
+                },
+                headers=headers,
+            )
+
+        mock_repo.create_calendar_overlay.assert_called_once()
+        mock_repo.delete_calendar_overlay.assert_called_once_with(1, 5)
+
+    def test_register_outage_dry_run(self, headers, mock_repo, mock_schedule_repo):
+        """dry_run では停止期間・予約の変更を保存しない"""
+        response = client.post(
+            "/equipments/1/outage",
+            json={
+                "start_datetime": "2030-01-07T09:00:00+00:00",
+                "end_datetime": "2030-01-07T17:00:00+00:00",
+                "dry_run": True,
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["updated_count"] == 1
+        mock_repo.create_calendar_overlay.assert_not_called()
+        mock_schedule_repo.apply_changes.assert_not_called()
+
+    def test_register_outage_invalid(self, headers, mock_repo):
+        """停止期間が不正な場合は422、存在しない設備は404"""
+        body = {
+            "start_datetime": "2030-01-07T17:00:00+00:00",
+            "end_datetime": "2030-01-07T09:00:00+00:00",
+        }
+        response = client.post("/equipments/1/outage", json=body, headers=headers)
+        assert response.status_code == 422
+
+        mock_repo.get_by_id.return_value = None
+        body = {
+            "start_datetime": "2030-01-07T09:00:00+00:00",
+            "end_datetime": "2030-01-07T17:00:00+00:00",
+        }
+        response = client.post("/equipments/99/outage", json=body, headers=headers)
+        assert response.status_code == 404
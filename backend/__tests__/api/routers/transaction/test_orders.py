@@ -1,9 +1,13 @@
 # __tests__/api/routers/transaction/test_orders.py
+from datetime import UTC, date, datetime, timedelta
 from unittest.mock import MagicMock
 
 import pytest
 from app.dependencies import (
+    get_calendar_cache,
     get_equipment_repo,
+    get_hold_store,
+    get_load_cache,
     get_order_repo,
     get_product_repo,
     get_schedule_repo,
@@ -11,6 +15,10 @@ from app.dependencies import (
 
 # テスト対象のAPIインスタンス
 from app.main import app
+from app.services.calendar_service import CalendarCache
+from app.services.hold_service import CapacityHoldStore
+from app.services.quick_quote_service import LoadCache
+from app.utils.equipment_calendar import EquipmentAvailability
 from fastapi.testclient import TestClient
 
 # テストクライアントの作成
@@ -37,17 +45,45 @@ class TestOrderRouter:
     def mock_equipment_repo(self):
         """設備リポジトリのモックを作成するフィクスチャ"""
         mock = MagicMock()
+        # 設備別稼働カレンダーは空にしておく
+        mock.get_calendar_overlays.return_value = []
         return mock
 
     @pytest.fixture
     def mock_schedule_repo(self):
         """スケジュールリポジトリのモックを作成するフィクスチャ"""
         mock = MagicMock()
+        # 休日情報（work_calendars）は空にしておく
+        mock.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+        # 設備別稼働カレンダー（equipment_calendar_overlays）も空にしておく
+        mock.client.table.return_value.select.return_value.gte.return_value.order.return_value.execute.return_value.data = []
         return mock
 
+    @pytest.fixture
+    def hold_store(self):
+        """テストごとに独立した仮押さえストア"""
+        return CapacityHoldStore()
+
+    @pytest.fixture
+    def calendar_cache(self):
+        """テストごとに独立した休日情報キャッシュ"""
+        return CalendarCache()
+
+    @pytest.fixture
+    def load_cache(self):
+        """テストごとに独立した作業量キャッシュ"""
+        return LoadCache()
+
     @pytest.fixture(autouse=True)
     def override_dependency(
-        self, mock_repo, mock_product_repo, mock_equipment_repo, mock_schedule_repo
+        self,
+        mock_repo,
+        mock_product_repo,
+        mock_equipment_repo,
+        mock_schedule_repo,
+        hold_store,
+        calendar_cache,
+        load_cache,
     ):
         """
         テスト実行中だけ依存関係を mock に差し替える。
@@ -56,6 +92,9 @@ class TestOrderRouter:
         app.dependency_overrides[get_product_repo] = lambda: mock_product_repo
         app.dependency_overrides[get_equipment_repo] = lambda: mock_equipment_repo
         app.dependency_overrides[get_schedule_repo] = lambda: mock_schedule_repo
+        app.dependency_overrides[get_hold_store] = lambda: hold_store
+        app.dependency_overrides[get_calendar_cache] = lambda: calendar_cache
+        app.dependency_overrides[get_load_cache] = lambda: load_cache
         yield
         app.dependency_overrides = {}
 
@@ -276,3 +315,537 @@ class TestOrderRouter:
 
         assert response.status_code == 404
         assert response.json()["detail"] == "Order not found"
+
+    def _setup_single_routing(self, mock_product_repo, mock_schedule_repo):
+        """1工程・1設備の製品データをモックに設定する"""
+        mock_product_repo.get_routings_by_product.return_value = [
+            {
+                "id": 1,
+                "equipment_group_id": 100,
+                "setup_time_seconds": 0,
+                "unit_time_seconds": 600,
+                "sequence_order": 1,
+            }
+        ]
+        mock_product_repo.client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+            {"equipment_id": 1}
+        ]
+        mock_schedule_repo.get_last_end_time.return_value = None
+        mock_product_repo.get_process_name.return_value = "テスト工程"
+
+    def test_simulate_with_hold_reserves_capacity(
+        self, headers, mock_product_repo, mock_schedule_repo, hold_store
+    ):
+        """POST /simulate: hold=True の結果は後続のシミュレーションで占有扱いになる"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        payload = {"product_id": 100, "quantity": 6, "hold": True}
+
+        first = client.post("/orders/simulate", json=payload, headers=headers)
+        second = client.post("/orders/simulate", json=payload, headers=headers)
+
+        assert first.status_code == 200
+        assert "hold_id" in first.json()
+        assert "hold_expires_at" in first.json()
+        # 2回目は1回目の仮押さえの後ろに配置される
+        first_end = first.json()["process_schedules"][-1]["end_time"]
+        second_start = second.json()["process_schedules"][0]["start_time"]
+        assert second_start >= first_end
+        assert len(hold_store.reserved_until(headers["x-tenant-id"])) == 1
+
+    def test_confirm_order_promotes_hold(
+        self, headers, mock_repo, mock_product_repo, mock_schedule_repo
+    ):
+        """POST /{order_id}/confirm: 仮押さえを再計算せずに本予約へ昇格する"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        simulated = client.post(
+            "/orders/simulate",
+            json={"product_id": 100, "quantity": 6, "hold": True},
+            headers=headers,
+        )
+        hold_id = simulated.json()["hold_id"]
+        mock_repo.get_by_id.return_value = {"id": 1, "product_id": 100, "quantity": 6}
+        mock_product_repo.get_routings_by_product.reset_mock()
+
+        response = client.post(
+            "/orders/1/confirm", params={"hold_id": hold_id}, headers=headers
+        )
+
+        assert response.status_code == 200
+        schedules = response.json()["schedules"]
+        assert all(schedule["order_id"] == 1 for schedule in schedules)
+        mock_schedule_repo.create_many.assert_called_once()
+        mock_product_repo.get_routings_by_product.assert_not_called()
+
+        # 昇格済みの仮押さえは再利用できない
+        response = client.post(
+            "/orders/1/confirm", params={"hold_id": hold_id}, headers=headers
+        )
+        assert response.status_code == 409
+
+    def test_confirm_order_restores_hold_on_failure(
+        self, headers, mock_repo, mock_product_repo, mock_schedule_repo, hold_store
+    ):
+        """POST /{order_id}/confirm: 本予約の保存に失敗した場合は仮押さえを戻す"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        simulated = client.post(
+            "/orders/simulate",
+            json={"product_id": 100, "quantity": 6, "hold": True},
+            headers=headers,
+        )
+        hold_id = simulated.json()["hold_id"]
+        mock_repo.get_by_id.return_value = {"id": 1, "product_id": 100, "quantity": 6}
+        mock_schedule_repo.create_many.side_effect = [RuntimeError("db error"), None]
+
+        with pytest.raises(RuntimeError):
+            client.post(
+                "/orders/1/confirm", params={"hold_id": hold_id}, headers=headers
+            )
+        assert hold_store.get(headers["x-tenant-id"], hold_id) is not None
+
+        response = client.post(
+            "/orders/1/confirm", params={"hold_id": hold_id}, headers=headers
+        )
+        assert response.status_code == 200
+        assert hold_store.get(headers["x-tenant-id"], hold_id) is None
+
+    def test_confirm_order_hold_mismatch(
+        self, headers, mock_repo, mock_product_repo, mock_schedule_repo, hold_store
+    ):
+        """POST /{order_id}/confirm: 仮押さえと注文の数量が異なる場合は400"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        simulated = client.post(
+            "/orders/simulate",
+            json={"product_id": 100, "quantity": 6, "hold": True},
+            headers=headers,
+        )
+        mock_repo.get_by_id.return_value = {"id": 1, "product_id": 100, "quantity": 7}
+
+        response = client.post(
+            "/orders/1/confirm",
+            params={"hold_id": simulated.json()["hold_id"]},
+            headers=headers,
+        )
+
+        assert response.status_code == 400
+        mock_schedule_repo.create_many.assert_not_called()
+        # 一致しない注文の確定では仮押さえを消費しない
+        assert hold_store.get(headers["x-tenant-id"], simulated.json()["hold_id"])
+
+    def test_release_hold(self, headers, mock_product_repo, mock_schedule_repo):
+        """DELETE /holds/{hold_id}: 仮押さえの解除"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        simulated = client.post(
+            "/orders/simulate",
+            json={"product_id": 100, "quantity": 6, "hold": True},
+            headers=headers,
+        )
+        hold_id = simulated.json()["hold_id"]
+
+        assert (
+            client.delete(f"/orders/holds/{hold_id}", headers=headers).status_code
+            == 200
+        )
+        assert (
+            client.delete(f"/orders/holds/{hold_id}", headers=headers).status_code
+            == 404
+        )
+
+    def test_simulate_uses_tenant_calendar(
+        self, headers, mock_product_repo, mock_schedule_repo
+    ):
+        """POST /simulate: テナントの休日を考慮し、休日情報はキャッシュから再利用する"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        today = date.today()
+        holidays = [today + timedelta(days=i) for i in range(14)]
+        calendar_query = mock_schedule_repo.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value
+        calendar_query.execute.return_value.data = [
+            {"date": d.isoformat(), "is_holiday": True, "note": None} for d in holidays
+        ]
+        payload = {"product_id": 100, "quantity": 6}
+
+        for _ in range(2):
+            response = client.post("/orders/simulate", json=payload, headers=headers)
+            assert response.status_code == 200
+            start = datetime.fromisoformat(
+                response.json()["process_schedules"][0]["start_time"]
+            )
+            assert start.date() > holidays[-1]
+
+        # 2回目のシミュレーションではDBへ問い合わせない
+        assert calendar_query.execute.call_count == 1
+
+    def test_simulate_respects_equipment_maintenance(
+        self, headers, mock_product_repo, mock_schedule_repo
+    ):
+        """POST /simulate: 設備別の保全時間帯には割り当てない"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        now = datetime.now(UTC)
+        maintenance_end = now + timedelta(days=10)
+        overlay_query = mock_schedule_repo.client.table.return_value.select.return_value.gte.return_value.order.return_value
+        overlay_query.execute.return_value.data = [
+            {
+                "equipment_id": 1,
+                "kind": "maintenance",
+                "start_datetime": (now - timedelta(days=1)).isoformat(),
+                "end_datetime": maintenance_end.isoformat(),
+            }
+        ]
+
+        response = client.post(
+            "/orders/simulate",
+            json={"product_id": 100, "quantity": 6},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        start = datetime.fromisoformat(
+            response.json()["process_schedules"][0]["start_time"]
+        )
+        assert start >= maintenance_end
+
+    def test_simulate_quantity_sweep(
+        self, headers, mock_product_repo, mock_schedule_repo
+    ):
+        """POST /simulate/sweep: 数量ごとのリードタイムを1回の読み込みで試算する"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+
+        response = client.post(
+            "/orders/simulate/sweep",
+            json={"product_id": 100, "quantities": [6, 60, 600]},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        points = response.json()["points"]
+        assert [point["quantity"] for point in points] == [6, 60, 600]
+        lead_times = [point["lead_time_seconds"] for point in points]
+        assert lead_times == sorted(lead_times)
+        mock_product_repo.get_routings_by_product.assert_called_once_with(100)
+        mock_schedule_repo.get_last_end_time.assert_called_once_with(1)
+
+    def test_simulate_max_quantity(
+        self, headers, mock_product_repo, mock_schedule_repo, mock_equipment_repo
+    ):
+        """POST /simulate/max-quantity: 希望納期までに対応可能な最大数量を返す"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        deadline = datetime.now(UTC) + timedelta(days=30)
+
+        response = client.post(
+            "/orders/simulate/max-quantity",
+            json={"product_id": 100, "desired_deadline": deadline.isoformat()},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["max_quantity"] > 0
+        assert datetime.fromisoformat(data["calculated_deadline"]) <= deadline
+        assert data["process_schedules"][-1]["end_time"] == data["calculated_deadline"]
+        mock_product_repo.get_routings_by_product.assert_called_once_with(100)
+        mock_schedule_repo.get_last_end_time.assert_called_once_with(1)
+
+    def test_simulate_max_quantity_past_deadline(
+        self, headers, mock_product_repo, mock_schedule_repo
+    ):
+        """POST /simulate/max-quantity: 1個も間に合わない場合は0"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+
+        response = client.post(
+            "/orders/simulate/max-quantity",
+            json={"product_id": 100, "desired_deadline": "2000-01-01T00:00:00"},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["max_quantity"] == 0
+        assert response.json()["process_schedules"] is None
+
+    def test_simulate_multi_line(self, headers, mock_product_repo, mock_schedule_repo):
+        """POST /simulate-multi: 明細ごとと全体の回答納期を返す"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        mock_product_repo.get_routings_by_products.return_value = {
+            100: mock_product_repo.get_routings_by_product.return_value
+        }
+        mock_product_repo.client.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {"equipment_group_id": 100, "equipment_id": 1}
+        ]
+
+        response = client.post(
+            "/orders/simulate-multi",
+            json={
+                "lines": [
+                    {"product_id": 100, "quantity": 6},
+                    {"product_id": 100, "quantity": 6},
+                ]
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        first, second = data["lines"]
+        assert (
+            second["process_schedules"][0]["start_time"]
+            >= first["process_schedules"][-1]["end_time"]
+        )
+        assert data["calculated_deadline"] == second["calculated_deadline"]
+        mock_product_repo.get_routings_by_products.assert_called_once_with([100])
+        mock_schedule_repo.get_last_end_time.assert_called_once_with(1)
+
+    def test_simulate_multi_line_unknown_product(
+        self, headers, mock_product_repo, mock_schedule_repo
+    ):
+        """POST /simulate-multi: 工程のない製品を含む場合は400"""
+        mock_product_repo.get_routings_by_products.return_value = {999: []}
+
+        response = client.post(
+            "/orders/simulate-multi",
+            json={"lines": [{"product_id": 999, "quantity": 1}]},
+            headers=headers,
+        )
+
+        assert response.status_code == 400
+
+    def test_simulate_quick_quote(self, headers, mock_product_repo, mock_schedule_repo):
+        """POST /simulate/quick: 作業量のキャッシュから回答納期と範囲を概算する"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        mock_product_repo.client.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {"equipment_group_id": 100, "equipment_id": 1}
+        ]
+        mock_schedule_repo.get_plan_from.return_value = []
+        payload = {"product_id": 100, "quantity": 6}
+
+        first = client.post("/orders/simulate/quick", json=payload, headers=headers)
+        second = client.post("/orders/simulate/quick", json=payload, headers=headers)
+
+        assert first.status_code == 200
+        data = first.json()
+        # 予約のない設備では見積もりと範囲が一致する
+        assert (
+            data["earliest_deadline"]
+            == data["calculated_deadline"]
+            == data["latest_deadline"]
+        )
+        assert data["error_seconds"] == {"minus": 0, "plus": 0}
+        assert second.status_code == 200
+        mock_schedule_repo.get_plan_from.assert_called_once()
+        mock_product_repo.get_routings_by_product.assert_called_once_with(100)
+
+    def test_confirm_order_invalidates_load_cache(
+        self, headers, mock_repo, mock_product_repo, mock_schedule_repo, load_cache
+    ):
+        """POST /{order_id}/confirm: 確定後は簡易見積もりの作業量を読み込み直す"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        mock_schedule_repo.get_plan_from.return_value = []
+        load = load_cache.get(
+            headers["x-tenant-id"], mock_schedule_repo, EquipmentAvailability(tz=UTC)
+        )
+        mock_repo.get_by_id.return_value = {"id": 1, "product_id": 100, "quantity": 6}
+
+        response = client.post("/orders/1/confirm", headers=headers)
+
+        assert response.status_code == 200
+        assert (
+            load_cache.get(
+                headers["x-tenant-id"],
+                mock_schedule_repo,
+                EquipmentAvailability(tz=UTC),
+            )
+            is not load
+        )
+
+    def test_simulate_quantity_sweep_invalid_quantity(self, headers):
+        """POST /simulate/sweep: 0以下の数量は422"""
+        response = client.post(
+            "/orders/simulate/sweep",
+            json={"product_id": 100, "quantities": [10, 0]},
+            headers=headers,
+        )
+
+        assert response.status_code == 422
+
+    def _setup_expedite(self, mock_repo, mock_product_repo, mock_schedule_repo):
+        """1工程・1設備の特急注文と、同じ設備の既存の予約をモックに設定する"""
+        self._setup_single_routing(mock_product_repo, mock_schedule_repo)
+        mock_product_repo.client.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {"equipment_group_id": 100, "equipment_id": 1}
+        ]
+        mock_repo.get_by_id.return_value = {"id": 1, "product_id": 100, "quantity": 6}
+        rows = [
+            {
+                "id": 50,
+                "tenant_id": "tenant-a",
+                "order_id": 2,
+                "process_routing_id": 20,
+                "sequence_order": 1,
+                "equipment_id": 1,
+                "start_datetime": "2025-01-06T09:00:00+00:00",
+                "end_datetime": "2025-01-06T10:00:00+00:00",
+            }
+        ]
+
+        def get_plan_suffix(since, *, equipment_ids=None, order_ids=None):
+            return [
+                row
+                for row in rows
+                if row["equipment_id"] in (equipment_ids or [])
+                or row["order_id"] in (order_ids or [])
+            ]
+
+        mock_schedule_repo.get_plan_suffix.side_effect = get_plan_suffix
+
+    def test_expedite_order(
+        self, headers, mock_repo, mock_product_repo, mock_schedule_repo
+    ):
+        """POST /{order_id}/expedite: 割り込んだ注文の前の予約を後ろへずらし、まとめて保存する"""
+        self._setup_expedite(mock_repo, mock_product_repo, mock_schedule_repo)
+
+        response = client.post(
+            "/orders/1/expedite",
+            json={"start_datetime": "2025-01-06T09:00:00+00:00"},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert [s["start_datetime"] for s in result["schedules"]] == [
+            "2025-01-06T09:00:00+00:00"
+        ]
+        assert [(s["id"], s["start_datetime"]) for s in result["rippled"]] == [
+            (50, "2025-01-06T10:00:00+00:00")
+        ]
+        assert result["delayed_orders"] == [
+            {
+                "order_id": 2,
+                "previous_end": "2025-01-06T10:00:00+00:00",
+                "new_end": "2025-01-06T11:00:00+00:00",
+                "delay_seconds": 3600,
+            }
+        ]
+        mock_schedule_repo.apply_changes.assert_called_once()
+        updates, inserts, deletes = mock_schedule_repo.apply_changes.call_args.args
+        assert [u["id"] for u in updates] == [50]
+        assert [i["order_id"] for i in inserts] == [1]
+        assert deletes == []
+        mock_repo.update.assert_called_once_with(
+            1, {"status": "confirmed", "is_scheduled": True}
+        )
+        # 計画全体ではなく、候補の設備1と特急注文・押し出された注文の予約だけを読み込む
+        mock_schedule_repo.get_plan_from.assert_not_called()
+        loaded = [
+            call.kwargs for call in mock_schedule_repo.get_plan_suffix.call_args_list
+        ]
+        assert loaded == [
+            {"equipment_ids": [1], "order_ids": [1]},
+            {"equipment_ids": [1], "order_ids": [1, 2]},
+        ]
+
+    def test_expedite_order_dry_run(
+        self, headers, mock_repo, mock_product_repo, mock_schedule_repo
+    ):
+        """POST /{order_id}/expedite: dry_run では保存しない"""
+        self._setup_expedite(mock_repo, mock_product_repo, mock_schedule_repo)
+
+        response = client.post(
+            "/orders/1/expedite",
+            json={"start_datetime": "2025-01-06T09:00:00+00:00", "dry_run": True},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["updated_count"] == 1
+        mock_schedule_repo.apply_changes.assert_not_called()
+        mock_repo.update.assert_not_called()
+
+    def test_expedite_order_not_found(self, headers, mock_repo):
+        """POST /{order_id}/expedite: 注文が存在しない場合は404"""
+        mock_repo.get_by_id.return_value = None
+
+        response = client.post("/orders/999/expedite", json={}, headers=headers)
+
+        assert response.status_code == 404
+
+    @pytest.fixture
+    def released_plan(self, mock_repo, mock_schedule_repo):
+        """
+        注文1（設備1）の後ろに注文2、別の設備2に注文3が並ぶ計画。
+
+        get_plan_suffix は指定した設備・注文のいずれかに属する予約だけを返す。
+        """
+        mock_repo.get_by_id.return_value = {"id": 1, "product_id": 100, "quantity": 6}
+        # 来週以降の月曜日 9:00（稼働時間内）
+        monday = date.today() + timedelta(days=14 - date.today().weekday())
+        start = datetime(monday.year, monday.month, monday.day, 9, tzinfo=UTC)
+        rows = [
+            {
+                "id": schedule_id,
+                "tenant_id": "tenant-a",
+                "order_id": order_id,
+                "process_routing_id": 10,
+                "sequence_order": 1,
+                "equipment_id": equipment_id,
+                "start_datetime": (start + timedelta(hours=offset)).isoformat(),
+                "end_datetime": (start + timedelta(hours=offset + 1)).isoformat(),
+            }
+            for schedule_id, order_id, equipment_id, offset in (
+                (50, 1, 1, 0),
+                (51, 2, 1, 1),
+                (52, 3, 2, 3),
+            )
+        ]
+
+        def get_plan_suffix(since, *, equipment_ids=None, order_ids=None):
+            return [
+                row
+                for row in rows
+                if row["equipment_id"] in (equipment_ids or [])
+                or row["order_id"] in (order_ids or [])
+            ]
+
+        mock_schedule_repo.get_plan_suffix.side_effect = get_plan_suffix
+        return rows
+
+    def test_cancel_order_compacts_freed_capacity(
+        self, headers, mock_repo, mock_schedule_repo, released_plan
+    ):
+        """POST /{order_id}/cancel: 予約を削除し、空いた設備の後続の予約を前詰めする"""
+        response = client.post("/orders/1/cancel", headers=headers)
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["released_count"] == 1
+        assert [s["id"] for s in result["compacted"]] == [51]
+        updates, inserts, deletes = mock_schedule_repo.apply_changes.call_args.args
+        assert [u["id"] for u in updates] == [51]
+        assert deletes == [50]
+        mock_repo.update.assert_called_once_with(
+            1, {"status": "canceled", "is_scheduled": False}
+        )
+        # 計画全体ではなく、空いた設備1の末尾とその予約の注文だけを読み込む
+        mock_schedule_repo.get_plan_from.assert_not_called()
+        loaded = [
+            call.kwargs for call in mock_schedule_repo.get_plan_suffix.call_args_list
+        ]
+        assert loaded == [
+            {"order_ids": [1]},
+            {"equipment_ids": [1]},
+            {"order_ids": [2]},
+        ]
+
+    def test_update_order_status_canceled_compacts(
+        self, headers, mock_repo, mock_schedule_repo, released_plan
+    ):
+        """PATCH /{id}: status=canceled はキャンセルと同じく予約を解放して前詰めする"""
+        mock_repo.update.return_value = {"id": 1, "status": "canceled"}
+
+        response = client.patch(
+            "/orders/1", json={"status": "canceled"}, headers=headers
+        )
+
+        assert response.status_code == 200
+        updates, inserts, deletes = mock_schedule_repo.apply_changes.call_args.args
+        assert [u["id"] for u in updates] == [51]
+        assert deletes == [50]
+        mock_repo.update.assert_called_once_with(
+            1, {"status": "canceled", "is_scheduled": False}
+        )
@@ -0,0 +1,188 @@
+# __tests__/api/routers/transaction/test_plan_versions.py
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import (
+    get_plan_version_cache,
+    get_plan_version_repo,
+    get_schedule_repo,
+)
+
+# テスト対象のAPIインスタンス
+from app.main import app
+from app.services.plan_version_service import PlanVersionCache
+
+# テストクライアントの作成
+client = TestClient(app)
+
+
+def _schedule(schedule_id: int, start: str, end: str) -> dict:
+    return {
+        "id": schedule_id,
+        "tenant_id": "tenant-a",
+        "order_id": 1,
+        "process_routing_id": 10 + schedule_id,
+        "equipment_id": 101,
+        "start_datetime": f"2025-01-06T{start}:00+00:00",
+        "end_datetime": f"2025-01-06T{end}:00+00:00",
+        "sequence_order": schedule_id,
+        "equipment_group_id": 10,
+    }
+
+
+@pytest.mark.api
+class TestPlanVersionsRouter:
+    """plan_versionsルーターのユニットテスト"""
+
+    @pytest.fixture
+    def records(self):
+        """保存したバージョン（DBの代わり）"""
+        return {}
+
+    @pytest.fixture
+    def mock_repo(self, records):
+        """保存したバージョンを返すリポジトリのモック"""
+        summary_keys = ("changes", "timeline")
+
+        def create(data):
+            record = {**data, "id": len(records) + 1}
+            records[record["id"]] = record
+            return record
+
+        mock = MagicMock()
+        mock.create.side_effect = create
+        mock.get_summaries.side_effect = lambda ids: {
+            i: {k: v for k, v in records[i].items() if k not in summary_keys}
+            for i in ids
+            if i in records
+        }
+        mock.get_payloads.side_effect = lambda ids, with_timeline=True: {
+            i: {
+                "id": i,
+                "changes": records[i]["changes"],
+                "timeline": records[i]["timeline"] if with_timeline else None,
+            }
+            for i in ids
+            if i in records
+        }
+        return mock
+
+    @pytest.fixture
+    def mock_schedule_repo(self):
+        mock = MagicMock()
+        mock.get_plan_rows.return_value = [
+            _schedule(1, "09:00", "10:00"),
+            _schedule(2, "10:00", "12:00"),
+        ]
+        return mock
+
+    @pytest.fixture(autouse=True)
+    def override_dependency(self, mock_repo, mock_schedule_repo):
+        app.dependency_overrides[get_plan_version_repo] = lambda: mock_repo
+        app.dependency_overrides[get_schedule_repo] = lambda: mock_schedule_repo
+        cache = PlanVersionCache()
+        app.dependency_overrides[get_plan_version_cache] = lambda: cache
+        yield
+        app.dependency_overrides = {}
+
+    def _create(self, headers, name: str, base_version_id: int | None = None):
+        return client.post(
+            "/plan-versions/",
+            json={"name": name, "base_version_id": base_version_id},
+            headers=headers,
+        )
+
+    def test_create_root_version(self, headers, records):
+        """元のバージョンを指定しない場合は計画全体を保存する"""
+        response = self._create(headers, "Monday baseline")
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["name"] == "Monday baseline"
+        assert result["segment_count"] == 2
+        assert "timeline" not in result
+        assert records[1]["tenant_id"] == headers["x-tenant-id"]
+        assert len(records[1]["timeline"]) == 2
+
+    def test_branch_stores_changes_only(self, headers, records, mock_schedule_repo):
+        """元のバージョンからの差分だけを保存し、計画を復元・比較できる"""
+        self._create(headers, "Monday baseline")
+        mock_schedule_repo.get_plan_rows.return_value = [
+            _schedule(1, "09:00", "10:00"),
+            _schedule(2, "13:00", "15:00"),
+            _schedule(3, "15:00", "16:00"),
+        ]
+
+        response = self._create(headers, "moved", base_version_id=1)
+
+        assert response.status_code == 200
+        assert response.json()["change_count"] == 2
+        assert records[2]["timeline"] is None
+        assert [change["id"] for change in records[2]["changes"]] == [2, 3]
+
+        response = client.get("/plan-versions/2", headers=headers)
+        assert response.status_code == 200
+        schedules = response.json()["schedules"]
+        assert [(s["id"], s["start_datetime"]) for s in schedules] == [
+            (1, "2025-01-06T09:00:00+00:00"),
+            (2, "2025-01-06T13:00:00+00:00"),
+            (3, "2025-01-06T15:00:00+00:00"),
+        ]
+
+        response = client.get(
+            "/plan-versions/diff",
+            params={"from_version_id": 1, "to_version_id": 2},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert result["common_version_id"] == 1
+        assert [(c["id"], c["kind"]) for c in result["changes"]] == [
+            (2, "changed"),
+            (3, "added"),
+        ]
+
+    def test_diff_without_common_ancestor(self, headers, mock_schedule_repo):
+        """共通の祖先がない場合は計画全体を比較する"""
+        self._create(headers, "first")
+        mock_schedule_repo.get_plan_rows.return_value = [_schedule(1, "09:00", "10:00")]
+        self._create(headers, "second")
+
+        response = client.get(
+            "/plan-versions/diff",
+            params={"from_version_id": 1, "to_version_id": 2},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["common_version_id"] is None
+        assert [(c["id"], c["kind"]) for c in result["changes"]] == [(2, "removed")]
+
+    def test_not_found(self, headers, mock_repo):
+        """存在しないバージョンは 404"""
+        assert self._create(headers, "x", base_version_id=99).status_code == 404
+        assert client.get("/plan-versions/99", headers=headers).status_code == 404
+        response = client.get(
+            "/plan-versions/diff",
+            params={"from_version_id": 1, "to_version_id": 99},
+            headers=headers,
+        )
+        assert response.status_code == 404
+        mock_repo.create.assert_not_called()
+
+    def test_missing_payload_is_not_found(self, headers, mock_repo):
+        """バージョンの差分が見つからない場合（削除済みなど）は 404"""
+        self._create(headers, "Monday baseline")
+        self._create(headers, "moved", base_version_id=1)
+        mock_repo.get_payloads.side_effect = lambda ids, with_timeline=True: {}
+
+        assert self._create(headers, "x", base_version_id=2).status_code == 404
+        response = client.get(
+            "/plan-versions/diff",
+            params={"from_version_id": 1, "to_version_id": 2},
+            headers=headers,
+        )
+        assert response.status_code == 404
@@ -4,10 +4,18 @@ from unittest.mock import MagicMock
 import pytest
 from fastapi.testclient import TestClient
 
-from app.dependencies import get_schedule_repo
+from app.dependencies import (
+    get_calendar_cache,
+    get_equipment_repo,
+    get_load_cache,
+    get_order_repo,
+    get_product_repo,
+    get_schedule_repo,
+)
 
 # テスト対象のAPIインスタンス
 from app.main import app
+from app.services.calendar_service import CalendarCache
 
 # テストクライアントの作成
 client = TestClient(app)
@@ -21,14 +29,31 @@ class TestProductionSchedulesRouter:
     def mock_repo(self):
         """リポジトリのモックを作成するフィクスチャ"""
         mock = MagicMock()
+        # 制約違反の検出で参照する周辺スケジュール・カレンダーは空にしておく
+        mock.get_plan_rows.return_value = []
+        mock.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+        return mock
+
+    @pytest.fixture
+    def mock_equipment_repo(self):
+        """設備リポジトリのモック（設備別稼働カレンダーは空）"""
+        mock = MagicMock()
+        mock.get_calendar_overlays.return_value = []
         return mock
 
     @pytest.fixture(autouse=True)
-    def override_dependency(self, mock_repo):
+    def override_dependency(self, mock_repo, mock_equipment_repo):
         """
         テスト実行中だけ依存関係を mock に差し替える。
         """
         app.dependency_overrides[get_schedule_repo] = lambda: mock_repo
+        # 注文・プロダクトを参照しないエンドポイントでも ScheduleService の生成に必要
+        app.dependency_overrides[get_order_repo] = lambda: MagicMock()
+        app.dependency_overrides[get_product_repo] = lambda: MagicMock()
+        app.dependency_overrides[get_equipment_repo] = lambda: mock_equipment_repo
+        # テスト間で休日情報のキャッシュを共有しない
+        calendar_cache = CalendarCache()
+        app.dependency_overrides[get_calendar_cache] = lambda: calendar_cache
         yield
         app.dependency_overrides = {}
 
@@ -71,7 +96,7 @@ class TestProductionSchedulesRouter:
         assert response.status_code == 200
         assert response.json() == expected_data
         mock_repo.get_by_period.assert_called_once_with(
-            "2024-01-01", "2024-01-31", None
+            "2024-01-01", "2024-01-31", None, time_zone="UTC"
         )
 
     def test_get_production_schedules_with_equipment_group_filter(
@@ -106,7 +131,9 @@ class TestProductionSchedulesRouter:
 
         assert response.status_code == 200
         assert response.json() == expected_data
-        mock_repo.get_by_period.assert_called_once_with("2024-01-01", "2024-01-31", 1)
+        mock_repo.get_by_period.assert_called_once_with(
+            "2024-01-01", "2024-01-31", 1, time_zone="UTC"
+        )
 
     def test_get_production_schedules_empty_result(self, headers, mock_repo):
         """GET /: 結果が空の場合のテスト"""
@@ -121,7 +148,7 @@ class TestProductionSchedulesRouter:
         assert response.status_code == 200
         assert response.json() == []
         mock_repo.get_by_period.assert_called_once_with(
-            "2024-12-01", "2024-12-31", None
+            "2024-12-01", "2024-12-31", None, time_zone="UTC"
         )
 
     def test_get_production_schedules_empty_equipment_group(self, headers, mock_repo):
@@ -141,7 +168,7 @@ class TestProductionSchedulesRouter:
         assert response.status_code == 200
         assert response.json() == []
         mock_repo.get_by_period.assert_called_once_with(
-            "2024-01-01", "2024-01-31", 999
+            "2024-01-01", "2024-01-31", 999, time_zone="UTC"
         )
 
     def test_get_production_schedules_missing_required_params(self, headers):
@@ -167,7 +194,7 @@ class TestProductionSchedulesRouter:
         assert response.status_code == 422  # Unprocessable Entity
 
     def test_update_production_schedule(self, headers, mock_repo):
-        """PATCH /{schedule_id}: スケジュールの更新テスト"""
+        """PATCH /{schedule_id}?snap=false: 指定どおりの日時で更新するテスト"""
         schedule_id = 10000001
         update_data = {
             "start_datetime": "2024-01-01T10:00:00+00:00",
@@ -186,12 +213,13 @@ class TestProductionSchedulesRouter:
 
         response = client.patch(
             f"/production-schedules/{schedule_id}",
+            params={"snap": "false"},
             json=update_data,
             headers=headers,
         )
 
         assert response.status_code == 200
-        assert response.json() == expected_response
+        assert response.json() == {**expected_response, "conflicts": []}
         mock_repo.update.assert_called_once_with(schedule_id, update_data)
 
     def test_update_production_schedule_partial_update(self, headers, mock_repo):
@@ -210,12 +238,17 @@ class TestProductionSchedulesRouter:
 
         response = client.patch(
             f"/production-schedules/{schedule_id}",
+            params={"snap": "false"},
             json=update_data,
             headers=headers,
         )
 
         assert response.status_code == 200
-        assert response.json() == expected_response
+        body = response.json()
+        assert {k: body[k] for k in expected_response} == expected_response
+        # 始業前に開始しているため、稼働時間外の違反が返される
+        assert [c["type"] for c in body["conflicts"]] == ["off_hours"]
+        assert body["conflicts"][0]["schedule_ids"] == [schedule_id]
         mock_repo.update.assert_called_once_with(schedule_id, update_data)
 
     def test_update_production_schedule_equipment_only(self, headers, mock_repo):
@@ -239,7 +272,7 @@ class TestProductionSchedulesRouter:
         )
 
         assert response.status_code == 200
-        assert response.json() == expected_response
+        assert response.json() == {**expected_response, "conflicts": []}
         mock_repo.update.assert_called_once_with(schedule_id, update_data)
 
     def test_update_production_schedule_not_found(self, headers, mock_repo):
@@ -252,6 +285,7 @@ class TestProductionSchedulesRouter:
 
         response = client.patch(
             f"/production-schedules/{schedule_id}",
+            params={"snap": "false"},
             json=update_data,
             headers=headers,
         )
@@ -299,5 +333,734 @@ class TestProductionSchedulesRouter:
 
         # 空のペイロードでも有効（何も更新されないが、リクエストは成功）
         assert response.status_code == 200
-        assert response.json() == expected_response
+        assert response.json() == {**expected_response, "conflicts": []}
         mock_repo.update.assert_called_once_with(schedule_id, {})
+
+    def test_update_production_schedule_cascade(self, headers, mock_repo):
+        """PATCH /{schedule_id}?cascade=true: 後続工程が連鎖して移動するテスト"""
+        moved = {
+            "id": 1,
+            "tenant_id": "tenant-a",
+            "order_id": 100,
+            "process_routing_id": 1001,
+            "sequence_order": 1,
+            "equipment_id": 101,
+            "start_datetime": "2025-01-06T09:00:00+00:00",
+            "end_datetime": "2025-01-06T10:00:00+00:00",
+        }
+        successor = {
+            **moved,
+            "id": 2,
+            "process_routing_id": 1002,
+            "sequence_order": 2,
+            "equipment_id": 102,
+            "start_datetime": "2025-01-06T10:00:00+00:00",
+            "end_datetime": "2025-01-06T11:00:00+00:00",
+        }
+        mock_repo.get_by_id.return_value = moved
+        mock_repo.get_plan_suffix.return_value = [moved, successor]
+        mock_repo.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+
+        response = client.patch(
+            "/production-schedules/1",
+            params={"cascade": "true"},
+            json={"start_datetime": "2025-01-06T14:00:00+00:00"},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["schedule"]["start_datetime"] == "2025-01-06T14:00:00+00:00"
+        assert result["schedule"]["end_datetime"] == "2025-01-06T15:00:00+00:00"
+        assert result["rippled"][0]["id"] == 2
+        assert result["rippled"][0]["start_datetime"] == "2025-01-06T15:00:00+00:00"
+        assert result["affected_order_ids"] == [100]
+        mock_repo.update.assert_not_called()
+        # 変更は1回のバッチで保存される
+        mock_repo.apply_changes.assert_called_once()
+        updates, inserts = mock_repo.apply_changes.call_args[0]
+        assert [u["id"] for u in updates] == [1, 2]
+        assert inserts == []
+        # 計画全体ではなく、連鎖が及んだ設備・注文の予約だけを読み込む
+        mock_repo.get_plan_from.assert_not_called()
+        assert mock_repo.get_plan_suffix.call_args.kwargs == {
+            "equipment_ids": [101, 102],
+            "order_ids": [100],
+        }
+
+    def test_update_production_schedule_invalidates_load_cache(
+        self, headers, mock_repo
+    ):
+        """PATCH /{schedule_id}: 保存後は簡易見積もりの作業量を読み込み直す"""
+        load_cache = MagicMock()
+        app.dependency_overrides[get_load_cache] = lambda: load_cache
+        mock_repo.update.return_value = self._plan_row(1, 101, "09:00", "10:00")
+
+        response = client.patch(
+            "/production-schedules/1",
+            params={"snap": "false"},
+            json={"equipment_id": 101},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        load_cache.invalidate.assert_called_once_with(headers["x-tenant-id"])
+
+    def test_update_production_schedule_cascade_not_found(self, headers, mock_repo):
+        """PATCH /{schedule_id}?cascade=true: 存在しないスケジュールは404"""
+        mock_repo.get_by_id.return_value = None
+
+        response = client.patch(
+            "/production-schedules/999",
+            params={"cascade": "true"},
+            json={"start_datetime": "2025-01-06T14:00:00+00:00"},
+            headers=headers,
+        )
+
+        assert response.status_code == 404
+        mock_repo.apply_changes.assert_not_called()
+
+    def _plan_row(self, id: int, equipment_id: int, start: str, end: str, **kw):
+        return {
+            "id": id,
+            "tenant_id": "tenant-a",
+            "order_id": kw.get("order_id"),
+            "process_routing_id": kw.get("process_routing_id", 1),
+            "sequence_order": kw.get("sequence_order", 1),
+            "equipment_id": equipment_id,
+            "start_datetime": f"2025-01-06T{start}:00+00:00",
+            "end_datetime": f"2025-01-06T{end}:00+00:00",
+        }
+
+    def test_batch_update_production_schedules(self, headers, mock_repo):
+        """PATCH /batch: 複数スケジュールを検証した上で一括更新するテスト"""
+        rows = [
+            self._plan_row(1, 101, "09:00", "10:00"),
+            self._plan_row(2, 101, "10:00", "11:00"),
+        ]
+        mock_repo.get_plan_rows.side_effect = lambda **kw: (
+            [r for r in rows if r["id"] in kw["ids"]] if "ids" in kw else rows
+        )
+        mock_repo.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+
+        payload = {
+            "updates": [
+                {
+                    "id": 1,
+                    "start_datetime": "2025-01-06T13:00:00+00:00",
+                    "end_datetime": "2025-01-06T14:00:00+00:00",
+                },
+                {
+                    "id": 2,
+                    "start_datetime": "2025-01-06T14:00:00+00:00",
+                    "end_datetime": "2025-01-06T15:00:00+00:00",
+                },
+            ]
+        }
+        response = client.patch(
+            "/production-schedules/batch", json=payload, headers=headers
+        )
+
+        assert response.status_code == 200
+        assert response.json()["updated_count"] == 2
+        mock_repo.apply_changes.assert_called_once()
+        updates = mock_repo.apply_changes.call_args[0][0]
+        assert [u["start_datetime"] for u in updates] == [
+            "2025-01-06T13:00:00+00:00",
+            "2025-01-06T14:00:00+00:00",
+        ]
+        mock_repo.update.assert_not_called()
+
+    def test_batch_update_snaps_to_working_time(self, headers, mock_repo):
+        """PATCH /batch: 日時を変更したスケジュールは稼働時間に吸着させて保存する"""
+        rows = [
+            self._plan_row(1, 101, "09:00", "10:00"),
+            self._plan_row(2, 102, "09:00", "11:00"),
+        ]
+        mock_repo.get_plan_rows.side_effect = lambda **kw: (
+            [r for r in rows if r["id"] in kw["ids"]] if "ids" in kw else rows
+        )
+
+        payload = {
+            "updates": [
+                # 昼休憩にかかる → 稼働時間1時間を保って 11:30-13:30 になる
+                {
+                    "id": 1,
+                    "start_datetime": "2025-01-06T11:30:00+00:00",
+                    "end_datetime": "2025-01-06T12:30:00+00:00",
+                },
+                # 終業をまたぐ → 16:00-17:00 と翌日 9:00-10:00 に分割される
+                {
+                    "id": 2,
+                    "start_datetime": "2025-01-06T16:00:00+00:00",
+                    "end_datetime": "2025-01-06T18:00:00+00:00",
+                },
+            ]
+        }
+        response = client.patch(
+            "/production-schedules/batch", json=payload, headers=headers
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["updated_count"] == 2
+        assert body["inserted_count"] == 1
+        assert {a["id"] for a in body["adjustments"]} == {1, 2}
+        updates, inserts = mock_repo.apply_changes.call_args[0]
+        assert [(u["start_datetime"], u["end_datetime"]) for u in updates] == [
+            ("2025-01-06T11:30:00+00:00", "2025-01-06T13:30:00+00:00"),
+            ("2025-01-06T16:00:00+00:00", "2025-01-06T17:00:00+00:00"),
+        ]
+        assert [(i["start_datetime"], i["end_datetime"]) for i in inserts] == [
+            ("2025-01-07T09:00:00+00:00", "2025-01-07T10:00:00+00:00")
+        ]
+
+    def test_batch_update_snap_opt_out(self, headers, mock_repo):
+        """PATCH /batch?snap=false: 指定どおりの日時で保存する"""
+        rows = [self._plan_row(1, 101, "09:00", "10:00")]
+        mock_repo.get_plan_rows.side_effect = lambda **kw: (
+            [r for r in rows if r["id"] in kw["ids"]] if "ids" in kw else rows
+        )
+
+        response = client.patch(
+            "/production-schedules/batch",
+            params={"snap": "false"},
+            json={
+                "updates": [
+                    {
+                        "id": 1,
+                        "start_datetime": "2025-01-06T11:30:00+00:00",
+                        "end_datetime": "2025-01-06T12:30:00+00:00",
+                    }
+                ]
+            },
+            headers=headers,
+        )
+
+        # 昼休憩にかかるため稼働時間外の違反となり、保存しない
+        assert response.status_code == 409
+        assert response.json()["detail"]["conflicts"][0]["type"] == "off_hours"
+        mock_repo.apply_changes.assert_not_called()
+
+    def test_batch_update_rejects_conflicts(self, headers, mock_repo):
+        """PATCH /batch: 1件でも制約違反があれば何も保存しない"""
+        rows = [
+            self._plan_row(1, 101, "09:00", "10:00"),
+            self._plan_row(2, 101, "10:00", "11:00"),
+            self._plan_row(3, 101, "14:00", "15:00"),
+        ]
+        mock_repo.get_plan_rows.side_effect = lambda **kw: (
+            [r for r in rows if r["id"] in kw["ids"]] if "ids" in kw else rows
+        )
+        mock_repo.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+
+        payload = {
+            "updates": [
+                {
+                    "id": 1,
+                    "start_datetime": "2025-01-06T13:00:00+00:00",
+                    "end_datetime": "2025-01-06T14:00:00+00:00",
+                },
+                {
+                    # 3 と重なる
+                    "id": 2,
+                    "start_datetime": "2025-01-06T14:30:00+00:00",
+                    "end_datetime": "2025-01-06T15:30:00+00:00",
+                },
+            ]
+        }
+        response = client.patch(
+            "/production-schedules/batch", json=payload, headers=headers
+        )
+
+        assert response.status_code == 409
+        conflicts = response.json()["detail"]["conflicts"]
+        assert conflicts[0]["type"] == "overlap"
+        assert conflicts[0]["schedule_ids"] == [3, 2]
+        mock_repo.apply_changes.assert_not_called()
+
+    def test_batch_update_not_found(self, headers, mock_repo):
+        """PATCH /batch: 存在しないIDを含む場合は404"""
+        mock_repo.get_plan_rows.return_value = []
+
+        response = client.patch(
+            "/production-schedules/batch",
+            json={"updates": [{"id": 1, "equipment_id": 102}]},
+            headers=headers,
+        )
+
+        assert response.status_code == 404
+        mock_repo.apply_changes.assert_not_called()
+
+    def test_batch_update_duplicate_ids(self, headers):
+        """PATCH /batch: 同じIDの重複指定はバリデーションエラー"""
+        response = client.patch(
+            "/production-schedules/batch",
+            json={"updates": [{"id": 1}, {"id": 1}]},
+            headers=headers,
+        )
+
+        assert response.status_code == 422
+
+    def test_update_production_schedule_reports_overlap(self, headers, mock_repo):
+        """PATCH /{schedule_id}: 移動先で重なる予約があれば conflicts に返す"""
+        moved = self._plan_row(1, 101, "10:00", "11:00", order_id=100)
+        neighbor = self._plan_row(2, 101, "10:30", "12:00", order_id=200)
+        mock_repo.update.return_value = {
+            k: v for k, v in moved.items() if k != "sequence_order"
+        }
+        mock_repo.get_plan_rows.side_effect = lambda **kw: (
+            [moved, neighbor] if "equipment_ids" in kw else [moved]
+        )
+
+        response = client.patch(
+            "/production-schedules/1",
+            params={"snap": "false"},
+            json={
+                "start_datetime": "2025-01-06T10:00:00+00:00",
+                "end_datetime": "2025-01-06T11:00:00+00:00",
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        conflicts = response.json()["conflicts"]
+        assert len(conflicts) == 1
+        assert conflicts[0]["type"] == "overlap"
+        assert conflicts[0]["schedule_ids"] == [1, 2]
+
+    def test_get_production_schedule_conflicts(self, headers, mock_repo):
+        """GET /conflicts: 期間内の制約違反を検出するテスト"""
+        mock_repo.get_plan_rows.return_value = [
+            self._plan_row(1, 101, "09:00", "11:00", order_id=100, sequence_order=1),
+            self._plan_row(2, 102, "10:00", "12:00", order_id=100, sequence_order=2),
+            self._plan_row(3, 102, "11:00", "12:00", order_id=200),
+        ]
+
+        response = client.get(
+            "/production-schedules/conflicts",
+            params={"start_date": "2025-01-06", "end_date": "2025-01-06"},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert [(c["type"], c["schedule_ids"]) for c in response.json()] == [
+            ("overlap", [2, 3]),
+            ("precedence", [1, 2]),
+        ]
+        mock_repo.get_plan_rows.assert_called_once_with(
+            start="2025-01-06T00:00:00+00:00",
+            end="2025-01-06T23:59:59.999999+00:00",
+        )
+
+    def test_get_production_schedule_conflicts_by_equipment_group(
+        self, headers, mock_repo
+    ):
+        """GET /conflicts: 設備グループの工程に関係する違反のみ返すテスト"""
+        rows = [
+            self._plan_row(1, 101, "09:00", "11:00"),
+            self._plan_row(2, 101, "10:00", "12:00"),
+            self._plan_row(3, 102, "16:00", "18:00"),
+        ]
+        rows[0]["equipment_group_id"] = 1
+        rows[1]["equipment_group_id"] = 2
+        rows[2]["equipment_group_id"] = 2
+        mock_repo.get_plan_rows.return_value = rows
+
+        response = client.get(
+            "/production-schedules/conflicts",
+            params={
+                "start_date": "2025-01-06",
+                "end_date": "2025-01-06",
+                "equipment_group_id": 1,
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert [c["schedule_ids"] for c in response.json()] == [[1, 2]]
+
+    def test_update_production_schedule_snap(self, headers, mock_repo):
+        """PATCH /{schedule_id}: 既定で稼働時間に吸着して保存するテスト"""
+        current = self._plan_row(1, 101, "15:00", "17:00", order_id=100)
+        mock_repo.get_by_id.return_value = current
+
+        # 金曜 16:00 へ移動 → 16:00-17:00 と翌週月曜 9:00-10:00 に分割される
+        response = client.patch(
+            "/production-schedules/1",
+            json={
+                "start_datetime": "2025-01-10T16:00:00+00:00",
+                "end_datetime": "2025-01-10T18:00:00+00:00",
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["start_datetime"] == "2025-01-10T16:00:00+00:00"
+        assert result["end_datetime"] == "2025-01-10T17:00:00+00:00"
+        assert result["segments"] == [
+            {
+                "start_datetime": "2025-01-10T16:00:00+00:00",
+                "end_datetime": "2025-01-10T17:00:00+00:00",
+            },
+            {
+                "start_datetime": "2025-01-13T09:00:00+00:00",
+                "end_datetime": "2025-01-13T10:00:00+00:00",
+            },
+        ]
+        assert [a["field"] for a in result["adjustments"]] == [
+            "end_datetime",
+            "segments",
+        ]
+        assert result["conflicts"] == []
+        mock_repo.update.assert_not_called()
+        updates, inserts = mock_repo.apply_changes.call_args[0]
+        assert updates == [
+            {
+                "id": 1,
+                "equipment_id": 101,
+                "start_datetime": "2025-01-10T16:00:00+00:00",
+                "end_datetime": "2025-01-10T17:00:00+00:00",
+            }
+        ]
+        assert inserts == [
+            {
+                "tenant_id": "tenant-a",
+                "order_id": 100,
+                "process_routing_id": 1,
+                "equipment_id": 101,
+                "start_datetime": "2025-01-13T09:00:00+00:00",
+                "end_datetime": "2025-01-13T10:00:00+00:00",
+            }
+        ]
+
+    def test_update_production_schedule_snap_uses_calendar_cache(
+        self, headers, mock_repo
+    ):
+        """PATCH /{schedule_id}?snap=true: 休日情報は2回目以降キャッシュから取得する"""
+        mock_repo.get_by_id.return_value = self._plan_row(1, 101, "09:00", "10:00")
+        calendar_query = mock_repo.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value
+        calendar_query.execute.return_value.data = [
+            {"date": "2025-01-07", "is_holiday": True, "note": None}
+        ]
+
+        fetch_counts = []
+        for _ in range(2):
+            response = client.patch(
+                "/production-schedules/1",
+                params={"snap": "true"},
+                json={"start_datetime": "2025-01-07T09:00:00+00:00"},
+                headers=headers,
+            )
+            assert response.status_code == 200
+            # 休日の 1/7 から翌稼働日へ移動する
+            assert response.json()["start_datetime"] == "2025-01-08T09:00:00+00:00"
+            fetch_counts.append(calendar_query.execute.call_count)
+
+        # 2回目の編集ではDBへ問い合わせない
+        assert fetch_counts[0] >= 1
+        assert fetch_counts[1] == fetch_counts[0]
+
+
+@pytest.mark.api
+class TestRescheduleRouter:
+    """POST /production-schedules/reschedule のテスト"""
+
+    @pytest.fixture
+    def mock_repo(self):
+        mock = MagicMock()
+        mock.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+        # 注文1（2時間・納期1/7）、注文2（1時間・納期1/10）。現在は注文2が先
+        mock.get_plan_from.return_value = [
+            self._plan_row(1, 2, "09:00", "10:00"),
+            self._plan_row(2, 1, "10:00", "12:00"),
+        ]
+        return mock
+
+    @pytest.fixture
+    def mock_order_repo(self):
+        mock = MagicMock()
+        mock.get_by_ids.return_value = {
+            1: {"id": 1, "status": "confirmed", "deadline_date": "2025-01-07"},
+            2: {"id": 2, "status": "confirmed", "deadline_date": "2025-01-10"},
+        }
+        return mock
+
+    @pytest.fixture
+    def mock_product_repo(self):
+        mock = MagicMock()
+        mock.client.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {"equipment_group_id": 10, "equipment_id": 101}
+        ]
+        return mock
+
+    @pytest.fixture
+    def mock_equipment_repo(self):
+        """設備リポジトリのモック（設備別稼働カレンダーは空）"""
+        mock = MagicMock()
+        mock.get_calendar_overlays.return_value = []
+        return mock
+
+    @pytest.fixture(autouse=True)
+    def override_dependency(
+        self, mock_repo, mock_order_repo, mock_product_repo, mock_equipment_repo
+    ):
+        app.dependency_overrides[get_schedule_repo] = lambda: mock_repo
+        app.dependency_overrides[get_order_repo] = lambda: mock_order_repo
+        app.dependency_overrides[get_product_repo] = lambda: mock_product_repo
+        app.dependency_overrides[get_equipment_repo] = lambda: mock_equipment_repo
+        calendar_cache = CalendarCache()
+        app.dependency_overrides[get_calendar_cache] = lambda: calendar_cache
+        yield
+        app.dependency_overrides = {}
+
+    @staticmethod
+    def _plan_row(id: int, order_id: int, start: str, end: str) -> dict:
+        return {
+            "id": id,
+            "tenant_id": "tenant-a",
+            "order_id": order_id,
+            "process_routing_id": order_id * 10,
+            "sequence_order": 1,
+            "equipment_group_id": 10,
+            "equipment_id": 101,
+            "start_datetime": f"2025-01-06T{start}:00+00:00",
+            "end_datetime": f"2025-01-06T{end}:00+00:00",
+        }
+
+    def test_reschedule_edd(self, headers, mock_repo):
+        """EDDで並べ直し、1回のリクエストでまとめて置き換える"""
+        response = client.post(
+            "/production-schedules/reschedule",
+            json={
+                "start_datetime": "2025-01-06T09:00:00+00:00",
+                "end_datetime": "2025-01-10T17:00:00+00:00",
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["rule"] == "edd"
+        assert result["order_count"] == 2
+        assert result["operation_count"] == 2
+        assert result["late_order_count"] == 0
+        mock_repo.apply_changes.assert_called_once()
+        updates, inserts, deletes = mock_repo.apply_changes.call_args[0]
+        assert sorted(
+            (u["id"], u["start_datetime"], u["end_datetime"]) for u in updates
+        ) == [
+            (1, "2025-01-06T11:00:00+00:00", "2025-01-06T12:00:00+00:00"),
+            (2, "2025-01-06T09:00:00+00:00", "2025-01-06T11:00:00+00:00"),
+        ]
+        assert inserts == []
+        assert deletes == []
+
+    def test_reschedule_dry_run(self, headers, mock_repo):
+        """dry_run では保存せず、結果のみを返す"""
+        response = client.post(
+            "/production-schedules/reschedule",
+            json={
+                "start_datetime": "2025-01-06T09:00:00+00:00",
+                "end_datetime": "2025-01-10T17:00:00+00:00",
+                "rule": "spt",
+                "dry_run": True,
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["updated_count"] == 2
+        mock_repo.apply_changes.assert_not_called()
+
+    def test_reschedule_invalid_window(self, headers, mock_repo):
+        """開始が終了以降の場合は 422"""
+        response = client.post(
+            "/production-schedules/reschedule",
+            json={
+                "start_datetime": "2025-01-10T09:00:00+00:00",
+                "end_datetime": "2025-01-06T17:00:00+00:00",
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 422
+        mock_repo.get_plan_from.assert_not_called()
+
+    def test_optimize_dry_run(self, headers, mock_repo):
+        """POST /optimize: 局所探索の結果と目的関数値の経過を返す"""
+        response = client.post(
+            "/production-schedules/optimize",
+            json={
+                "start_datetime": "2025-01-06T09:00:00+00:00",
+                "end_datetime": "2025-01-10T17:00:00+00:00",
+                "time_budget_ms": 50,
+                "seed": 0,
+                "workers": 1,
+                "dry_run": True,
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["operation_count"] == 2
+        assert result["late_order_count"] == 0
+        # 9:00-12:00 の3時間で2注文を加工するため、メイクスパンは3時間
+        assert result["makespan_seconds"] == 3 * 3600
+        assert result["objective"] <= result["initial_objective"]
+        assert result["trace"][0]["iteration"] == 0
+        mock_repo.apply_changes.assert_not_called()
+
+    def test_optimize_invalid_time_budget(self, headers, mock_repo):
+        """POST /optimize: 制限時間が範囲外の場合は 422"""
+        response = client.post(
+            "/production-schedules/optimize",
+            json={
+                "end_datetime": "2025-01-10T17:00:00+00:00",
+                "time_budget_ms": 0,
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 422
+        mock_repo.get_plan_from.assert_not_called()
+
+    def test_get_kpis(self, headers, mock_repo):
+        """GET /kpis: 期間の計画のKPIを返す（注文の完了は期間外のセグメントを含む）"""
+        in_window = [
+            self._plan_row(1, 2, "09:00", "10:00"),
+            self._plan_row(2, 1, "10:00", "14:00"),
+        ]
+        next_day = {
+            **self._plan_row(3, 1, "09:00", "10:00"),
+            "start_datetime": "2025-01-07T09:00:00+00:00",
+            "end_datetime": "2025-01-07T10:00:00+00:00",
+        }
+        mock_repo.get_plan_rows.side_effect = [in_window, [*in_window, next_day]]
+
+        response = client.get(
+            "/production-schedules/kpis",
+            params={"start_date": "2025-01-06", "end_date": "2025-01-06"},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["segment_count"] == 3
+        assert result["order_count"] == 2
+        # 注文1は 1/7 10:00 に完了（納期 1/7 0:00 から10時間遅れ）
+        assert result["late_order_count"] == 1
+        assert result["total_tardiness_seconds"] == 10 * 3600
+        # 1/6 の稼働時間（7時間）のうち、9:00-10:00 と 10:00-14:00（昼休憩を除く3時間）
+        assert result["machines"] == [
+            {
+                "equipment_id": 101,
+                "busy_seconds": 4 * 3600,
+                "available_seconds": 7 * 3600,
+                "utilization": round(4 / 7, 4),
+            }
+        ]
+        assert mock_repo.get_plan_rows.call_args_list[1].kwargs == {"order_ids": [1, 2]}
+
+    def test_compare_scenarios(self, headers, mock_repo):
+        """POST /scenarios/compare: シナリオごとのKPIと差分を返す（保存しない）"""
+        response = client.post(
+            "/scenarios/compare",
+            json={
+                "start_datetime": "2025-01-06T09:00:00+00:00",
+                "end_datetime": "2025-01-10T17:00:00+00:00",
+                "workers": 1,
+                "scenarios": [
+                    {
+                        "name": "add machine",
+                        "modifications": [
+                            {"type": "add_machine", "equipment_group_id": 10}
+                        ],
+                    },
+                    {
+                        "name": "expedite",
+                        "modifications": [{"type": "expedite_order", "order_id": 2}],
+                    },
+                ],
+            },
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        # 注文1（9:00-11:00）→ 注文2（11:00-12:00）
+        assert result["baseline"]["makespan_seconds"] == 3 * 3600
+        added, expedited = result["scenarios"]
+        # 設備を追加すると2注文を 9:00 から並行して加工できる
+        assert added["delta"]["makespan_seconds"] == -1 * 3600
+        assert len(added["kpis"]["machines"]) == 2
+        # 注文2を前倒し（納期は期間の開始）すると注文2（9:00-10:00）→ 注文1（10:00-12:00）
+        assert expedited["delta"]["makespan_seconds"] == 0
+        assert expedited["kpis"]["total_tardiness_seconds"] == 1 * 3600
+        mock_repo.apply_changes.assert_not_called()
+
+    def test_compare_scenarios_invalid(self, headers, mock_repo):
+        """POST /scenarios/compare: 変更の種別が不正な場合は 422、対象外の注文は 400"""
+        body = {
+            "start_datetime": "2025-01-06T09:00:00+00:00",
+            "end_datetime": "2025-01-10T17:00:00+00:00",
+            "workers": 1,
+        }
+
+        response = client.post(
+            "/scenarios/compare",
+            json={
+                **body,
+                "scenarios": [{"name": "x", "modifications": [{"type": "unknown"}]}],
+            },
+            headers=headers,
+        )
+        assert response.status_code == 422
+
+        response = client.post(
+            "/scenarios/compare",
+            json={
+                **body,
+                "scenarios": [
+                    {
+                        "name": "x",
+                        "modifications": [{"type": "expedite_order", "order_id": 99}],
+                    }
+                ],
+            },
+            headers=headers,
+        )
+        assert response.status_code == 400
+        assert "注文ID 99" in response.json()["detail"]
+
+    def test_compact(self, headers, mock_repo):
+        """POST /compact: 空いた稼働時間へ予約を前詰めし、まとめて保存する"""
+        mock_repo.get_plan_from.return_value = [
+            self._plan_row(1, 2, "10:00", "11:00"),
+            self._plan_row(2, 1, "11:00", "12:00"),
+        ]
+        body = {"start_datetime": "2025-01-06T09:00:00+00:00"}
+
+        response = client.post(
+            "/production-schedules/compact",
+            json={**body, "dry_run": True},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        mock_repo.apply_changes.assert_not_called()
+
+        response = client.post(
+            "/production-schedules/compact", json=body, headers=headers
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert [(s["id"], s["start_datetime"]) for s in result["compacted"]] == [
+            (1, "2025-01-06T09:00:00+00:00"),
+            (2, "2025-01-06T10:00:00+00:00"),
+        ]
+        updates, inserts = mock_repo.apply_changes.call_args.args
+        assert [u["id"] for u in updates] == [1, 2]
+        assert inserts == []
@@ -0,0 +1 @@
+# backend/__tests__/unit/__init__.py
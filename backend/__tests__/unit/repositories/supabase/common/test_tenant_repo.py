@@ -0,0 +1,36 @@
+# __tests__/repositories/supabase/common/test_tenant_repo.py
+from unittest.mock import MagicMock
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.repositories.supa_infra.common import TenantRepository
+
+
+@pytest.mark.unit
+class TestTenantRepository:
+    @pytest.fixture
+    def mock_client(self):
+        return MagicMock()
+
+    @pytest.fixture
+    def tenant_repo(self, mock_client):
+        return TenantRepository(mock_client)
+
+    @pytest.mark.parametrize("data, expected", [(True, True), (False, False)])
+    def test_is_member(self, tenant_repo, mock_client, data, expected):
+        """RLSと同じ is_tenant_member 関数で所属を判定する"""
+        mock_client.rpc.return_value.execute.return_value.data = data
+
+        assert tenant_repo.is_member("tenant-a") is expected
+        mock_client.rpc.assert_called_once_with(
+            "is_tenant_member", {"_tenant_id": "tenant-a"}
+        )
+
+    def test_invalid_tenant_id_is_not_member(self, tenant_repo, mock_client):
+        """UUIDとして不正なテナントIDはメンバーではないとみなす"""
+        mock_client.rpc.return_value.execute.side_effect = APIError(
+            {"message": "invalid input syntax for type uuid", "code": "22P02"}
+        )
+
+        assert tenant_repo.is_member("not-a-uuid") is False
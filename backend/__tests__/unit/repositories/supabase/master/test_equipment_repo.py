@@ -138,3 +138,23 @@ class TestEquipmentRepository:
 
         assert result == expected
         mock_client.table.assert_called_with(SupabaseTableName.EQUIPMENTS.value)
+
+    def test_get_calendar_overlays(self, equipment_repo, mock_client):
+        """設備別稼働カレンダー取得テスト（設備・期間で絞り込む）"""
+        from datetime import UTC, datetime
+
+        expected = [{"id": 1, "equipment_id": 5, "kind": "maintenance"}]
+        query = mock_client.table.return_value.select.return_value
+        query.in_.return_value.gte.return_value.order.return_value.execute.return_value.data = expected
+
+        since = datetime(2025, 1, 6, tzinfo=UTC)
+        result = equipment_repo.get_calendar_overlays(equipment_ids=[5], since=since)
+
+        assert result == expected
+        mock_client.table.assert_called_with(
+            SupabaseTableName.EQUIPMENT_CALENDAR_OVERLAYS.value
+        )
+        query.in_.assert_called_once_with("equipment_id", [5])
+        query.in_.return_value.gte.assert_called_once_with(
+            "end_datetime", since.isoformat()
+        )
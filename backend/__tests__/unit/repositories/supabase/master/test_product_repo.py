@@ -45,6 +45,24 @@ class TestProductRepository:
         # ここで重要なのは「テーブル名がPROCESS_ROUTINGSになっていること」
         mock_client.table.assert_called_with(SupabaseTableName.PROCESS_ROUTINGS.value)
 
+    def test_get_routings_by_products(self, product_repo, mock_client):
+        """複数の製品の工程を1回で取得し、製品IDごとにまとめる"""
+        query = mock_client.table.return_value.select.return_value.in_.return_value
+        query.order.return_value.execute.return_value.data = [
+            {"id": 1, "product_id": 10, "sequence_order": 1},
+            {"id": 2, "product_id": 20, "sequence_order": 1},
+            {"id": 3, "product_id": 10, "sequence_order": 2},
+        ]
+
+        result = product_repo.get_routings_by_products([10, 20, 30])
+
+        assert [r["id"] for r in result[10]] == [1, 3]
+        assert [r["id"] for r in result[20]] == [2]
+        assert result[30] == []
+        mock_client.table.return_value.select.return_value.in_.assert_called_once_with(
+            "product_id", [10, 20, 30]
+        )
+
     @pytest.mark.parametrize(
         "data, expected",
         [
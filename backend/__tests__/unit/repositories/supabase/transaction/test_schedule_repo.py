@@ -0,0 +1,104 @@
+# __tests__/repositories/supabase/transaction/test_schedule_repo.py
+from unittest.mock import MagicMock
+
+import pytest
+from app.repositories.supa_infra.common.base_repo import PAGE_SIZE
+from app.repositories.supa_infra.transaction.schedule_repo import ScheduleRepository
+
+
+def _row(id: int, **kw) -> dict:
+    return {
+        "id": id,
+        "equipment_id": kw.get("equipment_id", 1),
+        "order_id": kw.get("order_id"),
+        "start_datetime": kw.get("start", "2025-01-06T09:00:00+00:00"),
+        "end_datetime": "2025-01-06T10:00:00+00:00",
+        "process_routings": {"sequence_order": 1, "equipment_group_id": 10},
+    }
+
+
+@pytest.mark.unit
+class TestScheduleRepository:
+    @pytest.fixture
+    def mock_client(self):
+        return MagicMock()
+
+    @pytest.fixture
+    def schedule_repo(self, mock_client):
+        return ScheduleRepository(mock_client)
+
+    def test_get_plan_rows_fetches_all_pages(self, schedule_repo, mock_client):
+        """get_plan_rows: max_rows を超える結果をページに分けてすべて取得する"""
+        query = mock_client.table.return_value.select.return_value.gte.return_value
+        ordered = query.order.return_value.order.return_value
+        ordered.range.return_value.execute.side_effect = [
+            MagicMock(data=[_row(i) for i in range(PAGE_SIZE)]),
+            MagicMock(data=[_row(PAGE_SIZE)]),
+        ]
+
+        rows = schedule_repo.get_plan_rows(start="2025-01-06T00:00:00+00:00")
+
+        assert [row["id"] for row in rows] == list(range(PAGE_SIZE + 1))
+        assert rows[0]["sequence_order"] == 1
+        assert "process_routings" not in rows[0]
+        assert [c.args for c in ordered.range.call_args_list] == [
+            (0, PAGE_SIZE - 1),
+            (PAGE_SIZE, 2 * PAGE_SIZE - 1),
+        ]
+        # ページの境界が安定するよう、開始日時とIDの順に並べる
+        query.order.assert_called_with("start_datetime")
+        query.order.return_value.order.assert_called_with("id")
+
+    def test_get_plan_from_filters_tenant(self, schedule_repo, mock_client):
+        """get_plan_from: テナントIDを指定した場合はそのテナントの行だけを取得する"""
+        query = mock_client.table.return_value.select.return_value.gte.return_value
+        filtered = query.eq.return_value.order.return_value.order.return_value
+        filtered.range.return_value.execute.return_value = MagicMock(data=[_row(1)])
+
+        rows = schedule_repo.get_plan_from(
+            "2025-01-06T00:00:00+00:00", tenant_id="tenant-a"
+        )
+
+        assert [row["id"] for row in rows] == [1]
+        query.eq.assert_called_once_with("tenant_id", "tenant-a")
+
+    def test_get_plan_in_periods_fetches_all_pages(self, schedule_repo, mock_client):
+        """get_plan_in_periods: RPCの結果もページに分けて取得する"""
+        rpc = mock_client.rpc.return_value
+        rpc.range.return_value.execute.side_effect = [
+            MagicMock(data=[{"id": i} for i in range(PAGE_SIZE)]),
+            MagicMock(data=[]),
+        ]
+
+        rows = schedule_repo.get_plan_in_periods(
+            [("2025-01-06T00:00:00+00:00", "2025-01-06T23:59:59+00:00")]
+        )
+
+        assert len(rows) == PAGE_SIZE
+        assert rpc.range.call_count == 2
+        mock_client.rpc.assert_called_with(
+            "get_schedules_in_periods",
+            {
+                "p_starts": ["2025-01-06T00:00:00+00:00"],
+                "p_ends": ["2025-01-06T23:59:59+00:00"],
+            },
+        )
+
+    def test_get_plan_suffix_merges_equipment_and_orders(self, schedule_repo):
+        """get_plan_suffix: 設備・注文ごとの結果を重複なく開始日時順にまとめる"""
+        schedule_repo.get_plan_rows = MagicMock(
+            side_effect=[
+                [_row(1, start="2025-01-06T11:00:00+00:00"), _row(2)],
+                [_row(2), _row(3, start="2025-01-06T08:00:00+00:00")],
+            ]
+        )
+
+        rows = schedule_repo.get_plan_suffix(
+            "2025-01-06T00:00:00+00:00", equipment_ids=[1], order_ids=[5]
+        )
+
+        assert [row["id"] for row in rows] == [3, 2, 1]
+        assert schedule_repo.get_plan_rows.call_args_list[1].kwargs == {
+            "order_ids": [5],
+            "start": "2025-01-06T00:00:00+00:00",
+        }
@@ -104,3 +104,49 @@ class TestCalendarRepository:
         assert len(result.data) == 1
         assert result.data[0]["date"] == "2025-01-01"
         assert result.data[0]["is_holiday"] is True
+
+    def test_bulk_upsert_holidays_sends_single_request(self):
+        """複数日の休日情報を1回のupsertで送信する"""
+        from datetime import date
+
+        from app.repositories.supa_infra.common.calendar_repo import (
+            CalendarRepository,
+        )
+
+        upsert = self.client_mock.table.return_value.upsert
+        upsert.return_value.execute.return_value.data = [{"id": 1}, {"id": 2}]
+        repo = CalendarRepository(self.client_mock)
+
+        result = repo.bulk_upsert_holidays(
+            "tenant-a", [date(2025, 8, 13), date(2025, 8, 14)], True, "夏季休業"
+        )
+
+        assert result == [{"id": 1}, {"id": 2}]
+        upsert.assert_called_once_with(
+            [
+                {
+                    "tenant_id": "tenant-a",
+                    "date": "2025-08-13",
+                    "is_holiday": True,
+                    "note": "夏季休業",
+                },
+                {
+                    "tenant_id": "tenant-a",
+                    "date": "2025-08-14",
+                    "is_holiday": True,
+                    "note": "夏季休業",
+                },
+            ],
+            on_conflict="tenant_id,date",
+        )
+
+    def test_bulk_upsert_holidays_empty(self):
+        """対象日がない場合はリクエストを送信しない"""
+        from app.repositories.supa_infra.common.calendar_repo import (
+            CalendarRepository,
+        )
+
+        repo = CalendarRepository(self.client_mock)
+
+        assert repo.bulk_upsert_holidays("tenant-a", [], True) == []
+        self.client_mock.table.return_value.upsert.assert_not_called()
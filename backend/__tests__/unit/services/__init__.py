@@ -0,0 +1 @@
+# backend/__tests__/unit/services/__init__.py
@@ -0,0 +1,76 @@
+"""
+services の単体テストで共有するスケジュール行・日時のヘルパー
+
+テストモジュールからは ``from __tests__.unit.services.conftest import plan_row`` のように
+インポートして使う（クラス属性の計画データなど、フィクスチャを使えない箇所でも使えるように
+関数として提供する）。日時はすべて 2025年1月（UTC）で、日の指定がない場合は 6日（月曜日）。
+"""
+
+from datetime import UTC, datetime
+from typing import Any
+
+PLAN_DAY = 6
+
+
+def plan_dt(hour: int, minute: int = 0, day: int = PLAN_DAY) -> datetime:
+    """2025年1月の指定日時（UTC）を返す。"""
+    return datetime(2025, 1, day, hour, minute, tzinfo=UTC)
+
+
+def plan_at(hour: int, minute: int = 0, day: int = PLAN_DAY) -> str:
+    """2025年1月の指定日時（UTC）を ISO8601 文字列で返す。"""
+    return plan_dt(hour, minute, day).isoformat()
+
+
+def _plan_time(value: str | datetime, day: int) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if len(value) == len("HH:MM"):
+        return f"2025-01-{day:02d}T{value}:00+00:00"
+    return value
+
+
+def plan_row(
+    id: int,
+    order_id: int | None,
+    sequence_order: int,
+    equipment_id: int,
+    start: str | datetime,
+    end: str | datetime,
+    *,
+    group_id: int | None = None,
+    day: int = PLAN_DAY,
+    tenant_id: str = "tenant-a",
+) -> dict[str, Any]:
+    """
+    テナント tenant-a のスケジュール行を作成する。
+
+    Args:
+        id: スケジュールID
+        order_id: 注文ID（None の場合は注文に紐づかない予約）
+        sequence_order: 工程順
+        equipment_id: 設備ID
+        start: 開始（"HH:MM" の場合は day 日の時刻、それ以外は ISO8601 文字列・datetime）
+        end: 終了（start と同じ形式）
+        group_id: 設備グループID（指定した場合のみ equipment_group_id を含める）
+        day: "HH:MM" で指定した時刻の日
+        tenant_id: テナントID
+
+    Returns:
+        スケジュール行（process_routing_id は order_id * 10 + sequence_order）
+    """
+    row: dict[str, Any] = {
+        "id": id,
+        "tenant_id": tenant_id,
+        "order_id": order_id,
+        "process_routing_id": (
+            order_id * 10 + sequence_order if order_id is not None else None
+        ),
+        "sequence_order": sequence_order,
+        "equipment_id": equipment_id,
+        "start_datetime": _plan_time(start, day),
+        "end_datetime": _plan_time(end, day),
+    }
+    if group_id is not None:
+        row["equipment_group_id"] = group_id
+    return row
@@ -0,0 +1,140 @@
+"""
+calendar_impact_service（カレンダー変更の影響分析）の単体テスト
+"""
+
+from datetime import UTC, date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_dt, plan_row
+from app.services.calendar_impact_service import (
+    date_periods,
+    reflow_affected,
+    reflow_affected_suffix,
+    summarize_impact,
+)
+from app.utils.calendar import CalendarConfig
+from app.utils.equipment_calendar import OVERLAY_MAINTENANCE, EquipmentCalendars
+
+
+@pytest.mark.unit
+class TestDatePeriods:
+    """date_periods 関数のテスト"""
+
+    def test_merges_consecutive_dates(self):
+        """連続する日付は1つの期間にまとめる"""
+        periods = date_periods(
+            [date(2025, 1, 7), date(2025, 1, 6), date(2025, 1, 9), date(2025, 1, 6)],
+            UTC,
+        )
+
+        assert periods == [
+            ("2025-01-06T00:00:00+00:00", "2025-01-07T23:59:59.999999+00:00"),
+            ("2025-01-09T00:00:00+00:00", "2025-01-09T23:59:59.999999+00:00"),
+        ]
+
+    def test_uses_tenant_time_zone(self):
+        """日の境界はテナントのタイムゾーンで判定する"""
+        periods = date_periods([date(2025, 1, 6)], ZoneInfo("Asia/Tokyo"))
+
+        assert periods == [
+            ("2025-01-05T15:00:00+00:00", "2025-01-06T14:59:59.999999+00:00")
+        ]
+
+
+@pytest.mark.unit
+class TestReflowAffected:
+    """reflow_affected 関数のテスト"""
+
+    @pytest.fixture
+    def rows(self):
+        return [
+            plan_row(1, 100, 1, 1, "15:00", "16:00"),
+            plan_row(2, 100, 2, 2, "09:00", "10:00", day=7),
+            plan_row(3, 300, 1, 2, "09:00", "10:00", day=8),
+        ]
+
+    def test_reflows_only_affected_and_successors(self, rows):
+        """休日になった日の予約と、それに押し出された予約だけを再配置する"""
+        reflow = reflow_affected(
+            rows,
+            [1],
+            CalendarConfig(),
+            CalendarConfig(holidays={date(2025, 1, 6)}),
+            plan_dt(8),
+        )
+
+        assert [(s.id, s.start, s.end) for s in reflow.reflowed] == [
+            (1, plan_dt(9, day=7), plan_dt(10, day=7))
+        ]
+        assert [(s.id, s.start, s.end) for s in reflow.rippled] == [
+            (2, plan_dt(10, day=7), plan_dt(11, day=7))
+        ]
+        assert reflow.delayed_orders == [
+            {
+                "order_id": 100,
+                "previous_end": plan_dt(10, day=7).isoformat(),
+                "new_end": plan_dt(11, day=7).isoformat(),
+                "delay_seconds": 3600,
+            }
+        ]
+        updates, inserts = reflow.change_set()
+        assert [u["id"] for u in updates] == [1, 2]
+        assert inserts == []
+
+    def test_started_booking_is_not_moved(self, rows):
+        """着手済みの予約は置き直さない"""
+        reflow = reflow_affected(
+            rows,
+            [1],
+            CalendarConfig(),
+            CalendarConfig(holidays={date(2025, 1, 6)}),
+            datetime(2025, 1, 6, 15, 30, tzinfo=UTC),
+        )
+
+        assert reflow.change_set() == ([], [])
+
+    def test_suffix_loads_only_reached_machines(self, rows):
+        """影響が及ぶ設備・注文だけを読み込み、後続工程は設備の保全を避けて置き直す"""
+        calendar_config = CalendarConfig(holidays={date(2025, 1, 6)})
+        maintenance = {
+            "equipment_id": 2,
+            "kind": OVERLAY_MAINTENANCE,
+            "start_datetime": plan_dt(10, day=7).isoformat(),
+            "end_datetime": plan_dt(11, day=7).isoformat(),
+        }
+        calls = []
+
+        def load_rows(equipment_ids, order_ids):
+            calls.append((equipment_ids, order_ids))
+            return [
+                row
+                for row in rows
+                if row["equipment_id"] in equipment_ids or row["order_id"] in order_ids
+            ]
+
+        reflow = reflow_affected_suffix(
+            load_rows,
+            rows[:1],
+            CalendarConfig(),
+            calendar_config,
+            plan_dt(8),
+            EquipmentCalendars(calendar_config, [maintenance], tz=UTC),
+        )
+
+        assert [(s.id, s.start, s.end) for s in reflow.reflowed] == [
+            (1, plan_dt(9, day=7), plan_dt(10, day=7))
+        ]
+        assert [(s.id, s.start, s.end) for s in reflow.rippled] == [
+            (2, plan_dt(11, day=7), plan_dt(12, day=7))
+        ]
+        # 設備2は後続工程が押し出されてから読み込む
+        assert calls == [([1], [100]), ([1, 2], [100])]
+
+    def test_summarize_impact(self, rows):
+        """影響を受ける予約と注文IDをまとめる"""
+        impact = summarize_impact(rows[:2])
+
+        assert [s["id"] for s in impact["schedules"]] == [1, 2]
+        assert impact["order_ids"] == [100]
@@ -2,10 +2,15 @@
 calendar_service の単体テスト
 """
 
-from datetime import date
+import threading
+from datetime import UTC, date, datetime, timedelta
+from unittest.mock import MagicMock
 
 import pytest
 
+from app.services.calendar_service import CalendarCache
+from app.utils.calendar import DEFAULT_SHIFT_PATTERN
+
 
 @pytest.mark.unit
 class TestBuildCalendarConfig:
@@ -67,3 +72,171 @@ class TestBuildCalendarConfig:
         # 検証
         assert date(2025, 1, 1) in holidays
         assert date(2025, 1, 2) not in holidays
+
+
+@pytest.mark.unit
+class TestCalendarCache:
+    """CalendarCache クラスのテスト"""
+
+    @pytest.fixture
+    def calendar_repo(self):
+        repo = MagicMock()
+        repo.get_holidays_in_range.side_effect = lambda tenant_id, start, end: [
+            item
+            for item in [
+                {"date": "2025-01-01", "is_holiday": True},
+                {"date": "2025-02-11", "is_holiday": True},
+                {"date": "2025-02-15", "is_holiday": False},
+            ]
+            if start <= date.fromisoformat(item["date"]) <= end
+        ]
+        return repo
+
+    def test_covered_range_is_served_from_cache(self, calendar_repo):
+        """取得済みの範囲内の参照ではDBへ問い合わせない"""
+        cache = CalendarCache()
+
+        cache.get_config("tenant-a", calendar_repo, date(2025, 1, 1), date(2025, 1, 31))
+        config = cache.get_config(
+            "tenant-a", calendar_repo, date(2025, 1, 5), date(2025, 1, 20)
+        )
+
+        assert calendar_repo.get_holidays_in_range.call_count == 1
+        assert config.holidays == {date(2025, 1, 1)}
+
+    def test_extends_only_missing_range(self, calendar_repo):
+        """範囲外を参照した場合は不足分だけを取得する"""
+        cache = CalendarCache()
+
+        cache.get_config("tenant-a", calendar_repo, date(2025, 1, 1), date(2025, 1, 31))
+        config = cache.get_config(
+            "tenant-a", calendar_repo, date(2025, 1, 15), date(2025, 2, 28)
+        )
+
+        calendar_repo.get_holidays_in_range.assert_called_with(
+            "tenant-a", date(2025, 2, 1), date(2025, 2, 28)
+        )
+        assert config.holidays == {date(2025, 1, 1), date(2025, 2, 11)}
+        assert config.workdays == {date(2025, 2, 15)}
+
+    def test_config_extends_past_loaded_horizon(self, calendar_repo):
+        """読み込み済みの範囲外の日付を参照すると、まとめて延長して判定する"""
+        cache = CalendarCache()
+        config = cache.get_config(
+            "tenant-a", calendar_repo, date(2025, 1, 1), date(2025, 1, 31)
+        )
+
+        assert config.is_holiday(datetime(2025, 2, 11, 9, 0)) is True
+        assert config.is_holiday(datetime(2025, 2, 15, 9, 0)) is False
+        assert config.is_holiday(datetime(2025, 2, 20, 9, 0)) is False
+
+        calendar_repo.get_holidays_in_range.assert_called_with(
+            "tenant-a", date(2025, 2, 1), date(2025, 5, 1)
+        )
+        assert calendar_repo.get_holidays_in_range.call_count == 2
+
+    def test_entries_are_per_tenant(self, calendar_repo):
+        """テナントごとに別のエントリとして保持する"""
+        cache = CalendarCache()
+
+        cache.get_config("tenant-a", calendar_repo, date(2025, 1, 1), date(2025, 1, 31))
+        cache.get_config("tenant-b", calendar_repo, date(2025, 1, 1), date(2025, 1, 31))
+
+        # 休日情報はエントリのテナントで絞り込んで取得する
+        assert [
+            call.args[0] for call in calendar_repo.get_holidays_in_range.call_args_list
+        ] == ["tenant-a", "tenant-b"]
+
+    def test_slow_load_does_not_block_other_tenants(self, calendar_repo):
+        """あるテナントの読み込み中も、他のテナントの参照は待たされない"""
+        cache = CalendarCache()
+        loading = threading.Event()
+        release = threading.Event()
+        slow_repo = MagicMock()
+
+        def slow_load(tenant_id, start, end):
+            loading.set()
+            release.wait(timeout=5)
+            return []
+
+        slow_repo.get_holidays_in_range.side_effect = slow_load
+        slow = threading.Thread(
+            target=cache.get_config,
+            args=("tenant-a", slow_repo, date(2025, 1, 1), date(2025, 1, 31)),
+        )
+        slow.start()
+        try:
+            assert loading.wait(timeout=5)
+            config = cache.get_config(
+                "tenant-b", calendar_repo, date(2025, 1, 1), date(2025, 1, 31)
+            )
+            assert config.holidays == {date(2025, 1, 1)}
+            assert slow.is_alive()
+        finally:
+            release.set()
+            slow.join(timeout=5)
+
+    def test_expired_entry_is_reloaded(self, calendar_repo):
+        """有効期間を過ぎたエントリは取得し直す"""
+        now = datetime(2025, 1, 6, 9, 0, tzinfo=UTC)
+        clock = MagicMock(side_effect=lambda: now)
+        cache = CalendarCache(ttl_seconds=60, now_fn=clock)
+
+        cache.get_config("tenant-a", calendar_repo, date(2025, 1, 1), date(2025, 1, 31))
+        now += timedelta(seconds=60)
+        cache.get_config("tenant-a", calendar_repo, date(2025, 1, 1), date(2025, 1, 31))
+
+        assert calendar_repo.get_holidays_in_range.call_count == 2
+
+    def test_invalidate(self, calendar_repo):
+        """破棄したテナントのみ次回参照時に取得し直す"""
+        cache = CalendarCache()
+        for tenant_id in ("tenant-a", "tenant-b"):
+            cache.get_config(
+                tenant_id, calendar_repo, date(2025, 1, 1), date(2025, 1, 31)
+            )
+
+        cache.invalidate("tenant-a")
+        cache.get_config("tenant-a", calendar_repo, date(2025, 1, 1), date(2025, 1, 31))
+        cache.get_config("tenant-b", calendar_repo, date(2025, 1, 1), date(2025, 1, 31))
+
+        assert calendar_repo.get_holidays_in_range.call_count == 3
+
+    def test_shift_pattern_is_compiled_once_per_entry(self, calendar_repo):
+        """勤務パターンはエントリごとに1度だけ取得・コンパイルする"""
+        shift_pattern_repo = MagicMock()
+        shift_pattern_repo.get_pattern.return_value = {
+            "shifts": [{"start": "22:00", "end": "06:00"}],
+            "breaks": [],
+            "time_zone": "Asia/Tokyo",
+        }
+        cache = CalendarCache()
+
+        for _ in range(2):
+            config = cache.get_config(
+                "tenant-a",
+                calendar_repo,
+                date(2025, 1, 1),
+                date(2025, 1, 31),
+                shift_pattern_repo=shift_pattern_repo,
+            )
+
+        shift_pattern_repo.get_pattern.assert_called_once_with("tenant-a")
+        assert config.shift_pattern.describe() == "22:00 - 翌6:00"
+        assert config.time_zone == "Asia/Tokyo"
+
+    def test_default_shift_pattern_when_not_configured(self, calendar_repo):
+        """勤務パターンが未設定の場合はデフォルトの勤務パターンを使用する"""
+        shift_pattern_repo = MagicMock()
+        shift_pattern_repo.get_pattern.return_value = None
+        cache = CalendarCache()
+
+        config = cache.get_config(
+            "tenant-a",
+            calendar_repo,
+            date(2025, 1, 1),
+            shift_pattern_repo=shift_pattern_repo,
+        )
+
+        assert config.shift_pattern is DEFAULT_SHIFT_PATTERN
+        assert config.time_zone == "UTC"
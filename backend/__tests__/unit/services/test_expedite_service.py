@@ -0,0 +1,171 @@
+"""
+expedite_service（特急注文の割り込み）の単体テスト
+"""
+
+from datetime import UTC
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_dt, plan_row
+from app.services.expedite_service import insert_rush_order, insert_rush_order_suffix
+from app.utils.equipment_calendar import EquipmentCalendars
+
+# 設備グループ10: 設備1、設備グループ20: 設備2
+MEMBERS = {10: [1], 20: [2]}
+ORDER = {"id": 900, "product_id": 9, "quantity": 1}
+ROUTINGS = [
+    {
+        "id": 91,
+        "equipment_group_id": 10,
+        "sequence_order": 1,
+        "unit_time_seconds": 3600,
+    },
+    {
+        "id": 92,
+        "equipment_group_id": 20,
+        "sequence_order": 2,
+        "unit_time_seconds": 3600,
+    },
+]
+
+
+def _insert(rows: list[dict], members=MEMBERS, overlays=None):
+    return insert_rush_order(
+        ORDER,
+        ROUTINGS,
+        rows,
+        lambda group_id: members.get(group_id, []),
+        EquipmentCalendars(overlays=overlays, tz=UTC),
+        None,
+        plan_dt(10),
+        "tenant-a",
+        UTC,
+    )
+
+
+@pytest.mark.unit
+class TestInsertRushOrder:
+    """insert_rush_order 関数のテスト"""
+
+    @pytest.fixture
+    def rows(self):
+        return [
+            # 着手済み（動かさない）
+            plan_row(1, 100, 1, 1, "09:00", "11:00"),
+            # 特急注文と重なる予約とその後続工程
+            plan_row(2, 200, 1, 1, "11:00", "12:00"),
+            plan_row(3, 200, 2, 2, "13:00", "14:00"),
+            # 押し出された予約と重ならない予約
+            plan_row(4, 300, 1, 2, "15:00", "16:00"),
+        ]
+
+    def test_pushes_only_disrupted_bookings(self, rows):
+        """着手済みの予約の後に割り込み、重なる予約と後続工程だけを後ろへずらす"""
+        result = _insert(rows)
+
+        assert [(s.equipment_id, s.start, s.end) for s in result.inserted] == [
+            (1, plan_dt(11), plan_dt(12)),
+            (2, plan_dt(13), plan_dt(14)),
+        ]
+        assert [(s.id, s.start, s.end) for s in result.displaced] == [
+            (2, plan_dt(13), plan_dt(14)),
+            (3, plan_dt(14), plan_dt(15)),
+        ]
+        assert result.delayed_orders == [
+            {
+                "order_id": 200,
+                "previous_end": plan_dt(14).isoformat(),
+                "new_end": plan_dt(15).isoformat(),
+                "delay_seconds": 3600,
+            }
+        ]
+
+    def test_displaced_bookings_skip_maintenance(self, rows):
+        """押し出された予約は、移動先の設備の保全の時間を避けて配置する"""
+        maintenance = {
+            "equipment_id": 2,
+            "kind": "maintenance",
+            "start_datetime": plan_dt(14).isoformat(),
+            "end_datetime": plan_dt(15).isoformat(),
+        }
+
+        result = _insert(rows, overlays=[maintenance])
+
+        # 設備2の 14:00-15:00 は保全のため、後続工程は 15:00 から、
+        # その後ろの予約は 16:00 からになる
+        assert [(s.id, s.start, s.end) for s in result.displaced] == [
+            (2, plan_dt(13), plan_dt(14)),
+            (3, plan_dt(15), plan_dt(16)),
+            (4, plan_dt(16), plan_dt(17)),
+        ]
+
+    def test_change_set(self, rows):
+        """押し出された予約の更新と、特急注文の追加をまとめて返す"""
+        rows.append(plan_row(5, 900, 1, 1, "16:00", "17:00"))
+
+        updates, inserts, deletes = _insert(rows).change_set()
+
+        assert [u["id"] for u in updates] == [2, 3]
+        assert [
+            (i["order_id"], i["process_routing_id"], i["start_datetime"])
+            for i in inserts
+        ] == [
+            (900, 91, plan_dt(11).isoformat()),
+            (900, 92, plan_dt(13).isoformat()),
+        ]
+        # 特急注文の既存の予約は置き換える
+        assert deletes == [5]
+
+    def test_rejects_started_order(self, rows):
+        """着手済みの工程がある注文は前倒しできない"""
+        rows.append(plan_row(5, 900, 1, 1, "09:00", "09:30"))
+
+        with pytest.raises(ValueError, match="着手済み"):
+            _insert(rows)
+
+    def test_group_without_machines(self, rows):
+        """設備のない設備グループの工程はエラー"""
+        with pytest.raises(ValueError, match="設備グループID 20"):
+            _insert(rows, members={10: [1]})
+
+    def test_suffix_loads_only_affected_machines_and_orders(self, rows):
+        """候補の設備・特急注文から、連鎖が及ぶ設備・注文まで読み込む"""
+        rows += [
+            # 押し出された注文の後続工程（候補でない設備3）
+            plan_row(6, 200, 3, 3, "14:30", "15:30"),
+            # 連鎖が及ばない設備4の予約
+            plan_row(7, 400, 1, 4, "09:00", "10:00"),
+        ]
+        calls = []
+
+        def load_rows(equipment_ids, order_ids):
+            calls.append((equipment_ids, order_ids))
+            return [
+                row
+                for row in rows
+                if row["equipment_id"] in equipment_ids or row["order_id"] in order_ids
+            ]
+
+        result = insert_rush_order_suffix(
+            load_rows,
+            ORDER,
+            ROUTINGS,
+            lambda group_id: MEMBERS.get(group_id, []),
+            EquipmentCalendars(tz=UTC),
+            None,
+            plan_dt(10),
+            "tenant-a",
+            UTC,
+        )
+
+        assert [(s.id, s.start, s.end) for s in result.displaced] == [
+            (2, plan_dt(13), plan_dt(14)),
+            (3, plan_dt(14), plan_dt(15)),
+            (6, plan_dt(15), plan_dt(16)),
+        ]
+        # 押し出された予約の注文、ずらした後続工程の設備の順に加えて読み込み直す
+        assert calls == [
+            ([1, 2], [900]),
+            ([1, 2], [200, 900]),
+            ([1, 2, 3], [200, 900]),
+        ]
@@ -0,0 +1,148 @@
+"""
+hold_service の単体テスト
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from app.services.hold_service import CapacityHoldStore
+
+
+class FakeClock:
+    """テスト用の時刻を進められる時計"""
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def _schedule(equipment_id: int, start: str, end: str) -> dict:
+    return {
+        "tenant_id": "tenant-a",
+        "order_id": None,
+        "process_routing_id": 1,
+        "equipment_id": equipment_id,
+        "start_datetime": start,
+        "end_datetime": end,
+    }
+
+
+@pytest.mark.unit
+class TestCapacityHoldStore:
+    """CapacityHoldStore のテスト"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock(datetime(2025, 1, 6, 9, 0, tzinfo=UTC))
+
+    @pytest.fixture
+    def store(self, clock):
+        return CapacityHoldStore(now_fn=clock)
+
+    def test_reserved_until_takes_latest_end_per_equipment(self, store):
+        """設備ごとに仮押さえの最終終了時刻が返される"""
+        store.place(
+            "tenant-a",
+            1,
+            10,
+            [
+                _schedule(1, "2025-01-06T09:00:00+00:00", "2025-01-06T11:00:00+00:00"),
+                _schedule(2, "2025-01-06T11:00:00+00:00", "2025-01-06T12:00:00+00:00"),
+            ],
+        )
+        store.place(
+            "tenant-a",
+            1,
+            5,
+            [_schedule(1, "2025-01-06T11:00:00+00:00", "2025-01-06T14:00:00+00:00")],
+        )
+
+        reserved = store.reserved_until("tenant-a")
+
+        assert reserved == {
+            1: datetime(2025, 1, 6, 14, 0, tzinfo=UTC),
+            2: datetime(2025, 1, 6, 12, 0, tzinfo=UTC),
+        }
+
+    def test_holds_are_isolated_by_tenant(self, store):
+        """他テナントの仮押さえは参照できない"""
+        hold = store.place(
+            "tenant-a",
+            1,
+            10,
+            [_schedule(1, "2025-01-06T09:00:00+00:00", "2025-01-06T11:00:00+00:00")],
+        )
+
+        assert store.reserved_until("tenant-b") == {}
+        assert store.get("tenant-b", hold.hold_id) is None
+        assert store.release("tenant-b", hold.hold_id) is None
+        assert store.get("tenant-a", hold.hold_id) is hold
+
+    def test_hold_expires_after_ttl(self, store, clock):
+        """TTL経過後は仮押さえが失効する"""
+        hold = store.place(
+            "tenant-a",
+            1,
+            10,
+            [_schedule(1, "2025-01-06T09:00:00+00:00", "2025-01-06T11:00:00+00:00")],
+            ttl_seconds=60,
+        )
+
+        clock.now += timedelta(seconds=59)
+        assert store.get("tenant-a", hold.hold_id) is hold
+
+        clock.now += timedelta(seconds=1)
+        assert store.get("tenant-a", hold.hold_id) is None
+        assert store.reserved_until("tenant-a") == {}
+
+    def test_release_removes_hold(self, store):
+        """解除した仮押さえは占有時刻の計算から外れる"""
+        hold = store.place(
+            "tenant-a",
+            1,
+            10,
+            [_schedule(1, "2025-01-06T09:00:00+00:00", "2025-01-06T11:00:00+00:00")],
+            ttl_seconds=60,
+        )
+
+        assert store.release("tenant-a", hold.hold_id) is hold
+        assert store.release("tenant-a", hold.hold_id) is None
+        assert store.reserved_until("tenant-a") == {}
+
+    def test_restore_returns_released_hold(self, store, clock):
+        """取り出した仮押さえは戻せるが、期限切れの場合は戻さない"""
+        hold = store.place(
+            "tenant-a",
+            1,
+            10,
+            [_schedule(1, "2025-01-06T09:00:00+00:00", "2025-01-06T11:00:00+00:00")],
+            ttl_seconds=60,
+        )
+        store.release("tenant-a", hold.hold_id)
+
+        assert store.restore(hold) is True
+        assert store.get("tenant-a", hold.hold_id) is hold
+
+        store.release("tenant-a", hold.hold_id)
+        clock.now += timedelta(seconds=60)
+        assert store.restore(hold) is False
+        assert store.get("tenant-a", hold.hold_id) is None
+
+    def test_reserved_until_excludes_hold(self, store):
+        """指定した仮押さえを除外して占有時刻を計算できる"""
+        hold = store.place(
+            "tenant-a",
+            1,
+            10,
+            [_schedule(1, "2025-01-06T09:00:00+00:00", "2025-01-06T11:00:00+00:00")],
+        )
+
+        assert store.reserved_until("tenant-a", exclude_hold_id=hold.hold_id) == {}
+
+    def test_invalid_ttl_raises(self, store):
+        """保持時間が0以下の場合はValueError"""
+        with pytest.raises(ValueError, match="保持時間"):
+            store.place("tenant-a", 1, 10, [], ttl_seconds=0)
@@ -0,0 +1,199 @@
+"""
+kpi_service（計画のKPI評価）の単体テスト
+"""
+
+import time
+from datetime import UTC, datetime
+
+import numpy as np
+import pytest
+
+from app.services.kpi_service import (
+    NO_DEADLINE,
+    NO_ORDER,
+    PlanArrays,
+    evaluate_plan_kpis,
+)
+from app.utils.calendar import to_epoch_seconds
+from app.utils.equipment_calendar import EquipmentCalendars
+
+HOUR = 3600
+
+
+def _epoch(day: int, hour: int, minute: int = 0) -> int:
+    return to_epoch_seconds(datetime(2025, 1, day, hour, minute, tzinfo=UTC))
+
+
+def _iso(day: int, hour: int) -> str:
+    return datetime(2025, 1, day, hour, tzinfo=UTC).isoformat()
+
+
+@pytest.mark.unit
+class TestEvaluatePlanKpis:
+    """evaluate_plan_kpis のテスト"""
+
+    @pytest.fixture
+    def plan(self):
+        # 注文1: 設備1で 9:00-12:00、設備2で 13:00-15:00（納期 14:00 → 1時間遅れ）
+        # 注文2: 設備1で 13:00-14:00（納期 12:00 → 2時間遅れ）
+        # 注文3: 設備2で 9:00-10:00（納期なし）、注文なしの予約: 設備2で 10:00-11:00
+        return PlanArrays.from_rows(
+            [
+                {
+                    "order_id": 1,
+                    "equipment_id": 1,
+                    "start_datetime": _iso(6, 9),
+                    "end_datetime": _iso(6, 12),
+                },
+                {
+                    "order_id": 1,
+                    "equipment_id": 2,
+                    "start_datetime": _iso(6, 13),
+                    "end_datetime": _iso(6, 15),
+                },
+                {
+                    "order_id": 2,
+                    "equipment_id": 1,
+                    "start_datetime": _iso(6, 13),
+                    "end_datetime": _iso(6, 14),
+                },
+                {
+                    "order_id": 3,
+                    "equipment_id": 2,
+                    "start_datetime": _iso(6, 9),
+                    "end_datetime": _iso(6, 10),
+                },
+                {
+                    "order_id": None,
+                    "equipment_id": 2,
+                    "start_datetime": _iso(6, 10),
+                    "end_datetime": _iso(6, 11),
+                },
+            ],
+            {
+                1: {"deadline_date": _iso(6, 14)},
+                2: {"deadline_date": _iso(6, 12)},
+                3: {"deadline_date": None},
+            },
+            UTC,
+        )
+
+    def test_order_kpis(self, plan):
+        """メイクスパン・納期遅れ（合計・最大・遅れた注文数）を求める"""
+        kpis = evaluate_plan_kpis(plan)
+
+        assert kpis["segment_count"] == 5
+        assert kpis["order_count"] == 3
+        assert kpis["makespan_seconds"] == 6 * HOUR
+        assert kpis["total_tardiness_seconds"] == 3 * HOUR
+        assert kpis["max_tardiness_seconds"] == 2 * HOUR
+        assert kpis["late_order_count"] == 2
+
+    def test_utilization_by_elapsed_time(self, plan):
+        """稼働可能区間テーブルなしの場合は、期間の経過時間に対する割合"""
+        kpis = evaluate_plan_kpis(plan, horizon=(_epoch(6, 9), _epoch(6, 17)))
+
+        assert kpis["machines"] == [
+            {
+                "equipment_id": 1,
+                "busy_seconds": 4 * HOUR,
+                "available_seconds": 8 * HOUR,
+                "utilization": 0.5,
+            },
+            {
+                "equipment_id": 2,
+                "busy_seconds": 4 * HOUR,
+                "available_seconds": 8 * HOUR,
+                "utilization": 0.5,
+            },
+        ]
+
+    def test_utilization_by_working_time(self):
+        """稼働可能区間テーブルを渡した場合は、休憩・保全を除いた稼働時間で数える"""
+        plan = PlanArrays(
+            order_ids=[1, 2],
+            machine_ids=[1, 2],
+            starts=[_epoch(6, 9), _epoch(6, 9)],
+            # 9:00-14:00 のセグメントは昼休憩（1時間）を含む
+            ends=[_epoch(6, 14), _epoch(6, 11)],
+            deadlines=[NO_DEADLINE, NO_DEADLINE],
+        )
+        calendars = EquipmentCalendars(
+            overlays=[
+                {
+                    "equipment_id": 2,
+                    "kind": "maintenance",
+                    "start_datetime": _iso(6, 15),
+                    "end_datetime": _iso(6, 17),
+                }
+            ],
+            tz=UTC,
+        )
+
+        kpis = evaluate_plan_kpis(
+            plan,
+            horizon=(_epoch(6, 0), _epoch(7, 0)),
+            equipment_calendars=calendars,
+        )
+
+        assert [
+            (m["equipment_id"], m["busy_seconds"], m["available_seconds"])
+            for m in kpis["machines"]
+        ] == [(1, 4 * HOUR, 7 * HOUR), (2, 2 * HOUR, 5 * HOUR)]
+        assert kpis["machines"][1]["utilization"] == 0.4
+
+    def test_empty_plan(self):
+        """セグメントがない場合はすべて0"""
+        empty = np.array([], dtype=np.int64)
+        kpis = evaluate_plan_kpis(PlanArrays(empty, empty, empty, empty, empty))
+        assert kpis["order_count"] == 0
+        assert kpis["machines"] == []
+
+    def test_invalid_horizon(self, plan):
+        """期間の開始が終了以降の場合はエラー"""
+        with pytest.raises(ValueError, match="期間の開始"):
+            evaluate_plan_kpis(plan, horizon=(_epoch(6, 17), _epoch(6, 9)))
+
+    def test_mismatched_lengths(self):
+        """配列の長さが一致しない場合はエラー"""
+        with pytest.raises(ValueError, match="長さ"):
+            PlanArrays([1, 2], [1], [0, 0], [1, 1], [0, 0])
+
+    def test_large_plan_matches_reference(self):
+        """10万セグメントの計画を1回のベクトル演算で評価し、逐次計算と一致する"""
+        rng = np.random.default_rng(0)
+        size = 100_000
+        order_ids = rng.integers(0, 5_000, size)
+        order_ids[rng.random(size) < 0.01] = NO_ORDER
+        machine_ids = rng.integers(1, 200, size)
+        starts = _epoch(6, 0) + rng.integers(0, 30 * 24 * HOUR, size)
+        ends = starts + rng.integers(60, 8 * HOUR, size)
+        order_deadlines = _epoch(6, 0) + rng.integers(0, 30 * 24 * HOUR, 5_000)
+        order_deadlines[::7] = NO_DEADLINE
+        deadlines = np.where(
+            order_ids == NO_ORDER, NO_DEADLINE, order_deadlines[order_ids]
+        )
+        plan = PlanArrays(order_ids, machine_ids, starts, ends, deadlines)
+
+        started = time.perf_counter()
+        kpis = evaluate_plan_kpis(plan)
+        elapsed = time.perf_counter() - started
+
+        completions: dict[int, int] = {}
+        for order_id, end in zip(order_ids.tolist(), ends.tolist(), strict=True):
+            if order_id != NO_ORDER:
+                completions[order_id] = max(completions.get(order_id, 0), end)
+        tardiness = [
+            max(completion - int(order_deadlines[order_id]), 0)
+            for order_id, completion in completions.items()
+            if order_deadlines[order_id] != NO_DEADLINE
+        ]
+        assert kpis["order_count"] == len(completions)
+        assert kpis["total_tardiness_seconds"] == sum(tardiness)
+        assert kpis["max_tardiness_seconds"] == max(tardiness)
+        assert kpis["late_order_count"] == sum(1 for t in tardiness if t > 0)
+        assert sum(m["busy_seconds"] for m in kpis["machines"]) == int(
+            (ends - starts).sum()
+        )
+        # 目安はミリ秒単位。CI環境のばらつきを考慮して上限は緩めにとる
+        assert elapsed < 1.0
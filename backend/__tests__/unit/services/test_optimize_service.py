@@ -0,0 +1,261 @@
+"""
+optimize_service（局所探索によるスケジュールの最適化）の単体テスト
+"""
+
+import itertools
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, date, datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_at, plan_row
+from app.services.calendar_service import CalendarCache
+from app.services.optimize_service import CompactPlan, local_search, parallel_search
+from app.services.reschedule_service import (
+    DISPATCH_EDD,
+    build_reschedule_plan,
+    dispatch,
+    summarize_jobs,
+)
+from app.utils.calendar import CalendarConfig, from_epoch_seconds, to_epoch_seconds
+from app.utils.equipment_calendar import EquipmentCalendars
+
+WINDOW_START = datetime(2025, 1, 6, 9, 0, tzinfo=UTC)  # 月曜日
+WINDOW_END = datetime(2025, 1, 10, 17, 0, tzinfo=UTC)
+
+
+def _compact(rows, deadlines, members, calendar_config=None, **weights):
+    plan = build_reschedule_plan(
+        rows,
+        {
+            order_id: {"id": order_id, "status": "confirmed", "deadline_date": deadline}
+            for order_id, deadline in deadlines.items()
+        },
+        to_epoch_seconds(WINDOW_START),
+        to_epoch_seconds(WINDOW_END),
+        UTC,
+        EquipmentCalendars(calendar_config, tz=UTC),
+    )
+    calendars = EquipmentCalendars(calendar_config, plan.blocks, tz=UTC)
+    machines_for_group = lambda group_id: members.get(group_id, [])  # noqa: E731
+    dispatch(plan, machines_for_group, calendars, DISPATCH_EDD)
+    return plan, CompactPlan(plan, machines_for_group, calendars, **weights)
+
+
+@pytest.mark.unit
+class TestCompactPlan:
+    """CompactPlan のテスト"""
+
+    def test_initial_solution_reproduces_dispatch(self):
+        """初期解の評価はディスパッチの結果と一致する"""
+        rows = []
+        schedule_id = itertools.count(1)
+        for order_id in range(1, 31):
+            for sequence_order, group_id in enumerate([100, 200], start=1):
+                start = WINDOW_START + timedelta(minutes=order_id)
+                rows.append(
+                    plan_row(
+                        next(schedule_id),
+                        order_id,
+                        sequence_order,
+                        group_id,
+                        start.isoformat(),
+                        (start + timedelta(minutes=30 + order_id % 5)).isoformat(),
+                        group_id=group_id,
+                    )
+                )
+        plan, compact = _compact(
+            rows,
+            {order_id: "2025-01-07" for order_id in range(1, 31)},
+            {100: [100, 101], 200: [200, 201, 202]},
+        )
+        dispatched = summarize_jobs(plan, UTC)
+
+        objective = compact.evaluate(*compact.initial_solution())
+
+        assert objective.tardiness_seconds == sum(
+            job["tardiness_seconds"] for job in dispatched
+        )
+        assert from_epoch_seconds(
+            objective.makespan_seconds + to_epoch_seconds(WINDOW_START), UTC
+        ).isoformat() == max(job["completion"] for job in dispatched)
+
+    def test_pickle_keeps_evaluation(self):
+        """pickleして復元した配列表現でも同じ評価値になる（再計画の対象は含めない）"""
+        rows = [
+            plan_row(1, 1, 1, 1, "09:00", "11:00", group_id=100),
+            plan_row(2, 2, 1, 1, "11:00", "12:00", group_id=100),
+        ]
+        _, compact = _compact(rows, {1: plan_at(10), 2: None}, {100: [1]})
+        solution = compact.initial_solution()
+
+        restored = pickle.loads(pickle.dumps(compact))
+
+        assert restored.evaluate(*solution).value == compact.evaluate(*solution).value
+        assert restored._plan is None
+
+
+@pytest.mark.unit
+class TestLocalSearch:
+    """local_search のテスト"""
+
+    @pytest.fixture
+    def greedy_late(self):
+        # 注文1: 4時間・納期なし（9:00 から着手可能）
+        # 注文2: 1時間・納期 11:00（前工程が 9:30 に終わるまで着手できない）
+        # ディスパッチは 9:00 に空いている設備へ注文1を割り当てるため、注文2が遅れる
+        rows = [
+            plan_row(1, 1, 1, 1, "13:00", "17:00", group_id=100),
+            plan_row(2, 2, 1, 2, "08:30", "09:30", group_id=200),
+            plan_row(3, 2, 2, 1, "18:00", "19:00", group_id=100),
+        ]
+        return _compact(rows, {1: None, 2: plan_at(11)}, {100: [1], 200: [2]})
+
+    def test_improves_greedy_plan(self, greedy_late):
+        """空き時間を残してでも納期の近い注文を先に割り当てる解を見つける"""
+        plan, compact = greedy_late
+
+        result = local_search(
+            compact, time_budget_seconds=10, seed=0, max_iterations=500
+        )
+        compact.apply(result.sequence, result.assignment)
+
+        # 初期解: 注文2が 14:00-15:00 で4時間遅れ（メイクスパンは 9:00-15:00）
+        assert result.initial.tardiness_seconds == 4 * 3600
+        assert result.best.tardiness_seconds == 0
+        assert result.best.value == pytest.approx(0.1 * 6.5 * 3600)
+        jobs = {job["order_id"]: job for job in summarize_jobs(plan, UTC)}
+        assert jobs[2]["completion"] == plan_at(10, 30)
+        assert jobs[1]["completion"] == plan_at(15, 30)
+        # 最良解が更新されるたびに記録され、目的関数値は単調に減少する
+        assert result.trace[0] == {
+            "elapsed_ms": 0,
+            "iteration": 0,
+            "objective": result.initial.value,
+        }
+        objectives = [entry["objective"] for entry in result.trace]
+        assert objectives == sorted(objectives, reverse=True)
+        assert objectives[-1] == result.best.value
+
+    def test_respects_time_budget(self, greedy_late):
+        """制限時間を過ぎたら探索を打ち切る"""
+        _, compact = greedy_late
+        ticks = itertools.count()
+
+        result = local_search(
+            compact, time_budget_seconds=0.5, clock=lambda: next(ticks) * 0.1
+        )
+
+        # 経過時間は少なくとも1反復に1回確認する（0.1秒/回で 0.5秒 まで）
+        assert 1 <= result.iterations <= 4
+
+    def test_reassigns_within_group(self):
+        """同じ設備グループ内で設備を付け替えて納期遅れを解消する"""
+        # 設備1は 9:00-9:10 が予約済み。ディスパッチは注文1（4時間）を最も早く開始できる
+        # 設備2へ割り当てるため、設備2でしか加工できない注文2（1時間・納期 11:00）が遅れる
+        rows = [
+            # 昼休憩をはさむため作業時間は4時間
+            plan_row(1, 1, 1, 1, "09:00", "14:00", group_id=100),
+            plan_row(2, 2, 1, 2, "13:00", "14:00", group_id=200),
+            plan_row(3, 9, 1, 1, "09:00", "09:10", group_id=100),
+        ]
+        plan, compact = _compact(
+            rows,
+            {1: None, 2: plan_at(11)},
+            {100: [1, 2], 200: [2]},
+            makespan_weight=0,
+        )
+
+        result = local_search(compact, time_budget_seconds=10, seed=1)
+        compact.apply(result.sequence, result.assignment)
+
+        assert result.initial.tardiness_seconds == 4 * 3600
+        assert result.best.value == 0
+        ops = {job.order_id: job.operations[0] for job in plan.jobs}
+        assert ops[1].machine_id == 1
+        assert ops[2].segments[0][0] == to_epoch_seconds(WINDOW_START)
+
+    def test_same_seed_same_result(self, greedy_late):
+        """同じシード・同じ反復回数なら同じ結果になる"""
+        _, compact = greedy_late
+
+        first = local_search(compact, 10, seed=42, max_iterations=20)
+        second = local_search(compact, 10, seed=42, max_iterations=20)
+
+        assert first.sequence == second.sequence
+        assert first.assignment == second.assignment
+        assert first.iterations == second.iterations
+
+
+@pytest.mark.unit
+class TestParallelSearch:
+    """parallel_search のテスト"""
+
+    @pytest.fixture
+    def greedy_late(self):
+        rows = [
+            plan_row(1, 1, 1, 1, "13:00", "17:00", group_id=100),
+            plan_row(2, 2, 1, 2, "08:30", "09:30", group_id=200),
+            plan_row(3, 2, 2, 1, "18:00", "19:00", group_id=100),
+        ]
+        return _compact(rows, {1: None, 2: plan_at(11)}, {100: [1], 200: [2]})
+
+    def test_runs_on_process_pool(self, greedy_late):
+        """複数の探索をプロセスプールで実行し、最良の結果を採用する"""
+        plan, compact = greedy_late
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            result = parallel_search(compact, 0.2, workers=2, seed=0, executor=executor)
+        compact.apply(result.sequence, result.assignment)
+
+        assert result.best.tardiness_seconds == 0
+        assert result.iterations > 0
+        jobs = {job["order_id"]: job for job in summarize_jobs(plan, UTC)}
+        assert jobs[2]["completion"] == plan_at(10, 30)
+        # trace は全探索を通じた最良解の更新のみ（探索の番号を含む）
+        assert {entry["worker"] for entry in result.trace} <= {0, 1}
+        objectives = [entry["objective"] for entry in result.trace]
+        assert objectives == sorted(set(objectives), reverse=True)
+        assert objectives[-1] == result.best.value
+
+    def test_cached_calendar_is_detached(self):
+        """キャッシュのカレンダー設定（ロック・リポジトリを参照）でもプロセスプールへ渡せる"""
+        calendar_repo = MagicMock()
+        calendar_repo.get_holidays_in_range.return_value = [
+            {"date": "2025-03-03", "is_holiday": True}
+        ]
+        calendar_config = CalendarCache().get_config(
+            "tenant-a", calendar_repo, date(2025, 1, 6), date(2025, 1, 10)
+        )
+        rows = [
+            plan_row(1, 1, 1, 1, "13:00", "17:00", group_id=100),
+            plan_row(2, 2, 1, 2, "08:30", "09:30", group_id=200),
+            plan_row(3, 2, 2, 1, "18:00", "19:00", group_id=100),
+        ]
+        _, compact = _compact(
+            rows, {1: None, 2: plan_at(11)}, {100: [1], 200: [2]}, calendar_config
+        )
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            result = parallel_search(compact, 0.2, workers=2, seed=0, executor=executor)
+
+        assert result.best.tardiness_seconds == 0
+        # 渡す設定は、計画の先（DEFAULT_CALENDAR_HORIZON_DAYS 日後）までの休日情報を複製している
+        detached = compact.detached(compact.initial_solution())
+        config = detached._availabilities[0]._config
+        assert type(config) is CalendarConfig
+        assert date(2025, 3, 3) in config.holidays
+        assert compact._availabilities[0]._config is calendar_config
+
+    def test_single_worker_runs_in_process(self, greedy_late):
+        """並列数が1の場合はプロセスプールを使わない"""
+        _, compact = greedy_late
+        executor = ProcessPoolExecutor(max_workers=1)
+        executor.shutdown()
+
+        # 終了済みのExecutorを渡しても、並列数1では使われないため失敗しない
+        result = parallel_search(compact, 0.05, workers=1, seed=0, executor=executor)
+
+        assert result.best.value <= result.initial.value
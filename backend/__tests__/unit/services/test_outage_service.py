@@ -0,0 +1,174 @@
+"""
+outage_service（設備の故障による再配置）の単体テスト
+"""
+
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_dt, plan_row
+from app.services import outage_service
+from app.services.outage_service import repair_outage, repair_outage_suffix
+
+# 設備グループ10: 設備1・2、設備グループ20: 設備3
+MEMBERS = {10: [1, 2], 20: [3]}
+
+
+def _repair(
+    rows: list[dict], start: datetime, now: datetime, members=MEMBERS, overlays=()
+):
+    return repair_outage(
+        rows, 1, start, plan_dt(17), now, members, None, list(overlays), UTC
+    )
+
+
+@pytest.mark.unit
+class TestRepairOutage:
+    """repair_outage 関数のテスト"""
+
+    def test_moves_to_sibling_machine(self):
+        """停止と重なる予約を同じ設備グループの設備へ移し、後続工程をずらす"""
+        rows = [
+            plan_row(1, 100, 1, 1, "09:00", "10:00", group_id=10),
+            plan_row(2, 100, 2, 3, "10:00", "11:00", group_id=20),
+            plan_row(3, 300, 1, 2, "09:00", "10:00", group_id=10),
+        ]
+
+        repair = _repair(rows, plan_dt(9), now=plan_dt(8))
+
+        # 設備2は 10:00 まで予約があるため、その後に置く
+        assert [(s.id, s.equipment_id, s.start, s.end) for s in repair.moved] == [
+            (1, 2, plan_dt(10), plan_dt(11))
+        ]
+        assert [(s.id, s.start, s.end) for s in repair.rippled] == [
+            (2, plan_dt(11), plan_dt(12))
+        ]
+        assert repair.truncated == []
+        assert repair.delayed_orders == [
+            {
+                "order_id": 100,
+                "previous_end": plan_dt(11).isoformat(),
+                "new_end": plan_dt(12).isoformat(),
+                "delay_seconds": 3600,
+            }
+        ]
+
+    def test_ripple_skips_maintenance_on_successor_machine(self):
+        """後続工程は、ずらす先の設備の保全の時間を避けて配置する"""
+        rows = [
+            plan_row(1, 100, 1, 1, "09:00", "10:00", group_id=10),
+            plan_row(2, 100, 2, 3, "10:00", "11:00", group_id=20),
+            plan_row(3, 300, 1, 2, "09:00", "10:00", group_id=10),
+        ]
+        maintenance = {
+            "equipment_id": 3,
+            "kind": "maintenance",
+            "start_datetime": plan_dt(11).isoformat(),
+            "end_datetime": plan_dt(12).isoformat(),
+        }
+
+        repair = _repair(rows, plan_dt(9), now=plan_dt(8), overlays=[maintenance])
+
+        # 設備3の 11:00-12:00 は保全のため、後続工程は昼休憩の後の 13:00 から
+        assert [(s.id, s.start, s.end) for s in repair.rippled] == [
+            (2, plan_dt(13), plan_dt(14))
+        ]
+
+    def test_suffix_loads_only_affected_machines_and_orders(self):
+        """停止した設備・同じ設備グループの設備から、連鎖が及ぶ設備・注文まで読み込む"""
+        rows = [
+            plan_row(1, 100, 1, 1, "09:00", "10:00", group_id=10),
+            plan_row(2, 100, 2, 3, "10:00", "11:00", group_id=20),
+            plan_row(3, 300, 1, 2, "09:00", "10:00", group_id=10),
+            # 連鎖が及ばない設備4の予約
+            plan_row(4, 400, 1, 4, "09:00", "10:00", group_id=20),
+        ]
+        calls = []
+
+        def load_rows(equipment_ids, order_ids):
+            calls.append((equipment_ids, order_ids))
+            return [
+                row
+                for row in rows
+                if row["equipment_id"] in equipment_ids or row["order_id"] in order_ids
+            ]
+
+        repair = repair_outage_suffix(
+            load_rows,
+            1,
+            plan_dt(9),
+            plan_dt(17),
+            plan_dt(8),
+            {10: [1, 2]},
+            None,
+            [],
+            UTC,
+        )
+
+        assert [(s.id, s.equipment_id, s.start) for s in repair.moved] == [
+            (1, 2, plan_dt(10))
+        ]
+        assert [(s.id, s.start) for s in repair.rippled] == [(2, plan_dt(11))]
+        # 移した予約の注文、ずらした後続工程の設備の順に加えて読み込み直す
+        assert calls == [([1, 2], []), ([1, 2], [100]), ([1, 2, 3], [100])]
+
+    def test_suffix_reuses_segments_built_by_closure(self, monkeypatch):
+        """読み込んだ計画のセグメントは ripple_closure で1回だけ作成する"""
+        rows = [plan_row(1, 100, 1, 1, "09:00", "10:00", group_id=10)]
+        build_segments = MagicMock(side_effect=outage_service.build_segments)
+        monkeypatch.setattr(outage_service, "build_segments", build_segments)
+
+        repair = repair_outage_suffix(
+            lambda equipment_ids, order_ids: rows,
+            1,
+            plan_dt(9),
+            plan_dt(17),
+            plan_dt(8),
+            {10: [1, 2]},
+            None,
+            [],
+            UTC,
+        )
+
+        assert [s.id for s in repair.moved] == [1]
+        build_segments.assert_not_called()
+
+    def test_truncates_started_booking(self):
+        """停止の前に始まった予約は打ち切り、残りの作業だけを新しい予約として移す"""
+        rows = [plan_row(1, 100, 1, 1, "09:00", "11:00", group_id=10)]
+
+        repair = _repair(rows, plan_dt(10), now=plan_dt(10))
+        updates, inserts = repair.change_set()
+
+        assert [(s.id, s.end) for s in repair.truncated] == [(1, plan_dt(10))]
+        assert [(s.id, s.equipment_id, s.start, s.end) for s in repair.moved] == [
+            (-1, 2, plan_dt(10), plan_dt(11))
+        ]
+        assert updates == [
+            {
+                "id": 1,
+                "equipment_id": 1,
+                "start_datetime": plan_dt(9).isoformat(),
+                "end_datetime": plan_dt(10).isoformat(),
+            }
+        ]
+        assert [(i["order_id"], i["equipment_id"]) for i in inserts] == [(100, 2)]
+
+    def test_delays_without_sibling(self):
+        """移せる設備がない場合は、停止明けの同じ設備へ遅らせる"""
+        rows = [plan_row(1, 100, 1, 1, "13:00", "14:00", group_id=10)]
+
+        repair = _repair(rows, plan_dt(9), now=plan_dt(8), members={10: [1]})
+
+        assert [(s.equipment_id, s.start) for s in repair.moved] == [
+            (1, plan_dt(9, day=7))
+        ]
+
+    def test_untouched_when_no_overlap(self):
+        """停止と重ならない予約は動かさない"""
+        rows = [plan_row(1, 100, 1, 2, "09:00", "10:00", group_id=10)]
+
+        repair = _repair(rows, plan_dt(9), now=plan_dt(8))
+
+        assert repair.change_set() == ([], [])
@@ -0,0 +1,238 @@
+"""
+plan_version_service（差分で保存する計画バージョン）の単体テスト
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_dt, plan_row
+from app.services.plan_version_service import (
+    CHECKPOINT_INTERVAL,
+    PlanVersionCache,
+    apply_changes,
+    build_version_record,
+    diff_timeline_versions,
+    diff_versions,
+    to_timeline,
+    version_chain,
+    version_paths,
+)
+
+
+def _row(schedule_id: int, hour: int) -> dict:
+    # 1時間の予約（注文ID は schedule_id * 10）
+    return plan_row(
+        schedule_id, schedule_id * 10, 1, 1, plan_dt(hour), plan_dt(hour + 1)
+    )
+
+
+class FakeVersionStore:
+    """build_version_record のレコードを保存し、リポジトリの代わりに返す"""
+
+    def __init__(self):
+        self.records: dict[int, dict] = {}
+        self.repo = MagicMock()
+        self.repo.get_payloads.side_effect = self._get_payloads
+
+    def save(self, record: dict) -> dict:
+        version = {**record, "id": len(self.records) + 1}
+        self.records[version["id"]] = version
+        return version
+
+    def _get_payloads(self, version_ids, with_timeline=True):
+        return {
+            version_id: {
+                "id": version_id,
+                "changes": self.records[version_id]["changes"],
+                "timeline": self.records[version_id]["timeline"]
+                if with_timeline
+                else None,
+            }
+            for version_id in version_ids
+        }
+
+
+@pytest.mark.unit
+class TestBuildVersionRecord:
+    """build_version_record のテスト"""
+
+    def test_root_stores_timeline(self):
+        """元のないバージョンは計画全体を保存する（保存対象の項目のみ）"""
+        record = build_version_record("Monday", to_timeline([_row(2, 10), _row(1, 9)]))
+
+        assert record["depth"] == 0
+        assert record["ancestor_ids"] == []
+        assert [row["id"] for row in record["timeline"]] == [1, 2]
+        assert "tenant_id" not in record["timeline"][0]
+        assert record["segment_count"] == 2
+
+    def test_child_stores_changes_only(self):
+        """元のバージョンからの差分（変更前・変更後）だけを保存する"""
+        base = {"id": 5, "ancestor_ids": [3], "depth": 1}
+        base_timeline = to_timeline([_row(1, 9), _row(2, 10), _row(3, 11)])
+
+        record = build_version_record(
+            "moved",
+            to_timeline([_row(1, 9), _row(2, 13), _row(4, 14)]),
+            base,
+            base_timeline,
+        )
+
+        assert record["timeline"] is None
+        assert record["depth"] == 2
+        assert record["ancestor_ids"] == [3, 5]
+        assert [
+            (c["id"], c["before"] is not None, c["after"] is not None)
+            for c in record["changes"]
+        ] == [(2, True, True), (3, True, False), (4, False, True)]
+        assert record["change_count"] == 3
+
+    def test_checkpoint_interval(self):
+        """一定の世代ごとに計画全体を保存し、読み込みに必要な差分の数を抑える"""
+        base = {"id": 9, "ancestor_ids": [1], "depth": CHECKPOINT_INTERVAL - 1}
+        timeline = to_timeline([_row(1, 9)])
+
+        record = build_version_record("deep", timeline, base, timeline)
+
+        assert record["depth"] == 0
+        assert record["timeline"] is not None
+        assert record["changes"] == []
+
+    def test_missing_base_timeline(self):
+        """元のバージョンの計画がない場合はエラー"""
+        with pytest.raises(ValueError, match="元のバージョンの計画"):
+            build_version_record("x", {}, {"id": 1, "ancestor_ids": [], "depth": 0})
+
+
+@pytest.mark.unit
+class TestVersionLineage:
+    """version_chain・version_paths・diff_versions のテスト"""
+
+    def test_version_chain(self):
+        """直近のチェックポイントから自身までのID"""
+        assert version_chain({"id": 7, "ancestor_ids": [1, 4, 5, 6], "depth": 2}) == [
+            5,
+            6,
+            7,
+        ]
+        assert version_chain({"id": 4, "ancestor_ids": [1], "depth": 0}) == [4]
+
+    def test_version_paths(self):
+        """共通の祖先と、共通の祖先からそれぞれまでのID"""
+        a = {"id": 4, "ancestor_ids": [1, 2]}
+        b = {"id": 6, "ancestor_ids": [1, 5]}
+        assert version_paths(a, b) == (1, [2, 4], [5, 6])
+        assert version_paths(a, {"id": 2, "ancestor_ids": [1]}) == (2, [4], [])
+        assert version_paths(a, {"id": 9, "ancestor_ids": []}) == (None, [1, 2, 4], [9])
+
+    def test_diff_sibling_branches(self):
+        """分岐した2つのバージョンを、共通の祖先からの差分だけで比較する"""
+        common = to_timeline([_row(1, 9), _row(2, 10), _row(3, 11)])
+        branch_a = to_timeline([_row(1, 9), _row(2, 12), _row(3, 11)])
+        branch_b = to_timeline([_row(1, 9), _row(2, 10), _row(4, 15)])
+        changes_a = build_version_record("a", branch_a, _base(1), common)["changes"]
+        changes_b = build_version_record("b", branch_b, _base(1), common)["changes"]
+
+        diff = diff_versions([changes_a], [changes_b])
+
+        assert [(c["id"], c["kind"]) for c in diff] == [
+            (2, "changed"),
+            (3, "removed"),
+            (4, "added"),
+        ]
+        # 差分から求めた結果は、計画全体の比較と一致する
+        assert diff == diff_timeline_versions(branch_a, branch_b)
+
+    def test_diff_reverted_change(self):
+        """途中で変更して元に戻した行は、変更として扱わない"""
+        first = to_timeline([_row(1, 9)])
+        moved = to_timeline([_row(1, 12)])
+        changes = [
+            build_version_record("moved", moved, _base(1), first)["changes"],
+            build_version_record("back", first, _base(2), moved)["changes"],
+        ]
+
+        assert diff_versions([], changes) == []
+
+
+def _base(version_id: int) -> dict:
+    return {"id": version_id, "ancestor_ids": [], "depth": 0}
+
+
+@pytest.mark.unit
+class TestPlanVersionCache:
+    """PlanVersionCache のテスト"""
+
+    @pytest.fixture
+    def store(self):
+        # 1: 元のバージョン → 2: 行2を移動 → 3: 行1を削除・行3を追加
+        store = FakeVersionStore()
+        timelines = [
+            to_timeline([_row(1, 9), _row(2, 10)]),
+            to_timeline([_row(1, 9), _row(2, 13)]),
+            to_timeline([_row(2, 13), _row(3, 15)]),
+        ]
+        base, base_timeline = None, None
+        for name, timeline in zip("abc", timelines, strict=True):
+            base = store.save(build_version_record(name, timeline, base, base_timeline))
+            base_timeline = timeline
+        store.timelines = timelines
+        return store
+
+    def test_materializes_from_checkpoint(self, store):
+        """チェックポイントの計画に差分を順に適用して復元する"""
+        cache = PlanVersionCache()
+
+        timeline = cache.get_timeline("tenant-a", store.records[3], store.repo)
+
+        assert timeline == store.timelines[2]
+        store.repo.get_payloads.assert_called_once_with([1, 2, 3], with_timeline=True)
+
+    def test_reuses_cached_ancestor(self, store):
+        """読み込み済みの祖先からは差分だけを読み込み、変更のない行は共有する"""
+        cache = PlanVersionCache()
+        parent = cache.get_timeline("tenant-a", store.records[2], store.repo)
+
+        child = cache.get_timeline("tenant-a", store.records[3], store.repo)
+
+        assert store.repo.get_payloads.call_args.args == ([3],)
+        assert store.repo.get_payloads.call_args.kwargs == {"with_timeline": False}
+        assert child[2] is parent[2]
+        # 読み込み済みのバージョンはDBを参照しない
+        cache.get_timeline("tenant-a", store.records[3], store.repo)
+        assert store.repo.get_payloads.call_count == 2
+
+    def test_evicts_least_recently_used(self, store):
+        """上限を超えた場合は最も古く参照したバージョンを破棄する"""
+        cache = PlanVersionCache(max_size=1)
+        cache.get_timeline("tenant-a", store.records[1], store.repo)
+        cache.get_timeline("tenant-a", store.records[1], store.repo)
+        assert store.repo.get_payloads.call_count == 1
+
+        cache.get_timeline("tenant-b", store.records[1], store.repo)
+        cache.get_timeline("tenant-a", store.records[1], store.repo)
+        assert store.repo.get_payloads.call_count == 3
+
+    def test_missing_version(self, store):
+        """差分の読み込み対象のバージョンが存在しない場合はエラー"""
+        store.repo.get_payloads.side_effect = lambda ids, with_timeline: {}
+
+        with pytest.raises(ValueError, match="計画バージョン 1"):
+            PlanVersionCache().get_timeline("tenant-a", store.records[3], store.repo)
+
+
+@pytest.mark.unit
+class TestApplyChanges:
+    """apply_changes のテスト"""
+
+    def test_keeps_original(self):
+        """差分の適用は元の計画を変更しない"""
+        timeline = to_timeline([_row(1, 9)])
+
+        applied = apply_changes(
+            timeline, [{"id": 1, "before": timeline[1], "after": None}]
+        )
+
+        assert applied == {}
+        assert 1 in timeline
@@ -0,0 +1,255 @@
+"""
+quick_quote_service（LoadCache / build_quick_quote）の単体テスト
+"""
+
+import threading
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.scheduler_logic import schedule_order
+from app.services.quick_quote_service import LoadCache, build_quick_quote
+from app.utils.equipment_calendar import EquipmentAvailability
+
+START = datetime(2025, 1, 6, 9, 0, tzinfo=UTC)  # 月曜日
+
+
+def _at(hour: int, minute: int = 0) -> datetime:
+    return START.replace(hour=hour, minute=minute)
+
+
+@pytest.fixture
+def product_repo():
+    """2工程（段取り10分 + 1分/個、5分/個）。グループ100は設備1・2、グループ200は設備3"""
+    repo = MagicMock()
+    repo.get_routings_by_product.return_value = [
+        {
+            "id": 1,
+            "equipment_group_id": 100,
+            "setup_time_seconds": 600,
+            "unit_time_seconds": 60,
+            "sequence_order": 1,
+        },
+        {
+            "id": 2,
+            "equipment_group_id": 200,
+            "setup_time_seconds": 0,
+            "unit_time_seconds": 300,
+            "sequence_order": 2,
+        },
+    ]
+    members = {100: [1, 2], 200: [3]}
+    repo.client.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+        {"equipment_group_id": group_id, "equipment_id": equipment_id}
+        for group_id, equipment_ids in members.items()
+        for equipment_id in equipment_ids
+    ]
+    repo.client.table.return_value.select.return_value.eq.side_effect = (
+        lambda _column, group_id: MagicMock(
+            **{
+                "execute.return_value.data": [
+                    {"equipment_id": equipment_id} for equipment_id in members[group_id]
+                ]
+            }
+        )
+    )
+    return repo
+
+
+@pytest.fixture
+def schedule_repo():
+    """設備1: 9:00-11:00、設備3: 9:00-10:00 が予約済み"""
+    rows = [
+        {
+            "equipment_id": 1,
+            "start_datetime": _at(9).isoformat(),
+            "end_datetime": _at(11).isoformat(),
+        },
+        {
+            "equipment_id": 3,
+            "start_datetime": _at(9).isoformat(),
+            "end_datetime": _at(10).isoformat(),
+        },
+    ]
+    last_end = {1: _at(11), 3: _at(10)}
+    repo = MagicMock()
+    repo.get_plan_from.return_value = rows
+    repo.get_last_end_time.side_effect = last_end.get
+    return repo
+
+
+@pytest.mark.unit
+class TestBuildQuickQuote:
+    """build_quick_quote のテスト"""
+
+    def test_estimate_and_bounds(self, product_repo, schedule_repo):
+        """見積もりと範囲を工程ごとの作業量から求める"""
+        load = LoadCache(now_fn=lambda: START).get(
+            "tenant-a", schedule_repo, EquipmentAvailability(tz=UTC)
+        )
+
+        quote = build_quick_quote(
+            load,
+            product_repo,
+            EquipmentAvailability(tz=UTC),
+            1,
+            10,
+            "2025-01-06T12:00:00+00:00",
+            start_time=START,
+        )
+
+        # 下限: 設備2で 9:00-9:20、設備3が空く 10:00 から 10:50
+        assert quote["earliest_deadline"] == _at(10, 50).isoformat()
+        # 見積もり: グループ100の平均作業量60分 → 10:00-10:20、10:20-11:10
+        assert quote["calculated_deadline"] == _at(11, 10).isoformat()
+        # 上限: グループ100のすべての設備が空く 11:00-11:20、11:20-13:10（昼休憩をはさむ）
+        assert quote["latest_deadline"] == _at(13, 10).isoformat()
+        assert quote["error_seconds"] == {"minus": 20 * 60, "plus": 120 * 60}
+        assert quote["is_feasible"] is True
+        assert quote["is_certain"] is False
+
+    def test_full_simulation_within_bounds(self, product_repo, schedule_repo):
+        """設備の割り当てを試算した結果は見積もりの範囲に収まる"""
+        load = LoadCache(now_fn=lambda: START).get(
+            "tenant-a", schedule_repo, EquipmentAvailability(tz=UTC)
+        )
+        availability = EquipmentAvailability(tz=UTC)
+
+        for quantity in [1, 10, 100, 500]:
+            quote = build_quick_quote(
+                load, product_repo, availability, 1, quantity, start_time=START
+            )
+            simulated = schedule_order(
+                order_id=None,
+                product_id=1,
+                quantity=quantity,
+                product_repo=product_repo,
+                schedule_repo=schedule_repo,
+                tenant_id="tenant-a",
+                start_time=START,
+                dry_run=True,
+            )[-1]["end_datetime"]
+            assert quote["earliest_deadline"] <= simulated <= quote["latest_deadline"]
+
+    def test_unknown_product(self, product_repo, schedule_repo):
+        """工程のない製品はエラー"""
+        product_repo.get_routings_by_product.return_value = []
+        load = LoadCache(now_fn=lambda: START).get(
+            "tenant-a", schedule_repo, EquipmentAvailability(tz=UTC)
+        )
+        with pytest.raises(ValueError, match="工程が見つかりません"):
+            build_quick_quote(load, product_repo, EquipmentAvailability(tz=UTC), 9, 1)
+
+
+@pytest.mark.unit
+class TestLoadCache:
+    """LoadCache のテスト"""
+
+    def test_reuses_load_and_formulas(self, product_repo, schedule_repo):
+        """作業量・工程の式・グループのメンバーは1度だけ読み込む"""
+        cache = LoadCache(now_fn=lambda: START)
+        for quantity in [1, 2, 3]:
+            build_quick_quote(
+                cache.get("tenant-a", schedule_repo, EquipmentAvailability(tz=UTC)),
+                product_repo,
+                EquipmentAvailability(tz=UTC),
+                1,
+                quantity,
+                start_time=START,
+            )
+
+        # キャッシュのキーと同じテナントの予約だけを読み込む
+        schedule_repo.get_plan_from.assert_called_once_with(
+            START.isoformat(), tenant_id="tenant-a"
+        )
+        product_repo.get_routings_by_product.assert_called_once_with(1)
+        product_repo.client.table.return_value.select.return_value.in_.assert_called_once_with(
+            "equipment_group_id", [100, 200]
+        )
+
+    def test_backlog_counts_working_seconds(self, schedule_repo):
+        """予約済みの作業量は稼働時間で集計し、休憩時間を含めない"""
+        schedule_repo.get_plan_from.return_value = [
+            {
+                "equipment_id": 1,
+                "start_datetime": _at(11).isoformat(),
+                "end_datetime": _at(14).isoformat(),
+            },
+            {
+                # 基準時刻より前に始まった予約は、基準時刻以降の分だけを数える
+                "equipment_id": 2,
+                "start_datetime": _at(8).isoformat(),
+                "end_datetime": _at(10).isoformat(),
+            },
+        ]
+
+        load = LoadCache(now_fn=lambda: START).get(
+            "tenant-a", schedule_repo, EquipmentAvailability(tz=UTC)
+        )
+
+        # 11:00-14:00 は昼休憩 12:00-13:00 をはさむため2時間
+        assert load.backlog == {1: 2 * 3600, 2: 3600}
+        assert load.last_end == {
+            1: int(_at(14).timestamp()),
+            2: int(_at(10).timestamp()),
+        }
+
+    def test_expires_and_invalidates(self, schedule_repo):
+        """有効期間を過ぎた場合と invalidate の後は読み込み直す"""
+        now = [START]
+        cache = LoadCache(ttl_seconds=60, now_fn=lambda: now[0])
+
+        first = cache.get("tenant-a", schedule_repo, EquipmentAvailability(tz=UTC))
+        assert (
+            cache.get("tenant-a", schedule_repo, EquipmentAvailability(tz=UTC)) is first
+        )
+        now[0] = START + timedelta(seconds=60)
+        second = cache.get("tenant-a", schedule_repo, EquipmentAvailability(tz=UTC))
+        assert second is not first
+        cache.invalidate("tenant-a")
+        assert (
+            cache.get("tenant-a", schedule_repo, EquipmentAvailability(tz=UTC))
+            is not second
+        )
+        assert schedule_repo.get_plan_from.call_count == 3
+
+    def test_slow_load_does_not_block_other_tenants(self, schedule_repo):
+        """あるテナントの読み込み中も、他のテナントの参照は待たされない"""
+        cache = LoadCache(now_fn=lambda: START)
+        loading = threading.Event()
+        release = threading.Event()
+        slow_repo = MagicMock()
+
+        def slow_load(since, tenant_id=None):
+            loading.set()
+            release.wait(timeout=5)
+            return []
+
+        slow_repo.get_plan_from.side_effect = slow_load
+        slow = threading.Thread(
+            target=cache.get,
+            args=("tenant-a", slow_repo, EquipmentAvailability(tz=UTC)),
+        )
+        slow.start()
+        try:
+            assert loading.wait(timeout=5)
+            cache.get("tenant-b", schedule_repo, EquipmentAvailability(tz=UTC))
+            assert slow.is_alive()
+        finally:
+            release.set()
+            slow.join(timeout=5)
+
+    def test_invalidate_during_load_discards_entry(self, schedule_repo):
+        """読み込み中に invalidate された場合、読み込んだ負荷は保存しない"""
+        cache = LoadCache(now_fn=lambda: START)
+
+        def invalidating_load(since, tenant_id=None):
+            cache.invalidate("tenant-a")
+            return []
+
+        schedule_repo.get_plan_from.side_effect = invalidating_load
+        cache.get("tenant-a", schedule_repo, EquipmentAvailability(tz=UTC))
+        cache.get("tenant-a", schedule_repo, EquipmentAvailability(tz=UTC))
+
+        assert schedule_repo.get_plan_from.call_count == 2
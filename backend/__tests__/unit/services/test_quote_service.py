@@ -0,0 +1,259 @@
+"""
+quote_service（PlanningSnapshot）の単体テスト
+"""
+
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.scheduler_logic import schedule_order
+from app.services.quote_service import (
+    PlanningSnapshot,
+    build_max_quantity_response,
+    build_multi_response,
+    build_sweep_response,
+)
+from app.utils.calendar import to_epoch_seconds
+from app.utils.equipment_calendar import EquipmentCalendars
+
+START = datetime(2025, 1, 6, 9, 0, tzinfo=UTC)  # 月曜日
+
+
+@pytest.fixture
+def product_repo():
+    """2工程（段取り10分 + 1分/個、5分/個）・各1設備の製品"""
+    repo = MagicMock()
+    repo.get_routings_by_product.return_value = [
+        {
+            "id": 1,
+            "equipment_group_id": 100,
+            "setup_time_seconds": 600,
+            "unit_time_seconds": 60,
+            "sequence_order": 1,
+        },
+        {
+            "id": 2,
+            "equipment_group_id": 200,
+            "setup_time_seconds": 0,
+            "unit_time_seconds": 300,
+            "sequence_order": 2,
+        },
+    ]
+    members = {100: [{"equipment_id": 1}], 200: [{"equipment_id": 2}]}
+    repo.client.table.return_value.select.return_value.eq.side_effect = (
+        lambda _column, group_id: MagicMock(
+            **{"execute.return_value.data": members[group_id]}
+        )
+    )
+    return repo
+
+
+@pytest.fixture
+def schedule_repo():
+    repo = MagicMock()
+    repo.get_last_end_time.return_value = None
+    return repo
+
+
+def _snapshot(product_repo, schedule_repo) -> PlanningSnapshot:
+    return PlanningSnapshot(
+        product_repo, schedule_repo, EquipmentCalendars(), start_time=START
+    )
+
+
+@pytest.mark.unit
+class TestPlanningSnapshot:
+    """PlanningSnapshot のテスト"""
+
+    def test_duration_matrix(self, product_repo, schedule_repo):
+        """工程ごと・数量ごとの所要時間をまとめて求める"""
+        matrix = _snapshot(product_repo, schedule_repo).duration_matrix(1, [1, 10])
+        assert matrix.tolist() == [[660, 1200], [300, 3000]]
+
+    def test_plan_matches_schedule_order(self, product_repo, schedule_repo):
+        """試算結果は schedule_order の結果と一致する"""
+        snapshot = _snapshot(product_repo, schedule_repo)
+        durations = snapshot.duration_matrix(1, [50])[:, 0].tolist()
+
+        planned = snapshot.to_schedules(snapshot.plan(1, durations), "tenant-a")
+
+        assert planned == schedule_order(
+            order_id=None,
+            product_id=1,
+            quantity=50,
+            product_repo=product_repo,
+            schedule_repo=schedule_repo,
+            tenant_id="tenant-a",
+            start_time=START,
+            dry_run=True,
+        )
+
+    def test_sweep_loads_data_once(self, product_repo, schedule_repo):
+        """すべての数量を1回の読み込み結果に対して試算する"""
+        snapshot = _snapshot(product_repo, schedule_repo)
+
+        response = build_sweep_response(
+            snapshot, 1, [10, 100, 10], "2025-01-06T17:00:00+00:00"
+        )
+
+        points = response["points"]
+        assert [point["quantity"] for point in points] == [10, 100, 10]
+        # 数量10: 9:00-9:20（段取り10分 + 10分）、9:20-10:10（50分）
+        assert points[0]["calculated_deadline"] == "2025-01-06T10:10:00+00:00"
+        assert points[0]["lead_time_seconds"] == 70 * 60
+        assert points[0]["is_feasible"] is True
+        assert points[2] == points[0]
+        # 数量100は当日中に終わらない
+        assert points[1]["is_feasible"] is False
+        assert points[1]["lead_time_seconds"] > points[0]["lead_time_seconds"]
+
+        product_repo.get_routings_by_product.assert_called_once_with(1)
+        assert schedule_repo.get_last_end_time.call_count == 2
+        assert (
+            product_repo.client.table.return_value.select.return_value.eq.call_count
+            == 2
+        )
+
+    def test_plan_does_not_modify_snapshot(self, product_repo, schedule_repo):
+        """試算はスナップショットの設備の空き時刻を変更しない"""
+        snapshot = _snapshot(product_repo, schedule_repo)
+        first = snapshot.completion_times(1, [10])
+        second = snapshot.completion_times(1, [10])
+        assert first == second
+
+    def test_unknown_product(self, product_repo, schedule_repo):
+        """工程のない製品はエラー"""
+        product_repo.get_routings_by_product.return_value = []
+        with pytest.raises(ValueError, match="工程が見つかりません"):
+            _snapshot(product_repo, schedule_repo).completion_times(9, [1])
+
+
+@pytest.mark.unit
+class TestMaxQuantity:
+    """納期までに対応可能な最大数量の探索のテスト"""
+
+    def test_matches_linear_search(self, product_repo, schedule_repo):
+        """二分探索の結果は、数量を1つずつ試算した結果と一致する"""
+        snapshot = _snapshot(product_repo, schedule_repo)
+        deadline = to_epoch_seconds(datetime(2025, 1, 8, 12, 0, tzinfo=UTC))
+        completions = snapshot.completion_times(1, list(range(1, 301)))
+        expected = max(
+            quantity
+            for quantity, completion in zip(range(1, 301), completions, strict=True)
+            if completion <= deadline
+        )
+
+        quantity, planned, evaluations = snapshot.max_quantity_by(1, deadline, 1000)
+
+        assert quantity == expected
+        assert planned is not None
+        assert planned[-1][2][-1][1] <= deadline
+        # 試算回数は数量の対数程度
+        assert evaluations <= 2 * 10 + 2
+
+    def test_respects_upper_bound(self, product_repo, schedule_repo):
+        """上限の数量まで間に合う場合は上限を返す"""
+        snapshot = _snapshot(product_repo, schedule_repo)
+        deadline = to_epoch_seconds(datetime(2025, 3, 1, tzinfo=UTC))
+        quantity, _, _ = snapshot.max_quantity_by(1, deadline, 37)
+        assert quantity == 37
+
+    def test_response_loads_data_once(self, product_repo, schedule_repo):
+        """タイムゾーンなしの納期はテナントのタイムゾーンで解釈し、データは1度だけ読み込む"""
+        product_repo.get_process_name.return_value = "工程"
+        equipment_repo = MagicMock()
+        equipment_repo.get_equipment_name.return_value = "設備"
+        snapshot = _snapshot(product_repo, schedule_repo)
+
+        response = build_max_quantity_response(
+            snapshot, 1, "2025-01-06T17:00:00", 1000, product_repo, equipment_repo
+        )
+
+        # 数量n: 段取り10分 + 6n分の作業と昼休憩60分が 9:00-17:00 に収まる最大のn
+        assert response["max_quantity"] == 68
+        assert response["calculated_deadline"] == "2025-01-06T16:58:00+00:00"
+        assert response["process_schedules"][-1]["end_time"] == (
+            "2025-01-06T16:58:00+00:00"
+        )
+        product_repo.get_routings_by_product.assert_called_once_with(1)
+        assert schedule_repo.get_last_end_time.call_count == 2
+
+    def test_infeasible(self, product_repo, schedule_repo):
+        """1個も間に合わない場合は0"""
+        response = build_max_quantity_response(
+            _snapshot(product_repo, schedule_repo),
+            1,
+            "2025-01-06T09:05:00+00:00",
+            1000,
+            product_repo,
+            MagicMock(),
+        )
+
+        assert response["max_quantity"] == 0
+        assert response["calculated_deadline"] is None
+        assert response["process_schedules"] is None
+
+
+@pytest.mark.unit
+class TestMultiLine:
+    """複数明細の見積もりのテスト"""
+
+    def _setup_bulk(self, product_repo):
+        routings = product_repo.get_routings_by_product.return_value
+        product_repo.get_routings_by_products.return_value = {1: routings}
+        product_repo.client.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {"equipment_group_id": 100, "equipment_id": 1},
+            {"equipment_group_id": 200, "equipment_id": 2},
+        ]
+        product_repo.get_process_name.return_value = "工程"
+
+    def test_lines_share_capacity(self, product_repo, schedule_repo):
+        """後の明細は先の明細が使用する設備の後ろに割り当てられる"""
+        self._setup_bulk(product_repo)
+        snapshot = _snapshot(product_repo, schedule_repo)
+
+        response = build_multi_response(
+            snapshot,
+            [
+                {"product_id": 1, "quantity": 10, "deadline_date": None},
+                {
+                    "product_id": 1,
+                    "quantity": 10,
+                    "deadline_date": "2025-01-06T10:30:00+00:00",
+                },
+            ],
+            product_repo,
+            MagicMock(),
+        )
+
+        first, second = response["lines"]
+        # 1件目: 9:00-9:20、9:20-10:10
+        assert first["calculated_deadline"] == "2025-01-06T10:10:00+00:00"
+        # 2件目: 工程1 9:20-9:40、工程2 は1件目の後ろ 10:10-11:00
+        assert second["process_schedules"][0]["start_time"] == (
+            "2025-01-06T09:20:00+00:00"
+        )
+        assert second["calculated_deadline"] == "2025-01-06T11:00:00+00:00"
+        assert second["is_feasible"] is False
+        assert response["calculated_deadline"] == "2025-01-06T11:00:00+00:00"
+        assert response["is_feasible"] is False
+
+    def test_bulk_load(self, product_repo, schedule_repo):
+        """工程・設備グループはまとめて1回ずつ読み込み、スナップショットは変更しない"""
+        self._setup_bulk(product_repo)
+        snapshot = _snapshot(product_repo, schedule_repo)
+        equipment_repo = MagicMock()
+        equipment_repo.get_equipment_name.return_value = "設備"
+        lines = [{"product_id": 1, "quantity": 10, "deadline_date": None}] * 3
+
+        first = build_multi_response(snapshot, lines, product_repo, equipment_repo)
+        second = build_multi_response(snapshot, lines, product_repo, equipment_repo)
+
+        assert first == second
+        product_repo.get_routings_by_products.assert_called_once_with([1])
+        product_repo.get_routings_by_product.assert_not_called()
+        product_repo.client.table.return_value.select.return_value.in_.assert_called_once_with(
+            "equipment_group_id", [100, 200]
+        )
+        assert schedule_repo.get_last_end_time.call_count == 2
@@ -0,0 +1,290 @@
+"""
+reschedule_service（期間内の確定済み注文の再スケジュール）の単体テスト
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_at, plan_row
+from app.services.reschedule_service import (
+    DISPATCH_CR,
+    DISPATCH_EDD,
+    DISPATCH_SPT,
+    build_replacement,
+    build_reschedule_plan,
+    deadline_epoch,
+    dispatch,
+    summarize_jobs,
+)
+from app.utils.calendar import to_epoch_seconds
+from app.utils.equipment_calendar import EquipmentCalendars
+
+WINDOW_START = datetime(2025, 1, 6, 9, 0, tzinfo=UTC)  # 月曜日
+WINDOW_END = datetime(2025, 1, 10, 17, 0, tzinfo=UTC)
+
+
+def _order(order_id: int, deadline: str | None, status: str = "confirmed") -> dict:
+    return {"id": order_id, "status": status, "deadline_date": deadline}
+
+
+def _reschedule(rows, orders, rule=DISPATCH_EDD, members=None, start=WINDOW_START):
+    plan = build_reschedule_plan(
+        rows,
+        {order["id"]: order for order in orders},
+        to_epoch_seconds(start),
+        to_epoch_seconds(WINDOW_END),
+        UTC,
+        EquipmentCalendars(tz=UTC),
+    )
+    members = members or {100: [1]}
+    dispatch(
+        plan,
+        lambda group_id: members.get(group_id, []),
+        EquipmentCalendars(overlays=plan.blocks, tz=UTC),
+        rule,
+    )
+    return plan
+
+
+def _placements(plan) -> dict[int, list[tuple[str, str]]]:
+    updates, inserts, _ = build_replacement(plan, "tenant-a", UTC)
+    placements: dict[int, list[tuple[str, str]]] = {}
+    for row in sorted(
+        [
+            *(
+                {**u, "order_id": op.order_id}
+                for job in plan.jobs
+                for op in job.operations
+                for u in updates
+                if u["id"] in op.segment_ids
+            ),
+            *inserts,
+        ],
+        key=lambda row: row["start_datetime"],
+    ):
+        placements.setdefault(row["order_id"], []).append(
+            (row["start_datetime"], row["end_datetime"])
+        )
+    return placements
+
+
+@pytest.mark.unit
+class TestDispatchRules:
+    """ディスパッチルールのテスト"""
+
+    @pytest.fixture
+    def rows(self):
+        # 注文1（2時間・納期1/7）、注文2（1時間・納期1/10）。現在は注文2が先
+        return [
+            plan_row(1, 2, 1, 1, "09:00", "10:00", group_id=100),
+            plan_row(2, 1, 1, 1, "10:00", "12:00", group_id=100),
+        ]
+
+    @pytest.fixture
+    def orders(self):
+        return [_order(1, "2025-01-07"), _order(2, "2025-01-10")]
+
+    def test_edd(self, rows, orders):
+        """EDD: 納期の早い注文から割り当てる"""
+        placements = _placements(_reschedule(rows, orders, DISPATCH_EDD))
+        assert placements[1] == [(plan_at(9), plan_at(11))]
+        assert placements[2] == [(plan_at(11), plan_at(12))]
+
+    def test_spt(self, rows, orders):
+        """SPT: 所要時間の短い工程から割り当てる"""
+        placements = _placements(_reschedule(rows, orders, DISPATCH_SPT))
+        assert placements[2] == [(plan_at(9), plan_at(10))]
+        assert placements[1] == [(plan_at(10), plan_at(12))]
+
+    def test_critical_ratio(self, orders):
+        """CR: 納期までの残り時間 / 残作業時間 の小さい注文から割り当てる"""
+        rows = [
+            # 注文1: 納期は早いが残作業が短い、注文2: 納期は遅いが残作業が長い
+            plan_row(1, 1, 1, 1, "09:00", "10:00", group_id=100),
+            plan_row(2, 2, 1, 1, "10:00", "12:00", group_id=100),
+            plan_row(3, 2, 2, 2, "13:00", "17:00", group_id=200),
+        ]
+        orders = [_order(1, "2025-01-08"), _order(2, "2025-01-09")]
+        members = {100: [1], 200: [2]}
+
+        edd = _placements(_reschedule(rows, orders, DISPATCH_EDD, members))
+        cr = _placements(_reschedule(rows, orders, DISPATCH_CR, members))
+
+        assert edd[1] == [(plan_at(9), plan_at(10))]
+        assert cr[2][0] == (plan_at(9), plan_at(11))
+        assert cr[1] == [(plan_at(11), plan_at(12))]
+
+    def test_invalid_rule(self, rows, orders):
+        """不正なディスパッチルールはエラー"""
+        with pytest.raises(ValueError, match="ディスパッチルール"):
+            _reschedule(rows, orders, "fifo")
+
+
+@pytest.mark.unit
+class TestReschedule:
+    """再計画の対象の抽出と割り当てのテスト"""
+
+    def test_keeps_started_operations_and_blocks(self):
+        """着手済みの工程と対象外の予約は動かさず、その区間を避けて割り当てる"""
+        start = datetime(2025, 1, 6, 10, 0, tzinfo=UTC)
+        rows = [
+            # 注文1: 工程1は期間の開始前に着手済み、工程2は再計画
+            plan_row(1, 1, 1, 2, "09:00", "10:30", group_id=200),
+            plan_row(2, 1, 2, 1, "14:00", "15:00", group_id=100),
+            # 完了済みの注文の予約は動かさない
+            plan_row(3, 9, 1, 1, "11:00", "11:30", group_id=100),
+        ]
+        orders = [_order(1, None), _order(9, None, status="completed")]
+
+        plan = _reschedule(rows, orders, start=start)
+
+        assert plan.operation_count == 1
+        # 工程2は工程1の終了（10:30）以降、予約（11:00-11:30）を避けて分割される
+        assert _placements(plan)[1] == [
+            (plan_at(10, 30), plan_at(11)),
+            (plan_at(11, 30), plan_at(12)),
+        ]
+
+    def test_drops_canceled_orders(self):
+        """キャンセルされた注文の予約は削除し、空いた時間に詰める"""
+        rows = [
+            plan_row(1, 1, 1, 1, "09:00", "11:00", group_id=100),
+            plan_row(2, 2, 1, 1, "11:00", "12:00", group_id=100),
+        ]
+        orders = [_order(1, None, status="canceled"), _order(2, None)]
+
+        plan = _reschedule(rows, orders)
+        updates, inserts, deletes = build_replacement(plan, "tenant-a", UTC)
+
+        assert deletes == [1]
+        assert inserts == []
+        assert updates == [
+            {
+                "id": 2,
+                "equipment_id": 1,
+                "start_datetime": plan_at(9),
+                "end_datetime": plan_at(10),
+            }
+        ]
+
+    def test_replacement_reuses_ids(self):
+        """既存のスケジュールIDを再利用し、区間の増減は追加・削除で表す"""
+        rows = [
+            # 注文1: 2日に分割された工程（合計4時間）
+            plan_row(1, 1, 1, 1, "15:00", "17:00", group_id=100),
+            plan_row(2, 1, 1, 1, "09:00", "11:00", group_id=100, day=7),
+            # 注文2: 1工程（5時間）
+            plan_row(3, 2, 1, 1, "09:00", "12:00", group_id=100),
+            plan_row(4, 2, 1, 1, "13:00", "15:00", group_id=100),
+        ]
+        orders = [_order(1, "2025-01-06"), _order(2, "2025-01-10")]
+
+        plan = _reschedule(rows, orders)
+        updates, inserts, deletes = build_replacement(plan, "tenant-a", UTC)
+
+        # 注文1は 9:00-12:00, 13:00-14:00 の1シフト帯（1セグメント）、注文2は2日に分割
+        assert [u["id"] for u in updates] == [1, 3, 4]
+        assert deletes == [2]
+        assert inserts == []
+        summary = {job["order_id"]: job for job in summarize_jobs(plan, UTC)}
+        assert summary[1]["completion"] == plan_at(14)
+        assert summary[1]["tardiness_seconds"] == 14 * 3600
+
+    def test_work_excludes_breaks(self):
+        """休憩をはさむ予約の作業時間は稼働時間で数え、再計画で延びない"""
+        # 9:00-17:00 の1シフト帯（昼休憩 12:00-13:00 を除く7時間）
+        rows = [plan_row(1, 1, 1, 1, "09:00", "17:00", group_id=100)]
+
+        plan = _reschedule(rows, [_order(1, None)])
+        updates, inserts, deletes = build_replacement(plan, "tenant-a", UTC)
+
+        assert plan.jobs[0].operations[0].work_seconds == 7 * 3600
+        assert updates == [
+            {
+                "id": 1,
+                "equipment_id": 1,
+                "start_datetime": plan_at(9),
+                "end_datetime": plan_at(17),
+            }
+        ]
+        assert inserts == []
+        assert deletes == []
+
+    def test_picks_earliest_machine(self):
+        """設備グループ内で最も早く開始できる設備に割り当てる"""
+        rows = [
+            plan_row(1, 1, 1, 1, "09:00", "10:00", group_id=100),
+            plan_row(2, 2, 1, 1, "10:00", "11:00", group_id=100),
+            # 設備2は 9:00-10:00 が予約済み
+            plan_row(3, 9, 1, 2, "09:00", "10:00", group_id=100),
+        ]
+        orders = [_order(1, None), _order(2, None), _order(9, None, "completed")]
+
+        plan = _reschedule(rows, orders, members={100: [1, 2]})
+
+        ops = {job.order_id: job.operations[0] for job in plan.jobs}
+        assert ops[1].machine_id == 1
+        assert ops[2].machine_id == 2
+        assert _placements(plan)[2] == [(plan_at(10), plan_at(11))]
+
+    def test_large_plan_is_consistent(self):
+        """数千工程の計画でも、設備の重なり・工程順序の違反なく割り当てる"""
+        rows = []
+        schedule_id = 0
+        base = WINDOW_START
+        for order_id in range(1, 401):
+            for sequence_order, group_id in enumerate([100, 200, 300], start=1):
+                schedule_id += 1
+                start = base + timedelta(minutes=schedule_id)
+                rows.append(
+                    plan_row(
+                        schedule_id,
+                        order_id,
+                        sequence_order,
+                        group_id,
+                        start.isoformat(),
+                        (start + timedelta(minutes=20 + order_id % 7)).isoformat(),
+                        group_id=group_id,
+                    )
+                )
+        orders = [
+            _order(order_id, f"2025-01-{7 + order_id % 20:02d}")
+            for order_id in range(1, 401)
+        ]
+        members = {
+            group_id: [group_id + index for index in range(4)]
+            for group_id in [100, 200, 300]
+        }
+
+        plan = _reschedule(rows, orders, DISPATCH_CR, members)
+
+        assert plan.operation_count == 1200
+        by_machine: dict[int, list[tuple[int, int]]] = {}
+        for job in plan.jobs:
+            for prev, op in zip(job.operations, job.operations[1:], strict=False):
+                assert op.start >= prev.end
+            for op in job.operations:
+                # 区間はシフト帯単位のため、休憩を挟む場合は稼働時間より長くなる
+                assert sum(end - start for start, end in op.segments) >= (
+                    op.work_seconds
+                )
+                by_machine.setdefault(op.machine_id, []).extend(op.segments)
+        for segments in by_machine.values():
+            segments.sort()
+            for (_, prev_end), (start, _) in zip(segments, segments[1:], strict=False):
+                assert start >= prev_end
+
+
+@pytest.mark.unit
+class TestDeadlineEpoch:
+    """deadline_epoch のテスト"""
+
+    def test_date_only_is_start_of_day(self):
+        """日付のみの納期はその日の 0:00（テナントのタイムゾーン）"""
+        assert deadline_epoch("2025-01-07", UTC) == to_epoch_seconds(
+            datetime(2025, 1, 7, tzinfo=UTC)
+        )
+
+    def test_none(self):
+        assert deadline_epoch(None, UTC) is None
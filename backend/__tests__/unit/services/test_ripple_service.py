@@ -0,0 +1,278 @@
+"""
+ripple_service の単体テスト
+"""
+
+from datetime import date
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_dt, plan_row
+from app.services.ripple_service import (
+    build_change_set,
+    build_segments,
+    compact_machines,
+    ripple_closure,
+    ripple_insert,
+    ripple_move,
+    ripple_reflow,
+)
+from app.utils.calendar import CalendarConfig
+from app.utils.equipment_calendar import EquipmentCalendars
+
+
+@pytest.mark.unit
+class TestRippleMove:
+    """ripple_move 関数のテスト"""
+
+    def test_moves_order_successors(self):
+        """後続工程は移動したセグメントの終了後に再配置される"""
+        segments = build_segments(
+            [
+                plan_row(1, 100, 1, 1, "09:00", "10:00"),
+                plan_row(2, 100, 2, 2, "10:00", "11:00"),
+                plan_row(3, 100, 3, 3, "11:00", "11:30"),
+            ]
+        )
+
+        changed = ripple_move(segments, 1, plan_dt(13), plan_dt(14), 1)
+
+        assert [s.id for s in changed] == [1, 2, 3]
+        assert (segments[2].start, segments[2].end) == (plan_dt(14), plan_dt(15))
+        assert (segments[3].start, segments[3].end) == (plan_dt(15), plan_dt(15, 30))
+
+    def test_pushes_colliding_bookings_on_same_machine(self):
+        """移動先で重なる同一設備の予約は後ろへずれる"""
+        segments = build_segments(
+            [
+                plan_row(1, 100, 1, 1, "09:00", "10:00"),
+                plan_row(2, 200, 1, 2, "09:00", "11:00"),
+                plan_row(3, 300, 1, 2, "11:00", "12:00"),
+            ]
+        )
+
+        changed = ripple_move(segments, 1, plan_dt(10), plan_dt(11), 2)
+
+        assert {s.id for s in changed} == {1, 2, 3}
+        # 休憩(12:00-13:00)を挟んで作業量(2時間)が保たれる
+        assert (segments[2].start, segments[2].end) == (plan_dt(11), plan_dt(14))
+        assert (segments[3].start, segments[3].end) == (plan_dt(14), plan_dt(15))
+
+    def test_untouched_segments_stop_propagation(self):
+        """影響を受けないセグメントから先へは伝播しない"""
+        segments = build_segments(
+            [
+                plan_row(1, 100, 1, 1, "09:00", "10:00"),
+                plan_row(2, 100, 2, 2, "15:00", "16:00"),
+                plan_row(3, 200, 1, 2, "16:00", "17:00"),
+            ]
+        )
+
+        changed = ripple_move(segments, 1, plan_dt(10), plan_dt(11), 1)
+
+        assert [s.id for s in changed] == [1]
+
+    def test_split_across_days_produces_inserts(self):
+        """日をまたいで分割された後続工程は追加行として返される"""
+        segments = build_segments(
+            [
+                plan_row(1, 100, 1, 1, "09:00", "10:00"),
+                plan_row(2, 100, 2, 2, "10:00", "12:00"),
+            ]
+        )
+
+        changed = ripple_move(segments, 1, plan_dt(15), plan_dt(16), 1)
+        updates, inserts = build_change_set(changed)
+
+        assert segments[2].pieces == [
+            (plan_dt(16), plan_dt(17)),
+            (plan_dt(9, day=7), plan_dt(10, day=7)),
+        ]
+        assert [u["id"] for u in updates] == [1, 2]
+        assert len(inserts) == 1
+        assert inserts[0]["order_id"] == 100
+        assert inserts[0]["tenant_id"] == "tenant-a"
+
+
+@pytest.mark.unit
+class TestRippleClosure:
+    """ripple_closure 関数のテスト"""
+
+    ROWS = [
+        plan_row(1, 100, 1, 1, "09:00", "10:00"),
+        plan_row(2, 100, 2, 2, "10:00", "11:00"),
+        plan_row(3, 300, 1, 2, "11:00", "12:00"),
+        plan_row(4, 300, 2, 3, "13:00", "14:00"),
+        plan_row(5, 400, 1, 4, "09:00", "10:00"),
+    ]
+
+    def _load(self, loads: list):
+        def load_rows(equipment_ids, order_ids):
+            loads.append((equipment_ids, order_ids))
+            return [
+                row
+                for row in self.ROWS
+                if row["equipment_id"] in equipment_ids or row["order_id"] in order_ids
+            ]
+
+        return load_rows
+
+    def test_loads_only_machines_and_orders_reached_by_ripple(self):
+        """連鎖が及んだ設備・注文だけを読み足し、計画全体と同じ結果になる"""
+        loads: list = []
+
+        segments, changed = ripple_closure(
+            self._load(loads),
+            lambda segments: ripple_move(segments, 1, plan_dt(10), plan_dt(11), 1),
+            [1],
+            [100],
+        )
+
+        expected = build_segments(self.ROWS)
+        ripple_move(expected, 1, plan_dt(10), plan_dt(11), 1)
+        assert [s.id for s in changed] == [1, 2, 3, 4]
+        for segment in changed:
+            assert segment.pieces == expected[segment.id].pieces
+        # 連鎖の及ばない設備4は読み込まない
+        assert loads[-1] == ([1, 2, 3], [100, 300])
+        assert 5 not in segments
+
+    def test_single_load_when_ripple_stays_inside(self):
+        """連鎖が読み込んだ範囲で閉じていれば読み込みは1回"""
+        loads: list = []
+
+        _, changed = ripple_closure(
+            self._load(loads),
+            lambda segments: ripple_move(segments, 5, plan_dt(10), plan_dt(11), 4),
+            [4],
+            [400],
+        )
+
+        assert [s.id for s in changed] == [5]
+        assert loads == [([4], [400])]
+
+
+@pytest.mark.unit
+class TestRippleInsert:
+    """ripple_insert 関数のテスト"""
+
+    def test_pushes_bookings_behind_inserted_segment(self):
+        """割り込ませたセグメントと重なる予約と、その後続工程だけが後ろへずれる"""
+        segments = build_segments(
+            [
+                plan_row(1, 100, 1, 1, "09:00", "10:00"),
+                plan_row(2, 100, 2, 2, "10:00", "11:00"),
+                plan_row(3, 200, 1, 3, "09:00", "10:00"),
+            ]
+        )
+        inserted = build_segments([plan_row(-1, 900, 1, 1, "09:00", "10:00")])[-1]
+
+        changed = ripple_insert(segments, [inserted])
+
+        assert [s.id for s in changed] == [-1, 1, 2]
+        assert segments[-1] is inserted
+        assert (segments[1].start, segments[1].end) == (plan_dt(10), plan_dt(11))
+        assert (segments[2].start, segments[2].end) == (plan_dt(11), plan_dt(12))
+        assert (segments[3].start, segments[3].end) == (plan_dt(9), plan_dt(10))
+
+
+@pytest.mark.unit
+class TestRippleReflow:
+    """ripple_reflow 関数のテスト"""
+
+    def test_reflows_into_new_calendar(self):
+        """休日になった日の予約を次の稼働日へ置き直し、押し出された予約だけをずらす"""
+        segments = build_segments(
+            [
+                plan_row(1, 100, 1, 1, "15:00", "16:00"),
+                plan_row(2, 100, 2, 2, "16:00", "17:00"),
+                # 翌日の同じ設備の予約
+                {
+                    **plan_row(3, 300, 1, 1, "09:00", "10:00"),
+                    "start_datetime": "2025-01-07T09:00:00+00:00",
+                    "end_datetime": "2025-01-07T10:00:00+00:00",
+                },
+                # 置き直した予約と重ならない予約
+                {
+                    **plan_row(4, 400, 1, 2, "13:00", "14:00"),
+                    "start_datetime": "2025-01-07T13:00:00+00:00",
+                    "end_datetime": "2025-01-07T14:00:00+00:00",
+                },
+            ]
+        )
+
+        changed = ripple_reflow(
+            segments, [1], CalendarConfig(holidays={date(2025, 1, 6)})
+        )
+
+        assert [s.id for s in changed] == [1, 2, 3]
+        assert (segments[1].start, segments[1].end) == (
+            plan_dt(9, day=7),
+            plan_dt(10, day=7),
+        )
+        assert (segments[2].start, segments[2].end) == (
+            plan_dt(10, day=7),
+            plan_dt(11, day=7),
+        )
+        assert (segments[3].start, segments[3].end) == (
+            plan_dt(10, day=7),
+            plan_dt(11, day=7),
+        )
+        assert (segments[4].start, segments[4].end) == (
+            plan_dt(13, day=7),
+            plan_dt(14, day=7),
+        )
+
+    def test_unaffected_by_unknown_ids(self):
+        """計画に含まれないIDは無視する"""
+        segments = build_segments([plan_row(1, 100, 1, 1, "09:00", "10:00")])
+
+        assert ripple_reflow(segments, [99]) == []
+
+
+@pytest.mark.unit
+class TestCompactMachines:
+    """compact_machines 関数のテスト"""
+
+    def test_left_shifts_affected_machine_suffix(self):
+        """空いた設備の予約だけを、前工程の終了を守って前詰めする"""
+        segments = build_segments(
+            [
+                plan_row(2, 200, 1, 1, "10:00", "11:00"),
+                plan_row(3, 200, 2, 2, "11:00", "12:00"),
+                plan_row(4, 300, 1, 2, "09:00", "10:00"),
+                plan_row(5, 300, 2, 1, "11:00", "12:00"),
+            ]
+        )
+
+        changed = compact_machines(segments, {1: plan_dt(9)}, EquipmentCalendars())
+
+        assert [s.id for s in changed] == [2, 5]
+        assert (segments[2].start, segments[2].end) == (plan_dt(9), plan_dt(10))
+        # 前工程（設備2）の終了 10:00 より前には移動しない
+        assert (segments[5].start, segments[5].end) == (plan_dt(10), plan_dt(11))
+        # 対象外の設備の予約は動かさない
+        assert (segments[3].start, segments[3].end) == (plan_dt(11), plan_dt(12))
+
+    def test_started_segment_is_not_moved(self):
+        """空いた時刻より前に始まった予約は動かさず、その終了後に詰める"""
+        segments = build_segments(
+            [
+                plan_row(1, 100, 1, 1, "09:00", "10:00"),
+                plan_row(2, 200, 1, 1, "10:30", "11:30"),
+            ]
+        )
+
+        changed = compact_machines(segments, {1: plan_dt(9, 30)}, EquipmentCalendars())
+
+        assert [s.id for s in changed] == [2]
+        assert (segments[1].start, segments[1].end) == (plan_dt(9), plan_dt(10))
+        assert (segments[2].start, segments[2].end) == (plan_dt(10), plan_dt(11))
+
+    def test_respects_calendar(self):
+        """前詰めした予約は休憩をまたいで作業量を保つ"""
+        segments = build_segments([plan_row(2, 200, 1, 1, "14:00", "16:00")])
+
+        compact_machines(segments, {1: plan_dt(11)}, EquipmentCalendars())
+
+        # 2時間の作業は休憩(12:00-13:00)を挟んで 14:00 に終わる
+        assert (segments[2].start, segments[2].end) == (plan_dt(11), plan_dt(14))
@@ -0,0 +1,199 @@
+"""
+scenario_service（What-if シナリオの比較）の単体テスト
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, date, datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_at, plan_row
+from app.services.calendar_service import CalendarCache
+from app.services.scenario_service import (
+    VIRTUAL_EQUIPMENT_ID_BASE,
+    ScenarioSnapshot,
+    compare_scenarios,
+    run_scenario,
+)
+from app.utils.calendar import CalendarConfig, to_epoch_seconds
+
+HOUR = 3600
+WINDOW_START = datetime(2025, 1, 6, 9, 0, tzinfo=UTC)  # 月曜日
+WINDOW_END = datetime(2025, 1, 10, 17, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+def snapshot():
+    # 設備1台に3時間の注文を2件（注文1: 納期 15:00、注文2: 納期 11:00）
+    # EDDでは注文2（9:00-12:00、1時間遅れ）→ 注文1（13:00-16:00、1時間遅れ）
+    return ScenarioSnapshot(
+        rows=[
+            plan_row(1, 1, 1, 1, "09:00", "12:00", group_id=100),
+            plan_row(2, 2, 1, 1, "13:00", "16:00", group_id=100),
+        ],
+        orders={
+            1: {"id": 1, "status": "confirmed", "deadline_date": plan_at(15)},
+            2: {"id": 2, "status": "confirmed", "deadline_date": plan_at(11)},
+        },
+        members={100: [1]},
+        overlays=[],
+        calendar_config=CalendarConfig(),
+        window_start=to_epoch_seconds(WINDOW_START),
+        window_end=to_epoch_seconds(WINDOW_END),
+        tz=UTC,
+    )
+
+
+@pytest.mark.unit
+class TestScenarioSnapshot:
+    """ScenarioSnapshot のテスト"""
+
+    def test_fork_copies_on_write(self, snapshot):
+        """fork した子への変更は親・兄弟に影響しない"""
+        first = snapshot.fork()
+        second = snapshot.fork()
+
+        first.apply({"type": "add_machine", "equipment_group_id": 100, "count": 2})
+        first.apply({"type": "expedite_order", "order_id": 1, "deadline_date": None})
+        first.apply(
+            {
+                "type": "maintenance",
+                "start_datetime": plan_at(9),
+                "end_datetime": plan_at(10),
+                "equipment_ids": [1],
+            }
+        )
+
+        assert first.members[100] == [
+            1,
+            VIRTUAL_EQUIPMENT_ID_BASE,
+            VIRTUAL_EQUIPMENT_ID_BASE + 1,
+        ]
+        assert first.orders[1]["deadline_date"] == WINDOW_START.isoformat()
+        assert len(first.overlays) == 1
+        for other in (snapshot, second):
+            assert other.members[100] == [1]
+            assert other.orders[1]["deadline_date"] == plan_at(15)
+            assert other.overlays == []
+        # 読み込んだ計画は共有する
+        assert first.rows is snapshot.rows
+
+    def test_invalid_modifications(self, snapshot):
+        """対象外の注文・設備グループや不正な種別はエラー"""
+        fork = snapshot.fork()
+        with pytest.raises(ValueError, match="注文ID 99"):
+            fork.apply({"type": "expedite_order", "order_id": 99})
+        with pytest.raises(ValueError, match="設備グループID 999"):
+            fork.apply({"type": "add_machine", "equipment_group_id": 999})
+        with pytest.raises(ValueError, match="不正なシナリオの変更"):
+            fork.apply({"type": "unknown"})
+
+
+@pytest.mark.unit
+class TestRunScenario:
+    """run_scenario のテスト"""
+
+    def test_baseline(self, snapshot):
+        """変更なしの計画のKPI"""
+        kpis = run_scenario(snapshot)
+
+        assert kpis["operation_count"] == 2
+        assert kpis["makespan_seconds"] == 7 * HOUR
+        assert kpis["total_tardiness_seconds"] == 2 * HOUR
+        assert kpis["late_order_count"] == 2
+        assert kpis["machines"][0]["is_virtual"] is False
+
+    def test_extra_shift_for_all_machines(self, snapshot):
+        """設備の指定がない臨時稼働はすべての設備に適用する（昼休憩も稼働する）"""
+        fork = snapshot.fork()
+        fork.apply(
+            {
+                "type": "extra_shift",
+                "start_datetime": plan_at(12),
+                "end_datetime": plan_at(13),
+                "equipment_ids": None,
+            }
+        )
+
+        kpis = run_scenario(fork)
+
+        # 注文1は 12:00-15:00 で納期に間に合う
+        assert kpis["makespan_seconds"] == 6 * HOUR
+        assert kpis["total_tardiness_seconds"] == 1 * HOUR
+
+
+@pytest.mark.unit
+class TestCompareScenarios:
+    """compare_scenarios のテスト"""
+
+    SCENARIOS = [
+        {
+            "name": "add machine",
+            "modifications": [
+                {"type": "add_machine", "equipment_group_id": 100, "count": 1}
+            ],
+        },
+        {
+            "name": "maintenance",
+            "modifications": [
+                {
+                    "type": "maintenance",
+                    "start_datetime": plan_at(9),
+                    "end_datetime": plan_at(10),
+                    "equipment_ids": [1],
+                }
+            ],
+        },
+    ]
+
+    def test_side_by_side(self, snapshot):
+        """baseline と各シナリオのKPI・差分を返す"""
+        result = compare_scenarios(snapshot, self.SCENARIOS, workers=1)
+
+        assert result["baseline"]["makespan_seconds"] == 7 * HOUR
+        added, maintenance = result["scenarios"]
+        # 設備を追加すると2件を並行して加工できる（9:00-12:00）
+        assert added["name"] == "add machine"
+        assert added["delta"]["makespan_seconds"] == -4 * HOUR
+        assert added["delta"]["total_tardiness_seconds"] == -1 * HOUR
+        assert added["delta"]["late_order_count"] == -1
+        assert [m["is_virtual"] for m in added["kpis"]["machines"]] == [False, True]
+        # 保全で着手が1時間遅れ、注文2は昼休憩をまたいで 14:00 に終わる
+        assert maintenance["delta"]["makespan_seconds"] == 1 * HOUR
+        assert maintenance["delta"]["total_tardiness_seconds"] == 3 * HOUR
+        assert maintenance["delta"]["late_order_count"] == 0
+        # スナップショットは変更されない
+        assert snapshot.members == {100: [1]}
+
+    def test_runs_on_process_pool(self, snapshot):
+        """プロセスプールで計算しても同じ結果になる"""
+        expected = compare_scenarios(snapshot, self.SCENARIOS, workers=1)
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            result = compare_scenarios(
+                snapshot, self.SCENARIOS, workers=2, executor=executor
+            )
+
+        assert result == expected
+
+    def test_cached_calendar_on_process_pool(self, snapshot):
+        """キャッシュのカレンダー設定（ロック・リポジトリを参照）でもプロセスプールで計算できる"""
+        calendar_repo = MagicMock()
+        calendar_repo.get_holidays_in_range.return_value = [
+            {"date": "2025-01-07", "is_holiday": True}
+        ]
+        snapshot.calendar_config = CalendarCache().get_config(
+            "tenant-a", calendar_repo, WINDOW_START.date(), WINDOW_END.date()
+        )
+        expected = compare_scenarios(snapshot, self.SCENARIOS, workers=1)
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            result = compare_scenarios(
+                snapshot, self.SCENARIOS, workers=2, executor=executor
+            )
+
+        assert result == expected
+        detached = snapshot.detached()
+        assert type(detached.calendar_config) is CalendarConfig
+        assert date(2025, 1, 7) in detached.calendar_config.holidays
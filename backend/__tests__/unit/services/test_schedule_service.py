@@ -0,0 +1,117 @@
+"""
+schedule_service（生産スケジュールの編集・再計画）の単体テスト
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_at, plan_row
+from app.models.transaction.schedule import ScheduleBatchUpdate, ScheduleUpdate
+from app.services.calendar_service import CalendarCache
+from app.services.schedule_service import (
+    InvalidScheduleRequestError,
+    OrderNotFoundError,
+    ScheduleConflictError,
+    ScheduleNotFoundError,
+    ScheduleService,
+)
+
+
+@pytest.fixture
+def repo():
+    mock = MagicMock()
+    mock.get_plan_rows.return_value = []
+    # 休日・シフトパターンは未登録（平日 9:00-17:00）
+    mock.client.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+    return mock
+
+
+@pytest.fixture
+def load_cache():
+    return MagicMock()
+
+
+@pytest.fixture
+def order_repo():
+    return MagicMock()
+
+
+@pytest.fixture
+def service(repo, order_repo, load_cache):
+    return ScheduleService(
+        repo,
+        order_repo,
+        MagicMock(),
+        MagicMock(),
+        CalendarCache(),
+        load_cache,
+        "tenant-a",
+    )
+
+
+class TestBatchUpdate:
+    def test_missing_schedule(self, service, repo):
+        repo.get_plan_rows.return_value = [plan_row(1, None, 1, 101, "09:00", "10:00")]
+        batch = ScheduleBatchUpdate.model_validate(
+            {"updates": [{"id": 1, "equipment_id": 102}, {"id": 2}]}
+        )
+
+        with pytest.raises(ScheduleNotFoundError, match=r"\[2\]"):
+            service.batch_update(batch, snap=True)
+        repo.apply_changes.assert_not_called()
+
+    def test_conflict_is_not_saved(self, service, repo, load_cache):
+        moved = plan_row(1, None, 1, 101, "09:00", "10:00")
+        other = plan_row(2, None, 1, 102, "09:00", "10:00")
+        repo.get_plan_rows.side_effect = [[moved], [other]]
+        batch = ScheduleBatchUpdate.model_validate(
+            {"updates": [{"id": 1, "equipment_id": 102}]}
+        )
+
+        with pytest.raises(ScheduleConflictError) as excinfo:
+            service.batch_update(batch, snap=True)
+        assert [c["type"] for c in excinfo.value.conflicts] == ["overlap"]
+        repo.apply_changes.assert_not_called()
+        load_cache.invalidate.assert_not_called()
+
+
+class TestUpdate:
+    def test_rejects_inverted_period(self, service, repo):
+        repo.get_by_id.return_value = plan_row(1, None, 1, 101, "09:00", "10:00")
+        # 終了日時のみの指定で、現在の開始日時より前になる
+        data = ScheduleUpdate(end_datetime=plan_at(8))
+
+        with pytest.raises(InvalidScheduleRequestError):
+            service.update(1, data, cascade=False, snap=True)
+        repo.apply_changes.assert_not_called()
+
+    def test_raw_update_invalidates_load_cache(self, service, repo, load_cache):
+        repo.update.return_value = plan_row(1, None, 1, 102, "09:00", "10:00")
+
+        result = service.update(
+            1, ScheduleUpdate(equipment_id=102), cascade=False, snap=False
+        )
+
+        assert result["conflicts"] == []
+        repo.update.assert_called_once_with(1, {"equipment_id": 102})
+        load_cache.invalidate.assert_called_once_with("tenant-a")
+
+
+class TestReleaseOrder:
+    def test_missing_order(self, service, repo, order_repo, load_cache):
+        order_repo.get_by_id.return_value = None
+
+        with pytest.raises(OrderNotFoundError):
+            service.release_order(1)
+        repo.apply_changes.assert_not_called()
+        load_cache.invalidate.assert_not_called()
+
+    def test_without_future_bookings(self, service, repo, order_repo, load_cache):
+        """現在以降の予約がない注文は、前詰めせずに保存もしない"""
+        order_repo.get_by_id.return_value = {"id": 1}
+        repo.get_plan_suffix.return_value = []
+
+        assert service.release_order(1) == ([], [])
+        repo.apply_changes.assert_not_called()
+        load_cache.invalidate.assert_not_called()
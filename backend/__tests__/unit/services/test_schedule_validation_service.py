@@ -0,0 +1,196 @@
+"""
+schedule_validation_service の単体テスト
+"""
+
+from datetime import date
+
+import pytest
+
+from __tests__.unit.services.conftest import plan_dt, plan_row
+from app.services.schedule_validation_service import (
+    find_conflicts,
+    find_off_hours,
+    find_overlaps,
+    find_precedence_violations,
+    snap_to_working_time,
+)
+from app.utils.calendar import CalendarConfig
+
+
+@pytest.mark.unit
+class TestFindOverlaps:
+    """find_overlaps 関数のテスト"""
+
+    def test_detects_double_booking(self):
+        """同一設備の重なりを検出する"""
+        rows = [
+            plan_row(1, None, 1, 1, "09:00", "11:00"),
+            plan_row(2, None, 1, 1, "10:00", "12:00"),
+            plan_row(3, None, 1, 2, "10:00", "12:00"),
+        ]
+
+        conflicts = find_overlaps(rows)
+
+        assert len(conflicts) == 1
+        assert conflicts[0]["type"] == "overlap"
+        assert conflicts[0]["schedule_ids"] == [1, 2]
+        assert conflicts[0]["equipment_id"] == 1
+
+    def test_adjacent_segments_do_not_overlap(self):
+        """終了時刻と開始時刻が一致するだけなら重なりではない"""
+        rows = [
+            plan_row(1, None, 1, 1, "09:00", "10:00"),
+            plan_row(2, None, 1, 1, "10:00", "11:00"),
+        ]
+        assert find_overlaps(rows) == []
+
+    def test_long_segment_overlaps_later_ones(self):
+        """長いセグメントに含まれる複数のセグメントをすべて検出する"""
+        rows = [
+            plan_row(1, None, 1, 1, "09:00", "17:00"),
+            plan_row(2, None, 1, 1, "10:00", "11:00"),
+            plan_row(3, None, 1, 1, "13:00", "14:00"),
+        ]
+
+        conflicts = find_overlaps(rows)
+
+        assert [c["schedule_ids"] for c in conflicts] == [[1, 2], [1, 3]]
+
+    def test_focus_ids(self):
+        """focus_ids を指定すると関係する違反のみ返す"""
+        rows = [
+            plan_row(1, None, 1, 1, "09:00", "11:00"),
+            plan_row(2, None, 1, 1, "10:00", "12:00"),
+            plan_row(3, None, 1, 2, "09:00", "11:00"),
+            plan_row(4, None, 1, 2, "10:00", "12:00"),
+        ]
+
+        conflicts = find_overlaps(rows, focus_ids={4})
+
+        assert [c["schedule_ids"] for c in conflicts] == [[3, 4]]
+
+
+@pytest.mark.unit
+class TestFindPrecedenceViolations:
+    """find_precedence_violations 関数のテスト"""
+
+    def test_detects_step_starting_before_previous_ends(self):
+        """後工程が前工程の終了前に開始している場合に検出する"""
+        rows = [
+            plan_row(1, 100, 1, 1, "09:00", "11:00"),
+            plan_row(2, 100, 2, 2, "10:00", "12:00"),
+        ]
+
+        conflicts = find_precedence_violations(rows)
+
+        assert len(conflicts) == 1
+        assert conflicts[0]["type"] == "precedence"
+        assert conflicts[0]["schedule_ids"] == [1, 2]
+        assert conflicts[0]["order_id"] == 100
+
+    def test_multi_day_step_uses_latest_segment(self):
+        """前工程が複数日に分割されている場合、最後のセグメントと比較する"""
+        rows = [
+            plan_row(1, 100, 1, 1, "09:00", "17:00"),
+            plan_row(2, 100, 1, 1, "09:00", "10:00", day=7),
+            plan_row(3, 100, 2, 2, "13:00", "14:00"),
+        ]
+
+        conflicts = find_precedence_violations(rows)
+
+        assert [c["schedule_ids"] for c in conflicts] == [[2, 3]]
+
+    def test_segments_of_same_step_are_not_violations(self):
+        """同じ工程のセグメント同士は順序違反にならない"""
+        rows = [
+            plan_row(1, 100, 1, 1, "09:00", "17:00"),
+            plan_row(2, 100, 1, 1, "09:00", "10:00", day=7),
+            plan_row(3, 100, 2, 2, "10:00", "11:00", day=7),
+        ]
+        assert find_precedence_violations(rows) == []
+
+
+@pytest.mark.unit
+class TestFindOffHours:
+    """find_off_hours 関数のテスト"""
+
+    def test_detects_segments_outside_working_hours(self):
+        """休日・終業後・休憩中のセグメントを検出する"""
+        rows = [
+            plan_row(1, None, 1, 1, "09:00", "17:00"),  # 休憩をまたぐのは可
+            plan_row(2, None, 1, 1, "16:00", "18:00"),  # 終業後まで
+            plan_row(3, None, 1, 1, "12:00", "12:30"),  # 休憩中
+            plan_row(4, None, 1, 1, "10:00", "11:00", day=11),  # 土曜日
+        ]
+
+        conflicts = find_off_hours(rows)
+
+        assert [c["schedule_ids"] for c in conflicts] == [[2], [3], [4]]
+        assert all(c["type"] == "off_hours" for c in conflicts)
+
+    def test_find_conflicts_combines_all_checks(self):
+        """find_conflicts はすべての違反をまとめて返す"""
+        rows = [
+            plan_row(1, 100, 1, 1, "09:00", "11:00"),
+            plan_row(2, 100, 2, 1, "10:00", "18:00"),
+        ]
+
+        types = [c["type"] for c in find_conflicts(rows)]
+
+        assert types == ["overlap", "precedence", "off_hours"]
+
+
+@pytest.mark.unit
+class TestSnapToWorkingTime:
+    """snap_to_working_time 関数のテスト"""
+
+    def test_move_to_holiday_snaps_to_next_workday(self):
+        """休日へ移動した場合、翌稼働日の始業時刻に合わせ稼働時間を保つ"""
+        pieces, adjustments = snap_to_working_time(
+            plan_dt(9), plan_dt(11), plan_dt(10, day=11), plan_dt(12, day=11)
+        )
+
+        assert pieces == [(plan_dt(9, day=13), plan_dt(11, day=13))]
+        assert [a["field"] for a in adjustments] == ["start_datetime", "end_datetime"]
+
+    def test_move_across_break_extends_end(self):
+        """休憩をまたぐ場合、終了日時を休憩時間分だけ後ろへずらす"""
+        pieces, adjustments = snap_to_working_time(
+            plan_dt(9), plan_dt(11), plan_dt(11, day=7), plan_dt(13, day=7)
+        )
+
+        assert pieces == [(plan_dt(11, day=7), plan_dt(14, day=7))]
+        assert [a["field"] for a in adjustments] == ["end_datetime"]
+
+    def test_move_past_end_of_day_splits(self):
+        """終業時刻を超える場合、翌稼働日に分割する"""
+        pieces, adjustments = snap_to_working_time(
+            plan_dt(9), plan_dt(11), plan_dt(16, day=10), plan_dt(18, day=10)
+        )
+
+        assert pieces == [
+            (plan_dt(16, day=10), plan_dt(17, day=10)),
+            (plan_dt(9, day=13), plan_dt(10, day=13)),
+        ]
+        assert adjustments[-1]["field"] == "segments"
+        assert adjustments[-1]["adjusted"] == 2
+
+    def test_resize_uses_requested_working_minutes(self):
+        """リサイズの場合は要求された区間の稼働時間を使う"""
+        pieces, adjustments = snap_to_working_time(
+            plan_dt(9), plan_dt(10), plan_dt(9), plan_dt(14)
+        )
+
+        # 9:00-14:00 の稼働時間は 4 時間（休憩を除く）
+        assert pieces == [(plan_dt(9), plan_dt(14))]
+        assert adjustments == []
+
+    def test_uses_calendar_config(self):
+        """カレンダー設定の休日を考慮する"""
+        config = CalendarConfig(holidays={date(2025, 1, 13)})
+
+        pieces, _ = snap_to_working_time(
+            plan_dt(9), plan_dt(10), plan_dt(9, day=13), plan_dt(10, day=13), config
+        )
+
+        assert pieces == [(plan_dt(9, day=14), plan_dt(10, day=14))]
@@ -509,3 +509,128 @@ class TestScheduleOrder:
         assert start_dt_2.day == 13  # 月曜日
         assert start_dt_2.hour == 9
         assert end_dt_2.hour == 12
+
+    def test_schedule_avoids_equipment_maintenance(self) -> None:
+        """保全中の設備は避け、同じグループの別設備に割り当てる"""
+        from app.utils.equipment_calendar import EquipmentCalendars
+
+        mock_product_repo = MagicMock()
+        mock_schedule_repo = MagicMock()
+        mock_product_repo.get_routings_by_product.return_value = [
+            {
+                "id": 1,
+                "equipment_group_id": 100,
+                "setup_time_seconds": 0,
+                "unit_time_seconds": 3600,  # 60分/個
+                "sequence_order": 1,
+            }
+        ]
+        mock_product_repo.client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+            {"equipment_id": 1},
+            {"equipment_id": 2},
+        ]
+        # 設備2は10:00まで使用中
+        mock_schedule_repo.get_last_end_time.side_effect = lambda equipment_id: (
+            None if equipment_id == 1 else datetime(2025, 1, 6, 10, 0, tzinfo=UTC)
+        )
+        # 設備1は月曜日の終日保全
+        calendars = EquipmentCalendars(
+            overlays=[
+                {
+                    "equipment_id": 1,
+                    "kind": "maintenance",
+                    "start_datetime": "2025-01-06T00:00:00+00:00",
+                    "end_datetime": "2025-01-07T00:00:00+00:00",
+                }
+            ]
+        )
+
+        result = schedule_order(
+            order_id=9,
+            product_id=9,
+            quantity=3,
+            product_repo=mock_product_repo,
+            schedule_repo=mock_schedule_repo,
+            tenant_id="test-tenant-id",
+            start_time=datetime(2025, 1, 6, 9, 0, tzinfo=UTC),
+            dry_run=True,
+            equipment_calendars=calendars,
+        )
+
+        assert len(result) == 1
+        assert result[0]["equipment_id"] == 2
+        assert result[0]["start_datetime"] == "2025-01-06T10:00:00+00:00"
+        # 10:00 + 3時間 + 休憩1時間
+        assert result[0]["end_datetime"] == "2025-01-06T14:00:00+00:00"
+
+    def test_schedule_fetches_last_end_time_once_per_machine(self) -> None:
+        """設備の最終終了時刻は設備ごとに1回だけ取得し、割り当て後の終了時刻を引き継ぐ"""
+        mock_product_repo = MagicMock()
+        mock_schedule_repo = MagicMock()
+        # 同じ設備グループを使う2工程（10分 + 20分）
+        mock_product_repo.get_routings_by_product.return_value = [
+            {
+                "id": routing_id,
+                "equipment_group_id": 100,
+                "setup_time_seconds": 0,
+                "unit_time_seconds": unit_time,
+                "sequence_order": routing_id,
+            }
+            for routing_id, unit_time in [(1, 600), (2, 1200)]
+        ]
+        mock_product_repo.client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+            {"equipment_id": 1}
+        ]
+        mock_schedule_repo.get_last_end_time.return_value = None
+
+        result = schedule_order(
+            order_id=1,
+            product_id=1,
+            quantity=1,
+            product_repo=mock_product_repo,
+            schedule_repo=mock_schedule_repo,
+            tenant_id="test-tenant-id",
+            start_time=datetime(2025, 1, 6, 9, 0, tzinfo=UTC),
+            dry_run=True,
+        )
+
+        mock_schedule_repo.get_last_end_time.assert_called_once_with(1)
+        assert [(r["start_datetime"], r["end_datetime"]) for r in result] == [
+            ("2025-01-06T09:00:00+00:00", "2025-01-06T09:10:00+00:00"),
+            ("2025-01-06T09:10:00+00:00", "2025-01-06T09:30:00+00:00"),
+        ]
+
+    def test_schedule_fractional_unit_time_has_no_drift(self) -> None:
+        """単位時間に小数を含んでも、分割後の終了時刻は秒単位で正確に求まる"""
+        mock_product_repo = MagicMock()
+        mock_schedule_repo = MagicMock()
+        mock_product_repo.get_routings_by_product.return_value = [
+            {
+                "id": 1,
+                "equipment_group_id": 100,
+                "setup_time_seconds": 0,
+                "unit_time_seconds": 0.1,
+                "sequence_order": 1,
+            }
+        ]
+        mock_product_repo.client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+            {"equipment_id": 1}
+        ]
+        mock_schedule_repo.get_last_end_time.return_value = None
+
+        # 0.1秒 × 288000個 = 8時間（1日分の稼働時間 7時間 + 翌日 1時間）
+        result = schedule_order(
+            order_id=1,
+            product_id=1,
+            quantity=288000,
+            product_repo=mock_product_repo,
+            schedule_repo=mock_schedule_repo,
+            tenant_id="test-tenant-id",
+            start_time=datetime(2025, 1, 6, 9, 0, tzinfo=UTC),
+            dry_run=True,
+        )
+
+        assert [(r["start_datetime"], r["end_datetime"]) for r in result] == [
+            ("2025-01-06T09:00:00+00:00", "2025-01-06T17:00:00+00:00"),
+            ("2025-01-07T09:00:00+00:00", "2025-01-07T10:00:00+00:00"),
+        ]
@@ -0,0 +1,175 @@
+"""
+設備別稼働カレンダー（EquipmentAvailability / EquipmentCalendars）の単体テスト
+"""
+
+from datetime import UTC, datetime
+
+import numpy as np
+import pytest
+
+from app.utils.calendar import (
+    CalendarConfig,
+    split_work_across_days,
+    to_epoch_seconds,
+)
+from app.utils.equipment_calendar import EquipmentAvailability, EquipmentCalendars
+
+
+def _dt(day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2025, 1, day, hour, minute, tzinfo=UTC)
+
+
+def _overlay(kind: str, start: datetime, end: datetime, equipment_id: int = 1):
+    return {
+        "equipment_id": equipment_id,
+        "kind": kind,
+        "start_datetime": start.isoformat(),
+        "end_datetime": end.isoformat(),
+    }
+
+
+@pytest.mark.unit
+class TestEquipmentAvailability:
+    """EquipmentAvailability クラスのテスト"""
+
+    @pytest.mark.parametrize(
+        "start, minutes",
+        [
+            (_dt(6, 9), 240),
+            (_dt(6, 14), 360),
+            (_dt(10, 14), 360),  # 金曜日から週末をまたぐ
+            (_dt(6, 9), 20 * 60),
+        ],
+    )
+    def test_without_overlays_matches_tenant_calendar(self, start, minutes):
+        """上書きがない場合はテナントの稼働カレンダーと同じ分割になる"""
+        availability = EquipmentAvailability(CalendarConfig())
+        assert availability.split(start, minutes) == split_work_across_days(
+            start, minutes
+        )
+
+    def test_epoch_api_matches_datetime_api(self):
+        """エポック秒での計算結果は datetime での計算結果と一致する"""
+        availability = EquipmentAvailability(
+            overlays=[_overlay("maintenance", _dt(6, 14), _dt(6, 15))]
+        )
+        start = int(_dt(6, 9).timestamp())
+        assert availability.next_available_epoch(start) == start
+        assert availability.split_epoch(start, 360 * 60) == [
+            (int(a.timestamp()), int(b.timestamp()))
+            for a, b in availability.split(_dt(6, 9), 360)
+        ]
+
+    def test_maintenance_delays_start(self):
+        """保全中は開始できず、保全明けから開始する"""
+        availability = EquipmentAvailability(
+            overlays=[_overlay("maintenance", _dt(6, 8), _dt(6, 10, 30))]
+        )
+        assert availability.next_available(_dt(6, 9)) == _dt(6, 10, 30)
+
+    def test_maintenance_splits_span(self):
+        """シフト帯の途中の保全で作業が分割される"""
+        availability = EquipmentAvailability(
+            overlays=[_overlay("maintenance", _dt(6, 14), _dt(6, 15))]
+        )
+        assert availability.split(_dt(6, 9), 360) == [
+            (_dt(6, 9), _dt(6, 14)),
+            (_dt(6, 15), _dt(6, 17)),
+        ]
+
+    def test_extra_shift_on_weekend(self):
+        """休日の臨時稼働は稼働可能区間として扱う"""
+        availability = EquipmentAvailability(
+            overlays=[_overlay("extra_shift", _dt(11, 8), _dt(11, 12))]  # 土曜日
+        )
+        assert availability.next_available(_dt(10, 18)) == _dt(11, 8)
+        assert availability.split(_dt(11, 8), 300) == [
+            (_dt(11, 8), _dt(11, 12)),
+            (_dt(13, 9), _dt(13, 10)),
+        ]
+
+    def test_extra_shift_started_before_compiled_period(self):
+        """コンパイル開始より前に始まる臨時稼働も、期間内の部分は稼働可能とする"""
+        availability = EquipmentAvailability(
+            overlays=[
+                _overlay("extra_shift", _dt(11, 20), _dt(12, 6))
+            ]  # 土曜夜〜日曜朝
+        )
+        assert availability.next_available(_dt(12, 2)) == _dt(12, 2)
+        assert availability.split(_dt(12, 2), 300) == [
+            (_dt(12, 2), _dt(12, 6)),
+            (_dt(13, 9), _dt(13, 10)),
+        ]
+
+    def test_adjacent_extra_shift_extends_span(self):
+        """シフト帯に接する臨時稼働（残業）はシフト帯に結合される"""
+        availability = EquipmentAvailability(
+            overlays=[_overlay("extra_shift", _dt(6, 17), _dt(6, 19))]
+        )
+        assert availability.split(_dt(6, 16), 180) == [(_dt(6, 16), _dt(6, 19))]
+
+    def test_far_future_extends_horizon(self):
+        """コンパイル済みの期間外を参照した場合は期間を延長する"""
+        availability = EquipmentAvailability()
+        availability.next_available(_dt(6, 9))
+        far = datetime(2025, 12, 1, 9, 0, tzinfo=UTC)  # 月曜日
+        assert availability.next_available(far) == far
+        assert availability.split(far, 840) == [
+            (far, datetime(2025, 12, 1, 17, 0, tzinfo=UTC)),
+            (
+                datetime(2025, 12, 2, 9, 0, tzinfo=UTC),
+                datetime(2025, 12, 2, 17, 0, tzinfo=UTC),
+            ),
+        ]
+
+    @pytest.mark.parametrize(
+        "start, seconds, expected",
+        [
+            (_dt(6, 8), 0, _dt(6, 9)),  # 稼働時間前は次の稼働開始
+            (_dt(6, 11), 7200, _dt(6, 14)),  # 昼休憩をまたぐ
+            (_dt(10, 16), 3 * 3600, _dt(13, 11)),  # 週末をまたぐ
+        ],
+    )
+    def test_advance_epoch(self, start, seconds, expected):
+        """稼働時間を進めた時刻は split の終了時刻と一致する"""
+        availability = EquipmentAvailability()
+        result = availability.advance_epoch(to_epoch_seconds(start), seconds)
+        assert result == to_epoch_seconds(expected)
+        if seconds:
+            assert availability.split(start, seconds / 60)[-1][1] == expected
+
+    def test_working_seconds_at(self):
+        """2つの時刻の累積稼働時間の差は、その間の稼働時間（休憩・休日・保全を除く）"""
+        availability = EquipmentAvailability(
+            overlays=[_overlay("maintenance", _dt(7, 9), _dt(7, 10))]
+        )
+        times = np.array(
+            [
+                to_epoch_seconds(t)
+                for t in [_dt(6, 8), _dt(6, 11), _dt(6, 14), _dt(7, 11), _dt(13, 10)]
+            ]
+        )
+
+        worked = availability.working_seconds_at(times)
+
+        assert np.diff(worked).tolist() == [
+            2 * 3600,  # 月曜 8:00-11:00（9:00 から稼働）
+            2 * 3600,  # 月曜 11:00-14:00（昼休憩を除く）
+            4 * 3600,  # 月曜 14:00 - 火曜 11:00（9:00-10:00 は保全）
+            (5 + 7 * 3 + 1) * 3600,  # 火曜 11:00 - 翌週月曜 10:00（週末を除く）
+        ]
+
+
+@pytest.mark.unit
+class TestEquipmentCalendars:
+    """EquipmentCalendars クラスのテスト"""
+
+    def test_equipment_without_overlays_shares_table(self):
+        """上書きのない設備は同じテーブルを共有し、上書きのある設備は個別に持つ"""
+        calendars = EquipmentCalendars(
+            overlays=[_overlay("maintenance", _dt(6, 9), _dt(6, 12), equipment_id=1)]
+        )
+        assert calendars.for_equipment(2) is calendars.for_equipment(3)
+        assert calendars.for_equipment(1) is not calendars.for_equipment(2)
+        assert calendars.for_equipment(1).next_available(_dt(6, 9)) == _dt(6, 13)
+        assert calendars.for_equipment(2).next_available(_dt(6, 9)) == _dt(6, 9)
@@ -0,0 +1,136 @@
+"""
+ShiftPattern（勤務パターンの稼働区間テーブル）の単体テスト
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.utils.calendar import (
+    DEFAULT_SHIFT_PATTERN,
+    CalendarConfig,
+    ShiftPattern,
+    calculate_end_time,
+    calculate_working_minutes,
+    get_next_available_start_time,
+    is_during_break,
+    is_within_working_hours,
+    split_work_across_days,
+)
+
+
+@pytest.fixture
+def two_shift_config():
+    """2交代（6:00-14:00, 14:00-22:00）、休憩 10:00-10:30 / 18:00-18:45"""
+    pattern = ShiftPattern.from_time_ranges(
+        [{"start": "06:00", "end": "14:00"}, {"start": "14:00", "end": "22:00"}],
+        [{"start": "10:00", "end": "10:30"}, {"start": "18:00", "end": "18:45"}],
+    )
+    return CalendarConfig(shift_pattern=pattern)
+
+
+@pytest.fixture
+def night_shift_config():
+    """夜勤（22:00-翌6:00）、休憩 翌2:00-2:30"""
+    pattern = ShiftPattern.from_time_ranges(
+        [{"start": "22:00", "end": "06:00"}],
+        [{"start": "02:00", "end": "02:30"}],
+    )
+    return CalendarConfig(shift_pattern=pattern)
+
+
+@pytest.mark.unit
+class TestShiftPatternCompile:
+    """勤務パターンのコンパイルのテスト"""
+
+    def test_default_pattern(self):
+        """デフォルトは 9:00-17:00、休憩 12:00-13:00"""
+        assert DEFAULT_SHIFT_PATTERN.intervals == [(540, 720), (780, 1020)]
+        assert DEFAULT_SHIFT_PATTERN.spans == [(540, 1020)]
+        assert DEFAULT_SHIFT_PATTERN.describe() == "9:00 - 17:00"
+
+    def test_adjacent_shifts_are_merged_into_one_span(self, two_shift_config):
+        """連続するシフトは1つのシフト帯になり、休憩は稼働区間から除外される"""
+        pattern = two_shift_config.shift_pattern
+        assert pattern.spans == [(360, 1320)]
+        assert pattern.intervals == [(360, 600), (630, 1080), (1125, 1320)]
+        assert pattern.to_dict()["daily_work_minutes"] == 960 - 30 - 45
+
+    def test_night_shift_crosses_midnight(self, night_shift_config):
+        """夜勤は翌日分を1440分以上の値で保持する"""
+        pattern = night_shift_config.shift_pattern
+        assert pattern.crosses_midnight
+        assert pattern.intervals == [(1320, 1560), (1590, 1800)]
+        assert pattern.describe() == "22:00 - 翌6:00"
+
+    def test_invalid_patterns(self):
+        """シフトなし・24時間超・休憩のみのパターンはエラー"""
+        with pytest.raises(ValueError, match="シフトを1つ以上"):
+            ShiftPattern([])
+        with pytest.raises(ValueError, match="24時間以内"):
+            ShiftPattern([(0, 600), (1200, 1500)])
+        with pytest.raises(ValueError, match="稼働時間がありません"):
+            ShiftPattern([(540, 600)], [(500, 700)])
+        with pytest.raises(ValueError, match="HH:MM"):
+            ShiftPattern.from_time_ranges([{"start": "9時", "end": "17:00"}])
+
+
+@pytest.mark.unit
+class TestCalendarWithShiftPattern:
+    """勤務パターンを指定したカレンダー関数のテスト"""
+
+    def test_split_skips_breaks_within_span(self, two_shift_config):
+        """シフト帯内の休憩は読み飛ばし、1つの区間として扱う"""
+        start = datetime(2025, 1, 6, 6, 0)  # 月曜日
+        result = split_work_across_days(start, 300, two_shift_config)
+        assert result == [(start, datetime(2025, 1, 6, 11, 30))]
+
+    def test_split_carries_over_to_next_workday(self, two_shift_config):
+        """シフト帯の稼働時間（885分）を超える分は翌稼働日に繰り越す"""
+        start = datetime(2025, 1, 10, 21, 0)  # 金曜日
+        result = split_work_across_days(start, 120, two_shift_config)
+        assert result == [
+            (start, datetime(2025, 1, 10, 22, 0)),
+            (datetime(2025, 1, 13, 6, 0), datetime(2025, 1, 13, 7, 0)),
+        ]
+
+    def test_night_shift_belongs_to_previous_workday(self, night_shift_config):
+        """土曜日 1:00 は金曜日の夜勤の一部として稼働時間に含まれる"""
+        saturday_night = datetime(2025, 1, 11, 1, 0)
+        assert (
+            get_next_available_start_time(saturday_night, 60, night_shift_config)
+            == saturday_night
+        )
+        # 土曜日の夜勤はないため、日曜日 22:00 は次の稼働開始（月曜日 22:00）に送られる
+        assert get_next_available_start_time(
+            datetime(2025, 1, 12, 22, 0), 60, night_shift_config
+        ) == datetime(2025, 1, 13, 22, 0)
+
+    def test_night_shift_end_time_skips_break(self, night_shift_config):
+        """日付をまたいで休憩を除外した終了時刻を求める"""
+        start = datetime(2025, 1, 6, 23, 0)
+        assert is_during_break(datetime(2025, 1, 7, 2, 10), night_shift_config)
+        assert calculate_end_time(start, 240, night_shift_config) == datetime(
+            2025, 1, 7, 3, 30
+        )
+        assert is_within_working_hours(
+            start, datetime(2025, 1, 7, 3, 30), night_shift_config
+        )
+        assert (
+            calculate_working_minutes(
+                datetime(2025, 1, 6, 0, 0),
+                datetime(2025, 1, 8, 0, 0),
+                night_shift_config,
+            )
+            == 450 + 120
+        )
+
+    def test_end_time_beyond_night_shift_raises(self, night_shift_config):
+        """夜勤の終了（翌6:00）を超える作業はエラー"""
+        with pytest.raises(ValueError, match="作業が稼働時間を超えます"):
+            calculate_end_time(datetime(2025, 1, 7, 5, 0), 120, night_shift_config)
+
+    def test_start_outside_shift_raises(self, night_shift_config):
+        """シフト外の開始時刻はエラー（メッセージにシフト帯を含む）"""
+        with pytest.raises(ValueError, match="22:00 - 翌6:00"):
+            split_work_across_days(datetime(2025, 1, 6, 12, 0), 60, night_shift_config)
@@ -0,0 +1,109 @@
+"""
+タイムゾーン（DayBoundaries / resolve_time_zone）の単体テスト
+"""
+
+import pickle
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+
+from app.utils.calendar import CalendarConfig, split_work_across_days
+from app.utils.equipment_calendar import EquipmentAvailability
+from app.utils.time_zone import DayBoundaries, get_day_boundaries, resolve_time_zone
+
+
+def _epoch(dt: datetime) -> int:
+    return int(dt.timestamp())
+
+
+@pytest.mark.unit
+class TestDayBoundaries:
+    """DayBoundaries クラスのテスト"""
+
+    def test_resolve_time_zone(self):
+        """タイムゾーン名を解決し、未設定の場合はUTC、不正な名前はエラーとする"""
+        assert resolve_time_zone(None) is UTC
+        assert str(resolve_time_zone("Asia/Tokyo")) == "Asia/Tokyo"
+        with pytest.raises(ValueError, match="不正なタイムゾーン"):
+            resolve_time_zone("Mars/Olympus")
+
+    def test_day_of_uses_local_midnight(self):
+        """日付はタイムゾーンの 0:00 を境界として判定する"""
+        days = DayBoundaries(resolve_time_zone("Asia/Tokyo"))
+        # 2025-01-05 15:00 UTC = 2025-01-06 0:00 JST
+        t = _epoch(datetime(2025, 1, 5, 15, 0, tzinfo=UTC))
+        assert days.day_of(t) == date(2025, 1, 6)
+        assert days.day_of(t - 1) == date(2025, 1, 5)
+        assert days.day_start(t + 3600) == t
+
+    def test_dst_day_lengths(self):
+        """夏時間の切り替え日は 23時間・25時間になる"""
+        days = DayBoundaries(resolve_time_zone("America/New_York"))
+        assert days.day_seconds(date(2025, 3, 9)) == 23 * 3600
+        assert days.day_seconds(date(2025, 3, 10)) == 24 * 3600
+        assert days.day_seconds(date(2025, 11, 2)) == 25 * 3600
+        # 切り替え日でも壁時計の 9:00 を返す
+        nine = datetime.fromtimestamp(days.at(date(2025, 3, 9), 9 * 60), days.tz)
+        assert (nine.hour, nine.minute) == (9, 0)
+
+    def test_period_in_utc(self):
+        """期間の境界はタイムゾーンの日の境界をUTCで返す"""
+        days = DayBoundaries(resolve_time_zone("Asia/Tokyo"))
+        start, end = days.period(date(2025, 1, 6), date(2025, 1, 6))
+        assert start == datetime(2025, 1, 5, 15, 0, tzinfo=UTC)
+        assert end == datetime(2025, 1, 6, 15, 0, tzinfo=UTC) - timedelta(
+            microseconds=1
+        )
+
+    def test_table_extends_in_both_directions(self):
+        """テーブルの範囲外の日付を参照した場合は前後に延長する"""
+        days = DayBoundaries(UTC)
+        assert days.start_of(date(2025, 1, 1)) == _epoch(
+            datetime(2025, 1, 1, tzinfo=UTC)
+        )
+        assert days.day_of(_epoch(datetime(2031, 6, 1, 12, tzinfo=UTC))) == date(
+            2031, 6, 1
+        )
+        assert days.start_of(date(2019, 1, 1)) == _epoch(
+            datetime(2019, 1, 1, tzinfo=UTC)
+        )
+
+    def test_boundaries_are_shared_per_time_zone(self):
+        """境界テーブルはタイムゾーンごとに共有される"""
+        tz = resolve_time_zone("Asia/Tokyo")
+        assert get_day_boundaries(tz) is get_day_boundaries(tz)
+
+    def test_pickle_restores_shared_boundaries(self):
+        """pickleして復元すると、そのプロセスで共有される境界テーブルになる"""
+        tz = resolve_time_zone("America/New_York")
+        days = get_day_boundaries(tz)
+        days.start_of(date(2024, 3, 10))
+
+        assert pickle.loads(pickle.dumps(days)) is days
+
+
+@pytest.mark.unit
+class TestTenantTimeZone:
+    """テナントのタイムゾーンによる稼働時間の判定のテスト"""
+
+    def test_calendar_uses_tenant_time_zone(self):
+        """UTCで渡した日時も、テナントのタイムゾーンの稼働時間で分割する"""
+        config = CalendarConfig(time_zone="Asia/Tokyo")
+        # 2025-01-06 0:00 UTC = 9:00 JST（月曜日）
+        segments = split_work_across_days(
+            datetime(2025, 1, 6, 0, 0, tzinfo=UTC), 60, config
+        )
+        assert len(segments) == 1
+        start, end = segments[0]
+        assert start.isoformat() == "2025-01-06T09:00:00+09:00"
+        assert end.isoformat() == "2025-01-06T10:00:00+09:00"
+
+    def test_equipment_availability_on_dst_day(self):
+        """夏時間の切り替え後も、シフトは壁時計の 9:00 から始まる"""
+        config = CalendarConfig(
+            workdays={date(2025, 3, 9)}, time_zone="America/New_York"
+        )
+        availability = EquipmentAvailability(config)
+        # 2025-03-09（日曜日・稼働日扱い）0:00 EST = 5:00 UTC
+        start = availability.next_available(datetime(2025, 3, 9, 5, 0, tzinfo=UTC))
+        assert start.astimezone(config.tz).isoformat() == "2025-03-09T09:00:00-04:00"
@@ -0,0 +1,59 @@
+"""
+EquipmentTimeline の単体テスト
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.utils.timeline import EquipmentTimeline
+
+
+def _dt(hour: int, minute: int = 0) -> datetime:
+    return datetime(2025, 1, 6, hour, minute)
+
+
+@pytest.mark.unit
+class TestEquipmentTimeline:
+    """EquipmentTimeline クラスのテスト"""
+
+    @pytest.fixture
+    def timeline(self):
+        timeline = EquipmentTimeline()
+        timeline.add(1, _dt(13), _dt(15), "c")
+        timeline.add(1, _dt(9), _dt(10), "a")
+        timeline.add(1, _dt(10), _dt(12), "b")
+        timeline.add(2, _dt(9), _dt(17), "x")
+        return timeline
+
+    def test_entries_sorted_by_start(self, timeline):
+        """区間は開始時刻順に保持される"""
+        assert [key for _, _, key in timeline.entries(1)] == ["a", "b", "c"]
+        assert timeline.entries(3) == []
+
+    def test_overlapping(self, timeline):
+        """指定区間と重なる区間のみ返される（端点の接触は重なりとしない）"""
+        result = timeline.overlapping(1, _dt(11), _dt(13))
+        assert [key for _, _, key in result] == ["b"]
+
+        result = timeline.overlapping(1, _dt(9, 30), _dt(14))
+        assert [key for _, _, key in result] == ["a", "b", "c"]
+
+    def test_overlapping_long_interval_started_earlier(self, timeline):
+        """検索開始より前に始まる長い区間も検出される"""
+        result = timeline.overlapping(2, _dt(15), _dt(16))
+        assert [key for _, _, key in result] == ["x"]
+
+    def test_remove(self, timeline):
+        """区間を削除できる"""
+        timeline.remove(1, _dt(10), "b")
+        assert [key for _, _, key in timeline.entries(1)] == ["a", "c"]
+
+        with pytest.raises(KeyError):
+            timeline.remove(1, _dt(10), "b")
+
+    def test_last_end(self, timeline):
+        """最も遅い終了日時が返される"""
+        timeline.add(1, _dt(8), _dt(16), "long")
+        assert timeline.last_end(1) == _dt(16)
+        assert timeline.last_end(3) is None
@@ -8,9 +8,16 @@ from app.repositories.supa_infra import (
     CustomerRepository,
     EquipmentRepository,
     OrderRepository,
+    PlanVersionRepository,
     ProductRepository,
     ScheduleRepository,
+    TenantRepository,
 )
+from app.services.calendar_service import CalendarCache, calendar_cache
+from app.services.hold_service import CapacityHoldStore, hold_store
+from app.services.plan_version_service import PlanVersionCache, plan_version_cache
+from app.services.quick_quote_service import LoadCache, load_cache
+from app.services.schedule_service import ScheduleService
 from supabase import Client, ClientOptions, create_client  # type: ignore
 
 # Bearer Token (JWT) を取得するためのスキーム
@@ -24,11 +31,6 @@ def get_current_user_token(
     return credentials.credentials
 
 
-def get_current_tenant_id(x_tenant_id: str = Header(...)) -> str:
-    """テナントIDを取得する"""
-    return x_tenant_id
-
-
 def get_supabase_client(token: str = Depends(get_current_user_token)) -> Client:
     """
     ユーザーのトークンを使ってSupabaseクライアントを初期化する。
@@ -60,6 +62,33 @@ def get_supabase_client(token: str = Depends(get_current_user_token)) -> Client:
 # --- Dependency Injection用の関数 ---
 
 
+def get_tenant_repo(client: Client = Depends(get_supabase_client)) -> TenantRepository:
+    """テナントリポジトリを取得する。"""
+    return TenantRepository(client)
+
+
+def get_current_tenant_id(
+    x_tenant_id: str = Header(...),
+    tenant_repo: TenantRepository = Depends(get_tenant_repo),
+) -> str:
+    """
+    テナントIDを取得する。
+
+    テナントIDはヘッダーで指定されるため、ユーザーがテナントのメンバーであることを確認する。
+    テナントごとのキャッシュ（休日情報・作業量など）はこのIDをキーにするため、
+    確認しないと他のテナントのエントリを自分の権限で読み込んだデータで埋められてしまう。
+
+    Raises:
+        HTTPException: ユーザーがテナントのメンバーでない場合（403）
+    """
+    if not tenant_repo.is_member(x_tenant_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of the tenant",
+        )
+    return x_tenant_id
+
+
 def get_order_repo(client: Client = Depends(get_supabase_client)) -> OrderRepository:
     """注文リポジトリを取得する。"""
     return OrderRepository(client)
@@ -72,6 +101,13 @@ def get_schedule_repo(
     return ScheduleRepository(client)
 
 
+def get_plan_version_repo(
+    client: Client = Depends(get_supabase_client),
+) -> PlanVersionRepository:
+    """計画バージョンリポジトリを取得する。"""
+    return PlanVersionRepository(client)
+
+
 def get_product_repo(
     client: Client = Depends(get_supabase_client),
 ) -> ProductRepository:
@@ -91,3 +127,44 @@ def get_customer_repo(
 ) -> CustomerRepository:
     """顧客リポジトリを取得する。"""
     return CustomerRepository(client)
+
+
+def get_hold_store() -> CapacityHoldStore:
+    """仮押さえストア（プロセス内のメモリに保持）を取得する。"""
+    return hold_store
+
+
+def get_calendar_cache() -> CalendarCache:
+    """休日情報キャッシュを取得する。"""
+    return calendar_cache
+
+
+def get_load_cache() -> LoadCache:
+    """設備の作業量キャッシュを取得する。"""
+    return load_cache
+
+
+def get_plan_version_cache() -> PlanVersionCache:
+    """計画バージョンのキャッシュを取得する。"""
+    return plan_version_cache
+
+
+def get_schedule_service(
+    tenant_id: str = Depends(get_current_tenant_id),
+    repo: ScheduleRepository = Depends(get_schedule_repo),
+    order_repo: OrderRepository = Depends(get_order_repo),
+    product_repo: ProductRepository = Depends(get_product_repo),
+    equipment_repo: EquipmentRepository = Depends(get_equipment_repo),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
+    load_cache: LoadCache = Depends(get_load_cache),
+) -> ScheduleService:
+    """生産スケジュールの編集・再計画サービスを取得する。"""
+    return ScheduleService(
+        repo,
+        order_repo,
+        product_repo,
+        equipment_repo,
+        calendar_cache,
+        load_cache,
+        tenant_id,
+    )
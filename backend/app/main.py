@@ -11,7 +11,12 @@ from app.routers.master import (
     process_routing_router,
     product_router,
 )
-from app.routers.transaction import orders_router, production_schedules_router
+from app.routers.transaction import (
+    orders_router,
+    plan_versions_router,
+    production_schedules_router,
+    scenarios_router,
+)
 
 # .envファイルの読み込み
 load_dotenv()
@@ -48,6 +53,8 @@ app.include_router(calendar_router)
 app.include_router(customer_router)
 app.include_router(orders_router)
 app.include_router(production_schedules_router)
+app.include_router(plan_versions_router)
+app.include_router(scenarios_router)
 
 
 @app.get("/health")
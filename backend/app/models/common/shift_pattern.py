@@ -0,0 +1,26 @@
+# backend/app/models/common/shift_pattern.py
+from pydantic import BaseModel, Field
+
+from app.utils.time_zone import DEFAULT_TIME_ZONE
+
+
+class TimeRange(BaseModel):
+    """時刻範囲（HH:MM）"""
+
+    start: str = Field(..., pattern=r"^\d{1,2}:\d{2}$", description="開始時刻（HH:MM）")
+    end: str = Field(
+        ...,
+        pattern=r"^\d{1,2}:\d{2}$",
+        description="終了時刻（HH:MM）。開始時刻以前の場合は翌日の時刻として扱う",
+    )
+
+
+class ShiftPatternUpdate(BaseModel):
+    """勤務パターン更新用スキーマ"""
+
+    shifts: list[TimeRange] = Field(..., min_length=1, description="シフトのリスト")
+    breaks: list[TimeRange] = Field(default_factory=list, description="休憩のリスト")
+    time_zone: str = Field(
+        DEFAULT_TIME_ZONE,
+        description="シフト・休憩の時刻を解釈するタイムゾーン（IANA形式、例: Asia/Tokyo）",
+    )
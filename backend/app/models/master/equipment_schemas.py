@@ -1,6 +1,8 @@
 # models/master/equipment_schemas.py
+from datetime import datetime
+from typing import Literal
 
-from pydantic import Field
+from pydantic import Field, model_validator
 
 from app.models.common.base_schema import BaseSchema
 
@@ -71,3 +73,39 @@ class EquipmentGroupMembers(EquipmentGroupMembersBase):
 
 # 中間テーブルにおいてUpdateは定義しない
 # 古い紐付けを DELETE して新しい紐付けを INSERT する
+
+
+# --- Equipment Calendar Overlays ---
+class EquipmentCalendarOverlayCreate(BaseSchema):
+    """設備別稼働カレンダー（保全・臨時稼働）を登録するためのスキーマ"""
+
+    kind: Literal["maintenance", "extra_shift"] = Field(
+        default=...,
+        description="種別（maintenance: 保全で使用不可, extra_shift: 臨時稼働）",
+    )
+    start_datetime: datetime = Field(default=..., description="開始日時")
+    end_datetime: datetime = Field(default=..., description="終了日時")
+    note: str | None = Field(None, description="備考")
+
+    @model_validator(mode="after")
+    def validate_datetime_order(self) -> "EquipmentCalendarOverlayCreate":
+        """開始日時が終了日時より前であることを確認"""
+        if self.start_datetime >= self.end_datetime:
+            raise ValueError("start_datetime must be before end_datetime")
+        return self
+
+
+class EquipmentOutageCreate(BaseSchema):
+    """設備の故障（停止期間）を登録するためのスキーマ"""
+
+    start_datetime: datetime = Field(default=..., description="停止の開始日時")
+    end_datetime: datetime = Field(default=..., description="停止の終了日時（見込み）")
+    note: str | None = Field(None, description="備考")
+    dry_run: bool = Field(False, description="Trueの場合、保存せずに結果のみを返す")
+
+    @model_validator(mode="after")
+    def validate_datetime_order(self) -> "EquipmentOutageCreate":
+        """開始日時が終了日時より前であることを確認"""
+        if self.start_datetime >= self.end_datetime:
+            raise ValueError("start_datetime must be before end_datetime")
+        return self
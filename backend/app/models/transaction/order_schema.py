@@ -1,9 +1,19 @@
 # models/transaction/order_schema.py
+from typing import Literal
 
-from pydantic import ConfigDict, Field
+from pydantic import ConfigDict, Field, PositiveInt
 
 from app.models.common.base_schema import BaseSchema
 
+# 仮押さえのデフォルト保持時間（秒）
+DEFAULT_HOLD_TTL_SECONDS = 900
+# 1回の数量スイープで試算できる数量の上限
+MAX_SWEEP_QUANTITIES = 100
+# 納期までに対応可能な最大数量を探索する際の、数量の上限のデフォルト値
+DEFAULT_MAX_QUOTE_QUANTITY = 100_000
+# 1回の複数明細の見積もりで試算できる明細数の上限
+MAX_QUOTE_LINES = 50
+
 
 class OrderCreate(BaseSchema):
     """注文を作成するためのスキーマ"""
@@ -25,6 +35,79 @@ class OrderSimulateRequest(BaseSchema):
     product_id: int
     quantity: int
     deadline_date: str | None = Field(None, alias="desired_deadline")
+    hold: bool = Field(False, description="シミュレーション結果を仮押さえするか")
+    hold_ttl_seconds: int = Field(
+        DEFAULT_HOLD_TTL_SECONDS, gt=0, le=86400, description="仮押さえの保持時間（秒）"
+    )
+
+
+class OrderQuickQuoteRequest(BaseSchema):
+    """簡易見積もり（キャッシュした作業量による回答納期の概算）のリクエストスキーマ"""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    product_id: int
+    quantity: PositiveInt
+    deadline_date: str | None = Field(None, alias="desired_deadline")
+
+
+class OrderSweepRequest(BaseSchema):
+    """数量スイープ（数量ごとのリードタイム試算）のリクエストスキーマ"""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    product_id: int
+    quantities: list[PositiveInt] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_SWEEP_QUANTITIES,
+        description="試算する数量のリスト",
+    )
+    deadline_date: str | None = Field(None, alias="desired_deadline")
+
+
+class OrderMaxQuantityRequest(BaseSchema):
+    """納期までに対応可能な最大数量の試算のリクエストスキーマ"""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    product_id: int
+    deadline_date: str = Field(..., alias="desired_deadline")
+    max_quantity: PositiveInt = Field(
+        DEFAULT_MAX_QUOTE_QUANTITY,
+        le=DEFAULT_MAX_QUOTE_QUANTITY,
+        description="探索する数量の上限",
+    )
+
+
+class OrderQuoteLine(BaseSchema):
+    """複数明細の見積もりの明細"""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    product_id: int
+    quantity: PositiveInt
+    deadline_date: str | None = Field(None, alias="desired_deadline")
+
+
+class OrderMultiSimulateRequest(BaseSchema):
+    """複数明細の見積もり（明細ごとの回答納期の試算）のリクエストスキーマ"""
+
+    lines: list[OrderQuoteLine] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_QUOTE_LINES,
+        description="見積もりの明細（この順に設備の能力を割り当てる）",
+    )
+
+
+class OrderExpediteRequest(BaseSchema):
+    """特急注文（割り込み）のリクエストスキーマ"""
+
+    start_datetime: str | None = Field(
+        None, description="割り込みの基準日時（ISO8601。省略時は現在時刻）"
+    )
+    dry_run: bool = Field(False, description="保存せずに結果だけを返すか")
 
 
 class OrderUpdate(BaseSchema):
@@ -37,3 +120,6 @@ class OrderUpdate(BaseSchema):
     quantity: int | None = None
     deadline_date: str | None = Field(None, alias="desired_deadline")
     customer_id: int | None = None
+    status: Literal["draft", "confirmed", "completed", "canceled"] | None = Field(
+        None, description="canceled にすると予約を解放し、空いた設備を前詰めする"
+    )
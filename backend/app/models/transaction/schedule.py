@@ -1,8 +1,21 @@
 # models/transaction/schedule.py
+import os
 from datetime import datetime
+from typing import Annotated, Literal
 
 from pydantic import BaseModel, Field, model_validator
 
+# 目的関数の重み（納期遅れ・メイクスパンの秒数に掛ける）
+DEFAULT_TARDINESS_WEIGHT = 1.0
+DEFAULT_MAKESPAN_WEIGHT = 0.1
+
+# 探索の制限時間の上限（ミリ秒）
+MAX_OPTIMIZE_TIME_BUDGET_MS = 30_000
+# 探索の並列数の上限（CPU数）
+MAX_OPTIMIZE_WORKERS = os.cpu_count() or 1
+# 比較できるシナリオ数の上限
+MAX_SCENARIOS = 16
+
 
 class ScheduleRequest(BaseModel):
     """
@@ -40,3 +53,197 @@ class ScheduleUpdate(BaseModel):
                 # ISO8601形式のパースエラーはそのまま伝播
                 raise ValueError(f"Invalid datetime format: {e}") from e
         return self
+
+
+class ScheduleBatchItem(ScheduleUpdate):
+    """
+    一括調整用の1件分の変更内容
+    """
+
+    id: int = Field(..., description="スケジュールID")
+
+
+class ScheduleBatchUpdate(BaseModel):
+    """
+    スケジュール一括調整用のリクエストモデル
+    """
+
+    updates: list[ScheduleBatchItem] = Field(
+        ..., min_length=1, description="変更内容のリスト"
+    )
+
+    @model_validator(mode="after")
+    def validate_unique_ids(self) -> "ScheduleBatchUpdate":
+        """同じスケジュールIDが複数回指定されていないことを確認"""
+        ids = [item.id for item in self.updates]
+        if len(ids) != len(set(ids)):
+            raise ValueError("updates must not contain duplicate ids")
+        return self
+
+
+class RescheduleRequest(BaseModel):
+    """
+    期間内の確定済み注文の再スケジュール用のリクエストモデル
+    """
+
+    start_datetime: str | None = Field(
+        None,
+        description="再計画する期間の開始日時 (ISO8601形式。指定なしの場合は現在時刻)",
+    )
+    end_datetime: str = Field(..., description="再計画する期間の終了日時 (ISO8601形式)")
+    rule: Literal["edd", "spt", "cr"] = Field(
+        "edd",
+        description="ディスパッチルール（edd: 納期順、spt: 所要時間の短い順、cr: クリティカルレシオ順）",
+    )
+    dry_run: bool = Field(False, description="Trueの場合、保存せずに結果のみを返す")
+
+
+class CompactRequest(BaseModel):
+    """
+    空いた稼働時間への予約の前詰め用のリクエストモデル
+    """
+
+    start_datetime: str | None = Field(
+        None,
+        description="前詰めを始める日時 (ISO8601形式。指定なしの場合は現在時刻)",
+    )
+    equipment_ids: list[int] | None = Field(
+        None,
+        min_length=1,
+        description="前詰めする設備IDのリスト（指定なしの場合は予約のあるすべての設備）",
+    )
+    dry_run: bool = Field(False, description="Trueの場合、保存せずに結果のみを返す")
+
+
+class OptimizeRequest(RescheduleRequest):
+    """
+    期間内の確定済み注文の最適化（局所探索による再スケジュール）用のリクエストモデル
+    """
+
+    rule: Literal["edd", "spt", "cr"] = Field(
+        "edd", description="初期解を作るディスパッチルール"
+    )
+    time_budget_ms: int = Field(
+        1000,
+        ge=1,
+        le=MAX_OPTIMIZE_TIME_BUDGET_MS,
+        description="探索の制限時間（ミリ秒）",
+    )
+    tardiness_weight: float = Field(
+        DEFAULT_TARDINESS_WEIGHT, ge=0, description="目的関数の納期遅れ（秒）の重み"
+    )
+    makespan_weight: float = Field(
+        DEFAULT_MAKESPAN_WEIGHT, ge=0, description="目的関数のメイクスパン（秒）の重み"
+    )
+    seed: int | None = Field(None, description="乱数のシード（再現が必要な場合に指定）")
+    workers: int | None = Field(
+        None,
+        ge=1,
+        le=MAX_OPTIMIZE_WORKERS,
+        description="探索の並列数（指定なしの場合はCPU数）",
+    )
+
+
+class ExtraShiftModification(BaseModel):
+    """
+    シナリオの変更: 臨時稼働（残業・休日出勤）
+    """
+
+    type: Literal["extra_shift"]
+    start_datetime: str = Field(..., description="臨時稼働の開始日時 (ISO8601形式)")
+    end_datetime: str = Field(..., description="臨時稼働の終了日時 (ISO8601形式)")
+    equipment_ids: list[int] | None = Field(
+        None, description="対象の設備ID（指定なしの場合はすべての設備）"
+    )
+
+
+class MaintenanceModification(BaseModel):
+    """
+    シナリオの変更: 保全（設備の停止）
+    """
+
+    type: Literal["maintenance"]
+    start_datetime: str = Field(..., description="保全の開始日時 (ISO8601形式)")
+    end_datetime: str = Field(..., description="保全の終了日時 (ISO8601形式)")
+    equipment_ids: list[int] | None = Field(
+        None, description="対象の設備ID（指定なしの場合はすべての設備）"
+    )
+
+
+class AddMachineModification(BaseModel):
+    """
+    シナリオの変更: 設備グループへの設備の追加
+    """
+
+    type: Literal["add_machine"]
+    equipment_group_id: int = Field(..., description="設備を追加する設備グループID")
+    count: int = Field(1, ge=1, le=10, description="追加する設備の台数")
+
+
+class ExpediteOrderModification(BaseModel):
+    """
+    シナリオの変更: 注文の前倒し（納期の繰り上げ）
+    """
+
+    type: Literal["expedite_order"]
+    order_id: int = Field(..., description="前倒しする注文ID")
+    deadline_date: str | None = Field(
+        None,
+        description="変更後の納期 (ISO8601形式。指定なしの場合は期間の開始日時で最優先にする)",
+    )
+
+
+ScenarioModification = Annotated[
+    ExtraShiftModification
+    | MaintenanceModification
+    | AddMachineModification
+    | ExpediteOrderModification,
+    Field(discriminator="type"),
+]
+
+
+class Scenario(BaseModel):
+    """
+    What-if シナリオ（現在の計画に対する変更の組み合わせ）
+    """
+
+    name: str = Field(..., min_length=1, description="シナリオ名")
+    modifications: list[ScenarioModification] = Field(
+        default_factory=list, description="現在の計画に対する変更"
+    )
+
+
+class CompareScenariosRequest(BaseModel):
+    """
+    What-if シナリオの比較用のリクエストモデル（計画は保存しない）
+    """
+
+    start_datetime: str | None = Field(
+        None,
+        description="再計画する期間の開始日時 (ISO8601形式。指定なしの場合は現在時刻)",
+    )
+    end_datetime: str = Field(..., description="再計画する期間の終了日時 (ISO8601形式)")
+    rule: Literal["edd", "spt", "cr"] = Field(
+        "edd", description="各シナリオを計画するディスパッチルール"
+    )
+    scenarios: list[Scenario] = Field(
+        ..., min_length=1, max_length=MAX_SCENARIOS, description="比較するシナリオ"
+    )
+    workers: int | None = Field(
+        None,
+        ge=1,
+        le=MAX_OPTIMIZE_WORKERS,
+        description="計算の並列数（指定なしの場合はCPU数）",
+    )
+
+
+class PlanVersionCreate(BaseModel):
+    """
+    現在の計画を計画バージョンとして保存するリクエストモデル
+    """
+
+    name: str = Field(..., min_length=1, max_length=100, description="バージョン名")
+    base_version_id: int | None = Field(
+        None,
+        description="元のバージョンID（指定した場合は元のバージョンからの差分だけを保存する）",
+    )
@@ -1,16 +1,27 @@
 # backend/app/repositories/supa_infra/__init__.py
-from app.repositories.supa_infra.common import CalendarRepository, SupabaseTableName
+from app.repositories.supa_infra.common import (
+    CalendarRepository,
+    ShiftPatternRepository,
+    SupabaseTableName,
+    TenantRepository,
+)
 from app.repositories.supa_infra.master import (
     CustomerRepository,
     EquipmentRepository,
     ProductRepository,
 )
-from app.repositories.supa_infra.transaction import OrderRepository, ScheduleRepository
+from app.repositories.supa_infra.transaction import (
+    OrderRepository,
+    PlanVersionRepository,
+    ScheduleRepository,
+)
 
 __all__ = [
     # common
     "SupabaseTableName",
     "CalendarRepository",
+    "ShiftPatternRepository",
+    "TenantRepository",
     # master
     "EquipmentRepository",
     "ProductRepository",
@@ -18,4 +29,5 @@ __all__ = [
     # transaction
     "ScheduleRepository",
     "OrderRepository",
+    "PlanVersionRepository",
 ]
@@ -1,6 +1,14 @@
 # repositories/supa_infra/common/__init__.py
 from .base_repo import BaseRepository
 from .calendar_repo import CalendarRepository
+from .shift_pattern_repo import ShiftPatternRepository
 from .table_name import SupabaseTableName
+from .tenant_repo import TenantRepository
 
-__all__ = ["SupabaseTableName", "BaseRepository", "CalendarRepository"]
+__all__ = [
+    "SupabaseTableName",
+    "BaseRepository",
+    "CalendarRepository",
+    "ShiftPatternRepository",
+    "TenantRepository",
+]
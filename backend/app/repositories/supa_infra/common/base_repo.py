@@ -1,4 +1,5 @@
 # repositories/supa_infra/common/base_repo.py
+from collections.abc import Callable
 from typing import Any, Generic, TypeVar, cast
 
 from postgrest.exceptions import APIError
@@ -10,6 +11,9 @@ logger = get_logger(__name__)
 
 T = TypeVar("T", bound=dict[str, Any])  # 型変数を定義
 
+# 1回のリクエストで取得する件数（supabase/config.toml の max_rows 以下にすること）
+PAGE_SIZE = 1000
+
 
 class BaseRepository(Generic[T]):
     """基本的なCRUD操作を共通化するための抽象クラス。"""
@@ -29,6 +33,33 @@ class BaseRepository(Generic[T]):
 
         return cast(list[T], res.data)
 
+    def fetch_all_pages(
+        self, build_query: Callable[[], Any], page_size: int = PAGE_SIZE
+    ) -> list[dict[str, Any]]:
+        """
+        クエリの結果を .range() でページごとに取得し、すべての行を返す。
+
+        PostgREST は max_rows を超える行を返さないため、件数が上限を超えうる検索に使用する。
+        .range() は呼び出すたびに条件が追加されるため、ページごとに build_query で
+        クエリを作り直す。ページの境界で行が重複・欠落しないよう、クエリは一意な順序で
+        並べること。
+
+        Args:
+            build_query: 実行前のクエリ（table().select() や rpc()）を返す関数
+            page_size: 1ページの件数
+
+        Returns:
+            すべてのページの行のリスト
+        """
+        rows: list[dict[str, Any]] = []
+        while True:
+            offset = len(rows)
+            res = build_query().range(offset, offset + page_size - 1).execute()
+            page = cast(list[dict[str, Any]], res.data or [])
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+
     def get_by_id(self, id: int) -> T | None:
         """ID指定で1件取得"""
         logger.info(f"Fetching record {id} from {self.table_name}")
@@ -18,12 +18,16 @@ class CalendarRepository(BaseRepository[T]):
         super().__init__(client, SupabaseTableName.WORK_CALENDARS.value)
 
     def get_holidays_in_range(
-        self, start_date: date, end_date: date
+        self, tenant_id: str, start_date: date, end_date: date
     ) -> list[dict[str, Any]]:
         """
         指定期間内の休日情報を取得する。
 
+        複数のテナントに所属するユーザーはRLSで他のテナントの行も見えるため、
+        テナントIDで絞り込む。
+
         Args:
+            tenant_id: テナントID
             start_date: 開始日
             end_date: 終了日
 
@@ -37,6 +41,7 @@ class CalendarRepository(BaseRepository[T]):
         res = (
             self.client.table(self.table_name)
             .select("date, is_holiday, note")
+            .eq("tenant_id", tenant_id)
             .gte("date", start_date.isoformat())
             .lte("date", end_date.isoformat())
             .execute()
@@ -105,3 +110,72 @@ class CalendarRepository(BaseRepository[T]):
         if res.data and len(res.data) > 0:
             return cast(dict[str, Any], res.data[0])
         raise ValueError(f"Failed to upsert holiday for {target_date}")
+
+    def get_holidays_by_dates(
+        self, tenant_id: str, dates: list[date]
+    ) -> list[dict[str, Any]]:
+        """
+        指定した日付の休日情報をまとめて取得する。
+
+        Args:
+            tenant_id: テナントID
+            dates: 対象日のリスト
+
+        Returns:
+            休日情報のリスト（date, is_holiday, note を含む）
+        """
+        if not dates:
+            return []
+        logger.info(f"Fetching holidays for {len(dates)} dates from {self.table_name}")
+
+        res = (
+            self.client.table(self.table_name)
+            .select("date, is_holiday, note")
+            .eq("tenant_id", tenant_id)
+            .in_("date", [d.isoformat() for d in dates])
+            .execute()
+        )
+
+        return cast(list[dict[str, Any]], res.data if res.data else [])
+
+    def bulk_upsert_holidays(
+        self,
+        tenant_id: str,
+        dates: list[date],
+        is_holiday: bool,
+        note: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        複数日の休日情報を1回のリクエスト（1つのINSERT ... ON CONFLICT文）で作成または更新する。
+
+        1文で実行されるため、途中で失敗した場合はどの日付も更新されない。
+
+        Args:
+            tenant_id: テナントID
+            dates: 対象日のリスト（重複不可）
+            is_holiday: 休日フラグ
+            note: 備考
+
+        Returns:
+            作成または更新された休日情報のリスト
+        """
+        if not dates:
+            return []
+        logger.info(f"Bulk upserting {len(dates)} holidays in {self.table_name}")
+
+        rows = [
+            {
+                "tenant_id": tenant_id,
+                "date": target_date.isoformat(),
+                "is_holiday": is_holiday,
+                "note": note,
+            }
+            for target_date in dates
+        ]
+        res = (
+            self.client.table(self.table_name)
+            .upsert(rows, on_conflict="tenant_id,date")
+            .execute()
+        )
+
+        return cast(list[dict[str, Any]], res.data if res.data else [])
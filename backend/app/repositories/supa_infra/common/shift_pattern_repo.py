@@ -0,0 +1,81 @@
+# repositories/supa_infra/common/shift_pattern_repo.py
+from typing import Any, TypeVar, cast
+
+from app.repositories.supa_infra.common.base_repo import BaseRepository
+from app.repositories.supa_infra.common.table_name import SupabaseTableName
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T", bound=dict[str, Any])
+
+
+class ShiftPatternRepository(BaseRepository[T]):
+    """勤務パターン（シフト・休憩時間）リポジトリ"""
+
+    def __init__(self, client):
+        super().__init__(client, SupabaseTableName.SHIFT_PATTERNS.value)
+
+    def get_pattern(self, tenant_id: str) -> dict[str, Any] | None:
+        """
+        テナントの勤務パターンを取得する。
+
+        複数のテナントに所属するユーザーはRLSで複数の行が見えるため、テナントIDで絞り込む。
+
+        Args:
+            tenant_id: テナントID
+
+        Returns:
+            勤務パターン（shifts, breaks, time_zone を含む）。未設定の場合はNone
+        """
+        logger.info(f"Fetching shift pattern from {self.table_name}")
+
+        res = (
+            self.client.table(self.table_name)
+            .select("*")
+            .eq("tenant_id", tenant_id)
+            .limit(1)
+            .execute()
+        )
+
+        if res.data and len(res.data) > 0:
+            return cast(dict[str, Any], res.data[0])
+        return None
+
+    def upsert_pattern(
+        self,
+        tenant_id: str,
+        shifts: list[dict[str, str]],
+        breaks: list[dict[str, str]],
+        time_zone: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        テナントの勤務パターンを作成または更新する。
+
+        Args:
+            tenant_id: テナントID
+            shifts: シフトのリスト（{"start": "HH:MM", "end": "HH:MM"}）
+            breaks: 休憩のリスト（{"start": "HH:MM", "end": "HH:MM"}）
+            time_zone: テナントのタイムゾーン（Noneの場合は変更しない）
+
+        Returns:
+            作成または更新された勤務パターン
+        """
+        logger.info(f"Upserting shift pattern in {self.table_name}")
+
+        data: dict[str, Any] = {
+            "tenant_id": tenant_id,
+            "shifts": shifts,
+            "breaks": breaks,
+        }
+        if time_zone is not None:
+            data["time_zone"] = time_zone
+        res = (
+            self.client.table(self.table_name)
+            .upsert(data, on_conflict="tenant_id")
+            .execute()
+        )
+
+        if res.data and len(res.data) > 0:
+            return cast(dict[str, Any], res.data[0])
+        raise ValueError("Failed to upsert shift pattern")
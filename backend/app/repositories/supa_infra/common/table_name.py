@@ -6,6 +6,7 @@ class SupabaseTableName(Enum):
     """Supabaseのテーブル名を定義する列挙型クラス。"""
 
     USERS = "users"
+    TENANTS = "tenants"
     PRODUCTS = "products"
     ORDERS = "orders"
     CUSTOMERS = "customers"
@@ -13,6 +14,9 @@ class SupabaseTableName(Enum):
     EQUIPMENTS = "equipments"
     EQUIPMENT_GROUPS = "equipment_groups"
     EQUIPMENT_GROUP_MEMBERS = "equipment_group_members"
+    EQUIPMENT_CALENDAR_OVERLAYS = "equipment_calendar_overlays"
     PRODUCTION_SCHEDULES = "production_schedules"
+    PLAN_VERSIONS = "plan_versions"
     WORK_CALENDARS = "work_calendars"
+    SHIFT_PATTERNS = "shift_patterns"
     # Add more table names as needed
@@ -0,0 +1,40 @@
+# repositories/supa_infra/common/tenant_repo.py
+from typing import Any, TypeVar
+
+from postgrest.exceptions import APIError
+
+from app.repositories.supa_infra.common.base_repo import BaseRepository
+from app.repositories.supa_infra.common.table_name import SupabaseTableName
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T", bound=dict[str, Any])
+
+
+class TenantRepository(BaseRepository[T]):
+    """テナント（所属の確認）リポジトリ"""
+
+    def __init__(self, client):
+        super().__init__(client, SupabaseTableName.TENANTS.value)
+
+    def is_member(self, tenant_id: str) -> bool:
+        """
+        現在のユーザー（auth.uid()）がテナントのメンバーかどうかを判定する。
+
+        RLSポリシーと同じ is_tenant_member 関数で判定する。
+
+        Args:
+            tenant_id: テナントID
+
+        Returns:
+            メンバーの場合True（テナントIDが不正な形式の場合もFalse）
+        """
+        try:
+            res = self.client.rpc(
+                "is_tenant_member", {"_tenant_id": tenant_id}
+            ).execute()
+        except APIError as e:
+            logger.warning(f"Failed to check membership of tenant {tenant_id}: {e}")
+            return False
+        return bool(res.data)
@@ -1,4 +1,5 @@
 # repositories/supa_infra/master/equipment_repo.py
+from datetime import datetime
 from typing import Any, TypeVar, cast
 
 from postgrest.exceptions import APIError
@@ -132,3 +133,53 @@ class EquipmentRepository(BaseRepository[T]):
             return None
         except Exception:
             return None
+
+    # --- Equipment Calendar Overlays (設備別稼働カレンダー) ---
+
+    def get_calendar_overlays(
+        self,
+        equipment_ids: list[int] | None = None,
+        since: datetime | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        設備別稼働カレンダー（保全・臨時稼働）を取得する。
+
+        Args:
+            equipment_ids: 対象の設備IDのリスト（Noneの場合は全設備）
+            since: この日時以降に終了する上書きのみを取得する（Noneの場合は全期間）
+
+        Returns:
+            上書きのリスト（開始日時順）
+        """
+        query = self.client.table(
+            SupabaseTableName.EQUIPMENT_CALENDAR_OVERLAYS.value
+        ).select("*")
+        if equipment_ids is not None:
+            query = query.in_("equipment_id", equipment_ids)
+        if since is not None:
+            query = query.gte("end_datetime", since.isoformat())
+        res = query.order("start_datetime").execute()
+        return cast(list[dict[str, Any]], res.data) if res.data else []
+
+    def create_calendar_overlay(self, data: dict[str, Any]) -> dict[str, Any]:
+        """設備別稼働カレンダーの上書きを作成"""
+        res = (
+            self.client.table(SupabaseTableName.EQUIPMENT_CALENDAR_OVERLAYS.value)
+            .insert(data)
+            .execute()
+        )
+        if res.data and len(res.data) > 0:
+            return cast(dict[str, Any], res.data[0])
+        raise ValueError("Failed to create equipment calendar overlay")
+
+    def delete_calendar_overlay(self, equipment_id: int, overlay_id: int) -> bool:
+        """設備別稼働カレンダーの上書きを削除"""
+        res = (
+            self.client.table(SupabaseTableName.EQUIPMENT_CALENDAR_OVERLAYS.value)
+            # postgrest-pyの型定義ではCountMethod enumが要求されるが、文字列でも動作するためignoreする
+            .delete(count="exact")  # type: ignore
+            .eq("id", overlay_id)
+            .eq("equipment_id", equipment_id)
+            .execute()
+        )
+        return res.count is not None and res.count > 0
@@ -21,6 +21,26 @@ class ProductRepository(BaseRepository[T]):
         )
         return cast(list[T], res.data)
 
+    def get_routings_by_products(self, product_ids: list[int]) -> dict[int, list[T]]:
+        """複数の製品IDに紐づく工程順序を1回のリクエストでまとめて取得
+
+        Returns:
+            製品IDごとの工程順序（sequence_order順）。工程のない製品は空のリスト
+        """
+        routings: dict[int, list[T]] = {product_id: [] for product_id in product_ids}
+        if not product_ids:
+            return routings
+        res = (
+            self.client.table(SupabaseTableName.PROCESS_ROUTINGS.value)
+            .select("*")
+            .in_("product_id", product_ids)
+            .order("sequence_order")
+            .execute()
+        )
+        for routing in cast(list[T], res.data or []):
+            routings.setdefault(routing["product_id"], []).append(routing)
+        return routings
+
     def get_routing_by_id(self, routing_id: int) -> T | None:
         """工程順序ID検索"""
         res = (
@@ -1,5 +1,6 @@
 # repositories/supabase/transaction/__init__.py
 from .order_repo import OrderRepository
+from .plan_version_repo import PlanVersionRepository
 from .schedule_repo import ScheduleRepository
 
-__all__ = ["OrderRepository", "ScheduleRepository"]
+__all__ = ["OrderRepository", "PlanVersionRepository", "ScheduleRepository"]
@@ -1,4 +1,6 @@
 # repositories/supa_infra/transaction/order_repo.py
+from typing import Any, cast
+
 from app.repositories.supa_infra.common import BaseRepository, SupabaseTableName
 
 
@@ -19,3 +21,25 @@ class OrderRepository(BaseRepository):
         self.client.table(self.table_name).update({"is_scheduled": True}).eq(
             "id", order_id
         ).execute()
+
+    def get_by_ids(self, order_ids: list[int]) -> dict[int, dict[str, Any]]:
+        """
+        複数の注文を1回のリクエストでまとめて取得する。
+
+        Args:
+            order_ids (list[int]): 注文IDのリスト。
+
+        Returns:
+            dict[int, dict[str, Any]]: 注文IDごとの注文。存在しない注文は含まれない。
+        """
+        if not order_ids:
+            return {}
+        res = (
+            self.client.table(self.table_name)
+            .select("*")
+            .in_("id", order_ids)
+            .execute()
+        )
+        return {
+            order["id"]: order for order in cast(list[dict[str, Any]], res.data or [])
+        }
@@ -0,0 +1,81 @@
+# repositories/supa_infra/transaction/plan_version_repo.py
+from typing import Any, cast
+
+from app.repositories.supa_infra.common import BaseRepository, SupabaseTableName
+
+# 差分・計画全体を除いたバージョンの項目（一覧・系統の参照用）
+VERSION_SUMMARY_COLUMNS = (
+    "id, name, base_version_id, ancestor_ids, depth, "
+    "change_count, segment_count, created_at"
+)
+
+
+class PlanVersionRepository(BaseRepository):
+    """計画バージョン（差分で保存したスナップショット）を管理するリポジトリクラス。"""
+
+    def __init__(self, client):
+        super().__init__(client, SupabaseTableName.PLAN_VERSIONS.value)
+
+    def get_versions(self) -> list[dict[str, Any]]:
+        """
+        バージョンの一覧を、差分・計画全体を除いて取得する。
+
+        Returns:
+            list[dict[str, Any]]: バージョンのリスト（作成日時順）。
+        """
+        res = (
+            self.client.table(self.table_name)
+            .select(VERSION_SUMMARY_COLUMNS)
+            .order("created_at")
+            .execute()
+        )
+        return cast(list[dict[str, Any]], res.data or [])
+
+    def get_summaries(self, version_ids: list[int]) -> dict[int, dict[str, Any]]:
+        """
+        複数のバージョンを、差分・計画全体を除いて1回のリクエストで取得する。
+
+        Args:
+            version_ids (list[int]): バージョンIDのリスト。
+
+        Returns:
+            dict[int, dict[str, Any]]: バージョンIDごとのバージョン。存在しないバージョンは含まれない。
+        """
+        if not version_ids:
+            return {}
+        res = (
+            self.client.table(self.table_name)
+            .select(VERSION_SUMMARY_COLUMNS)
+            .in_("id", version_ids)
+            .execute()
+        )
+        return {
+            version["id"]: version
+            for version in cast(list[dict[str, Any]], res.data or [])
+        }
+
+    def get_payloads(
+        self, version_ids: list[int], with_timeline: bool = True
+    ) -> dict[int, dict[str, Any]]:
+        """
+        複数のバージョンの差分（と計画全体）を1回のリクエストでまとめて取得する。
+
+        Args:
+            version_ids (list[int]): バージョンIDのリスト。
+            with_timeline (bool): Trueの場合、チェックポイントの計画全体（timeline）も取得する。
+
+        Returns:
+            dict[int, dict[str, Any]]: バージョンIDごとの id, changes（, timeline）。
+        """
+        if not version_ids:
+            return {}
+        res = (
+            self.client.table(self.table_name)
+            .select("id, changes, timeline" if with_timeline else "id, changes")
+            .in_("id", version_ids)
+            .execute()
+        )
+        return {
+            payload["id"]: {"timeline": None, **payload}
+            for payload in cast(list[dict[str, Any]], res.data or [])
+        }
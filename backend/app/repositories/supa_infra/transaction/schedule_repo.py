@@ -1,8 +1,9 @@
 # backend/app/repositories/supa_infra/transaction/schedule_repo.py
-from datetime import datetime
+from datetime import date, datetime
 from typing import Any, cast
 
 from app.repositories.supa_infra.common import BaseRepository, SupabaseTableName
+from app.utils.time_zone import get_day_boundaries, resolve_time_zone
 from supabase import Client  # type: ignore
 
 
@@ -46,8 +47,183 @@ class ScheduleRepository(BaseRepository):
         """
         self.client.table(self.table_name).insert(schedule_data).execute()
 
+    def create_many(self, schedules: list[dict[str, Any]]) -> None:
+        """複数のスケジュールデータを1回のリクエストでまとめて挿入する。
+
+        Args:
+            schedules (List[Dict[str, Any]]): 挿入するスケジュールデータのリスト。
+        """
+        if not schedules:
+            return
+        self.client.table(self.table_name).insert(schedules).execute()
+
+    def get_plan_from(
+        self, since: str, tenant_id: str | None = None
+    ) -> list[dict[str, Any]]:
+        """指定日時以降に終了するスケジュールを、工程順序の情報と共に取得する。
+
+        再計算（連鎖移動など）のためにメモリ上へ計画を展開する用途で使用する。
+
+        Args:
+            since: 基準日時 (ISO8601)。end_datetime がこれ以降のスケジュールを取得する
+            tenant_id: テナントIDで絞り込む場合に使用（複数のテナントに所属するユーザーは
+                RLSで他のテナントの行も見えるため、テナントごとのキャッシュの読み込みに使う）
+
+        Returns:
+            スケジュールのリスト（開始日時順）。
+            各要素には sequence_order, equipment_group_id を含む。
+        """
+        return self.get_plan_rows(start=since, tenant_id=tenant_id)
+
+    def get_plan_suffix(
+        self,
+        since: str,
+        *,
+        equipment_ids: list[int] | None = None,
+        order_ids: list[int] | None = None,
+    ) -> list[dict[str, Any]]:
+        """指定した設備・注文のいずれかに属し、指定日時以降に終了するスケジュールを取得する。
+
+        計画全体ではなく、変更の影響が及ぶ設備・注文の末尾だけを展開する用途で使用する。
+
+        Args:
+            since: 基準日時 (ISO8601)。end_datetime がこれ以降のスケジュールを取得する
+            equipment_ids: 設備IDのリスト
+            order_ids: 注文IDのリスト
+
+        Returns:
+            スケジュールのリスト（開始日時順、重複なし）。
+            各要素には sequence_order, equipment_group_id を含む。
+        """
+        rows: dict[int, dict[str, Any]] = {}
+        if equipment_ids:
+            for row in self.get_plan_rows(equipment_ids=equipment_ids, start=since):
+                rows[row["id"]] = row
+        if order_ids:
+            for row in self.get_plan_rows(order_ids=order_ids, start=since):
+                rows.setdefault(row["id"], row)
+        return sorted(rows.values(), key=lambda row: (row["start_datetime"], row["id"]))
+
+    def get_plan_rows(
+        self,
+        *,
+        ids: list[int] | None = None,
+        order_ids: list[int] | None = None,
+        equipment_ids: list[int] | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        tenant_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """条件に一致するスケジュールを、工程順序の情報と共に取得する。
+
+        Args:
+            ids: スケジュールIDで絞り込む場合に使用
+            order_ids: 注文IDで絞り込む場合に使用
+            equipment_ids: 設備IDで絞り込む場合に使用
+            start: この日時 (ISO8601) 以降に終了するスケジュールに絞り込む
+            end: この日時 (ISO8601) 以前に開始するスケジュールに絞り込む
+            tenant_id: テナントIDで絞り込む場合に使用
+
+        Returns:
+            スケジュールのリスト（開始日時順）。
+            各要素には sequence_order, equipment_group_id を含む。
+        """
+
+        def build_query() -> Any:
+            query = self.client.table(self.table_name).select(
+                "*, process_routings(sequence_order, equipment_group_id)"
+            )
+            if ids is not None:
+                query = query.in_("id", ids)
+            if order_ids is not None:
+                query = query.in_("order_id", order_ids)
+            if equipment_ids is not None:
+                query = query.in_("equipment_id", equipment_ids)
+            if start is not None:
+                query = query.gte("end_datetime", start)
+            if end is not None:
+                query = query.lte("start_datetime", end)
+            if tenant_id is not None:
+                query = query.eq("tenant_id", tenant_id)
+            # ページの境界で行が重複・欠落しないよう、IDまで含めて並べる
+            return query.order("start_datetime").order("id")
+
+        plan = []
+        for item in self.fetch_all_pages(build_query):
+            routing = cast(dict[str, Any], item.pop("process_routings", None) or {})
+            plan.append(
+                {
+                    **item,
+                    "sequence_order": routing.get("sequence_order"),
+                    "equipment_group_id": routing.get("equipment_group_id"),
+                }
+            )
+        return plan
+
+    def get_plan_in_periods(
+        self, periods: list[tuple[str, str]]
+    ) -> list[dict[str, Any]]:
+        """いずれかの期間と重なるスケジュールを、工程順序の情報と共に取得する。
+
+        DB側の get_schedules_in_periods 関数が期間のインデックスで検索するため、
+        期間外のスケジュールを走査しない。
+
+        Args:
+            periods: (開始日時, 終了日時) (ISO8601) のリスト
+
+        Returns:
+            スケジュールのリスト（開始日時順）。
+            各要素には sequence_order, equipment_group_id を含む。
+        """
+        if not periods:
+            return []
+        params = {
+            "p_starts": [start for start, _ in periods],
+            "p_ends": [end for _, end in periods],
+        }
+        # 関数の結果は開始日時・IDの順に並ぶため、そのままページに分けて取得できる
+        return self.fetch_all_pages(
+            lambda: self.client.rpc("get_schedules_in_periods", params)
+        )
+
+    def apply_changes(
+        self,
+        updates: list[dict[str, Any]],
+        inserts: list[dict[str, Any]] | None = None,
+        deletes: list[int] | None = None,
+    ) -> dict[str, int]:
+        """スケジュールの更新・追加・削除を1回のRPCでまとめて適用する。
+
+        DB側の apply_schedule_changes 関数は1トランザクションで実行されるため、
+        いずれかの更新対象が見つからない場合はすべての変更がロールバックされる。
+
+        Args:
+            updates: 更新内容のリスト（id, equipment_id, start_datetime, end_datetime）
+            inserts: 追加するスケジュールデータのリスト
+            deletes: 削除するスケジュールIDのリスト
+
+        Returns:
+            Dict[str, int]: updated, inserted, deleted の件数。
+
+        Raises:
+            APIError: Supabase APIリクエストが失敗した場合。
+        """
+        res = self.client.rpc(
+            "apply_schedule_changes",
+            {
+                "p_updates": updates,
+                "p_inserts": inserts or [],
+                "p_deletes": deletes or [],
+            },
+        ).execute()
+        return cast(dict[str, int], res.data)
+
     def get_by_period(
-        self, start_date: str, end_date: str, equipment_group_id: int | None = None
+        self,
+        start_date: str,
+        end_date: str,
+        equipment_group_id: int | None = None,
+        time_zone: str | None = None,
     ) -> list[dict[str, Any]]:
         """指定された期間内の生産スケジュールを関連データと共に取得する。
 
@@ -55,6 +231,7 @@ class ScheduleRepository(BaseRepository):
             start_date: 取得開始日 (ISO8601 / YYYY-MM-DD)
             end_date: 取得終了日 (ISO8601 / YYYY-MM-DD)
             equipment_group_id: (Optional) 特定の設備グループで絞り込む場合に使用
+            time_zone: (Optional) 期間の日付を解釈するタイムゾーン（Noneの場合はUTC）
 
         Returns:
             スケジュールオブジェクトのリスト。
@@ -63,9 +240,12 @@ class ScheduleRepository(BaseRepository):
         # Supabaseのリレーション解決を使用して関連データを取得
         # orders -> products のネストされた関係も取得する
         # スケジュールが期間と重複するものを取得: schedule.start <= end_date AND schedule.end >= start_date
-        # 日付をISO8601形式に変換（YYYY-MM-DDをYYYY-MM-DDTHH:MM:SS+00:00形式に）
-        start_datetime_str = f"{start_date}T00:00:00+00:00"
-        end_datetime_str = f"{end_date}T23:59:59.999999+00:00"
+        # 日付をタイムゾーンの日の境界（UTCのISO8601形式）に変換
+        period_start, period_end = get_day_boundaries(
+            resolve_time_zone(time_zone)
+        ).period(date.fromisoformat(start_date[:10]), date.fromisoformat(end_date[:10]))
+        start_datetime_str = period_start.isoformat()
+        end_datetime_str = period_end.isoformat()
 
         query = (
             self.client.table(self.table_name)
@@ -120,7 +300,7 @@ class ScheduleRepository(BaseRepository):
             if (process_routing := item.get("process_routings"))
             and (group_id := process_routing.get("equipment_group_id")) is not None
         }
-        
+
         # 設備グループ名のマップを作成
         equipment_group_names = {}
         if equipment_group_ids:
@@ -133,7 +313,7 @@ class ScheduleRepository(BaseRepository):
             if groups_res.data:
                 for group in groups_res.data:
                     equipment_group_names[group["id"]] = group["name"]
-        
+
         # レスポンスを整形してフラットな構造にする
         schedules = []
         for item in schedule_data:
@@ -161,7 +341,7 @@ class ScheduleRepository(BaseRepository):
                 if item.get("equipments")
                 else {}
             )
-            
+
             # 設備グループ名を取得
             equipment_group_name = None
             if process_routing and process_routing.get("equipment_group_id"):
@@ -0,0 +1,45 @@
+# routers/errors.py
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+
+from app.services.schedule_service import (
+    EquipmentNotFoundError,
+    HoldUnavailableError,
+    InvalidScheduleRequestError,
+    OrderNotFoundError,
+    ScheduleConflictError,
+    ScheduleNotFoundError,
+)
+
+
+@contextmanager
+def http_errors() -> Iterator[None]:
+    """サービス層の例外を HTTPException に変換する。
+
+    - ScheduleNotFoundError, OrderNotFoundError, EquipmentNotFoundError: 404
+    - ScheduleConflictError: 409（衝突と調整内容を detail に含める）
+    - HoldUnavailableError: 409
+    - InvalidScheduleRequestError: 422
+    - ValueError: 400
+    """
+    try:
+        yield
+    except (ScheduleNotFoundError, OrderNotFoundError, EquipmentNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e)) from None
+    except ScheduleConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": str(e),
+                "conflicts": e.conflicts,
+                "adjustments": e.adjustments,
+            },
+        ) from None
+    except HoldUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from None
+    except InvalidScheduleRequestError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
@@ -1,17 +1,38 @@
 # routers/master/calendars.py
-from datetime import date, datetime, timedelta
-from typing import Any
+from datetime import date, timedelta
+from typing import Any, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from postgrest.exceptions import APIError
 
-from app.dependencies import get_current_tenant_id, get_supabase_client
+from app.dependencies import (
+    get_calendar_cache,
+    get_current_tenant_id,
+    get_load_cache,
+    get_schedule_service,
+    get_supabase_client,
+)
+from app.models.common.shift_pattern import ShiftPatternUpdate
 from app.models.common.work_calendar import (
     WorkCalendar,
     WorkCalendarCreate,
     WorkCalendarUpdate,
 )
 from app.repositories.supa_infra.common.calendar_repo import CalendarRepository
+from app.repositories.supa_infra.common.shift_pattern_repo import (
+    ShiftPatternRepository,
+)
+from app.routers.errors import http_errors
+from app.services.calendar_service import (
+    CalendarCache,
+    compile_shift_pattern,
+    row_time_zone,
+)
+from app.services.quick_quote_service import LoadCache
+from app.services.schedule_service import ScheduleService
+from app.utils.calendar import DEFAULT_SHIFT_PATTERN, ShiftPattern
 from app.utils.logger import get_logger
+from app.utils.time_zone import resolve_time_zone
 from pydantic import BaseModel, Field
 from supabase import Client
 
@@ -19,6 +40,9 @@ calendar_router = APIRouter(prefix="/calendars", tags=["Master (Calendars)"])
 
 logger = get_logger(__name__)
 
+# カレンダー変更の影響分析（report: 影響を受ける予約を返す、reflow: 影響を受ける予約を再配置する）
+ImpactMode = Literal["report", "reflow"]
+
 
 class CalendarQueryParams(BaseModel):
     """カレンダー取得用のクエリパラメータ"""
@@ -35,15 +59,25 @@ class BatchUpdateRequest(BaseModel):
     note: str | None = Field(None, description="備考")
 
 
-def get_calendar_repo(client: Client = Depends(get_supabase_client)) -> CalendarRepository:
+def get_calendar_repo(
+    client: Client = Depends(get_supabase_client),
+) -> CalendarRepository:
     """カレンダーリポジトリを取得する"""
     return CalendarRepository(client)
 
 
+def get_shift_pattern_repo(
+    client: Client = Depends(get_supabase_client),
+) -> ShiftPatternRepository:
+    """勤務パターンリポジトリを取得する"""
+    return ShiftPatternRepository(client)
+
+
 @calendar_router.get("/")
 def get_calendars(
     year: int,
     month: int,
+    tenant_id: str = Depends(get_current_tenant_id),
     repo: CalendarRepository = Depends(get_calendar_repo),
 ) -> list[dict[str, Any]]:
     """
@@ -52,6 +86,7 @@ def get_calendars(
     Args:
         year: 年
         month: 月（1-12）
+        tenant_id: テナントID
 
     Returns:
         カレンダー情報のリスト
@@ -65,69 +100,229 @@ def get_calendars(
     else:
         end_date = date(year, month + 1, 1) - timedelta(days=1)
 
-    return repo.get_holidays_in_range(start_date, end_date)
+    return repo.get_holidays_in_range(tenant_id, start_date, end_date)
 
 
 @calendar_router.post("/")
 def upsert_calendar(
     calendar_data: WorkCalendarCreate,
+    impact: ImpactMode | None = Query(
+        None,
+        description="影響分析（report: 影響の報告、reflow: 影響を受ける予約の再配置）",
+    ),
     tenant_id: str = Depends(get_current_tenant_id),
     repo: CalendarRepository = Depends(get_calendar_repo),
+    service: ScheduleService = Depends(get_schedule_service),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
+    load_cache: LoadCache = Depends(get_load_cache),
 ) -> dict[str, Any]:
     """
     カレンダー情報を作成または更新
 
     Args:
         calendar_data: カレンダーデータ
+        impact: 影響分析のモード（Noneの場合は分析しない）
         tenant_id: テナントID
         repo: カレンダーリポジトリ
+        service: 生産スケジュールサービス（影響分析・再配置に使用）
+        calendar_cache: 休日情報キャッシュ（更新後に破棄する）
+        load_cache: 簡易見積もりの作業量のキャッシュ（稼働時間が変わるため更新後に破棄する）
 
     Returns:
         作成/更新されたカレンダー情報
+        （impact 指定時は、影響を受ける予約・注文と再配置の結果 impact を含む）
     """
-    logger.info(f"Upserting calendar for {calendar_data.date}")
-    return repo.create_or_update_holiday(
+    logger.info(f"Upserting calendar for {calendar_data.date} (impact={impact})")
+    loaded = None
+    if impact is not None:
+        with http_errors():
+            loaded = service.load_calendar_impact([calendar_data.date])
+    result = repo.create_or_update_holiday(
         tenant_id=tenant_id,
         target_date=calendar_data.date,
         is_holiday=calendar_data.is_holiday,
         note=calendar_data.note,
     )
+    calendar_cache.invalidate(tenant_id)
+    load_cache.invalidate(tenant_id)
+    if loaded is None:
+        return result
+    with http_errors():
+        resolved = service.resolve_calendar_impact(loaded, reflow=impact == "reflow")
+    return {**result, "impact": resolved}
 
 
 @calendar_router.post("/batch")
 def batch_update_calendars(
     batch_data: BatchUpdateRequest,
+    impact: ImpactMode | None = Query(
+        None,
+        description="影響分析（report: 影響の報告、reflow: 影響を受ける予約の再配置）",
+    ),
     tenant_id: str = Depends(get_current_tenant_id),
     repo: CalendarRepository = Depends(get_calendar_repo),
+    service: ScheduleService = Depends(get_schedule_service),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
+    load_cache: LoadCache = Depends(get_load_cache),
 ) -> dict[str, Any]:
     """
     複数日のカレンダー情報を一括更新
 
+    変更が必要な日付を1回のupsertでまとめて保存する。
+    1文で実行されるため、失敗した場合はどの日付も更新されない。
+
     Args:
         batch_data: 一括更新データ
+        impact: 影響分析のモード（Noneの場合は分析しない）。対象は実際に変更する日付のみ
         tenant_id: テナントID
         repo: カレンダーリポジトリ
+        service: 生産スケジュールサービス（影響分析・再配置に使用）
+        calendar_cache: 休日情報キャッシュ（更新後に破棄する）
+        load_cache: 簡易見積もりの作業量のキャッシュ（稼働時間が変わるため更新後に破棄する）
 
     Returns:
-        更新結果
+        更新結果（日付ごとの結果 results を含む）
+        - created: 新規作成
+        - updated: 既存の設定を更新
+        - unchanged: 既に同じ設定のため更新不要
+        - duplicate: リクエスト内で重複している日付
+        impact 指定時は、影響を受ける予約・注文と再配置の結果 impact を含む
     """
-    logger.info(f"Batch updating {len(batch_data.dates)} dates")
+    logger.info(f"Batch updating {len(batch_data.dates)} dates (impact={impact})")
 
-    updated_count = 0
-    for target_date in batch_data.dates:
+    unique_dates = list(dict.fromkeys(batch_data.dates))
+    existing = {
+        date.fromisoformat(item["date"]): item
+        for item in repo.get_holidays_by_dates(tenant_id, unique_dates)
+    }
+
+    statuses: dict[date, str] = {}
+    for target_date in unique_dates:
+        current = existing.get(target_date)
+        if current is None:
+            statuses[target_date] = "created"
+        elif (
+            current.get("is_holiday") == batch_data.is_holiday
+            and current.get("note") == batch_data.note
+        ):
+            statuses[target_date] = "unchanged"
+        else:
+            statuses[target_date] = "updated"
+
+    changed_dates = [d for d in unique_dates if statuses[d] != "unchanged"]
+    loaded = None
+    if impact is not None:
+        with http_errors():
+            loaded = service.load_calendar_impact(changed_dates)
+    if changed_dates:
         try:
-            repo.create_or_update_holiday(
+            repo.bulk_upsert_holidays(
                 tenant_id=tenant_id,
-                target_date=target_date,
+                dates=changed_dates,
                 is_holiday=batch_data.is_holiday,
                 note=batch_data.note,
             )
-            updated_count += 1
-        except Exception as e:
-            logger.error(f"Failed to update {target_date}: {e}")
-            # 継続して処理する
+        except APIError as e:
+            logger.error(f"Failed to batch update calendars: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail="カレンダーの一括更新に失敗しました（どの日付も更新されていません）",
+            ) from None
+        # 日付ごとではなく、一括更新の後に1回だけ破棄する
+        calendar_cache.invalidate(tenant_id)
+        load_cache.invalidate(tenant_id)
 
-    return {
-        "updated_count": updated_count,
+    results = []
+    seen: set[date] = set()
+    for target_date in batch_data.dates:
+        status = "duplicate" if target_date in seen else statuses[target_date]
+        seen.add(target_date)
+        results.append({"date": target_date.isoformat(), "status": status})
+
+    response: dict[str, Any] = {
+        "updated_count": len(changed_dates),
         "total_count": len(batch_data.dates),
+        "results": results,
+    }
+    if impact is not None and loaded is not None:
+        with http_errors():
+            response["impact"] = service.resolve_calendar_impact(
+                loaded, reflow=impact == "reflow"
+            )
+    return response
+
+
+@calendar_router.get("/shift-pattern")
+def get_shift_pattern(
+    tenant_id: str = Depends(get_current_tenant_id),
+    repo: ShiftPatternRepository = Depends(get_shift_pattern_repo),
+) -> dict[str, Any]:
+    """
+    テナントの勤務パターン（シフト・休憩時間）を取得
+
+    Returns:
+        勤務パターン（休憩を除いた稼働区間 working_intervals、タイムゾーン time_zone を含む）。
+        未設定の場合はデフォルトの勤務パターン（is_default=True）
+    """
+    logger.info("Fetching shift pattern")
+    row = repo.get_pattern(tenant_id)
+    try:
+        pattern = compile_shift_pattern(row)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e)) from None
+    time_zone = row_time_zone(row)
+    if pattern is None:
+        return {
+            **DEFAULT_SHIFT_PATTERN.to_dict(),
+            "time_zone": time_zone,
+            "is_default": True,
+        }
+    return {**pattern.to_dict(), "time_zone": time_zone, "is_default": False}
+
+
+@calendar_router.put("/shift-pattern")
+def update_shift_pattern(
+    pattern_data: ShiftPatternUpdate,
+    tenant_id: str = Depends(get_current_tenant_id),
+    repo: ShiftPatternRepository = Depends(get_shift_pattern_repo),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
+    load_cache: LoadCache = Depends(get_load_cache),
+) -> dict[str, Any]:
+    """
+    テナントの勤務パターン（シフト・休憩時間）を更新
+
+    保存前に稼働区間テーブルへコンパイルして検証するため、
+    不正な勤務パターン（24時間を超えるシフトなど）や不正なタイムゾーンは保存されない。
+
+    Args:
+        pattern_data: 勤務パターン
+        tenant_id: テナントID
+        repo: 勤務パターンリポジトリ
+        calendar_cache: 休日情報キャッシュ（更新後に破棄する）
+        load_cache: 簡易見積もりの作業量のキャッシュ（稼働時間が変わるため更新後に破棄する）
+
+    Returns:
+        更新後の勤務パターン
+    """
+    logger.info("Updating shift pattern")
+    shifts = [item.model_dump() for item in pattern_data.shifts]
+    breaks = [item.model_dump() for item in pattern_data.breaks]
+    try:
+        pattern = ShiftPattern.from_time_ranges(shifts, breaks)
+        resolve_time_zone(pattern_data.time_zone)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from None
+
+    repo.upsert_pattern(
+        tenant_id=tenant_id,
+        shifts=shifts,
+        breaks=breaks,
+        time_zone=pattern_data.time_zone,
+    )
+    calendar_cache.invalidate(tenant_id)
+    load_cache.invalidate(tenant_id)
+    return {
+        **pattern.to_dict(),
+        "time_zone": pattern_data.time_zone,
+        "is_default": False,
     }
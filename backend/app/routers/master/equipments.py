@@ -1,12 +1,22 @@
 # routers/master/equipments.py
+from typing import Any
+
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.dependencies import get_current_tenant_id, get_equipment_repo
+from app.dependencies import (
+    get_current_tenant_id,
+    get_equipment_repo,
+    get_schedule_service,
+)
 from app.models.master.equipment_schemas import (
+    EquipmentCalendarOverlayCreate,
     EquipmentCreate,
+    EquipmentOutageCreate,
     EquipmentUpdate,
 )
 from app.repositories.supa_infra.master.equipment_repo import EquipmentRepository
+from app.routers.errors import http_errors
+from app.services.schedule_service import ScheduleService
 from app.utils.logger import get_logger
 
 equipment_router = APIRouter(prefix="/equipments", tags=["Master (Equipments)"])
@@ -68,3 +78,70 @@ def delete_equipment(
     if not success:
         raise HTTPException(status_code=404, detail="Not found")
     return {"status": "deleted"}
+
+
+@equipment_router.get("/{equipment_id}/calendar")
+def get_equipment_calendar(
+    equipment_id: int, repo: EquipmentRepository = Depends(get_equipment_repo)
+):
+    """設備別稼働カレンダー（保全・臨時稼働）を取得"""
+    logger.info(f"Fetching calendar overlays for equipment {equipment_id}")
+    return repo.get_calendar_overlays(equipment_ids=[equipment_id])
+
+
+@equipment_router.post("/{equipment_id}/calendar")
+def create_equipment_calendar_overlay(
+    equipment_id: int,
+    overlay_data: EquipmentCalendarOverlayCreate,
+    tenant_id: str = Depends(get_current_tenant_id),
+    repo: EquipmentRepository = Depends(get_equipment_repo),
+):
+    """
+    設備別稼働カレンダーに保全・臨時稼働の時間帯を登録
+
+    登録した時間帯は、以降のシミュレーション・確定時に
+    設備ごとの稼働可能区間としてテナントの稼働カレンダーに重ねて考慮される。
+    """
+    logger.info(f"Creating calendar overlay for equipment {equipment_id}")
+    data = overlay_data.with_tenant_id(tenant_id)
+    data["equipment_id"] = equipment_id
+    try:
+        return repo.create_calendar_overlay(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+
+@equipment_router.delete("/{equipment_id}/calendar/{overlay_id}")
+def delete_equipment_calendar_overlay(
+    equipment_id: int,
+    overlay_id: int,
+    repo: EquipmentRepository = Depends(get_equipment_repo),
+):
+    """設備別稼働カレンダーの時間帯を削除"""
+    logger.info(f"Deleting calendar overlay {overlay_id} of equipment {equipment_id}")
+    if not repo.delete_calendar_overlay(equipment_id, overlay_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"status": "deleted"}
+
+
+@equipment_router.post("/{equipment_id}/outage")
+def register_equipment_outage(
+    equipment_id: int,
+    outage_data: EquipmentOutageCreate,
+    service: ScheduleService = Depends(get_schedule_service),
+) -> dict[str, Any]:
+    """
+    設備の故障を登録し、停止期間と重なる予約だけを同じ設備グループの設備へ移す
+
+    停止期間は保全として設備別稼働カレンダーに登録し、以降の計画でも使用不可とする。
+    停止期間より前に始まっていた予約は停止の開始で打ち切り、残りの作業だけを移す。
+    移動で前工程の終了が遅れた後続工程は後ろへずらし、予約の変更は1回のRPCでまとめて保存する。
+    予約の変更の保存に失敗した場合は、登録した停止期間を削除してエラーを返す。
+    """
+    logger.info(
+        f"Registering outage of equipment {equipment_id} from "
+        f"{outage_data.start_datetime} to {outage_data.end_datetime}"
+        f" (dry_run={outage_data.dry_run})"
+    )
+    with http_errors():
+        return service.register_outage(equipment_id, outage_data)
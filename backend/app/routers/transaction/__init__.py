@@ -1,11 +1,15 @@
 # backend/app/routers/transaction/__init__.py
 from .orders import orders_router
+from .plan_versions import plan_versions_router
 from .production_schedules import production_schedules_router
+from .scenarios import scenarios_router
 
 # TODO: Initialize master-related routers here
 
 
 __all__ = [
     "orders_router",
+    "plan_versions_router",
     "production_schedules_router",
+    "scenarios_router",
 ]
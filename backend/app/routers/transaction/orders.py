@@ -1,24 +1,51 @@
 # routers/transaction/orders.py
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import UTC, date, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from app.dependencies import (
+    get_calendar_cache,
     get_current_tenant_id,
     get_equipment_repo,
+    get_hold_store,
+    get_load_cache,
     get_order_repo,
     get_product_repo,
     get_schedule_repo,
+    get_schedule_service,
 )
 from app.models.transaction.order_schema import (
     OrderCreate,
+    OrderExpediteRequest,
+    OrderMaxQuantityRequest,
+    OrderMultiSimulateRequest,
+    OrderQuickQuoteRequest,
     OrderSimulateRequest,
+    OrderSweepRequest,
     OrderUpdate,
 )
+from app.repositories.supa_infra.common.calendar_repo import CalendarRepository
+from app.repositories.supa_infra.common.shift_pattern_repo import (
+    ShiftPatternRepository,
+)
 from app.repositories.supa_infra.master.equipment_repo import EquipmentRepository
 from app.repositories.supa_infra.master.product_repo import ProductRepository
 from app.repositories.supa_infra.transaction.order_repo import OrderRepository
 from app.repositories.supa_infra.transaction.schedule_repo import ScheduleRepository
+from app.routers.errors import http_errors
 from app.scheduler_logic import schedule_order
+from app.services.calendar_service import CalendarCache, TenantCalendarConfig
+from app.services.hold_service import CapacityHoldStore
+from app.services.quick_quote_service import LoadCache, build_quick_quote
+from app.services.quote_service import (
+    PlanningSnapshot,
+    build_max_quantity_response,
+    build_multi_response,
+    build_sweep_response,
+)
+from app.services.schedule_service import ScheduleService
 from app.services.simulation_service import build_simulate_response
+from app.utils.equipment_calendar import EquipmentCalendars
 from app.utils.logger import get_logger
 
 orders_router = APIRouter(prefix="/orders", tags=["Transaction (Orders)"])
@@ -39,6 +66,37 @@ def _map_order_response(order: dict) -> dict:
     return mapped
 
 
+def _get_calendar_config(
+    tenant_id: str, schedule_repo: ScheduleRepository, calendar_cache: CalendarCache
+) -> TenantCalendarConfig:
+    """
+    テナントの休日情報と勤務パターンをキャッシュから取得する。
+
+    計画が読み込み済みの期間を越えた場合は、参照時にキャッシュが延長される。
+    """
+    return calendar_cache.get_config(
+        tenant_id,
+        CalendarRepository(schedule_repo.client),
+        date.today(),
+        shift_pattern_repo=ShiftPatternRepository(schedule_repo.client),
+    )
+
+
+def _get_equipment_calendars(
+    tenant_id: str, schedule_repo: ScheduleRepository, calendar_cache: CalendarCache
+) -> EquipmentCalendars:
+    """
+    テナントの稼働カレンダーに、現在以降の設備別の保全・臨時稼働を重ねた
+    設備ごとの稼働可能区間テーブルを構築する。
+    """
+    overlays = EquipmentRepository(schedule_repo.client).get_calendar_overlays(
+        since=datetime.now(UTC)
+    )
+    return EquipmentCalendars(
+        _get_calendar_config(tenant_id, schedule_repo, calendar_cache), overlays
+    )
+
+
 @orders_router.post("/")
 def create_order(
     order_data: OrderCreate,
@@ -77,22 +135,39 @@ def update_order(
     order_id: int,
     order_data: OrderUpdate,
     repo: OrderRepository = Depends(get_order_repo),
+    service: ScheduleService = Depends(get_schedule_service),
 ):
-    """注文を更新"""
+    """
+    注文を更新
+
+    ステータスを canceled にした場合は、POST /{order_id}/cancel と同じく
+    注文の現在以降の予約を削除し、空いた設備の後続の予約を前詰めする。
+    """
     logger.info(f"Updating order {order_id}")
-    result = repo.update(order_id, order_data.model_dump(exclude_unset=True))
+    data = order_data.model_dump(exclude_unset=True)
+    if data.get("status") == "canceled":
+        with http_errors():
+            service.release_order(order_id)
+        data["is_scheduled"] = False
+    result = repo.update(order_id, data)
     if not result:
         raise HTTPException(status_code=404, detail="Not found")
     return _map_order_response(result)
 
 
 @orders_router.delete("/{order_id}")
-def delete_order(order_id: int, repo: OrderRepository = Depends(get_order_repo)):
-    """注文を削除"""
+def delete_order(
+    order_id: int,
+    service: ScheduleService = Depends(get_schedule_service),
+):
+    """
+    注文を削除
+
+    注文の予約は連鎖削除されるため、空いた設備の後続の予約を前詰めする。
+    """
     logger.info(f"Deleting order {order_id}")
-    success = repo.delete(order_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Not found")
+    with http_errors():
+        service.delete_order(order_id)
     return {"status": "deleted"}
 
 
@@ -103,16 +178,22 @@ def simulate_schedule_without_id(
     product_repo: ProductRepository = Depends(get_product_repo),
     equipment_repo: EquipmentRepository = Depends(get_equipment_repo),
     schedule_repo: ScheduleRepository = Depends(get_schedule_repo),
+    holds: CapacityHoldStore = Depends(get_hold_store),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
 ):
     """
     スケジュールのシミュレーションを行う（DB保存なし）。
     新規注文作成時にorder_idなしで呼び出される。
+
+    hold=True の場合、結果を仮押さえとして保持し、後続のシミュレーションで
+    占有済みとして扱う。仮押さえは hold_ttl_seconds 経過後に自動で失効する。
     """
     logger.info(
         f"Simulating schedule with product_id={order_data.product_id}, quantity={order_data.quantity}"
     )
 
     try:
+        calendars = _get_equipment_calendars(tenant_id, schedule_repo, calendar_cache)
         # dry_run=True で実行（order_id は None）
         result = schedule_order(
             order_id=None,
@@ -122,13 +203,191 @@ def simulate_schedule_without_id(
             schedule_repo=schedule_repo,
             tenant_id=tenant_id,
             dry_run=True,
+            calendar_config=calendars.calendar_config,
+            reserved_until=holds.reserved_until(tenant_id),
+            equipment_calendars=calendars,
         )
-        return build_simulate_response(
+        response = build_simulate_response(
             result, order_data.deadline_date, product_repo, equipment_repo
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from None
 
+    if order_data.hold:
+        hold = holds.place(
+            tenant_id=tenant_id,
+            product_id=order_data.product_id,
+            quantity=order_data.quantity,
+            schedules=result,
+            ttl_seconds=order_data.hold_ttl_seconds,
+        )
+        response["hold_id"] = hold.hold_id
+        response["hold_expires_at"] = hold.expires_at.isoformat()
+
+    return response
+
+
+@orders_router.post("/simulate/quick")
+def simulate_quick_quote(
+    quote_data: OrderQuickQuoteRequest,
+    tenant_id: str = Depends(get_current_tenant_id),
+    product_repo: ProductRepository = Depends(get_product_repo),
+    schedule_repo: ScheduleRepository = Depends(get_schedule_repo),
+    holds: CapacityHoldStore = Depends(get_hold_store),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
+    load_cache: LoadCache = Depends(get_load_cache),
+):
+    """
+    キャッシュした設備の作業量と工程の式から、回答納期を概算する（DB保存なし）。
+
+    設備への割り当ては試算しないため、結果は見積もりの範囲（earliest_deadline〜
+    latest_deadline）と共に返す。正確な回答納期は /simulate で求める。
+    """
+    logger.info(
+        f"Quick quote for product_id={quote_data.product_id}, quantity={quote_data.quantity}"
+    )
+
+    try:
+        availability = EquipmentCalendars(
+            _get_calendar_config(tenant_id, schedule_repo, calendar_cache)
+        ).shared()
+        return build_quick_quote(
+            load_cache.get(tenant_id, schedule_repo, availability),
+            product_repo,
+            availability,
+            quote_data.product_id,
+            quote_data.quantity,
+            quote_data.deadline_date,
+            reserved_until=holds.reserved_until(tenant_id),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+
+@orders_router.post("/simulate/sweep")
+def simulate_quantity_sweep(
+    sweep_data: OrderSweepRequest,
+    tenant_id: str = Depends(get_current_tenant_id),
+    product_repo: ProductRepository = Depends(get_product_repo),
+    schedule_repo: ScheduleRepository = Depends(get_schedule_repo),
+    holds: CapacityHoldStore = Depends(get_hold_store),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
+):
+    """
+    数量ごとの回答納期・リードタイムを試算する（DB保存なし）。
+
+    工程・設備の空き時刻・稼働カレンダーは1度だけ読み込み、
+    すべての数量を同じスナップショットに対して試算する。
+    """
+    logger.info(
+        f"Simulating quantity sweep for product_id={sweep_data.product_id}, "
+        f"quantities={sweep_data.quantities}"
+    )
+
+    try:
+        snapshot = PlanningSnapshot(
+            product_repo,
+            schedule_repo,
+            _get_equipment_calendars(tenant_id, schedule_repo, calendar_cache),
+            reserved_until=holds.reserved_until(tenant_id),
+        )
+        return build_sweep_response(
+            snapshot,
+            sweep_data.product_id,
+            sweep_data.quantities,
+            sweep_data.deadline_date,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+
+@orders_router.post("/simulate/max-quantity")
+def simulate_max_quantity(
+    quote_data: OrderMaxQuantityRequest,
+    tenant_id: str = Depends(get_current_tenant_id),
+    product_repo: ProductRepository = Depends(get_product_repo),
+    equipment_repo: EquipmentRepository = Depends(get_equipment_repo),
+    schedule_repo: ScheduleRepository = Depends(get_schedule_repo),
+    holds: CapacityHoldStore = Depends(get_hold_store),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
+):
+    """
+    希望納期までに対応可能な最大数量と、その数量のスケジュールを試算する（DB保存なし）。
+
+    工程・設備の空き時刻・稼働カレンダーは1度だけ読み込み、
+    同じスナップショットに対して数量を二分探索する。
+    """
+    logger.info(
+        f"Simulating max quantity for product_id={quote_data.product_id}, "
+        f"deadline={quote_data.deadline_date}"
+    )
+
+    try:
+        snapshot = PlanningSnapshot(
+            product_repo,
+            schedule_repo,
+            _get_equipment_calendars(tenant_id, schedule_repo, calendar_cache),
+            reserved_until=holds.reserved_until(tenant_id),
+        )
+        return build_max_quantity_response(
+            snapshot,
+            quote_data.product_id,
+            quote_data.deadline_date,
+            quote_data.max_quantity,
+            product_repo,
+            equipment_repo,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+
+@orders_router.post("/simulate-multi")
+def simulate_multi_line(
+    quote_data: OrderMultiSimulateRequest,
+    tenant_id: str = Depends(get_current_tenant_id),
+    product_repo: ProductRepository = Depends(get_product_repo),
+    equipment_repo: EquipmentRepository = Depends(get_equipment_repo),
+    schedule_repo: ScheduleRepository = Depends(get_schedule_repo),
+    holds: CapacityHoldStore = Depends(get_hold_store),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
+):
+    """
+    複数明細の見積もりを行う（DB保存なし）。
+
+    明細の順に同じ設備の空き時刻へ割り当てるため、後の明細の回答納期は
+    先の明細が使用する設備の能力を考慮したものになる。
+    """
+    logger.info(f"Simulating {len(quote_data.lines)} quote lines")
+
+    try:
+        snapshot = PlanningSnapshot(
+            product_repo,
+            schedule_repo,
+            _get_equipment_calendars(tenant_id, schedule_repo, calendar_cache),
+            reserved_until=holds.reserved_until(tenant_id),
+        )
+        return build_multi_response(
+            snapshot,
+            [line.model_dump() for line in quote_data.lines],
+            product_repo,
+            equipment_repo,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+
+@orders_router.delete("/holds/{hold_id}")
+def release_hold(
+    hold_id: str,
+    tenant_id: str = Depends(get_current_tenant_id),
+    holds: CapacityHoldStore = Depends(get_hold_store),
+):
+    """仮押さえを解除する"""
+    logger.info(f"Releasing capacity hold {hold_id}")
+    if holds.release(tenant_id, hold_id) is None:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    return {"status": "released"}
+
 
 @orders_router.post("/{order_id}/simulate")
 def simulate_schedule(
@@ -138,6 +397,8 @@ def simulate_schedule(
     product_repo: ProductRepository = Depends(get_product_repo),
     equipment_repo: EquipmentRepository = Depends(get_equipment_repo),
     schedule_repo: ScheduleRepository = Depends(get_schedule_repo),
+    holds: CapacityHoldStore = Depends(get_hold_store),
+    calendar_cache: CalendarCache = Depends(get_calendar_cache),
 ):
     """
     スケジュールのシミュレーションを行う（DB保存なし）。
@@ -149,6 +410,7 @@ def simulate_schedule(
         raise HTTPException(status_code=404, detail="Order not found")
 
     try:
+        calendars = _get_equipment_calendars(tenant_id, schedule_repo, calendar_cache)
         # dry_run=True で実行
         result = schedule_order(
             order_id=order["id"],
@@ -158,6 +420,9 @@ def simulate_schedule(
             schedule_repo=schedule_repo,
             tenant_id=tenant_id,
             dry_run=True,
+            calendar_config=calendars.calendar_config,
+            reserved_until=holds.reserved_until(tenant_id),
+            equipment_calendars=calendars,
         )
         return build_simulate_response(
             result, order.get("desired_deadline"), product_repo, equipment_repo
@@ -169,34 +434,50 @@ def simulate_schedule(
 @orders_router.post("/{order_id}/confirm")
 def confirm_order(
     order_id: int,
-    tenant_id: str = Depends(get_current_tenant_id),
-    order_repo: OrderRepository = Depends(get_order_repo),
-    product_repo: ProductRepository = Depends(get_product_repo),
-    schedule_repo: ScheduleRepository = Depends(get_schedule_repo),
+    hold_id: str | None = Query(None, description="昇格する仮押さえID"),
+    holds: CapacityHoldStore = Depends(get_hold_store),
+    service: ScheduleService = Depends(get_schedule_service),
 ):
     """
     スケジュールを確定・保存し、注文ステータスをconfirmedにする。
+
+    hold_id が指定された場合は、再計算せずに仮押さえしたスケジュールを本予約に昇格する。
     """
     logger.info(f"Confirming order {order_id}")
-    order = order_repo.get_by_id(order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    with http_errors():
+        result = service.confirm_order(order_id, hold_id, holds)
+    return {"status": "confirmed", "schedules": result}
 
-    try:
-        # 1. 実際に保存 (dry_run=False)
-        result = schedule_order(
-            order_id=order["id"],
-            product_id=order["product_id"],
-            quantity=order["quantity"],
-            product_repo=product_repo,
-            schedule_repo=schedule_repo,
-            tenant_id=tenant_id,
-            dry_run=False,
-        )
 
-        # 2. ステータス更新 & is_scheduled フラグ更新
-        order_repo.update(order_id, {"status": "confirmed", "is_scheduled": True})
+@orders_router.post("/{order_id}/expedite")
+def expedite_order(
+    order_id: int,
+    request: OrderExpediteRequest,
+    service: ScheduleService = Depends(get_schedule_service),
+):
+    """
+    注文を特急注文として最も早い位置に割り込ませ、押し出された予約を後ろへずらす。
 
-        return {"status": "confirmed", "schedules": result}
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e)) from None
+    計画全体を組み直さず、割り込みと重なる予約とその後続工程だけを連鎖的に移動し、
+    変更（特急注文の追加・既存の予約の移動・特急注文の既存の予約の削除）を
+    1回のRPCでまとめて保存する。完了が遅れた注文と新しい完了日時を返す。
+    """
+    logger.info(f"Expediting order {order_id} (dry_run={request.dry_run})")
+    with http_errors():
+        return service.expedite_order(order_id, request)
+
+
+@orders_router.post("/{order_id}/cancel")
+def cancel_order(
+    order_id: int,
+    service: ScheduleService = Depends(get_schedule_service),
+):
+    """
+    注文をキャンセルし、ステータスをcanceledにする。
+
+    注文の現在以降の予約を削除し、空いた設備の後続の予約を前詰めする。
+    予約の削除と前詰めは1回のRPCでまとめて保存する。
+    """
+    logger.info(f"Canceling order {order_id}")
+    with http_errors():
+        return service.cancel_order(order_id)
@@ -0,0 +1,161 @@
+# routers/transaction/plan_versions.py
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.dependencies import (
+    get_current_tenant_id,
+    get_plan_version_cache,
+    get_plan_version_repo,
+    get_schedule_repo,
+)
+from app.models.transaction.schedule import PlanVersionCreate
+from app.repositories.supa_infra.transaction.plan_version_repo import (
+    PlanVersionRepository,
+)
+from app.repositories.supa_infra.transaction.schedule_repo import ScheduleRepository
+from app.services.plan_version_service import (
+    PlanVersionCache,
+    Timeline,
+    build_version_record,
+    diff_timeline_versions,
+    diff_versions,
+    timeline_rows,
+    to_timeline,
+    version_paths,
+)
+from app.utils.logger import get_logger
+
+plan_versions_router = APIRouter(
+    prefix="/plan-versions", tags=["Transaction (Plan Versions)"]
+)
+
+logger = get_logger(__name__)
+
+
+@plan_versions_router.get("/")
+def get_plan_versions(
+    repo: PlanVersionRepository = Depends(get_plan_version_repo),
+) -> list[dict[str, Any]]:
+    """計画バージョンの一覧を取得する（差分・計画全体は含まない）。"""
+    return repo.get_versions()
+
+
+@plan_versions_router.post("/")
+def create_plan_version(
+    request: PlanVersionCreate,
+    tenant_id: str = Depends(get_current_tenant_id),
+    repo: PlanVersionRepository = Depends(get_plan_version_repo),
+    schedule_repo: ScheduleRepository = Depends(get_schedule_repo),
+    cache: PlanVersionCache = Depends(get_plan_version_cache),
+) -> dict[str, Any]:
+    """
+    現在の計画を名前付きのバージョンとして保存する。
+
+    元のバージョンを指定した場合は、元のバージョンの計画からの差分だけを保存する
+    （一定の世代ごとに計画全体を保存し、読み込み時に適用する差分の数を抑える）。
+    同じバージョンを元に複数のバージョンを作成して、計画を分岐させることができる。
+    """
+    logger.info(
+        f"Creating plan version '{request.name}'"
+        f" (base_version_id={request.base_version_id})"
+    )
+    timeline = to_timeline(schedule_repo.get_plan_rows())
+    base, base_timeline = None, None
+    if request.base_version_id is not None:
+        base = _get_version(repo, request.base_version_id)
+        base_timeline = _get_timeline(cache, tenant_id, base, repo)
+
+    record = build_version_record(request.name, timeline, base, base_timeline)
+    try:
+        created = repo.create({**record, "tenant_id": tenant_id})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    return {
+        key: value
+        for key, value in created.items()
+        if key not in ("changes", "timeline")
+    }
+
+
+@plan_versions_router.get("/diff")
+def diff_plan_versions(
+    from_version_id: int = Query(..., description="比較元のバージョンID"),
+    to_version_id: int = Query(..., description="比較先のバージョンID"),
+    tenant_id: str = Depends(get_current_tenant_id),
+    repo: PlanVersionRepository = Depends(get_plan_version_repo),
+    cache: PlanVersionCache = Depends(get_plan_version_cache),
+) -> dict[str, Any]:
+    """
+    2つのバージョンの計画の変更（追加・削除・変更されたスケジュール）を返す。
+
+    共通の祖先からそれぞれのバージョンまでの差分だけを読み込むため、
+    計画全体ではなく変更の件数に比例した時間で比較する。
+    共通の祖先がない場合は、両方の計画全体を比較する。
+    """
+    versions = repo.get_summaries([from_version_id, to_version_id])
+    for version_id in (from_version_id, to_version_id):
+        if version_id not in versions:
+            raise HTTPException(status_code=404, detail="Not found")
+    version_from, version_to = versions[from_version_id], versions[to_version_id]
+
+    common, path_from, path_to = version_paths(version_from, version_to)
+    if common is None:
+        changes = diff_timeline_versions(
+            _get_timeline(cache, tenant_id, version_from, repo),
+            _get_timeline(cache, tenant_id, version_to, repo),
+        )
+    else:
+        payloads = repo.get_payloads([*path_from, *path_to], with_timeline=False)
+        if any(version_id not in payloads for version_id in [*path_from, *path_to]):
+            raise HTTPException(status_code=404, detail="Not found")
+        changes = diff_versions(
+            [payloads[version_id]["changes"] for version_id in path_from],
+            [payloads[version_id]["changes"] for version_id in path_to],
+        )
+    return {
+        "from_version_id": from_version_id,
+        "to_version_id": to_version_id,
+        "common_version_id": common,
+        "change_count": len(changes),
+        "changes": changes,
+    }
+
+
+@plan_versions_router.get("/{version_id}")
+def get_plan_version(
+    version_id: int,
+    tenant_id: str = Depends(get_current_tenant_id),
+    repo: PlanVersionRepository = Depends(get_plan_version_repo),
+    cache: PlanVersionCache = Depends(get_plan_version_cache),
+) -> dict[str, Any]:
+    """
+    バージョンの計画を取得する。
+
+    直近の計画全体を保存したバージョンから差分を順に適用して計画を復元する
+    （読み込み済みの祖先の計画はメモリ上のキャッシュから再利用する）。
+    """
+    version = _get_version(repo, version_id)
+    timeline = _get_timeline(cache, tenant_id, version, repo)
+    return {**version, "schedules": timeline_rows(timeline)}
+
+
+def _get_version(repo: PlanVersionRepository, version_id: int) -> dict[str, Any]:
+    """バージョンを取得する（存在しない場合は 404）。"""
+    version = repo.get_summaries([version_id]).get(version_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return version
+
+
+def _get_timeline(
+    cache: PlanVersionCache,
+    tenant_id: str,
+    version: dict[str, Any],
+    repo: PlanVersionRepository,
+) -> Timeline:
+    """バージョンの計画を復元する（祖先の差分が見つからない場合は 404）。"""
+    try:
+        return cache.get_timeline(tenant_id, version, repo)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from None
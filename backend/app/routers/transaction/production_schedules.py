@@ -1,11 +1,18 @@
 # routers/transaction/production_schedules.py
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
 
-from app.dependencies import get_schedule_repo
-from app.models.transaction.schedule import ScheduleUpdate
-from app.repositories.supa_infra.transaction.schedule_repo import ScheduleRepository
+from app.dependencies import get_schedule_service
+from app.models.transaction.schedule import (
+    CompactRequest,
+    OptimizeRequest,
+    RescheduleRequest,
+    ScheduleBatchUpdate,
+    ScheduleUpdate,
+)
+from app.routers.errors import http_errors
+from app.services.schedule_service import ScheduleService
 from app.utils.logger import get_logger
 
 production_schedules_router = APIRouter(
@@ -22,36 +29,174 @@ def get_production_schedules(
     equipment_group_id: int | None = Query(
         None, description="特定の設備グループで絞り込む場合に使用"
     ),
-    repo: ScheduleRepository = Depends(get_schedule_repo),
+    service: ScheduleService = Depends(get_schedule_service),
 ) -> list[dict[str, Any]]:
     """
     指定された期間内の生産スケジュールを取得する。
 
     製品名、工程名、注文番号、設備名などが結合された状態で返される。
+    期間の日付はテナントのタイムゾーンで解釈する。
     """
     logger.info(
         f"Fetching production schedules from {start_date} to {end_date}"
         f"{f' for equipment_group_id={equipment_group_id}' if equipment_group_id else ''}"
     )
-    return repo.get_by_period(start_date, end_date, equipment_group_id)
+    with http_errors():
+        return service.get_by_period(start_date, end_date, equipment_group_id)
+
+
+@production_schedules_router.get("/conflicts")
+def get_production_schedule_conflicts(
+    start_date: str = Query(..., description="検証開始日 (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="検証終了日 (YYYY-MM-DD)"),
+    equipment_group_id: int | None = Query(
+        None, description="特定の設備グループの工程に関係する違反のみ返す場合に使用"
+    ),
+    service: ScheduleService = Depends(get_schedule_service),
+) -> list[dict[str, Any]]:
+    """
+    指定された期間内のスケジュールの制約違反を検出する。
+
+    設備ごと・注文ごとにソートして走査し、ダブルブッキング（overlap）、
+    工程順序違反（precedence）、稼働時間外の配置（off_hours）を返す。
+    期間外のスケジュールとの関係は検証しない。
+    """
+    logger.info(f"Detecting schedule conflicts from {start_date} to {end_date}")
+    with http_errors():
+        return service.find_conflicts(start_date, end_date, equipment_group_id)
+
+
+@production_schedules_router.get("/kpis")
+def get_production_schedule_kpis(
+    start_date: str = Query(..., description="評価開始日 (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="評価終了日 (YYYY-MM-DD)"),
+    service: ScheduleService = Depends(get_schedule_service),
+) -> dict[str, Any]:
+    """
+    指定された期間の計画のKPIを求める。
+
+    期間と重なるスケジュールの注文について、メイクスパン・納期遅れ（合計・最大・遅れた注文数）と、
+    設備ごとの期間内の稼働率（稼働時間に対する作業時間の割合）を返す。
+    注文の完了時刻は期間外を含む最後のセグメントの終了時刻とする。
+    """
+    logger.info(f"Evaluating schedule KPIs from {start_date} to {end_date}")
+    with http_errors():
+        kpis = service.evaluate_kpis(start_date, end_date)
+    return {"start_date": start_date, "end_date": end_date, **kpis}
+
+
+@production_schedules_router.patch("/batch")
+def batch_update_production_schedules(
+    batch_data: ScheduleBatchUpdate,
+    snap: bool = Query(
+        True,
+        description=(
+            "日時を変更したスケジュールを稼働時間に吸着させる"
+            "（snap=false で指定どおりの日時で保存する）"
+        ),
+    ),
+    service: ScheduleService = Depends(get_schedule_service),
+) -> dict[str, Any]:
+    """
+    ガントチャート上で複数のバーをまとめて調整する。
+
+    日時を変更したスケジュールは、単体の調整と同じく稼働時間に吸着させる（snap=false を除く）。
+    すべての変更を適用した状態で、重なり・工程順序・稼働時間の制約をまとめて検証し、
+    違反がなければ1回のリクエスト（1トランザクション）で保存する。
+    1件でも違反・不在があればどの変更も保存しない（all-or-nothing）。
+    """
+    logger.info(
+        f"Batch updating production schedules {[i.id for i in batch_data.updates]}"
+    )
+    with http_errors():
+        return service.batch_update(batch_data, snap)
+
+
+@production_schedules_router.post("/reschedule")
+def reschedule_production_schedules(
+    request: RescheduleRequest,
+    service: ScheduleService = Depends(get_schedule_service),
+) -> dict[str, Any]:
+    """
+    期間内に作業が残っている確定済みの注文を、ディスパッチルールに従って計画し直す。
+
+    対象の注文の未着手の工程をすべて外し、設備が空く・工程が着手可能になるイベントを
+    時刻順に処理して再割り当てする。再計画しない予約は動かさず、
+    キャンセルされた注文の予約は削除する。
+    結果は1回のリクエスト（1トランザクション）でまとめて置き換える。
+    """
+    with http_errors():
+        return service.reschedule(request)
+
+
+@production_schedules_router.post("/optimize")
+def optimize_production_schedules(
+    request: OptimizeRequest,
+    service: ScheduleService = Depends(get_schedule_service),
+) -> dict[str, Any]:
+    """
+    期間内の確定済みの注文を、制限時間内の局所探索で計画し直す。
+
+    ディスパッチルールによる再スケジュールの結果を初期解とし、注文の工程の順序の入れ替えと
+    同じ設備グループ内での設備の付け替えで、重み付きの納期遅れ + メイクスパンを改善する。
+    並列数を指定した場合は、同じ初期解から異なる乱数列の探索をプロセスプールで並列に行い、
+    最良の結果を採用する。見つかった最良解を再スケジュールと同じく1回のリクエストで保存し、
+    最良解が更新された経過（trace）をあわせて返す。
+    """
+    with http_errors():
+        return service.optimize(request)
+
+
+@production_schedules_router.post("/compact")
+def compact_production_schedules(
+    request: CompactRequest,
+    service: ScheduleService = Depends(get_schedule_service),
+) -> dict[str, Any]:
+    """
+    指定日時以降に始まる予約を、空いた稼働時間へ前詰めする。
+
+    設備ごとに予約を開始日時の順に前へ詰め、同じ注文の前工程の終了より前には移動しない。
+    注文の削除・キャンセル時は影響を受けた設備に対して自動で実行されるため、
+    計画を手動で編集して空いた時間を詰める場合などに使う。
+    """
+    with http_errors():
+        return service.compact(request)
 
 
 @production_schedules_router.patch("/{schedule_id}")
 def update_production_schedule(
     schedule_id: int,
     schedule_data: ScheduleUpdate,
-    repo: ScheduleRepository = Depends(get_schedule_repo),
+    cascade: bool = Query(
+        False, description="後続工程と衝突する予約を連鎖的に再スケジュールする"
+    ),
+    snap: bool = Query(
+        True,
+        description=(
+            "稼働時間に吸着させ、稼働時間を保ったまま終了日時を再計算する"
+            "（snap=false で指定どおりの日時で保存する）"
+        ),
+    ),
+    service: ScheduleService = Depends(get_schedule_service),
 ) -> dict[str, Any]:
     """
     ガントチャート上でのドラッグ&ドロップによるスケジュール手動調整。
 
     開始・終了日時、担当設備を変更することができます。
+    レスポンスの conflicts には、変更したスケジュールが関係する制約違反が含まれます。
+    開始・終了日時を変更した場合は、スケジューラと同じカレンダー規則で開始日時を
+    稼働時間に合わせ、稼働時間（分）を保ったまま終了日時と日ごとの分割を再計算します。
+    調整内容は adjustments に含まれます。snap=false の場合は指定どおりの日時で保存します。
+    cascade=true の場合、同じ注文の後続工程と、移動先で重なる同一設備の予約を
+    後ろへずらし、変更をまとめて1回で保存します。
     """
-    logger.info(f"Updating production schedule {schedule_id}")
-    try:
-        # exclude_unset=True により、指定されたフィールドのみ更新される
-        result = repo.update(schedule_id, schedule_data.model_dump(exclude_unset=True))
-        return result
-    except ValueError as e:
-        # レコードが存在しない、または更新に失敗した場合
-        raise HTTPException(status_code=404, detail=str(e)) from None
+    # 日時を変更しない場合（設備のみの変更など）は吸着しない
+    snap = snap and (
+        schedule_data.start_datetime is not None
+        or schedule_data.end_datetime is not None
+    )
+    logger.info(
+        f"Updating production schedule {schedule_id} (cascade={cascade}, snap={snap})"
+    )
+    with http_errors():
+        return service.update(schedule_id, schedule_data, cascade=cascade, snap=snap)
@@ -0,0 +1,31 @@
+# routers/transaction/scenarios.py
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from app.dependencies import get_schedule_service
+from app.models.transaction.schedule import CompareScenariosRequest
+from app.routers.errors import http_errors
+from app.services.schedule_service import ScheduleService
+from app.utils.logger import get_logger
+
+scenarios_router = APIRouter(prefix="/scenarios", tags=["Transaction (Scenarios)"])
+
+logger = get_logger(__name__)
+
+
+@scenarios_router.post("/compare")
+def compare_scenarios(
+    request: CompareScenariosRequest,
+    service: ScheduleService = Depends(get_schedule_service),
+) -> dict[str, Any]:
+    """
+    現在の計画に対する What-if シナリオを計画し直し、KPIを並べて返す（保存しない）。
+
+    期間内の計画・注文・設備グループ・設備の上書きを1度だけ読み込み、シナリオごとに
+    変更（臨時稼働・保全・設備の追加・注文の前倒し）を適用したコピーを作って、
+    再スケジュールと同じディスパッチルールで計画し直す。シナリオはプロセスプールで並列に計算し、
+    変更なしの計画（baseline）のKPIと、シナリオごとのKPI・baselineとの差分を返す。
+    """
+    with http_errors():
+        return service.compare_scenarios(request)
@@ -3,18 +3,156 @@
 
 注文に対して、製品の工程順序に基づいて生産スケジュールを作成する。
 カレンダーユーティリティを使用して稼働時間（平日 9:00 - 17:00）内でスケジュールを割り当てる。
+設備ごとの保全・臨時稼働は、設備別の稼働可能区間テーブル（EquipmentCalendars）で考慮する。
+時刻は内部ではエポック秒の整数で扱い、ISO文字列への変換は結果の作成時のみ行う。
 """
 
+import math
+from collections.abc import Callable
 from datetime import datetime
 from typing import Any
 
 from app.repositories.supa_infra.master.product_repo import ProductRepository
 from app.repositories.supa_infra.transaction.schedule_repo import ScheduleRepository
-from app.utils.calendar import (
-    CalendarConfig,
-    get_next_available_start_time,
-    split_work_across_days,
-)
+from app.utils.calendar import CalendarConfig, from_epoch_seconds, to_epoch_seconds
+from app.utils.equipment_calendar import EquipmentCalendars, Interval
+
+# (工程, 割り当てた設備ID, 分割後の区間のリスト)
+PlannedStep = tuple[dict[str, Any], int, list[Interval]]
+
+
+class MachineTimeline:
+    """
+    設備ごとの空き時刻（エポック秒）。
+
+    設備の最終終了時刻は、最初に参照された時点で設備ごとに1回だけ取得する。
+    fork した子は親の取得結果を共有し、自身の割り当て（book）だけを別に保持するため、
+    同じ読み込み結果に対して複数の計画を試算できる。
+    """
+
+    def __init__(
+        self,
+        schedule_repo: ScheduleRepository | None = None,
+        reserved_until: dict[int, datetime] | None = None,
+        parent: "MachineTimeline | None" = None,
+    ):
+        """
+        Args:
+            schedule_repo: 設備の最終終了時刻の取得に使用するリポジトリ
+            reserved_until: 設備ごとの仮押さえ終了時刻（仮押さえ済みの区間は占有扱い）
+            parent: 取得結果を共有する親（fork で使用）
+        """
+        self._schedule_repo = schedule_repo
+        self._reserved = {
+            machine_id: to_epoch_seconds(until)
+            for machine_id, until in (reserved_until or {}).items()
+        }
+        self._parent = parent
+        self._free_at: dict[int, int] = {}
+
+    def free_at(self, machine_id: int) -> int:
+        """設備が空く時刻（エポック秒。予約がない場合は0）"""
+        if machine_id in self._free_at:
+            return self._free_at[machine_id]
+        if self._parent is not None:
+            return self._parent.free_at(machine_id)
+        free_at = self._load(machine_id)
+        self._free_at[machine_id] = free_at
+        return free_at
+
+    def book(self, machine_id: int, end: int) -> None:
+        """設備を end（エポック秒）まで占有済みにする。"""
+        self._free_at[machine_id] = max(self.free_at(machine_id), end)
+
+    def fork(self) -> "MachineTimeline":
+        """取得結果を共有し、割り当てだけを別に保持する子を作成する。"""
+        return MachineTimeline(parent=self)
+
+    def _load(self, machine_id: int) -> int:
+        # 設備の最終終了時刻を取得（最終終了時刻がない場合は制約なし）
+        last_end = (
+            self._schedule_repo.get_last_end_time(machine_id)
+            if self._schedule_repo is not None
+            else None
+        )
+        free_at = to_epoch_seconds(last_end) if last_end else 0
+        # 仮押さえがある場合は、その終了時刻まで設備を占有済みとみなす
+        return max(free_at, self._reserved.get(machine_id, 0))
+
+
+def routing_duration_seconds(routing: dict[str, Any], quantity: int) -> int:
+    """工程の所要時間（段取り時間 + 単位時間 × 数量）。秒未満は切り上げる。"""
+    setup_time_sec = routing.get("setup_time_seconds", 0) or 0
+    unit_time_sec = float(routing["unit_time_seconds"])
+    return math.ceil(setup_time_sec + (unit_time_sec * quantity))
+
+
+def plan_routings(
+    routings: list[dict[str, Any]],
+    durations: list[int],
+    start: int,
+    machines_for_group: Callable[[int], list[int]],
+    timeline: MachineTimeline,
+    equipment_calendars: EquipmentCalendars,
+) -> list[PlannedStep]:
+    """
+    工程を順に、最も早く開始できる設備へ割り当てる（DBアクセスなし）。
+
+    Args:
+        routings: 工程のリスト（sequence_order順）
+        durations: 工程ごとの所要時間（秒）
+        start: 最初の工程の開始基準時刻（エポック秒）
+        machines_for_group: 設備グループIDから設備IDのリストを返す関数
+        timeline: 設備ごとの空き時刻（割り当てた工程の終了時刻で更新される）
+        equipment_calendars: 設備ごとの稼働可能区間テーブル
+
+    Returns:
+        工程ごとの (工程, 設備ID, 分割後の区間のリスト)
+
+    Raises:
+        ValueError: 設備グループにメンバーが存在しない場合
+    """
+    planned: list[PlannedStep] = []
+    current_process_start = start
+
+    for routing, duration in zip(routings, durations, strict=True):
+        # 設備グループに属する設備IDを取得
+        equipment_group_id = routing["equipment_group_id"]
+        machine_ids = machines_for_group(equipment_group_id)
+
+        if not machine_ids:
+            raise ValueError(
+                f"設備グループID {equipment_group_id} に設備が見つかりません"
+            )
+
+        # 各設備について開始可能な時刻を計算し、最も早く開始できる設備を選定
+        best: tuple[int, int] | None = None
+        for machine_id in machine_ids:
+            # 前工程が終わった時間と設備が空く時間の遅い方を基準とする
+            base_start = max(timeline.free_at(machine_id), current_process_start)
+
+            # 設備の稼働可能区間テーブルを二分探索して実際の開始時刻を決定
+            actual_start = equipment_calendars.for_equipment(
+                machine_id
+            ).next_available_epoch(base_start)
+
+            if best is None or actual_start < best[1]:
+                best = (machine_id, actual_start)
+
+        assert best is not None
+        machine_id, actual_start = best
+
+        # 所要時間が長い場合、複数日（シフト帯）に分割してスケジュールを作成
+        segments = equipment_calendars.for_equipment(machine_id).split_epoch(
+            actual_start, duration
+        )
+        planned.append((routing, machine_id, segments))
+
+        # 次工程の開始基準時間は、最後のセグメントの終了時刻
+        current_process_start = segments[-1][1]
+        timeline.book(machine_id, current_process_start)
+
+    return planned
 
 
 def schedule_order(
@@ -27,6 +165,8 @@ def schedule_order(
     start_time: datetime | None = None,
     dry_run: bool = False,
     calendar_config: CalendarConfig | None = None,
+    reserved_until: dict[int, datetime] | None = None,
+    equipment_calendars: EquipmentCalendars | None = None,
 ) -> list[dict[str, Any]]:
     """
     注文に対してスケジュールを作成する。
@@ -41,6 +181,9 @@ def schedule_order(
         start_time: スケジュール開始基準時刻（指定なしの場合は現在時刻）
         dry_run: Trueの場合、DBに保存せずに計算結果のみを返す
         calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
+        reserved_until: 設備ごとの仮押さえ終了時刻（仮押さえ済みの区間は占有扱い）
+        equipment_calendars: 設備ごとの稼働可能区間テーブル
+            （Noneの場合は calendar_config のみから構築し、設備ごとの上書きはなし）
 
     Returns:
         作成されたスケジュールのリスト
@@ -54,76 +197,36 @@ def schedule_order(
     if not routings:
         raise ValueError(f"製品ID {product_id} に対する工程が見つかりません")
 
-    created_schedules = []
+    # 結果の日時はテナントのタイムゾーンで表す（未設定の場合は開始基準時刻のタイムゾーン）
+    tz = calendar_config.tz if calendar_config is not None else None
     # 最初の工程の開始基準時間（指定がない場合は現在時刻）
-    current_process_start = start_time if start_time else datetime.now().astimezone()
-
-    for routing in routings:
-        # 工程の情報を取得
-        equipment_group_id = routing["equipment_group_id"]
-        setup_time_sec = routing.get("setup_time_seconds", 0) or 0
-        unit_time_sec = float(routing["unit_time_seconds"])
-
-        # 所要時間を計算（段取り時間 + 単位時間 × 数量）
-        total_duration_sec = setup_time_sec + (unit_time_sec * quantity)
-        total_duration_min = total_duration_sec / 60
+    reference = start_time if start_time else datetime.now(tz).astimezone(tz)
+    tz = tz or reference.tzinfo
 
-        # 設備グループに属する設備IDを取得
-        machine_ids = _get_equipment_ids_by_group(product_repo, equipment_group_id)
-
-        if not machine_ids:
-            raise ValueError(
-                f"設備グループID {equipment_group_id} に設備が見つかりません"
-            )
-
-        # 各設備について、開始可能な時刻を計算
-        candidates = []
-        for machine_id in machine_ids:
-            # 設備の最終終了時刻を取得
-            last_end = schedule_repo.get_last_end_time(machine_id)
-
-            # 設備が空く時間（最終終了時刻がない場合は開始基準時刻）
-            machine_free_at = last_end if last_end else current_process_start
-
-            # 前工程が終わった時間と設備が空く時間の遅い方を基準とする
-            base_start = max(machine_free_at, current_process_start)
-
-            # カレンダーロジックを適用して実際の開始時刻を決定
-            actual_start = get_next_available_start_time(
-                base_start, total_duration_min, calendar_config
-            )
-
-            candidates.append(
-                {
-                    "machine_id": machine_id,
-                    "start": actual_start,
-                    "duration_sec": total_duration_sec,
-                }
-            )
+    if equipment_calendars is None:
+        equipment_calendars = EquipmentCalendars(calendar_config, tz=tz)
 
-        # 最も早く開始できる設備を選定
-        best = min(candidates, key=lambda x: x["start"])  # type: ignore
-        start_time = best["start"]  # type: ignore
-
-        if start_time is None:
-            raise ValueError("開始時刻が取得できません")
-        elif type(start_time) is not datetime:
-            raise ValueError("開始時刻の型が正しくありません")
-
-        # 所要時間が長い場合、複数日に分割してスケジュールを作成
-        schedule_segments = split_work_across_days(
-            start_time, total_duration_min, calendar_config
-        )
+    # 以降の計算はエポック秒の整数で行い、ISO文字列への変換は結果の作成時のみ行う
+    planned = plan_routings(
+        routings,
+        [routing_duration_seconds(routing, quantity) for routing in routings],
+        to_epoch_seconds(reference),
+        lambda group_id: get_equipment_ids_by_group(product_repo, group_id),
+        MachineTimeline(schedule_repo, reserved_until),
+        equipment_calendars,
+    )
 
+    created_schedules = []
+    for routing, machine_id, segments in planned:
         # 各セグメント（日別のスケジュール）をデータベースに保存
-        for segment_start, segment_end in schedule_segments:
+        for segment_start, segment_end in segments:
             schedule_data = {
                 "tenant_id": tenant_id,
                 "order_id": order_id,
                 "process_routing_id": routing["id"],
-                "equipment_id": best["machine_id"],
-                "start_datetime": segment_start.isoformat(),
-                "end_datetime": segment_end.isoformat(),
+                "equipment_id": machine_id,
+                "start_datetime": from_epoch_seconds(segment_start, tz).isoformat(),
+                "end_datetime": from_epoch_seconds(segment_end, tz).isoformat(),
             }
 
             # Dry Runモードでなければデータベースに保存
@@ -132,13 +235,10 @@ def schedule_order(
 
             created_schedules.append(schedule_data)
 
-        # 次工程の開始基準時間は、最後のセグメントの終了時刻
-        current_process_start = schedule_segments[-1][1]
-
     return created_schedules
 
 
-def _get_equipment_ids_by_group(
+def get_equipment_ids_by_group(
     product_repo: ProductRepository, group_id: int
 ) -> list[int]:
     """
@@ -158,3 +258,30 @@ def _get_equipment_ids_by_group(
         .execute()
     )
     return [row["equipment_id"] for row in res.data] if res.data else []  # type: ignore
+
+
+def get_equipment_ids_by_groups(
+    product_repo: ProductRepository, group_ids: list[int]
+) -> dict[int, list[int]]:
+    """
+    複数の設備グループについて、所属する設備IDを1回のリクエストでまとめて取得する。
+
+    Args:
+        product_repo: 製品リポジトリ（equipment_group_membersテーブルへのアクセスに使用）
+        group_ids: 設備グループIDのリスト
+
+    Returns:
+        設備グループIDごとの設備IDのリスト（メンバーがいないグループは空のリスト）
+    """
+    members: dict[int, list[int]] = {group_id: [] for group_id in group_ids}
+    if not group_ids:
+        return members
+    res = (
+        product_repo.client.table("equipment_group_members")
+        .select("equipment_group_id, equipment_id")
+        .in_("equipment_group_id", group_ids)
+        .execute()
+    )
+    for row in res.data or []:  # type: ignore
+        members.setdefault(row["equipment_group_id"], []).append(row["equipment_id"])
+    return members
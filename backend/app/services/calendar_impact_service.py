@@ -0,0 +1,249 @@
+"""
+カレンダー変更の影響分析サービスモジュール
+
+休日・稼働日の変更で稼働時間が変わる日と重なる予約を、日付の期間で引く
+（ScheduleRepository.get_plan_in_periods。DB側の期間のインデックスで検索する）。
+再配置する場合は、影響を受ける予約だけを新しいカレンダーで置き直し、
+押し出された後続工程・同じ設備の予約を ripple_reflow で後ろへずらす。
+計画は全体ではなく、影響を受ける予約の設備・注文と、連鎖が及ぶ設備・注文の
+末尾だけを読み込む（reflow_affected_suffix）。
+"""
+
+from collections.abc import Callable, Iterable
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Any
+
+from app.services.ripple_service import (
+    PlanSegment,
+    build_change_set,
+    build_segments,
+    delayed_orders,
+    order_completions,
+    ripple_closure,
+    ripple_reflow,
+)
+from app.utils.calendar import CalendarConfig
+from app.utils.equipment_calendar import EquipmentCalendars
+from app.utils.time_zone import get_day_boundaries
+
+
+class CalendarImpact:
+    """
+    カレンダー変更前に取得した、変更する日と重なる予約。
+
+    Attributes:
+        dates: 変更する日付
+        previous_config: 変更前のカレンダー設定（変更する日がない場合は None）
+        periods: 変更する日の期間（date_periods の戻り値）
+        rows: 変更する日と重なる予約
+    """
+
+    def __init__(
+        self,
+        dates: list[date],
+        previous_config: CalendarConfig | None,
+        periods: list[tuple[str, str]],
+        rows: list[dict[str, Any]],
+    ):
+        self.dates = dates
+        self.previous_config = previous_config
+        self.periods = periods
+        self.rows = rows
+
+
+class CalendarReflow:
+    """
+    カレンダー変更による再配置の結果。
+
+    Attributes:
+        reflowed: 変更した日と重なり、置き直したセグメント
+        rippled: 置き直したセグメントに押し出された予約
+        delayed_orders: 完了が遅れた注文（order_id, previous_end, new_end, delay_seconds）
+    """
+
+    def __init__(
+        self,
+        reflowed: list[PlanSegment],
+        rippled: list[PlanSegment],
+        delayed_orders: list[dict[str, Any]],
+    ):
+        self.reflowed = reflowed
+        self.rippled = rippled
+        self.delayed_orders = delayed_orders
+
+    def change_set(self) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """ScheduleRepository.apply_changes の入力（更新・追加）を作成する。"""
+        return build_change_set([*self.reflowed, *self.rippled])
+
+
+def date_periods(dates: Iterable[date], tz: tzinfo) -> list[tuple[str, str]]:
+    """
+    日付を連続する日ごとにまとめ、各期間の開始・終了日時（ISO8601, UTC）を返す。
+
+    終了は期間の最終日の翌日 0:00 の直前（DayBoundaries.period と同じ）。
+
+    Args:
+        dates: 日付（重複・順不同可）
+        tz: 日の境界を判定するタイムゾーン
+
+    Returns:
+        (開始日時, 終了日時) のリスト（日付順）
+    """
+    boundaries = get_day_boundaries(tz)
+    periods: list[tuple[str, str]] = []
+    ranges: list[list[date]] = []
+    for day in sorted(set(dates)):
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    for first, last in ranges:
+        start, end = boundaries.period(first, last)
+        periods.append((start.isoformat(), end.isoformat()))
+    return periods
+
+
+def summarize_impact(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    影響を受ける予約と注文をまとめる。
+
+    Args:
+        rows: 変更した日と重なるスケジュール（ScheduleRepository.get_plan_in_periods の戻り値）
+
+    Returns:
+        影響を受ける予約 schedules（開始日時順）と注文ID order_ids
+    """
+    return {
+        "schedules": [
+            {
+                "id": row["id"],
+                "order_id": row.get("order_id"),
+                "equipment_id": row["equipment_id"],
+                "start_datetime": row["start_datetime"],
+                "end_datetime": row["end_datetime"],
+            }
+            for row in rows
+        ],
+        "order_ids": sorted(
+            {row["order_id"] for row in rows if row.get("order_id") is not None}
+        ),
+    }
+
+
+def reflow_affected(
+    rows: list[dict[str, Any]],
+    affected_ids: Iterable[int],
+    previous_config: CalendarConfig | None,
+    calendar_config: CalendarConfig | None,
+    now: datetime,
+    equipment_calendars: EquipmentCalendars | None = None,
+) -> CalendarReflow:
+    """
+    変更した日と重なる予約だけを新しいカレンダーで置き直す（DBアクセスなし）。
+
+    作業量は変更前のカレンダーで算出するため、休日になった日の作業は次の稼働時間へ移る。
+    着手済み（now より前に開始）の予約は置き直さない。
+
+    Args:
+        rows: 最初の変更日以降に終了するスケジュール
+            （ScheduleRepository.get_plan_from・get_plan_suffix の戻り値）
+        affected_ids: 変更した日と重なるスケジュールID
+        previous_config: 変更前のカレンダー設定
+        calendar_config: 変更後のカレンダー設定
+        now: 現在日時
+        equipment_calendars: 変更後のカレンダー設定に設備ごとの保全・臨時稼働を重ねた
+            稼働可能区間テーブル（指定時は置き直し・連鎖の配置に使う）
+
+    Returns:
+        再配置の結果
+    """
+    segments = build_segments(rows, previous_config)
+    previous_end = order_completions(segments.values())
+    targets = [
+        segment_id
+        for segment_id in affected_ids
+        if segment_id in segments and segments[segment_id].start >= now
+    ]
+    if not targets:
+        return CalendarReflow([], [], [])
+
+    target_ids = set(targets)
+    before = {segment_id: segments[segment_id].pieces for segment_id in target_ids}
+    changed = ripple_reflow(segments, targets, calendar_config, equipment_calendars)
+    reflowed: list[PlanSegment] = []
+    for segment in changed:
+        if segment.id not in target_ids:
+            continue
+        if (segment.start, segment.end) == (
+            before[segment.id][0][0],
+            before[segment.id][-1][1],
+        ):
+            # 開始・終了が変わらない予約は保存し直さない
+            segment.pieces = before[segment.id]
+        else:
+            reflowed.append(segment)
+    rippled = [segment for segment in changed if segment.id not in target_ids]
+    return CalendarReflow(
+        reflowed,
+        rippled,
+        delayed_orders(
+            previous_end,
+            order_completions(segments.values()),
+            (segment.order_id for segment in [*reflowed, *rippled]),
+        ),
+    )
+
+
+def reflow_affected_suffix(
+    load_rows: Callable[[list[int], list[int]], list[dict[str, Any]]],
+    affected_rows: list[dict[str, Any]],
+    previous_config: CalendarConfig | None,
+    calendar_config: CalendarConfig | None,
+    now: datetime,
+    equipment_calendars: EquipmentCalendars | None = None,
+) -> CalendarReflow:
+    """
+    影響が及ぶ設備・注文の予約だけを読み込んで、reflow_affected を行う。
+
+    最初に変更した日と重なる予約の設備・注文の予約を読み込み、連鎖で変更された予約の
+    設備・注文が読み込まれていない場合は、加えて読み込み直す（ripple_closure）。
+
+    Args:
+        load_rows: (設備IDのリスト, 注文IDのリスト) のいずれかに属する、最初の変更日以降に
+            終了するスケジュール行を返す関数（ScheduleRepository.get_plan_suffix など）
+        affected_rows: 変更した日と重なるスケジュール
+            （ScheduleRepository.get_plan_in_periods の戻り値）
+        その他の引数は reflow_affected と同じ
+
+    Returns:
+        再配置の結果
+    """
+    affected_ids = [row["id"] for row in affected_rows]
+    loaded: list[list[dict[str, Any]]] = []
+    reflows: list[CalendarReflow] = []
+
+    def load(machines: list[int], orders: list[int]) -> list[dict[str, Any]]:
+        loaded.append(load_rows(machines, orders))
+        return loaded[-1]
+
+    def replan(_: dict[int, PlanSegment]) -> list[PlanSegment]:
+        reflows.append(
+            reflow_affected(
+                loaded[-1],
+                affected_ids,
+                previous_config,
+                calendar_config,
+                now,
+                equipment_calendars,
+            )
+        )
+        return [*reflows[-1].reflowed, *reflows[-1].rippled]
+
+    ripple_closure(
+        load,
+        replan,
+        [row["equipment_id"] for row in affected_rows],
+        [row.get("order_id") for row in affected_rows],
+        previous_config,
+    )
+    return reflows[-1]
@@ -1,17 +1,26 @@
 """
 稼働カレンダー取得ヘルパー
 
-CalendarConfig を CalendarRepository から構築するユーティリティ関数。
+CalendarConfig を CalendarRepository から構築するユーティリティ関数と、
+テナントごとに取得済みの休日情報・コンパイル済みの勤務パターン・タイムゾーンを保持するキャッシュ。
 """
 
-from datetime import date, datetime, timedelta
+import threading
+from collections.abc import Callable
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
 
 from app.repositories.supa_infra.common.calendar_repo import CalendarRepository
-from app.utils.calendar import CalendarConfig
+from app.repositories.supa_infra.common.shift_pattern_repo import (
+    ShiftPatternRepository,
+)
+from app.utils.calendar import CalendarConfig, ShiftPattern
+from app.utils.time_zone import DEFAULT_TIME_ZONE
 
 
 def build_calendar_config(
     calendar_repo: CalendarRepository,
+    tenant_id: str,
     start_date: date | None = None,
     end_date: date | None = None,
     days_ahead: int = 90,
@@ -21,6 +30,7 @@ def build_calendar_config(
 
     Args:
         calendar_repo: カレンダーリポジトリ
+        tenant_id: テナントID
         start_date: 取得開始日（Noneの場合は今日）
         end_date: 取得終了日（Noneの場合はstart_date + days_ahead）
         days_ahead: start_dateがNoneの場合に使用する期間（デフォルト90日）
@@ -34,8 +44,19 @@ def build_calendar_config(
     if end_date is None:
         end_date = start_date + timedelta(days=days_ahead)
 
-    # データベースから休日情報を取得
-    holidays_data = calendar_repo.get_holidays_in_range(start_date, end_date)
+    holidays, workdays = _fetch_calendar_days(
+        calendar_repo, tenant_id, start_date, end_date
+    )
+    return CalendarConfig(holidays=holidays, workdays=workdays)
+
+
+def _fetch_calendar_days(
+    calendar_repo: CalendarRepository, tenant_id: str, start_date: date, end_date: date
+) -> tuple[set[date], set[date]]:
+    """
+    データベースから休日情報を取得し、(休日セット, 稼働日セット) に分類する。
+    """
+    holidays_data = calendar_repo.get_holidays_in_range(tenant_id, start_date, end_date)
 
     # is_holiday=True の日付を休日セット、is_holiday=False の日付を稼働日セットに分類
     holidays = {
@@ -50,4 +71,288 @@ def build_calendar_config(
         if item.get("is_holiday", False) is False
     }
 
-    return CalendarConfig(holidays=holidays, workdays=workdays)
+    return holidays, workdays
+
+
+def load_shift_pattern(
+    shift_pattern_repo: ShiftPatternRepository, tenant_id: str
+) -> ShiftPattern | None:
+    """
+    テナントの勤務パターンを取得し、稼働区間テーブルにコンパイルする。
+
+    Returns:
+        ShiftPattern: コンパイル済みの勤務パターン（未設定の場合はNone）
+
+    Raises:
+        ValueError: 保存されている勤務パターンが不正な場合
+    """
+    return compile_shift_pattern(shift_pattern_repo.get_pattern(tenant_id))
+
+
+def compile_shift_pattern(row: dict[str, Any] | None) -> ShiftPattern | None:
+    """
+    勤務パターンの行（shifts, breaks を含む）を稼働区間テーブルにコンパイルする。
+
+    Returns:
+        ShiftPattern: コンパイル済みの勤務パターン（行がない・シフトが空の場合はNone）
+
+    Raises:
+        ValueError: 勤務パターンが不正な場合
+    """
+    if row is None or not row.get("shifts"):
+        return None
+    return ShiftPattern.from_time_ranges(row["shifts"], row.get("breaks") or [])
+
+
+def row_time_zone(row: dict[str, Any] | None) -> str:
+    """勤務パターンの行に設定されたタイムゾーン（未設定の場合は DEFAULT_TIME_ZONE）"""
+    return (row or {}).get("time_zone") or DEFAULT_TIME_ZONE
+
+
+# 休日情報キャッシュのデフォルト有効期間（秒）
+DEFAULT_CALENDAR_CACHE_TTL_SECONDS = 300
+# 開始日のみ指定された場合に読み込む期間（日）
+DEFAULT_CALENDAR_HORIZON_DAYS = 90
+# 読み込み済みの範囲外を参照した際に、まとめて追加で読み込む期間（日）
+CALENDAR_EXTENSION_DAYS = 90
+
+
+class _CachedCalendar:
+    """
+    1テナント分の取得済み休日情報と、その取得範囲・勤務パターン。
+
+    DBからの読み込み・延長はエントリごとのロック（lock）で直列化する。
+    """
+
+    def __init__(
+        self, tenant_id: str, start_date: date, end_date: date, loaded_at: datetime
+    ):
+        self.tenant_id = tenant_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.loaded_at = loaded_at
+        self.lock = threading.Lock()
+        # start_date から end_date までを読み込み済みかどうか（作成直後は未読み込み）
+        self.loaded = False
+        self.holidays: set[date] = set()
+        self.workdays: set[date] = set()
+        # 勤務パターンとタイムゾーンは1度だけ取得・コンパイルし、エントリの有効期間中は使い回す
+        self.shift_pattern: ShiftPattern | None = None
+        self.time_zone = DEFAULT_TIME_ZONE
+        self.shift_pattern_loaded = False
+
+    def covers(self, start_date: date, end_date: date) -> bool:
+        return self.start_date <= start_date and end_date <= self.end_date
+
+
+class TenantCalendarConfig(CalendarConfig):
+    """
+    CalendarCache のエントリを参照する CalendarConfig。
+
+    スケジューリング中に読み込み済みの範囲外の日付を参照した場合は、
+    キャッシュのエントリを CALENDAR_EXTENSION_DAYS 単位で延長してから判定する。
+    """
+
+    def __init__(
+        self,
+        cache: "CalendarCache",
+        entry: _CachedCalendar,
+        calendar_repo: CalendarRepository,
+    ):
+        super().__init__(
+            holidays=entry.holidays,
+            workdays=entry.workdays,
+            shift_pattern=entry.shift_pattern,
+            time_zone=entry.time_zone,
+        )
+        self._cache = cache
+        self._entry = entry
+        self._calendar_repo = calendar_repo
+
+    def is_holiday(self, dt: datetime) -> bool:
+        target_date = dt.date()
+        if not self._entry.covers(target_date, target_date):
+            self._cache.extend(self._entry, self._calendar_repo, target_date)
+        return super().is_holiday(dt)
+
+    def detached(self, start_date: date, end_date: date) -> CalendarConfig:
+        """
+        キャッシュのエントリを期間まで延長し、その時点の休日情報を複製した CalendarConfig を返す。
+
+        キャッシュ（ロック）とリポジトリを参照しないため、pickleしてプロセスプールへ渡せる。
+        期間外の日付は延長されず、DBの情報がない日として判定される。
+        """
+        holidays, workdays = self._cache.snapshot(
+            self._entry, self._calendar_repo, start_date, end_date
+        )
+        return CalendarConfig(
+            holidays=holidays,
+            workdays=workdays,
+            shift_pattern=self.shift_pattern,
+            time_zone=self.time_zone,
+        )
+
+
+class CalendarCache:
+    """
+    テナントごとの休日情報をメモリ上に保持するキャッシュ。
+
+    要求された期間が取得済みの範囲に含まれていればDBへ問い合わせず、
+    範囲外の場合は不足している前後の期間だけを追加で取得する。
+    カレンダーの更新時は invalidate で破棄し、
+    他のプロセスでの更新に備えて有効期間を過ぎたエントリも取得し直す。
+
+    キャッシュ全体のロックはエントリの辞書の参照・更新にだけ使い、DBからの読み込みは
+    エントリごとのロックで行う（あるテナントの読み込みが他のテナントを待たせない）。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = DEFAULT_CALENDAR_CACHE_TTL_SECONDS,
+        now_fn: Callable[[], datetime] | None = None,
+    ):
+        """
+        Args:
+            ttl_seconds: キャッシュの有効期間（秒）
+            now_fn: 現在時刻を返す関数（テスト用に差し替え可能）。Noneの場合はUTC現在時刻
+        """
+        self._ttl = timedelta(seconds=ttl_seconds)
+        self._now_fn = now_fn if now_fn is not None else lambda: datetime.now(UTC)
+        self._entries: dict[str, _CachedCalendar] = {}
+        self._lock = threading.Lock()
+
+    def get_config(
+        self,
+        tenant_id: str,
+        calendar_repo: CalendarRepository,
+        start_date: date,
+        end_date: date | None = None,
+        shift_pattern_repo: ShiftPatternRepository | None = None,
+    ) -> TenantCalendarConfig:
+        """
+        指定期間をカバーする CalendarConfig を返す。
+
+        返される設定は、期間外の日付を参照した時点でキャッシュを延長するため、
+        計画が期間を越えて延びる場合も休日情報が欠けることはない。
+
+        Args:
+            tenant_id: テナントID
+            calendar_repo: 不足分の取得に使用するカレンダーリポジトリ
+            start_date: 必要な期間の開始日
+            end_date: 必要な期間の終了日（Noneの場合は start_date + 90日）
+            shift_pattern_repo: 勤務パターン・タイムゾーンの取得に使用するリポジトリ
+                （Noneの場合はデフォルトの勤務パターン・タイムゾーンを使用）
+
+        Returns:
+            TenantCalendarConfig: 休日情報と稼働日情報が設定されたカレンダー設定
+        """
+        if end_date is None:
+            end_date = start_date + timedelta(days=DEFAULT_CALENDAR_HORIZON_DAYS)
+
+        with self._lock:
+            now = self._now_fn()
+            entry = self._entries.get(tenant_id)
+            if entry is None or now - entry.loaded_at >= self._ttl:
+                entry = _CachedCalendar(tenant_id, start_date, end_date, now)
+                self._entries[tenant_id] = entry
+
+        with entry.lock:
+            if not entry.loaded:
+                self._load(entry, calendar_repo, entry.start_date, entry.end_date)
+                entry.loaded = True
+            self._extend_to(entry, calendar_repo, start_date, end_date)
+
+            if shift_pattern_repo is not None and not entry.shift_pattern_loaded:
+                row = shift_pattern_repo.get_pattern(tenant_id)
+                entry.shift_pattern = compile_shift_pattern(row)
+                entry.time_zone = row_time_zone(row)
+                entry.shift_pattern_loaded = True
+
+        return TenantCalendarConfig(self, entry, calendar_repo)
+
+    def extend(
+        self, entry: _CachedCalendar, calendar_repo: CalendarRepository, target: date
+    ) -> None:
+        """
+        エントリの範囲を target を含むまで延長する。
+
+        1日ずつ取得しないよう、CALENDAR_EXTENSION_DAYS 単位でまとめて取得する。
+        """
+        extension = timedelta(days=CALENDAR_EXTENSION_DAYS)
+        with entry.lock:
+            self._extend_to(
+                entry,
+                calendar_repo,
+                min(target, entry.start_date - extension)
+                if target < entry.start_date
+                else entry.start_date,
+                max(target, entry.end_date + extension)
+                if target > entry.end_date
+                else entry.end_date,
+            )
+
+    def snapshot(
+        self,
+        entry: _CachedCalendar,
+        calendar_repo: CalendarRepository,
+        start_date: date,
+        end_date: date,
+    ) -> tuple[set[date], set[date]]:
+        """エントリの範囲を期間まで広げ、(休日セット, 稼働日セット) の複製を返す。"""
+        with entry.lock:
+            self._extend_to(
+                entry,
+                calendar_repo,
+                min(start_date, entry.start_date),
+                max(end_date, entry.end_date),
+            )
+            return set(entry.holidays), set(entry.workdays)
+
+    def invalidate(self, tenant_id: str | None = None) -> None:
+        """
+        キャッシュを破棄する。
+
+        Args:
+            tenant_id: 破棄するテナントID（Noneの場合は全テナント）
+        """
+        with self._lock:
+            if tenant_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(tenant_id, None)
+
+    def _extend_to(
+        self,
+        entry: _CachedCalendar,
+        calendar_repo: CalendarRepository,
+        start_date: date,
+        end_date: date,
+    ) -> None:
+        """不足している前後の期間だけを取得してエントリの範囲を広げる。"""
+        if start_date < entry.start_date:
+            self._load(
+                entry, calendar_repo, start_date, entry.start_date - timedelta(days=1)
+            )
+            entry.start_date = start_date
+        if end_date > entry.end_date:
+            self._load(
+                entry, calendar_repo, entry.end_date + timedelta(days=1), end_date
+            )
+            entry.end_date = end_date
+
+    @staticmethod
+    def _load(
+        entry: _CachedCalendar,
+        calendar_repo: CalendarRepository,
+        start_date: date,
+        end_date: date,
+    ) -> None:
+        holidays, workdays = _fetch_calendar_days(
+            calendar_repo, entry.tenant_id, start_date, end_date
+        )
+        entry.holidays |= holidays
+        entry.workdays |= workdays
+
+
+# アプリケーション全体で共有する休日情報キャッシュ
+calendar_cache = CalendarCache()
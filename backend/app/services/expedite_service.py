@@ -0,0 +1,260 @@
+"""
+特急注文（割り込み）サービスモジュール
+
+特急注文の工程を、着手済みの予約を除いた最も早い稼働時間に割り当て、
+割り込みで押し出された予約だけを連鎖的に後ろへずらす（ripple_insert）。
+各設備の末尾に並べる通常のスケジューリングと異なり、既存の計画は
+割り込みの影響を受ける設備・後続工程の範囲でしか変更しない。
+
+計画は全体ではなく、特急注文の工程の候補の設備と、連鎖が及ぶ設備・注文の末尾だけを
+読み込む（insert_rush_order_suffix）。
+"""
+
+from collections.abc import Callable
+from datetime import datetime, tzinfo
+from typing import Any
+
+from app.scheduler_logic import routing_duration_seconds
+from app.services.ripple_service import (
+    PlanSegment,
+    build_change_set,
+    build_segments,
+    delayed_orders,
+    order_completions,
+    ripple_closure,
+    ripple_insert,
+)
+from app.utils.calendar import (
+    CalendarConfig,
+    from_epoch_seconds,
+    parse_datetime,
+    to_epoch_seconds,
+)
+from app.utils.equipment_calendar import EquipmentCalendars
+
+
+class RushInsertion:
+    """
+    特急注文の割り込み結果。
+
+    Attributes:
+        inserted: 特急注文のセグメント（工程順。IDは保存前の仮のID）
+        displaced: 押し出されて再配置された既存のセグメント
+        replaced_ids: 置き換える特急注文の既存のスケジュールID
+        delayed_orders: 完了が遅れた注文（order_id, previous_end, new_end, delay_seconds）
+    """
+
+    def __init__(
+        self,
+        inserted: list[PlanSegment],
+        displaced: list[PlanSegment],
+        replaced_ids: list[int],
+        delayed_orders: list[dict[str, Any]],
+    ):
+        self.inserted = inserted
+        self.displaced = displaced
+        self.replaced_ids = replaced_ids
+        self.delayed_orders = delayed_orders
+
+    def inserted_rows(self) -> list[dict[str, Any]]:
+        """特急注文の保存するスケジュール（稼働時間外で分割した区間ごとに1行）。"""
+        return build_change_set(self.inserted)[1]
+
+    def change_set(
+        self,
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[int]]:
+        """ScheduleRepository.apply_changes の入力（更新・追加・削除）を作成する。"""
+        updates, inserts = build_change_set([*self.displaced, *self.inserted])
+        return updates, inserts, self.replaced_ids
+
+
+def insert_rush_order(
+    order: dict[str, Any],
+    routings: list[dict[str, Any]],
+    rows: list[dict[str, Any]],
+    machines_for_group: Callable[[int], list[int]],
+    equipment_calendars: EquipmentCalendars,
+    calendar_config: CalendarConfig | None,
+    now: datetime,
+    tenant_id: str,
+    tz: tzinfo,
+    segments: dict[int, PlanSegment] | None = None,
+) -> RushInsertion:
+    """
+    特急注文を最も早く着手できる位置に割り込ませ、押し出された予約を後ろへずらす。
+
+    各工程は、前工程の終了時刻と、設備で着手済み（now より前に開始）の予約の終了時刻の
+    遅い方から、最も早く開始できる設備に割り当てる。未着手の予約は割り込みの対象とし、
+    重なる予約と同じ注文の後続工程だけを再配置する。
+
+    Args:
+        order: 特急注文（id, product_id, quantity を含む）
+        routings: 製品の工程のリスト（sequence_order順）
+        rows: now 以降に終了するスケジュール（ScheduleRepository.get_plan_from の戻り値）
+        machines_for_group: 設備グループIDから設備IDのリストを返す関数
+        equipment_calendars: 設備ごとの稼働可能区間テーブル（特急注文と、押し出された
+            予約の配置に使う。設備の保全・臨時稼働を含む）
+        calendar_config: 既存の予約の作業量の算出に使うカレンダー設定
+        now: 基準時刻（これより前に開始した予約は動かさない）
+        tenant_id: テナントID
+        tz: 結果の日時のタイムゾーン
+        segments: rows から作成済みのセグメント（省略時は rows から作成する。
+            割り込みで書き換える）
+
+    Returns:
+        割り込みの結果
+
+    Raises:
+        ValueError: 工程がない場合、特急注文に着手済みの工程がある場合、
+            または設備グループにメンバーが存在しない場合
+    """
+    if not routings:
+        raise ValueError(f"製品ID {order['product_id']} に対する工程が見つかりません")
+
+    order_id = order["id"]
+    now_epoch = to_epoch_seconds(now)
+    own_rows = [row for row in rows if row.get("order_id") == order_id]
+    if segments is None:
+        segments = build_segments(rows, calendar_config)
+    # 特急注文の既存の予約は置き換えるため、計画から外す
+    for row in own_rows:
+        segments.pop(row["id"], None)
+    if any(parse_datetime(row["start_datetime"]) < now for row in own_rows):
+        raise ValueError(
+            f"注文ID {order_id} には着手済みの工程があるため前倒しできません"
+        )
+
+    # 着手済みの予約は動かさないため、設備はその終了時刻まで使えない
+    busy_until: dict[int, int] = {}
+    for segment in segments.values():
+        if segment.start < now:
+            busy_until[segment.equipment_id] = max(
+                busy_until.get(segment.equipment_id, 0),
+                to_epoch_seconds(segment.end),
+            )
+
+    previous_end = order_completions(segments.values())
+
+    inserted: list[PlanSegment] = []
+    ready = now_epoch
+    for index, routing in enumerate(routings):
+        machine_ids = machines_for_group(routing["equipment_group_id"])
+        if not machine_ids:
+            raise ValueError(
+                f"設備グループID {routing['equipment_group_id']} に設備が見つかりません"
+            )
+        machine_id, start = min(
+            (
+                (
+                    machine_id,
+                    equipment_calendars.for_equipment(machine_id).next_available_epoch(
+                        max(ready, busy_until.get(machine_id, 0))
+                    ),
+                )
+                for machine_id in machine_ids
+            ),
+            key=lambda candidate: candidate[1],
+        )
+        duration = routing_duration_seconds(routing, order["quantity"])
+        pieces = equipment_calendars.for_equipment(machine_id).split_epoch(
+            start, duration
+        )
+        segment = PlanSegment(
+            {
+                # 保存前の仮のID（既存のスケジュールIDと重ならない負の値）
+                "id": -(index + 1),
+                "tenant_id": tenant_id,
+                "order_id": order_id,
+                "process_routing_id": routing["id"],
+                "sequence_order": routing.get("sequence_order"),
+                "equipment_id": machine_id,
+                "start_datetime": from_epoch_seconds(pieces[0][0], tz).isoformat(),
+                "end_datetime": from_epoch_seconds(pieces[-1][1], tz).isoformat(),
+            },
+            calendar_config,
+        )
+        segment.pieces = [
+            (from_epoch_seconds(s, tz), from_epoch_seconds(e, tz)) for s, e in pieces
+        ]
+        segment.work_minutes = duration / 60
+        inserted.append(segment)
+        ready = pieces[-1][1]
+
+    changed = ripple_insert(segments, inserted, calendar_config, equipment_calendars)
+    displaced = [segment for segment in changed if segment.id > 0]
+
+    delayed = delayed_orders(
+        previous_end,
+        order_completions(segments.values()),
+        (segment.order_id for segment in displaced),
+    )
+    return RushInsertion(
+        inserted,
+        displaced,
+        sorted(row["id"] for row in own_rows),
+        delayed,
+    )
+
+
+def insert_rush_order_suffix(
+    load_rows: Callable[[list[int], list[int]], list[dict[str, Any]]],
+    order: dict[str, Any],
+    routings: list[dict[str, Any]],
+    machines_for_group: Callable[[int], list[int]],
+    equipment_calendars: EquipmentCalendars,
+    calendar_config: CalendarConfig | None,
+    now: datetime,
+    tenant_id: str,
+    tz: tzinfo,
+) -> RushInsertion:
+    """
+    影響が及ぶ設備・注文の予約だけを読み込んで、insert_rush_order を行う。
+
+    最初に特急注文の工程の設備グループの設備と特急注文の予約を読み込み、押し出された
+    予約の設備・注文が読み込まれていない場合は、加えて読み込み直す（ripple_closure）。
+
+    Args:
+        load_rows: (設備IDのリスト, 注文IDのリスト) のいずれかに属する、now 以降に
+            終了するスケジュール行を返す関数（ScheduleRepository.get_plan_suffix など）
+        その他の引数は insert_rush_order と同じ
+
+    Returns:
+        割り込みの結果
+    """
+    loaded: list[list[dict[str, Any]]] = []
+    insertions: list[RushInsertion] = []
+
+    def load(machines: list[int], orders: list[int]) -> list[dict[str, Any]]:
+        loaded.append(load_rows(machines, orders))
+        return loaded[-1]
+
+    def replan(segments: dict[int, PlanSegment]) -> list[PlanSegment]:
+        insertions.append(
+            insert_rush_order(
+                order,
+                routings,
+                loaded[-1],
+                machines_for_group,
+                equipment_calendars,
+                calendar_config,
+                now,
+                tenant_id,
+                tz,
+                segments,
+            )
+        )
+        insertion = insertions[-1]
+        return [*insertion.inserted, *insertion.displaced]
+
+    ripple_closure(
+        load,
+        replan,
+        [
+            machine_id
+            for routing in routings
+            for machine_id in machines_for_group(routing["equipment_group_id"])
+        ],
+        [order["id"]],
+        calendar_config,
+    )
+    return insertions[-1]
@@ -0,0 +1,220 @@
+"""
+設備キャパシティ仮押さえサービスモジュール
+
+シミュレーション結果を一定時間（TTL）だけ設備タイムライン上に仮予約として保持する。
+仮押さえは後続のシミュレーションで占有済みの区間として扱われ、
+注文確定時には本予約（production_schedules）へ昇格される。
+
+期限切れの判定は満了時刻のヒープで行い、全件走査は行わない。
+
+仮押さえはプロセス内のメモリにのみ保持するため、複数のワーカープロセスで
+実行する構成では、あるワーカーで登録した仮押さえを他のワーカーから参照できない。
+仮押さえを使用する場合は、APIを単一プロセス（スレッドプールは可）で実行すること。
+"""
+
+import heapq
+import threading
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from app.models.transaction.order_schema import DEFAULT_HOLD_TTL_SECONDS
+
+
+class CapacityHold:
+    """
+    1回のシミュレーションで確保した仮押さえ。
+
+    Attributes:
+        hold_id: 仮押さえID
+        tenant_id: テナントID
+        product_id: 製品ID
+        quantity: 数量
+        schedules: 仮押さえしたスケジュール（schedule_order の戻り値と同形式）
+        expires_at: 満了日時（UTC）
+    """
+
+    def __init__(
+        self,
+        hold_id: str,
+        tenant_id: str,
+        product_id: int,
+        quantity: int,
+        schedules: list[dict[str, Any]],
+        expires_at: datetime,
+    ):
+        self.hold_id = hold_id
+        self.tenant_id = tenant_id
+        self.product_id = product_id
+        self.quantity = quantity
+        self.schedules = schedules
+        self.expires_at = expires_at
+
+    def reserved_until(self) -> dict[int, datetime]:
+        """設備ごとに、この仮押さえが占有する最終終了時刻を返す。"""
+        result: dict[int, datetime] = {}
+        for schedule in self.schedules:
+            equipment_id = schedule["equipment_id"]
+            end = datetime.fromisoformat(schedule["end_datetime"])
+            if equipment_id not in result or end > result[equipment_id]:
+                result[equipment_id] = end
+        return result
+
+
+class CapacityHoldStore:
+    """
+    テナント単位で仮押さえを保持するインメモリストア。
+
+    FastAPIの同期エンドポイントはスレッドプールで実行されるため、
+    すべての操作はロックで保護する。プロセス間では共有されない。
+    """
+
+    def __init__(self, now_fn: Callable[[], datetime] | None = None):
+        """
+        Args:
+            now_fn: 現在時刻を返す関数（テスト用に差し替え可能）。Noneの場合はUTC現在時刻
+        """
+        self._now_fn = now_fn if now_fn is not None else lambda: datetime.now(UTC)
+        self._holds: dict[str, CapacityHold] = {}
+        self._by_tenant: dict[str, dict[str, CapacityHold]] = {}
+        # (満了時刻のタイムスタンプ, hold_id) のヒープ
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def place(
+        self,
+        tenant_id: str,
+        product_id: int,
+        quantity: int,
+        schedules: list[dict[str, Any]],
+        ttl_seconds: int = DEFAULT_HOLD_TTL_SECONDS,
+    ) -> CapacityHold:
+        """
+        スケジュールを仮押さえとして登録する。
+
+        Args:
+            tenant_id: テナントID
+            product_id: 製品ID
+            quantity: 数量
+            schedules: 仮押さえするスケジュール
+            ttl_seconds: 保持時間（秒）
+
+        Returns:
+            登録された仮押さえ
+        """
+        if ttl_seconds <= 0:
+            raise ValueError(f"保持時間は正の値である必要があります: {ttl_seconds}秒")
+
+        with self._lock:
+            now = self._now_fn()
+            self._expire(now)
+
+            hold = CapacityHold(
+                hold_id=uuid.uuid4().hex,
+                tenant_id=tenant_id,
+                product_id=product_id,
+                quantity=quantity,
+                schedules=schedules,
+                expires_at=now + timedelta(seconds=ttl_seconds),
+            )
+            self._holds[hold.hold_id] = hold
+            self._by_tenant.setdefault(tenant_id, {})[hold.hold_id] = hold
+            heapq.heappush(
+                self._expiry_heap, (hold.expires_at.timestamp(), hold.hold_id)
+            )
+            return hold
+
+    def get(self, tenant_id: str, hold_id: str) -> CapacityHold | None:
+        """有効な仮押さえを取得する（期限切れ・他テナントの場合はNone）。"""
+        with self._lock:
+            self._expire(self._now_fn())
+            hold = self._holds.get(hold_id)
+            if hold is None or hold.tenant_id != tenant_id:
+                return None
+            return hold
+
+    def release(self, tenant_id: str, hold_id: str) -> CapacityHold | None:
+        """
+        仮押さえを解除して返す。
+
+        ヒープ上のエントリは満了時に読み捨てるため、ここでは削除しない。
+
+        Returns:
+            解除した仮押さえ（期限切れ・存在しない場合はNone）
+        """
+        with self._lock:
+            self._expire(self._now_fn())
+            hold = self._holds.get(hold_id)
+            if hold is None or hold.tenant_id != tenant_id:
+                return None
+            self._remove(hold)
+            return hold
+
+    def restore(self, hold: CapacityHold) -> bool:
+        """
+        release で取り出した仮押さえを戻す（本予約への昇格に失敗した場合など）。
+
+        Returns:
+            戻した場合はTrue（取り出した後に期限切れになった場合はFalse）
+        """
+        with self._lock:
+            now = self._now_fn()
+            self._expire(now)
+            if hold.expires_at <= now:
+                return False
+            self._holds[hold.hold_id] = hold
+            self._by_tenant.setdefault(hold.tenant_id, {})[hold.hold_id] = hold
+            heapq.heappush(
+                self._expiry_heap, (hold.expires_at.timestamp(), hold.hold_id)
+            )
+            return True
+
+    def reserved_until(
+        self, tenant_id: str, exclude_hold_id: str | None = None
+    ) -> dict[int, datetime]:
+        """
+        テナントの有効な仮押さえについて、設備ごとの占有終了時刻を返す。
+
+        Args:
+            tenant_id: テナントID
+            exclude_hold_id: 計算から除外する仮押さえID
+
+        Returns:
+            {設備ID: 仮押さえの最終終了時刻}
+        """
+        with self._lock:
+            self._expire(self._now_fn())
+            holds = list(self._by_tenant.get(tenant_id, {}).values())
+
+        result: dict[int, datetime] = {}
+        for hold in holds:
+            if hold.hold_id == exclude_hold_id:
+                continue
+            for equipment_id, end in hold.reserved_until().items():
+                if equipment_id not in result or end > result[equipment_id]:
+                    result[equipment_id] = end
+        return result
+
+    def _expire(self, now: datetime) -> None:
+        """満了時刻を過ぎた仮押さえをヒープの先頭から取り除く。"""
+        now_ts = now.timestamp()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now_ts:
+            _, hold_id = heapq.heappop(self._expiry_heap)
+            hold = self._holds.get(hold_id)
+            # 解除済みの場合は読み捨てる
+            if hold is not None:
+                self._remove(hold)
+
+    def _remove(self, hold: CapacityHold) -> None:
+        """仮押さえをインデックスから削除する。"""
+        self._holds.pop(hold.hold_id, None)
+        tenant_holds = self._by_tenant.get(hold.tenant_id)
+        if tenant_holds is not None:
+            tenant_holds.pop(hold.hold_id, None)
+            if not tenant_holds:
+                del self._by_tenant[hold.tenant_id]
+
+
+# アプリケーション全体で共有する仮押さえストア（プロセスごとに1つ。モジュールの docstring を参照）
+hold_store = CapacityHoldStore()
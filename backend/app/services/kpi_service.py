@@ -0,0 +1,225 @@
+"""
+計画のKPI評価サービスモジュール
+
+計画全体をセグメント単位の配列（注文・設備・開始・終了・納期）で受け取り、
+メイクスパン・納期遅れ（合計・最大・遅れた注文数）・設備ごとの稼働率を
+NumPy のベクトル演算でまとめて求める。Python のループはセグメント数に比例しないため、
+数十万セグメントの計画でもミリ秒単位で評価できる。
+
+時刻はエポック秒の整数で扱う。稼働率の分母・分子は、稼働可能区間テーブルを
+渡した場合は稼働時間（休憩・休日を除く）、渡さない場合は経過時間で数える。
+"""
+
+from datetime import tzinfo
+from typing import Any
+
+import numpy as np
+
+from app.services.reschedule_service import deadline_epoch
+from app.utils.calendar import parse_datetime, to_epoch_seconds
+from app.utils.equipment_calendar import EquipmentAvailability, EquipmentCalendars
+
+# 納期なし・注文なしを表す値
+NO_DEADLINE = np.iinfo(np.int64).max
+NO_ORDER = -1
+
+
+class PlanArrays:
+    """
+    計画をセグメント単位の配列で表したもの（各配列の長さはセグメント数）。
+
+    Attributes:
+        order_ids: 注文ID（注文のない予約は NO_ORDER）
+        machine_ids: 設備ID
+        starts: 開始時刻（エポック秒）
+        ends: 終了時刻（エポック秒）
+        deadlines: 注文の納期（エポック秒。納期のない注文・予約は NO_DEADLINE）
+    """
+
+    def __init__(
+        self,
+        order_ids: np.ndarray,
+        machine_ids: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        deadlines: np.ndarray,
+    ):
+        self.order_ids = np.asarray(order_ids, dtype=np.int64)
+        self.machine_ids = np.asarray(machine_ids, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.deadlines = np.asarray(deadlines, dtype=np.int64)
+        size = self.order_ids.size
+        if any(
+            array.shape != (size,)
+            for array in (self.machine_ids, self.starts, self.ends, self.deadlines)
+        ):
+            raise ValueError("計画の配列の長さが一致しません")
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: list[dict[str, Any]],
+        orders: dict[int, dict[str, Any]],
+        tz: tzinfo,
+    ) -> "PlanArrays":
+        """
+        スケジュール行と注文から配列を作る。
+
+        Args:
+            rows: スケジュール（order_id, equipment_id, start_datetime, end_datetime を含む）
+            orders: 注文IDごとの注文（deadline_date を含む）
+            tz: 日付のみの納期を解釈するタイムゾーン
+        """
+        deadlines: dict[int, int] = {}
+        for order_id, order in orders.items():
+            deadline = deadline_epoch(order.get("deadline_date"), tz)
+            deadlines[order_id] = deadline if deadline is not None else NO_DEADLINE
+        order_ids = [
+            row["order_id"] if row.get("order_id") is not None else NO_ORDER
+            for row in rows
+        ]
+        return cls(
+            np.array(order_ids, dtype=np.int64),
+            np.array([row["equipment_id"] for row in rows], dtype=np.int64),
+            np.array(
+                [
+                    to_epoch_seconds(parse_datetime(row["start_datetime"]))
+                    for row in rows
+                ],
+                dtype=np.int64,
+            ),
+            np.array(
+                [to_epoch_seconds(parse_datetime(row["end_datetime"])) for row in rows],
+                dtype=np.int64,
+            ),
+            np.array(
+                [deadlines.get(order_id, NO_DEADLINE) for order_id in order_ids],
+                dtype=np.int64,
+            ),
+        )
+
+
+def evaluate_plan_kpis(
+    plan: PlanArrays,
+    horizon: tuple[int, int] | None = None,
+    equipment_calendars: EquipmentCalendars | None = None,
+) -> dict[str, Any]:
+    """
+    計画のKPIを求める。
+
+    Args:
+        plan: 計画の配列表現
+        horizon: 稼働率を求める期間（エポック秒の開始・終了。Noneの場合は計画の最初の開始から
+            最後の終了まで）。メイクスパンは期間の開始（Noneの場合は最初の開始）から数える
+        equipment_calendars: 稼働可能区間テーブル（指定した場合は稼働率を稼働時間で求める）
+
+    Returns:
+        segment_count, order_count, makespan_seconds, total_tardiness_seconds,
+        max_tardiness_seconds, late_order_count と、設備ごとの稼働率（machines）
+
+    Raises:
+        ValueError: 期間の開始が終了以降の場合
+    """
+    if plan.starts.size == 0:
+        return {
+            "segment_count": 0,
+            "order_count": 0,
+            "makespan_seconds": 0,
+            "total_tardiness_seconds": 0,
+            "max_tardiness_seconds": 0,
+            "late_order_count": 0,
+            "machines": [],
+        }
+    period_start, period_end = (
+        horizon
+        if horizon is not None
+        else (int(plan.starts.min()), int(plan.ends.max()))
+    )
+    if period_start >= period_end:
+        raise ValueError("期間の開始は終了より前である必要があります")
+
+    tardiness = _order_tardiness(plan)
+    return {
+        "segment_count": int(plan.starts.size),
+        "order_count": int(tardiness.size),
+        "makespan_seconds": int(plan.ends.max()) - period_start,
+        "total_tardiness_seconds": int(tardiness.sum()),
+        "max_tardiness_seconds": int(tardiness.max(initial=0)),
+        "late_order_count": int(np.count_nonzero(tardiness)),
+        "machines": _machine_utilization(
+            plan, period_start, period_end, equipment_calendars
+        ),
+    }
+
+
+def _order_tardiness(plan: PlanArrays) -> np.ndarray:
+    """注文ごとの納期遅れ（秒）。完了時刻は注文の最後のセグメントの終了時刻とする。"""
+    has_order = plan.order_ids != NO_ORDER
+    order_ids, inverse = np.unique(plan.order_ids[has_order], return_inverse=True)
+    completions = np.full(order_ids.size, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(completions, inverse, plan.ends[has_order])
+    deadlines = np.full(order_ids.size, NO_DEADLINE, dtype=np.int64)
+    np.minimum.at(deadlines, inverse, plan.deadlines[has_order])
+
+    with_deadline = deadlines != NO_DEADLINE
+    tardiness = np.zeros(order_ids.size, dtype=np.int64)
+    tardiness[with_deadline] = np.maximum(
+        completions[with_deadline] - deadlines[with_deadline], 0
+    )
+    return tardiness
+
+
+def _machine_utilization(
+    plan: PlanArrays,
+    period_start: int,
+    period_end: int,
+    equipment_calendars: EquipmentCalendars | None,
+) -> list[dict[str, Any]]:
+    """設備ごとの期間内の稼働時間・稼働可能時間・稼働率。"""
+    machine_ids, inverse = np.unique(plan.machine_ids, return_inverse=True)
+    starts = np.clip(plan.starts, period_start, period_end)
+    ends = np.clip(plan.ends, period_start, period_end)
+
+    if equipment_calendars is None:
+        busy = np.bincount(inverse, weights=ends - starts, minlength=machine_ids.size)
+        available = np.full(machine_ids.size, period_end - period_start)
+    else:
+        busy = np.zeros(machine_ids.size, dtype=np.int64)
+        available = np.zeros(machine_ids.size, dtype=np.int64)
+        # 稼働可能区間テーブルを共有する設備（上書きのない設備）はまとめて求める
+        tables: dict[int, tuple[EquipmentAvailability, list[int]]] = {}
+        for index, machine_id in enumerate(machine_ids.tolist()):
+            availability = equipment_calendars.for_equipment(machine_id)
+            tables.setdefault(id(availability), (availability, []))[1].append(index)
+        for availability, indexes in tables.values():
+            period = availability.working_seconds_at(
+                np.array([period_start, period_end], dtype=np.int64)
+            )
+            available[indexes] = period[1] - period[0]
+            mask = np.isin(inverse, indexes)
+            worked = availability.working_seconds_at(
+                ends[mask]
+            ) - availability.working_seconds_at(starts[mask])
+            busy += np.bincount(
+                inverse[mask], weights=worked, minlength=machine_ids.size
+            ).astype(np.int64)
+
+    utilization = np.divide(
+        busy, available, out=np.zeros(machine_ids.size), where=available > 0
+    )
+    return [
+        {
+            "equipment_id": machine_id,
+            "busy_seconds": int(busy_seconds),
+            "available_seconds": int(available_seconds),
+            "utilization": round(float(rate), 4),
+        }
+        for machine_id, busy_seconds, available_seconds, rate in zip(
+            machine_ids.tolist(),
+            busy.tolist(),
+            available.tolist(),
+            utilization.tolist(),
+            strict=True,
+        )
+    ]
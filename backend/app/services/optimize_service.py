@@ -0,0 +1,473 @@
+"""
+スケジュール最適化サービスモジュール
+
+ディスパッチ（設備が空いた時点で最も早く開始できる設備を選ぶ貪欲法）の結果を初期解とし、
+制限時間内の局所探索（焼きなまし法）で納期遅れとメイクスパンを改善する。
+
+解は配列だけで表す（CompactPlan）。
+
+- 工程の順序: 注文のインデックスの列。k 回目に現れた注文はその注文の k 番目の工程を表すため、
+  どの並べ替えも工程順序の制約を満たす
+- 設備の割り当て: 工程ごとの設備のインデックス
+
+近傍は、順序の2要素の入れ替えと、同じ設備グループ内での設備の付け替えの2種類。
+解の評価では区間の分割結果を作らず、稼働時間の累積テーブルの二分探索
+（EquipmentAvailability.advance_epoch）で終了時刻のみを求める。
+
+複数の並列数を指定した場合は、同じ初期解から異なる乱数列で探索する（マルチスタート）。
+探索はプロセスプールで並列に実行し、配列表現はpickleして1回だけ作った
+バイト列を各プロセスへ渡す（稼働カレンダーはキャッシュを参照しない設定に置き換えて渡す）。制限時間は同じまま、並列数に比例して探索できる解が増える。
+"""
+
+import copy
+import math
+import multiprocessing
+import pickle
+import random
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import UTC, timedelta
+from typing import Any
+
+from app.models.transaction.schedule import (
+    DEFAULT_MAKESPAN_WEIGHT,
+    DEFAULT_TARDINESS_WEIGHT,
+    MAX_OPTIMIZE_WORKERS,
+)
+from app.services.calendar_service import DEFAULT_CALENDAR_HORIZON_DAYS
+from app.services.reschedule_service import (
+    Operation,
+    ReschedulePlan,
+    group_key,
+    group_members,
+)
+from app.utils.calendar import from_epoch_seconds
+from app.utils.equipment_calendar import EquipmentAvailability, EquipmentCalendars
+
+# 焼きなまし法の温度（初期解の目的関数値に対する割合と、終了時の初期温度に対する割合）
+INITIAL_TEMPERATURE_RATIO = 0.05
+FINAL_TEMPERATURE_RATIO = 0.001
+# 初期温度の下限（目的関数値の単位。初期解の目的関数値が0に近い場合）
+MIN_INITIAL_TEMPERATURE = 60.0
+
+
+class Objective:
+    """
+    解の評価値。
+
+    Attributes:
+        value: 目的関数値（重み付きの納期遅れ + メイクスパン。小さいほど良い）
+        tardiness_seconds: 注文ごとの納期遅れ（秒）の合計
+        makespan_seconds: 最初の注文の着手可能時刻から最後の注文の完了までの時間（秒）
+    """
+
+    def __init__(self, value: float, tardiness_seconds: int, makespan_seconds: int):
+        self.value = value
+        self.tardiness_seconds = tardiness_seconds
+        self.makespan_seconds = makespan_seconds
+
+
+class CompactPlan:
+    """
+    再計画の対象を配列で表したもの（解の評価はDBアクセス・オブジェクト生成なしで行う）。
+
+    Attributes:
+        machine_ids: 設備ID（設備のインデックス順）
+        op_job: 工程ごとの注文のインデックス
+        op_work: 工程ごとの作業時間（秒）
+        op_candidates: 工程ごとに割り当て可能な設備のインデックスのリスト
+        job_first: 注文ごとの最初の工程のインデックス
+        job_release: 注文ごとの着手可能時刻（エポック秒）
+        job_deadline: 注文ごとの納期（エポック秒。未設定の場合はNone）
+    """
+
+    def __init__(
+        self,
+        plan: ReschedulePlan,
+        machines_for_group: Callable[[int], list[int]],
+        equipment_calendars: EquipmentCalendars,
+        tardiness_weight: float = DEFAULT_TARDINESS_WEIGHT,
+        makespan_weight: float = DEFAULT_MAKESPAN_WEIGHT,
+    ):
+        """
+        Args:
+            plan: 再計画の対象（build_reschedule_plan の戻り値）
+            machines_for_group: 設備グループIDから設備IDのリストを返す関数
+            equipment_calendars: 再計画しない予約を稼働不可の区間として含む稼働可能区間テーブル
+            tardiness_weight: 納期遅れの重み
+            makespan_weight: メイクスパンの重み
+
+        Raises:
+            ValueError: 設備グループにメンバーが存在しない場合
+        """
+        self._plan = plan
+        self._tardiness_weight = tardiness_weight
+        self._makespan_weight = makespan_weight
+
+        members = group_members(plan, machines_for_group)
+        self.machine_ids = sorted({m for ids in members.values() for m in ids})
+        machine_index = {machine_id: i for i, machine_id in enumerate(self.machine_ids)}
+        self._availabilities: list[EquipmentAvailability] = [
+            equipment_calendars.for_equipment(machine_id)
+            for machine_id in self.machine_ids
+        ]
+        candidates = {
+            group_id: [machine_index[machine_id] for machine_id in machine_ids]
+            for group_id, machine_ids in members.items()
+        }
+
+        self.op_job: list[int] = []
+        self.op_work: list[int] = []
+        self.op_candidates: list[list[int]] = []
+        self.job_first: list[int] = []
+        self.job_release = [job.release for job in plan.jobs]
+        self.job_deadline = [job.deadline for job in plan.jobs]
+        for job_index, job in enumerate(plan.jobs):
+            self.job_first.append(len(self.op_job))
+            for op in job.operations:
+                self.op_job.append(job_index)
+                self.op_work.append(op.work_seconds)
+                self.op_candidates.append(candidates[group_key(op)])
+        self._machine_index = machine_index
+        self._origin = min(self.job_release, default=0)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # 並列探索のプロセスへは評価に必要な配列だけを渡す（再計画の対象は渡さない）
+        state = self.__dict__.copy()
+        state["_plan"] = None
+        return state
+
+    def detached(self, solution: tuple[list[int], list[int]]) -> "CompactPlan":
+        """
+        稼働カレンダーを DB・キャッシュを参照しない設定に置き換えた複製を返す
+        （プロセスプールへpickleして渡す前に使う）。
+
+        休日情報は、最初の着手可能時刻から solution の完了の
+        DEFAULT_CALENDAR_HORIZON_DAYS 日後までを読み込んでおく。
+        """
+        completions = self._decode(*solution)
+        start_date = from_epoch_seconds(self._origin, UTC).date() - timedelta(days=1)
+        end_date = from_epoch_seconds(
+            max(completions, default=self._origin), UTC
+        ).date() + timedelta(days=DEFAULT_CALENDAR_HORIZON_DAYS + 1)
+        availabilities: dict[int, EquipmentAvailability] = {}
+        for availability in self._availabilities:
+            if id(availability) not in availabilities:
+                availabilities[id(availability)] = availability.detached(
+                    start_date, end_date
+                )
+        compact = copy.copy(self)
+        compact._availabilities = [
+            availabilities[id(availability)] for availability in self._availabilities
+        ]
+        return compact
+
+    def initial_solution(self) -> tuple[list[int], list[int]]:
+        """
+        現在の割り当て（ディスパッチの結果）を (工程の順序, 設備の割り当て) で返す。
+
+        工程は開始時刻順に並べるため、評価すると各設備の工程の順序が現在と一致する。
+        """
+        starts = [
+            (op.start, job_index, op_index)
+            for job_index, job in enumerate(self._plan.jobs)
+            for op_index, op in enumerate(job.operations)
+        ]
+        sequence = [job_index for _, job_index, _ in sorted(starts)]
+        assignment = [
+            self._machine_index[op.machine_id]
+            for job in self._plan.jobs
+            for op in job.operations
+        ]
+        return sequence, assignment
+
+    def evaluate(self, sequence: list[int], assignment: list[int]) -> Objective:
+        """解を評価する（各工程を順に、前工程の終了と設備が空く時刻の遅い方から開始する）。"""
+        completions = self._decode(sequence, assignment)
+        tardiness = sum(
+            max(completion - deadline, 0)
+            for completion, deadline in zip(completions, self.job_deadline, strict=True)
+            if deadline is not None
+        )
+        makespan = max(completions, default=self._origin) - self._origin
+        return Objective(
+            self._tardiness_weight * tardiness + self._makespan_weight * makespan,
+            tardiness,
+            makespan,
+        )
+
+    def apply(self, sequence: list[int], assignment: list[int]) -> None:
+        """解を再計画の対象（各工程の machine_id・segments）に反映する。"""
+        operations = [op for job in self._plan.jobs for op in job.operations]
+        self._decode(sequence, assignment, operations)
+
+    def _decode(
+        self,
+        sequence: list[int],
+        assignment: list[int],
+        operations: list[Operation] | None = None,
+    ) -> list[int]:
+        """注文ごとの完了時刻を返す（operations を渡した場合は区間も作成して反映する）。"""
+        next_op = list(self.job_first)
+        ready = list(self.job_release)
+        free_at = [0] * len(self.machine_ids)
+        for job_index in sequence:
+            op_index = next_op[job_index]
+            next_op[job_index] += 1
+            machine = assignment[op_index]
+            availability = self._availabilities[machine]
+            start = availability.next_available_epoch(
+                max(ready[job_index], free_at[machine])
+            )
+            work = self.op_work[op_index]
+            end = availability.advance_epoch(start, work)
+            if operations is not None:
+                op = operations[op_index]
+                op.machine_id = self.machine_ids[machine]
+                op.segments = (
+                    availability.split_epoch(start, work)
+                    if work > 0
+                    else [(start, start)]
+                )
+            free_at[machine] = end
+            ready[job_index] = end
+        return ready
+
+
+class SearchResult:
+    """
+    局所探索の結果。
+
+    Attributes:
+        sequence: 最良解の工程の順序
+        assignment: 最良解の設備の割り当て
+        initial: 初期解の評価値
+        best: 最良解の評価値
+        iterations: 評価した近傍の数
+        trace: 最良解が更新された時点の記録（elapsed_ms, iteration, objective）
+    """
+
+    def __init__(
+        self,
+        sequence: list[int],
+        assignment: list[int],
+        initial: Objective,
+        best: Objective,
+        iterations: int,
+        trace: list[dict[str, Any]],
+    ):
+        self.sequence = sequence
+        self.assignment = assignment
+        self.initial = initial
+        self.best = best
+        self.iterations = iterations
+        self.trace = trace
+
+
+def local_search(
+    compact: CompactPlan,
+    time_budget_seconds: float,
+    seed: int | None = None,
+    max_iterations: int | None = None,
+    clock: Callable[[], float] = time.monotonic,
+    initial_solution: tuple[list[int], list[int]] | None = None,
+) -> SearchResult:
+    """
+    初期解から焼きなまし法で解を改善する。
+
+    Args:
+        compact: 再計画の対象の配列表現
+        time_budget_seconds: 探索の制限時間（秒）
+        seed: 乱数のシード（同じシード・同じ反復回数なら同じ結果）
+        max_iterations: 評価する近傍の数の上限（Noneの場合は制限時間のみ）
+        clock: 経過時間の計測に使う関数（テスト用に差し替え可能）
+        initial_solution: 初期解（Noneの場合は compact.initial_solution()）
+
+    Returns:
+        SearchResult
+    """
+    rng = random.Random(seed)
+    started = clock()
+    sequence, assignment = (
+        (list(initial_solution[0]), list(initial_solution[1]))
+        if initial_solution is not None
+        else compact.initial_solution()
+    )
+    current = initial = best = compact.evaluate(sequence, assignment)
+    best_solution = (list(sequence), list(assignment))
+    trace = [{"elapsed_ms": 0, "iteration": 0, "objective": initial.value}]
+
+    # 付け替え先のある工程（同じ設備グループに複数の設備がある工程）
+    movable = [i for i, ids in enumerate(compact.op_candidates) if len(ids) > 1]
+    swappable = len(set(sequence)) > 1
+    initial_temperature = max(
+        initial.value * INITIAL_TEMPERATURE_RATIO, MIN_INITIAL_TEMPERATURE
+    )
+
+    iteration = 0
+    while (movable or swappable) and best.value > 0:
+        elapsed = clock() - started
+        if elapsed >= time_budget_seconds or (
+            max_iterations is not None and iteration >= max_iterations
+        ):
+            break
+        iteration += 1
+        temperature = initial_temperature * FINAL_TEMPERATURE_RATIO ** (
+            elapsed / time_budget_seconds
+        )
+
+        undo = _perturb(rng, sequence, assignment, compact, movable, swappable)
+        candidate = compact.evaluate(sequence, assignment)
+        delta = candidate.value - current.value
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            current = candidate
+            if candidate.value < best.value:
+                best = candidate
+                best_solution = (list(sequence), list(assignment))
+                trace.append(
+                    {
+                        "elapsed_ms": round((clock() - started) * 1000),
+                        "iteration": iteration,
+                        "objective": best.value,
+                    }
+                )
+        else:
+            undo()
+
+    return SearchResult(*best_solution, initial, best, iteration, trace)
+
+
+def parallel_search(
+    compact: CompactPlan,
+    time_budget_seconds: float,
+    workers: int,
+    seed: int | None = None,
+    executor: Executor | None = None,
+) -> SearchResult:
+    """
+    同じ初期解から異なる乱数列で local_search を並列に実行し、最良の結果を返す。
+
+    Args:
+        compact: 再計画の対象の配列表現
+        time_budget_seconds: 探索の制限時間（秒。各探索で共通）
+        workers: 並列数（1の場合はプロセスプールを使わずに実行する）
+        seed: 乱数のシード（各探索のシードはこのシードから決める）
+        executor: 探索を実行するExecutor（Noneの場合は共有のプロセスプール）
+
+    Returns:
+        最良の探索の結果。iterations は全探索の合計、trace は全探索を通じて
+        最良解が更新された時点の記録（探索の番号 worker を含む）
+    """
+    started = time.monotonic()
+    initial = compact.initial_solution()
+    if executor is None:
+        workers = max(1, min(workers, MAX_OPTIMIZE_WORKERS))
+    if workers <= 1:
+        return local_search(
+            compact, time_budget_seconds, seed=seed, initial_solution=initial
+        )
+
+    rng = random.Random(seed)
+    payload = pickle.dumps(compact.detached(initial), protocol=pickle.HIGHEST_PROTOCOL)
+    remaining = max(time_budget_seconds - (time.monotonic() - started), 0.0)
+    executor = executor if executor is not None else get_search_executor()
+    futures = [
+        executor.submit(
+            _search_chain, payload, remaining, rng.randrange(2**32), initial
+        )
+        for _ in range(workers)
+    ]
+    results = [future.result() for future in futures]
+
+    best = min(results, key=lambda result: result.best.value)
+    trace: list[dict[str, Any]] = []
+    for entry in sorted(
+        (
+            {**entry, "worker": worker}
+            for worker, result in enumerate(results)
+            for entry in result.trace
+        ),
+        key=lambda entry: (entry["elapsed_ms"], entry["iteration"]),
+    ):
+        if not trace or entry["objective"] < trace[-1]["objective"]:
+            trace.append(entry)
+    return SearchResult(
+        best.sequence,
+        best.assignment,
+        best.initial,
+        best.best,
+        sum(result.iterations for result in results),
+        trace,
+    )
+
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_search_executor() -> ProcessPoolExecutor:
+    """
+    並列探索に使う共有のプロセスプールを返す（最初の呼び出し時に作成する）。
+
+    APIサーバーのスレッドからforkしないよう、プロセスはspawnで起動する。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=MAX_OPTIMIZE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _search_chain(
+    payload: bytes,
+    time_budget_seconds: float,
+    seed: int,
+    initial_solution: tuple[list[int], list[int]],
+) -> SearchResult:
+    """プロセスプールで実行する1つの探索（配列表現はpickleしたバイト列で受け取る）。"""
+    return local_search(
+        pickle.loads(payload),
+        time_budget_seconds,
+        seed=seed,
+        initial_solution=initial_solution,
+    )
+
+
+def _perturb(
+    rng: random.Random,
+    sequence: list[int],
+    assignment: list[int],
+    compact: CompactPlan,
+    movable: list[int],
+    swappable: bool,
+) -> Callable[[], None]:
+    """近傍へ移動し（解をその場で変更し）、元に戻す関数を返す。"""
+    if movable and (not swappable or rng.random() < 0.5):
+        # 同じ設備グループ内の別の設備へ付け替える
+        op_index = rng.choice(movable)
+        previous = assignment[op_index]
+        assignment[op_index] = rng.choice(
+            [m for m in compact.op_candidates[op_index] if m != previous]
+        )
+
+        def undo_reassign() -> None:
+            assignment[op_index] = previous
+
+        return undo_reassign
+
+    # 異なる注文の工程の順序を入れ替える
+    while True:
+        i, j = rng.sample(range(len(sequence)), 2)
+        if sequence[i] != sequence[j]:
+            break
+    sequence[i], sequence[j] = sequence[j], sequence[i]
+
+    def undo_swap() -> None:
+        sequence[i], sequence[j] = sequence[j], sequence[i]
+
+    return undo_swap
@@ -0,0 +1,326 @@
+"""
+設備故障（停止）対応サービスモジュール
+
+故障した設備の停止期間と重なる予約だけを、同じ設備グループの設備
+（停止明けの故障した設備を含む）のうち最も早く終わる位置へ移し、
+前工程の終了が遅れた後続工程を ripple_insert で後ろへずらす。
+停止期間より前に始まっていた予約は停止の開始で打ち切り、残りの作業だけを移す。
+停止と重ならない予約は、移した予約の後続工程を除いて動かさない。
+
+計画は全体ではなく、停止した設備・同じ設備グループの設備と、連鎖が及ぶ設備・注文の
+末尾だけを読み込む（repair_outage_suffix）。
+"""
+
+from collections.abc import Callable
+from datetime import datetime, tzinfo
+from typing import Any
+
+from app.services.ripple_service import (
+    PlanSegment,
+    build_change_set,
+    build_segments,
+    delayed_orders,
+    order_completions,
+    ripple_closure,
+    ripple_insert,
+)
+from app.utils.calendar import (
+    CalendarConfig,
+    calculate_working_minutes,
+    from_epoch_seconds,
+    parse_datetime,
+    to_epoch_seconds,
+)
+from app.utils.equipment_calendar import (
+    OVERLAY_MAINTENANCE,
+    EquipmentCalendars,
+    Interval,
+)
+
+
+class OutageRepair:
+    """
+    設備停止による再配置の結果。
+
+    Attributes:
+        moved: 停止と重なり、移動した予約（打ち切った予約の残りの作業は保存前の負のID）
+        truncated: 停止の開始で打ち切った着手済みの予約
+        rippled: 移動した予約に押し出された後続工程
+        delayed_orders: 完了が遅れた注文（order_id, previous_end, new_end, delay_seconds）
+    """
+
+    def __init__(
+        self,
+        moved: list[PlanSegment],
+        truncated: list[PlanSegment],
+        rippled: list[PlanSegment],
+        delayed_orders: list[dict[str, Any]],
+    ):
+        self.moved = moved
+        self.truncated = truncated
+        self.rippled = rippled
+        self.delayed_orders = delayed_orders
+
+    def change_set(self) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """ScheduleRepository.apply_changes の入力（更新・追加）を作成する。"""
+        return build_change_set([*self.truncated, *self.moved, *self.rippled])
+
+
+def repair_outage(
+    rows: list[dict[str, Any]],
+    equipment_id: int,
+    outage_start: datetime,
+    outage_end: datetime,
+    now: datetime,
+    members: dict[int, list[int]],
+    calendar_config: CalendarConfig | None,
+    overlays: list[dict[str, Any]],
+    tz: tzinfo,
+    segments: dict[int, PlanSegment] | None = None,
+) -> OutageRepair:
+    """
+    停止期間と重なる予約を、同じ設備グループの設備へ移す（DBアクセスなし）。
+
+    重なる予約を開始日時の順に、停止の開始（過去の場合は現在）と前工程の終了の遅い方以降で、
+    設備グループの各設備に置いた場合に最も早く終わる設備・時刻へ割り当てる。
+    他の予約・停止期間・設備別の上書きは稼働不可の区間として扱う。
+
+    Args:
+        rows: 停止の開始以降に終了するスケジュール（ScheduleRepository.get_plan_from の戻り値。
+            equipment_group_id を含む）
+        equipment_id: 停止した設備ID
+        outage_start: 停止の開始日時
+        outage_end: 停止の終了日時
+        now: 現在日時（これより前には予約を移さない）
+        members: 設備グループIDごとの設備IDのリスト
+        calendar_config: テナントのカレンダー設定
+        overlays: 設備別の上書き（保全・臨時稼働）
+        tz: 結果の日時のタイムゾーン
+        segments: rows から作成済みのセグメント（省略時は rows から作成する。
+            再配置で書き換える）
+
+    Returns:
+        再配置の結果
+    """
+    affected_rows = sorted(
+        (
+            row
+            for row in rows
+            if row["equipment_id"] == equipment_id
+            and _overlaps(row, outage_start, outage_end)
+        ),
+        key=lambda row: (row["start_datetime"], row["id"]),
+    )
+    if segments is None:
+        segments = build_segments(rows, calendar_config)
+    previous_end = order_completions(segments.values())
+    if not affected_rows:
+        return OutageRepair([], [], [], [])
+
+    affected_ids = {row["id"] for row in affected_rows}
+    outage_block = {
+        "equipment_id": equipment_id,
+        "kind": OVERLAY_MAINTENANCE,
+        "start_datetime": outage_start.isoformat(),
+        "end_datetime": outage_end.isoformat(),
+    }
+    equipment_calendars = EquipmentCalendars(
+        calendar_config,
+        [
+            *overlays,
+            outage_block,
+            *(_as_block(row) for row in rows if row["id"] not in affected_ids),
+        ],
+        tz=tz,
+    )
+
+    by_order: dict[int | None, list[PlanSegment]] = {}
+    for segment in segments.values():
+        if segment.order_id is not None and segment.id not in affected_ids:
+            by_order.setdefault(segment.order_id, []).append(segment)
+
+    resume_from = to_epoch_seconds(max(outage_start, now))
+    placed: dict[int, list[Interval]] = {}
+    truncated: list[PlanSegment] = []
+    moved: list[PlanSegment] = []
+    for index, row in enumerate(affected_rows):
+        segment = segments.pop(row["id"])
+        if segment.start < outage_start:
+            # 着手済みの予約は停止の開始で打ち切り、残りの作業を新しい予約として移す
+            done = calculate_working_minutes(
+                segment.start, outage_start, calendar_config
+            )
+            remaining = segment.work_minutes - done
+            segment.pieces = [(segment.start, outage_start)]
+            segment.work_minutes = done
+            segments[segment.id] = segment
+            truncated.append(segment)
+            if remaining <= 0:
+                continue
+            segment = PlanSegment({**row, "id": -(index + 1)}, calendar_config)
+            segment.work_minutes = remaining
+
+        # 前工程（移動済みの予約を含む）の終了より前には置かない
+        ready = max(
+            [resume_from]
+            + [
+                to_epoch_seconds(other.end)
+                for other in by_order.get(segment.order_id, [])
+                if other.sequence_order < segment.sequence_order
+            ]
+        )
+        group_id = row.get("equipment_group_id")
+        machine_ids = members.get(group_id, []) if group_id is not None else []
+        machine_id, pieces = _earliest_finish(
+            equipment_calendars,
+            machine_ids or [equipment_id],
+            ready,
+            round(segment.work_minutes * 60),
+            placed,
+        )
+        segment.equipment_id = machine_id
+        segment.pieces = [
+            (from_epoch_seconds(s, tz), from_epoch_seconds(e, tz)) for s, e in pieces
+        ]
+        placed.setdefault(machine_id, []).append((pieces[0][0], pieces[-1][1]))
+        moved.append(segment)
+        if segment.order_id is not None:
+            by_order.setdefault(segment.order_id, []).append(segment)
+
+    # 後続工程は、停止期間と設備別の上書きを重ねた設備ごとのカレンダーでずらす
+    # （他の予約との重なりは ripple_insert が解消するため、予約は稼働不可にしない）
+    moved_ids = {segment.id for segment in moved}
+    changed = ripple_insert(
+        segments,
+        moved,
+        calendar_config,
+        EquipmentCalendars(calendar_config, [*overlays, outage_block], tz=tz),
+    )
+    rippled = [segment for segment in changed if segment.id not in moved_ids]
+    return OutageRepair(
+        moved,
+        truncated,
+        rippled,
+        delayed_orders(
+            previous_end,
+            order_completions(segments.values()),
+            (segment.order_id for segment in [*moved, *rippled]),
+        ),
+    )
+
+
+def repair_outage_suffix(
+    load_rows: Callable[[list[int], list[int]], list[dict[str, Any]]],
+    equipment_id: int,
+    outage_start: datetime,
+    outage_end: datetime,
+    now: datetime,
+    members: dict[int, list[int]],
+    calendar_config: CalendarConfig | None,
+    overlays: list[dict[str, Any]],
+    tz: tzinfo,
+    order_ids: list[int] | None = None,
+) -> OutageRepair:
+    """
+    影響が及ぶ設備・注文の予約だけを読み込んで、repair_outage を行う。
+
+    最初に停止した設備と同じ設備グループの設備の予約を読み込み、移動・連鎖で変更された
+    予約の設備・注文が読み込まれていない場合は、加えて読み込み直す（ripple_closure）。
+
+    Args:
+        load_rows: (設備IDのリスト, 注文IDのリスト) のいずれかに属する、停止の開始以降に
+            終了するスケジュール行を返す関数（ScheduleRepository.get_plan_suffix など）
+        order_ids: 最初に読み込む注文ID（停止した設備の予約の注文など）
+        その他の引数は repair_outage と同じ
+
+    Returns:
+        再配置の結果
+    """
+    loaded: list[list[dict[str, Any]]] = []
+    repairs: list[OutageRepair] = []
+
+    def load(machines: list[int], orders: list[int]) -> list[dict[str, Any]]:
+        loaded.append(load_rows(machines, orders))
+        return loaded[-1]
+
+    def replan(segments: dict[int, PlanSegment]) -> list[PlanSegment]:
+        repairs.append(
+            repair_outage(
+                loaded[-1],
+                equipment_id,
+                outage_start,
+                outage_end,
+                now,
+                members,
+                calendar_config,
+                overlays,
+                tz,
+                segments,
+            )
+        )
+        repair = repairs[-1]
+        return [*repair.truncated, *repair.moved, *repair.rippled]
+
+    ripple_closure(
+        load,
+        replan,
+        [equipment_id, *(m for machine_ids in members.values() for m in machine_ids)],
+        order_ids or [],
+        calendar_config,
+    )
+    return repairs[-1]
+
+
+def _earliest_finish(
+    equipment_calendars: EquipmentCalendars,
+    machine_ids: list[int],
+    ready: int,
+    work_seconds: int,
+    placed: dict[int, list[Interval]],
+) -> tuple[int, list[Interval]]:
+    """
+    ready 以降で、作業が最も早く終わる設備と区間を返す。
+
+    同じ再配置で先に割り当てた予約（placed）とは重ならないようにする。
+    """
+    candidates: list[tuple[int, int, list[Interval]]] = []
+    for machine_id in machine_ids:
+        availability = equipment_calendars.for_equipment(machine_id)
+        t = ready
+        while True:
+            start = availability.next_available_epoch(t)
+            pieces = (
+                availability.split_epoch(start, work_seconds)
+                if work_seconds > 0
+                else [(start, start)]
+            )
+            clash = max(
+                (
+                    end
+                    for begin, end in placed.get(machine_id, [])
+                    if begin < pieces[-1][1] and end > pieces[0][0]
+                ),
+                default=None,
+            )
+            if clash is None:
+                break
+            t = clash
+        candidates.append((pieces[-1][1], machine_id, pieces))
+    _, machine_id, pieces = min(candidates, key=lambda c: (c[0], c[1]))
+    return machine_id, pieces
+
+
+def _overlaps(row: dict[str, Any], start: datetime, end: datetime) -> bool:
+    return (
+        parse_datetime(row["start_datetime"]) < end
+        and parse_datetime(row["end_datetime"]) > start
+    )
+
+
+def _as_block(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "equipment_id": row["equipment_id"],
+        "kind": OVERLAY_MAINTENANCE,
+        "start_datetime": row["start_datetime"],
+        "end_datetime": row["end_datetime"],
+    }
@@ -0,0 +1,272 @@
+"""
+計画バージョン（名前付きスナップショット）サービスモジュール
+
+計画バージョンは元のバージョン（base）からの差分だけを保存する。差分はスケジュールIDごとの
+変更前・変更後の内容（before / after。存在しない場合はNone）で、
+CHECKPOINT_INTERVAL 世代ごと（と元のないバージョン）にだけ計画全体（timeline）を保存する。
+
+- 読み込み: 直近のチェックポイントの計画に、以降の差分を順に適用する（最大 CHECKPOINT_INTERVAL 世代）
+- 比較: 2つのバージョンの共通の祖先からそれぞれへの差分だけをたどる（変更の件数に比例）
+
+読み込んだ計画は PlanVersionCache に保持し、子のバージョンは親の計画の行をそのまま共有して
+自身の差分だけを適用する（バージョンは変更されないため、キャッシュの破棄は不要）。
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, cast
+
+from app.repositories.supa_infra.transaction.plan_version_repo import (
+    PlanVersionRepository,
+)
+
+# バージョンに保存するスケジュールの項目
+VERSIONED_FIELDS = (
+    "order_id",
+    "process_routing_id",
+    "equipment_id",
+    "start_datetime",
+    "end_datetime",
+)
+# 計画全体を保存する間隔（世代数）。読み込み時に適用する差分の数の上限になる
+CHECKPOINT_INTERVAL = 8
+# キャッシュするバージョンの数の上限
+DEFAULT_VERSION_CACHE_SIZE = 64
+
+# 比較結果の変更の種別
+CHANGE_ADDED = "added"
+CHANGE_REMOVED = "removed"
+CHANGE_CHANGED = "changed"
+
+Timeline = dict[int, dict[str, Any]]
+
+
+def to_timeline(rows: Iterable[dict[str, Any]]) -> Timeline:
+    """スケジュール（またはバージョンに保存した計画）を、IDごとの保存対象の項目にする。"""
+    return {
+        row["id"]: {field: row.get(field) for field in VERSIONED_FIELDS} for row in rows
+    }
+
+
+def timeline_rows(timeline: Timeline) -> list[dict[str, Any]]:
+    """計画を保存用の行（ID順）にする。"""
+    return [
+        {"id": schedule_id, **timeline[schedule_id]} for schedule_id in sorted(timeline)
+    ]
+
+
+def diff_timelines(before: Timeline, after: Timeline) -> list[dict[str, Any]]:
+    """2つの計画の差分（ID順の id, before, after）を求める。"""
+    return [
+        {
+            "id": schedule_id,
+            "before": before.get(schedule_id),
+            "after": after.get(schedule_id),
+        }
+        for schedule_id in sorted(before.keys() | after.keys())
+        if before.get(schedule_id) != after.get(schedule_id)
+    ]
+
+
+def build_version_record(
+    name: str,
+    timeline: Timeline,
+    base: dict[str, Any] | None = None,
+    base_timeline: Timeline | None = None,
+) -> dict[str, Any]:
+    """
+    保存するバージョンのレコードを作成する。
+
+    Args:
+        name: バージョン名
+        timeline: 保存する計画
+        base: 元のバージョン（Noneの場合は計画全体を保存する）
+        base_timeline: 元のバージョンの計画（base を指定した場合は必須）
+
+    Returns:
+        name, base_version_id, ancestor_ids, depth, changes, timeline,
+        change_count, segment_count を含む辞書
+    """
+    if base is None:
+        return {
+            "name": name,
+            "base_version_id": None,
+            "ancestor_ids": [],
+            "depth": 0,
+            "changes": [],
+            "timeline": timeline_rows(timeline),
+            "change_count": 0,
+            "segment_count": len(timeline),
+        }
+    if base_timeline is None:
+        raise ValueError("元のバージョンの計画が指定されていません")
+
+    changes = diff_timelines(base_timeline, timeline)
+    depth = base["depth"] + 1
+    is_checkpoint = depth >= CHECKPOINT_INTERVAL
+    return {
+        "name": name,
+        "base_version_id": base["id"],
+        "ancestor_ids": [*base["ancestor_ids"], base["id"]],
+        "depth": 0 if is_checkpoint else depth,
+        "changes": changes,
+        "timeline": timeline_rows(timeline) if is_checkpoint else None,
+        "change_count": len(changes),
+        "segment_count": len(timeline),
+    }
+
+
+def version_chain(version: dict[str, Any]) -> list[int]:
+    """バージョンの計画の読み込みに必要なバージョンのID（直近のチェックポイントから順）。"""
+    depth = version["depth"]
+    ancestors = version["ancestor_ids"][len(version["ancestor_ids"]) - depth :]
+    return [*ancestors, version["id"]] if depth > 0 else [version["id"]]
+
+
+def apply_changes(timeline: Timeline, changes: list[dict[str, Any]]) -> Timeline:
+    """計画に差分を適用した新しい計画を返す（変更のない行は元の計画と共有する）。"""
+    applied = dict(timeline)
+    for change in changes:
+        if change["after"] is None:
+            applied.pop(change["id"], None)
+        else:
+            applied[change["id"]] = change["after"]
+    return applied
+
+
+def version_paths(
+    version_a: dict[str, Any], version_b: dict[str, Any]
+) -> tuple[int | None, list[int], list[int]]:
+    """
+    2つのバージョンの共通の祖先と、共通の祖先からそれぞれへのバージョンのID。
+
+    Returns:
+        共通の祖先のID（共通の祖先がない場合はNone）と、共通の祖先の子から
+        version_a・version_b までのIDのリスト（古い順）
+    """
+    lineage_a = [*version_a["ancestor_ids"], version_a["id"]]
+    lineage_b = [*version_b["ancestor_ids"], version_b["id"]]
+    shared = 0
+    for id_a, id_b in zip(lineage_a, lineage_b, strict=False):
+        if id_a != id_b:
+            break
+        shared += 1
+    common = lineage_a[shared - 1] if shared > 0 else None
+    return common, lineage_a[shared:], lineage_b[shared:]
+
+
+def diff_versions(
+    changes_a: list[list[dict[str, Any]]],
+    changes_b: list[list[dict[str, Any]]],
+) -> list[dict[str, Any]]:
+    """
+    共通の祖先からの差分だけで、バージョンAからバージョンBへの変更を求める。
+
+    変更された行の共通の祖先での内容は、最初の差分の変更前の内容（before）とする。
+
+    Args:
+        changes_a: 共通の祖先からバージョンAまでの各バージョンの差分（古い順）
+        changes_b: 共通の祖先からバージョンBまでの各バージョンの差分（古い順）
+
+    Returns:
+        ID順の変更（id, kind, from, to）。kind は added / removed / changed
+    """
+    at_common: dict[int, dict[str, Any] | None] = {}
+    at_a: dict[int, dict[str, Any] | None] = {}
+    at_b: dict[int, dict[str, Any] | None] = {}
+    for path, at_version in ((changes_a, at_a), (changes_b, at_b)):
+        for changes in path:
+            for change in changes:
+                at_common.setdefault(change["id"], change["before"])
+                at_version[change["id"]] = change["after"]
+
+    diff = []
+    for schedule_id in sorted(at_common):
+        before = at_a.get(schedule_id, at_common[schedule_id])
+        after = at_b.get(schedule_id, at_common[schedule_id])
+        if before == after:
+            continue
+        kind = (
+            CHANGE_ADDED
+            if before is None
+            else CHANGE_REMOVED
+            if after is None
+            else CHANGE_CHANGED
+        )
+        diff.append({"id": schedule_id, "kind": kind, "from": before, "to": after})
+    return diff
+
+
+def diff_timeline_versions(before: Timeline, after: Timeline) -> list[dict[str, Any]]:
+    """共通の祖先がない2つの計画の変更を、計画全体の比較で求める。"""
+    return diff_versions([], [diff_timelines(before, after)])
+
+
+class PlanVersionCache:
+    """
+    読み込んだバージョンの計画をメモリ上に保持するキャッシュ（LRU）。
+
+    バージョンは作成後に変更されないため、有効期間は設けない。
+    返す計画はキャッシュと共有しているため、呼び出し側で変更しないこと。
+    """
+
+    def __init__(self, max_size: int = DEFAULT_VERSION_CACHE_SIZE):
+        """
+        Args:
+            max_size: 保持するバージョンの数の上限
+        """
+        self._max_size = max_size
+        self._entries: OrderedDict[tuple[str, int], Timeline] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_timeline(
+        self,
+        tenant_id: str,
+        version: dict[str, Any],
+        repo: PlanVersionRepository,
+    ) -> Timeline:
+        """
+        バージョンの計画を返す。
+
+        キャッシュにある最も新しい祖先の計画から、以降の差分だけを読み込んで適用する。
+
+        Args:
+            tenant_id: テナントID
+            version: バージョン（id, ancestor_ids, depth を含む）
+            repo: 差分を読み込むリポジトリ
+        """
+        chain = version_chain(version)
+        with self._lock:
+            start, timeline = 0, None
+            for index in range(len(chain) - 1, -1, -1):
+                cached = self._entries.get((tenant_id, chain[index]))
+                if cached is not None:
+                    self._entries.move_to_end((tenant_id, chain[index]))
+                    start, timeline = index + 1, cached
+                    break
+        if start == len(chain) and timeline is not None:
+            return timeline
+
+        payloads = repo.get_payloads(chain[start:], with_timeline=timeline is None)
+        for version_id in chain[start:]:
+            payload = payloads.get(version_id)
+            if payload is None:
+                raise ValueError(f"計画バージョン {version_id} が見つかりません")
+            if timeline is None:
+                timeline = to_timeline(payload["timeline"] or [])
+            else:
+                timeline = apply_changes(timeline, payload["changes"] or [])
+            self._put((tenant_id, version_id), timeline)
+        return cast(Timeline, timeline)
+
+    def _put(self, key: tuple[str, int], timeline: Timeline) -> None:
+        with self._lock:
+            self._entries[key] = timeline
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+
+# アプリケーション全体で共有する計画バージョンのキャッシュ
+plan_version_cache = PlanVersionCache()
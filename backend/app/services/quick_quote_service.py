@@ -0,0 +1,348 @@
+"""
+簡易見積もりサービスモジュール
+
+受注画面での最初の概算回答のため、設備の割り当てを試算せずに回答納期を見積もる。
+設備ごとの予約済み稼働時間（現在以降の作業量）・最終終了時刻と、製品ごとの工程の
+所要時間の式（段取り時間 + 単位時間 × 数量）をテナントごとにキャッシュし、
+見積もりは工程数に比例する計算（各工程で稼働時間の累積テーブルを二分探索するのみ）で行う。
+
+見積もりは工程ごとに、設備グループの予約済み稼働時間を所属設備で均等に分担したと
+みなして待ち時間を求める。あわせて次の範囲（誤差の範囲）を返す。
+
+- 下限: 最も作業量の少ない設備に、予約済みの作業が隙間なく詰まっているとみなした場合。
+  実際の空き時刻は予約の隙間の分だけ遅くなるため、これより早くなることはない
+- 上限: グループ内のすべての設備（仮押さえを含む）が空く時刻から開始した場合。
+  実際には最も早く空く設備に割り当てられるため、これより遅くなることはない
+
+いずれもテナントの稼働カレンダーで計算し、設備ごとの保全・臨時稼働は考慮しない。
+"""
+
+import threading
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import numpy as np
+
+from app.repositories.supa_infra.master.product_repo import ProductRepository
+from app.repositories.supa_infra.transaction.schedule_repo import ScheduleRepository
+from app.scheduler_logic import get_equipment_ids_by_groups, routing_duration_seconds
+from app.services.simulation_service import is_schedule_feasible
+from app.utils.calendar import from_epoch_seconds, parse_datetime, to_epoch_seconds
+from app.utils.equipment_calendar import EquipmentAvailability
+
+# 設備の作業量・工程の式のキャッシュの有効期間（秒）
+DEFAULT_LOAD_CACHE_TTL_SECONDS = 60
+
+
+class GroupLoad:
+    """
+    設備グループの作業量の集計。
+
+    Attributes:
+        machine_count: 所属する設備の数
+        min_backlog: 設備ごとの予約済み稼働時間（秒）の最小値
+        mean_backlog: 設備ごとの予約済み稼働時間（秒）の平均値（切り上げ）
+        horizon: すべての設備が空く時刻（エポック秒）
+    """
+
+    def __init__(
+        self, machine_count: int, min_backlog: int, mean_backlog: int, horizon: int
+    ):
+        self.machine_count = machine_count
+        self.min_backlog = min_backlog
+        self.mean_backlog = mean_backlog
+        self.horizon = horizon
+
+
+class TenantLoad:
+    """
+    1テナントの作業量と工程の式のキャッシュ。
+
+    設備ごとの作業量は読み込み時に1度だけ集計し、設備グループごとの集計と
+    製品ごとの工程の式は最初に参照された時点で1度だけ求める。
+    """
+
+    def __init__(
+        self,
+        as_of: int,
+        backlog: dict[int, int],
+        last_end: dict[int, int],
+        loaded_at: datetime,
+    ):
+        """
+        Args:
+            as_of: 作業量を集計した基準時刻（エポック秒）
+            backlog: 設備ごとの基準時刻以降の予約済み稼働時間（秒）
+            last_end: 設備ごとの最終終了時刻（エポック秒）
+            loaded_at: 読み込んだ日時（UTC）
+        """
+        self.as_of = as_of
+        self.backlog = backlog
+        self.last_end = last_end
+        self.loaded_at = loaded_at
+        self._groups: dict[int, list[int]] = {}
+        self._formulas: dict[int, list[dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def formulas(
+        self, product_repo: ProductRepository, product_id: int
+    ) -> list[dict[str, Any]]:
+        """
+        製品の工程の式（equipment_group_id, setup_time_seconds, unit_time_seconds）。
+
+        Raises:
+            ValueError: 工程が取得できない場合
+        """
+        with self._lock:
+            if product_id not in self._formulas:
+                self._formulas[product_id] = [
+                    {
+                        "equipment_group_id": routing["equipment_group_id"],
+                        "setup_time_seconds": routing.get("setup_time_seconds", 0) or 0,
+                        "unit_time_seconds": routing["unit_time_seconds"],
+                    }
+                    for routing in product_repo.get_routings_by_product(product_id)
+                    or []
+                ]
+            formulas = self._formulas[product_id]
+        if not formulas:
+            raise ValueError(f"製品ID {product_id} に対する工程が見つかりません")
+        return formulas
+
+    def group_loads(
+        self,
+        product_repo: ProductRepository,
+        group_ids: list[int],
+        reserved_until: dict[int, datetime] | None = None,
+    ) -> dict[int, GroupLoad]:
+        """
+        設備グループごとの作業量の集計を返す（メンバーは未取得のグループのみまとめて取得する）。
+
+        Args:
+            product_repo: 製品リポジトリ（equipment_group_membersテーブルへのアクセスに使用）
+            group_ids: 設備グループIDのリスト
+            reserved_until: 設備ごとの仮押さえ終了時刻（上限の計算に含める）
+
+        Raises:
+            ValueError: 設備グループにメンバーが存在しない場合
+        """
+        with self._lock:
+            missing = sorted(set(group_ids) - self._groups.keys())
+            if missing:
+                self._groups.update(get_equipment_ids_by_groups(product_repo, missing))
+            members = {group_id: self._groups[group_id] for group_id in group_ids}
+
+        reserved = {
+            machine_id: to_epoch_seconds(until)
+            for machine_id, until in (reserved_until or {}).items()
+        }
+        loads = {}
+        for group_id, machine_ids in members.items():
+            if not machine_ids:
+                raise ValueError(f"設備グループID {group_id} に設備が見つかりません")
+            backlogs = [self.backlog.get(machine_id, 0) for machine_id in machine_ids]
+            loads[group_id] = GroupLoad(
+                machine_count=len(machine_ids),
+                min_backlog=min(backlogs),
+                mean_backlog=-(-sum(backlogs) // len(machine_ids)),
+                horizon=max(
+                    max(
+                        self.last_end.get(machine_id, 0),
+                        reserved.get(machine_id, 0),
+                    )
+                    for machine_id in machine_ids
+                ),
+            )
+        return loads
+
+
+class LoadCache:
+    """
+    テナントごとの設備の作業量・工程の式をメモリ上に保持するキャッシュ。
+
+    有効期間を過ぎたエントリは次の参照時に読み込み直す。
+    スケジュールを保存・変更した場合（注文の確定・削除、手動調整、再スケジュール、
+    設備停止・カレンダー変更による再配置など）は invalidate で破棄する。
+
+    DBからの読み込みはキャッシュ全体のロックの外で、テナントごとのロックで行う
+    （同じテナントの同時の読み込みは1回にまとめ、他のテナントは待たせない）。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = DEFAULT_LOAD_CACHE_TTL_SECONDS,
+        now_fn: Callable[[], datetime] | None = None,
+    ):
+        """
+        Args:
+            ttl_seconds: キャッシュの有効期間（秒）
+            now_fn: 現在時刻を返す関数（テスト用に差し替え可能）。Noneの場合はUTC現在時刻
+        """
+        self._ttl = timedelta(seconds=ttl_seconds)
+        self._now_fn = now_fn if now_fn is not None else lambda: datetime.now(UTC)
+        self._entries: dict[str, TenantLoad] = {}
+        self._lock = threading.Lock()
+        self._tenant_locks: dict[str, threading.Lock] = {}
+        # invalidate の回数（読み込み中に破棄されたエントリを保存しないために使う）
+        self._generations: dict[str, int] = {}
+
+    def get(
+        self,
+        tenant_id: str,
+        schedule_repo: ScheduleRepository,
+        availability: EquipmentAvailability,
+    ) -> TenantLoad:
+        """
+        テナントの作業量を返す（未読み込み・期限切れの場合は読み込む）。
+
+        Args:
+            tenant_id: テナントID
+            schedule_repo: スケジュールリポジトリ
+            availability: 作業量（稼働時間）の集計に使うテナントの稼働可能区間テーブル
+        """
+        entry = self._fresh_entry(tenant_id)
+        if entry is not None:
+            return entry
+        with self._lock:
+            tenant_lock = self._tenant_locks.setdefault(tenant_id, threading.Lock())
+
+        with tenant_lock:
+            # 待っている間に他のリクエストが読み込んだ場合はそれを使う
+            entry = self._fresh_entry(tenant_id)
+            if entry is not None:
+                return entry
+            with self._lock:
+                generation = self._generations.get(tenant_id, 0)
+            entry = self._load(tenant_id, schedule_repo, availability, self._now_fn())
+            with self._lock:
+                if self._generations.get(tenant_id, 0) == generation:
+                    self._entries[tenant_id] = entry
+            return entry
+
+    def invalidate(self, tenant_id: str) -> None:
+        """テナントのキャッシュを破棄する（読み込み中のエントリも保存しない）。"""
+        with self._lock:
+            self._entries.pop(tenant_id, None)
+            self._generations[tenant_id] = self._generations.get(tenant_id, 0) + 1
+
+    def _fresh_entry(self, tenant_id: str) -> TenantLoad | None:
+        """有効期間内のエントリ（ない場合はNone）"""
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is None or self._now_fn() - entry.loaded_at >= self._ttl:
+                return None
+            return entry
+
+    @staticmethod
+    def _load(
+        tenant_id: str,
+        schedule_repo: ScheduleRepository,
+        availability: EquipmentAvailability,
+        now: datetime,
+    ) -> TenantLoad:
+        """
+        基準時刻以降に終了するテナントのスケジュールを1回で取得し、設備ごとに集計する。
+
+        エントリはテナントIDをキーに保持するため、RLSで見える他のテナントの行は含めない。
+        """
+        as_of = to_epoch_seconds(now)
+        rows = schedule_repo.get_plan_from(now.isoformat(), tenant_id=tenant_id)
+        machine_ids = [row["equipment_id"] for row in rows]
+        starts = np.array(
+            [to_epoch_seconds(parse_datetime(row["start_datetime"])) for row in rows],
+            dtype=np.int64,
+        )
+        ends = np.array(
+            [to_epoch_seconds(parse_datetime(row["end_datetime"])) for row in rows],
+            dtype=np.int64,
+        )
+        # 予約の長さには休憩などの稼働時間外が含まれるため、稼働時間の累積テーブルの差で求める
+        worked = availability.working_seconds_at(
+            ends
+        ) - availability.working_seconds_at(np.maximum(starts, as_of))
+
+        backlog: dict[int, int] = {}
+        last_end: dict[int, int] = {}
+        for machine_id, seconds, end in zip(
+            machine_ids, worked.tolist(), ends.tolist(), strict=True
+        ):
+            backlog[machine_id] = backlog.get(machine_id, 0) + max(seconds, 0)
+            last_end[machine_id] = max(last_end.get(machine_id, 0), end)
+        return TenantLoad(as_of, backlog, last_end, now)
+
+
+def build_quick_quote(
+    load: TenantLoad,
+    product_repo: ProductRepository,
+    availability: EquipmentAvailability,
+    product_id: int,
+    quantity: int,
+    desired_deadline: str | None = None,
+    reserved_until: dict[int, datetime] | None = None,
+    start_time: datetime | None = None,
+) -> dict[str, Any]:
+    """
+    キャッシュした作業量と工程の式から、回答納期とその範囲を見積もる。
+
+    Args:
+        load: テナントの作業量のキャッシュ
+        product_repo: 製品リポジトリ（未キャッシュの工程・設備グループの取得に使用）
+        availability: テナントの稼働カレンダーの稼働可能区間テーブル
+        product_id: 製品ID
+        quantity: 数量
+        desired_deadline: 希望納期（ISO形式の文字列またはNone）
+        reserved_until: 設備ごとの仮押さえ終了時刻（上限の計算に含める）
+        start_time: 見積もりの開始基準時刻（指定なしの場合は現在時刻）
+
+    Returns:
+        見積もりの回答納期（calculated_deadline）と範囲（earliest_deadline, latest_deadline）、
+        見積もりの誤差の範囲（秒）、希望納期に間に合うか（is_feasible）と
+        範囲全体で判定が変わらないか（is_certain）、作業量の集計日時（load_as_of）
+
+    Raises:
+        ValueError: 工程が取得できない場合、または設備グループにメンバーが存在しない場合
+    """
+    formulas = load.formulas(product_repo, product_id)
+    groups = load.group_loads(
+        product_repo,
+        [formula["equipment_group_id"] for formula in formulas],
+        reserved_until,
+    )
+
+    start = to_epoch_seconds(start_time if start_time else datetime.now(UTC))
+    earliest = estimate = latest = max(start, load.as_of)
+    for formula in formulas:
+        group = groups[formula["equipment_group_id"]]
+        duration = routing_duration_seconds(formula, quantity)
+        earliest = availability.advance_epoch(
+            max(earliest, availability.advance_epoch(load.as_of, group.min_backlog)),
+            duration,
+        )
+        estimate = availability.advance_epoch(
+            max(estimate, availability.advance_epoch(load.as_of, group.mean_backlog)),
+            duration,
+        )
+        latest = availability.advance_epoch(max(latest, group.horizon), duration)
+    estimate = min(max(estimate, earliest), latest)
+
+    tz = availability.tz
+    calculated_deadline = from_epoch_seconds(estimate, tz).isoformat()
+    earliest_deadline = from_epoch_seconds(earliest, tz).isoformat()
+    latest_deadline = from_epoch_seconds(latest, tz).isoformat()
+    is_feasible = is_schedule_feasible(desired_deadline, calculated_deadline)
+    return {
+        "product_id": product_id,
+        "quantity": quantity,
+        "calculated_deadline": calculated_deadline,
+        "earliest_deadline": earliest_deadline,
+        "latest_deadline": latest_deadline,
+        "error_seconds": {"minus": estimate - earliest, "plus": latest - estimate},
+        "is_feasible": is_feasible,
+        "is_certain": is_schedule_feasible(desired_deadline, earliest_deadline)
+        == is_schedule_feasible(desired_deadline, latest_deadline),
+        "load_as_of": from_epoch_seconds(load.as_of, tz).isoformat(),
+    }
+
+
+load_cache = LoadCache()
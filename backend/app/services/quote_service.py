@@ -0,0 +1,414 @@
+"""
+見積もり（回答納期の試算）サービスモジュール
+
+工程・設備グループ・設備の空き時刻・稼働カレンダーを1度だけ読み込んだスナップショット
+（PlanningSnapshot）に対して、schedule_order と同じ割り当てをメモリ上で繰り返し試算する。
+数量を変えた試算などを、DBへ問い合わせ直すことなく行える。
+"""
+
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+
+from app.repositories.supa_infra.master.equipment_repo import EquipmentRepository
+from app.repositories.supa_infra.master.product_repo import ProductRepository
+from app.repositories.supa_infra.transaction.schedule_repo import ScheduleRepository
+from app.scheduler_logic import (
+    MachineTimeline,
+    PlannedStep,
+    get_equipment_ids_by_group,
+    get_equipment_ids_by_groups,
+    plan_routings,
+    routing_duration_seconds,
+)
+from app.services.simulation_service import (
+    build_process_schedules,
+    is_schedule_feasible,
+)
+from app.utils.calendar import from_epoch_seconds, parse_datetime, to_epoch_seconds
+from app.utils.equipment_calendar import EquipmentCalendars
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class PlanningSnapshot:
+    """
+    1回の読み込み結果に対して、注文の割り当てをメモリ上で試算するスナップショット。
+
+    工程・設備グループのメンバーは製品・グループごとに1度だけ取得し、
+    設備の空き時刻は MachineTimeline で設備ごとに1度だけ取得する。
+    試算は MachineTimeline の fork に対して行うため、スナップショット自体は変更されない。
+    """
+
+    def __init__(
+        self,
+        product_repo: ProductRepository,
+        schedule_repo: ScheduleRepository,
+        equipment_calendars: EquipmentCalendars,
+        reserved_until: dict[int, datetime] | None = None,
+        start_time: datetime | None = None,
+    ):
+        """
+        Args:
+            product_repo: 製品リポジトリ
+            schedule_repo: スケジュールリポジトリ（設備の最終終了時刻の取得に使用）
+            equipment_calendars: 設備ごとの稼働可能区間テーブル
+            reserved_until: 設備ごとの仮押さえ終了時刻（仮押さえ済みの区間は占有扱い）
+            start_time: 試算の開始基準時刻（指定なしの場合は現在時刻）
+        """
+        calendar_config = equipment_calendars.calendar_config
+        tz = calendar_config.tz if calendar_config is not None else None
+        reference = start_time if start_time else datetime.now(tz).astimezone(tz)
+        self.tz = tz or reference.tzinfo
+        self.start = to_epoch_seconds(reference)
+        self.equipment_calendars = equipment_calendars
+        self.timeline = MachineTimeline(schedule_repo, reserved_until)
+        self._product_repo = product_repo
+        self._routings: dict[int, list[dict[str, Any]]] = {}
+        self._machines: dict[int, list[int]] = {}
+
+    def routings(self, product_id: int) -> list[dict[str, Any]]:
+        """
+        製品の工程（sequence_order順）。製品ごとに1度だけ取得する。
+
+        Raises:
+            ValueError: 工程が取得できない場合
+        """
+        if product_id not in self._routings:
+            self._routings[product_id] = (
+                self._product_repo.get_routings_by_product(product_id) or []
+            )
+        routings = self._routings[product_id]
+        if not routings:
+            raise ValueError(f"製品ID {product_id} に対する工程が見つかりません")
+        return routings
+
+    def machines_for_group(self, group_id: int) -> list[int]:
+        """設備グループに属する設備ID。グループごとに1度だけ取得する。"""
+        if group_id not in self._machines:
+            self._machines[group_id] = get_equipment_ids_by_group(
+                self._product_repo, group_id
+            )
+        return self._machines[group_id]
+
+    def preload(self, product_ids: list[int]) -> None:
+        """
+        複数の製品の工程と、その設備グループのメンバーをまとめて取得する。
+
+        製品ごと・グループごとに問い合わせる代わりに、それぞれ1回のリクエストで読み込む。
+        """
+        missing_products = sorted(set(product_ids) - self._routings.keys())
+        if missing_products:
+            self._routings.update(
+                self._product_repo.get_routings_by_products(missing_products)
+            )
+        group_ids = {
+            routing["equipment_group_id"]
+            for product_id in set(product_ids)
+            for routing in self._routings.get(product_id, [])
+        }
+        missing_groups = sorted(group_ids - self._machines.keys())
+        if missing_groups:
+            self._machines.update(
+                get_equipment_ids_by_groups(self._product_repo, missing_groups)
+            )
+
+    def duration_matrix(self, product_id: int, quantities: list[int]) -> np.ndarray:
+        """
+        工程ごと・数量ごとの所要時間（秒）を1回のベクトル演算で求める。
+
+        Returns:
+            形状 (工程数, 数量の数) の整数配列（段取り時間 + 単位時間 × 数量、秒未満は切り上げ）
+        """
+        routings = self.routings(product_id)
+        setup = np.array(
+            [routing.get("setup_time_seconds", 0) or 0 for routing in routings],
+            dtype=np.float64,
+        )
+        unit = np.array(
+            [float(routing["unit_time_seconds"]) for routing in routings],
+            dtype=np.float64,
+        )
+        qty = np.asarray(quantities, dtype=np.float64)
+        return np.ceil(setup[:, None] + unit[:, None] * qty[None, :]).astype(np.int64)
+
+    def plan(
+        self,
+        product_id: int,
+        durations: list[int],
+        timeline: MachineTimeline | None = None,
+    ) -> list[PlannedStep]:
+        """
+        製品の工程を、指定した所要時間で割り当てる（DBへの保存なし）。
+
+        Args:
+            product_id: 製品ID
+            durations: 工程ごとの所要時間（秒）
+            timeline: 割り当てを反映する設備の空き時刻
+                （Noneの場合はスナップショットの fork に割り当て、スナップショットは変更しない）
+
+        Returns:
+            工程ごとの (工程, 設備ID, 分割後の区間のリスト)
+        """
+        return plan_routings(
+            self.routings(product_id),
+            durations,
+            self.start,
+            self.machines_for_group,
+            timeline if timeline is not None else self.timeline.fork(),
+            self.equipment_calendars,
+        )
+
+    def completion_times(self, product_id: int, quantities: list[int]) -> list[int]:
+        """
+        数量ごとの完了時刻（エポック秒）を試算する。
+
+        所要時間はまとめてベクトル演算で求め、同じ数量は1度だけ試算する。
+        """
+        unique_quantities, inverse = np.unique(
+            np.asarray(quantities, dtype=np.int64), return_inverse=True
+        )
+        durations = self.duration_matrix(product_id, unique_quantities.tolist())
+        completions = [
+            self.plan(product_id, durations[:, index].tolist())[-1][2][-1][1]
+            for index in range(len(unique_quantities))
+        ]
+        return [completions[index] for index in inverse.ravel().tolist()]
+
+    def plan_quantity(self, product_id: int, quantity: int) -> list[PlannedStep]:
+        """数量を指定して製品の工程を割り当てる（スナップショットは変更しない）。"""
+        return self.plan(
+            product_id,
+            [
+                routing_duration_seconds(routing, quantity)
+                for routing in self.routings(product_id)
+            ],
+        )
+
+    def max_quantity_by(
+        self, product_id: int, deadline: int, upper_bound: int
+    ) -> tuple[int, list[PlannedStep] | None, int]:
+        """
+        deadline（エポック秒）までに完了できる最大の数量を探索する。
+
+        完了時刻は数量に対して単調に増加するため、数量を倍々に増やして上限を見つけた後、
+        二分探索で境界を求める（試算は O(log Q) 回）。
+
+        Args:
+            product_id: 製品ID
+            deadline: 納期（エポック秒）
+            upper_bound: 探索する数量の上限
+
+        Returns:
+            (最大数量, その数量の割り当て結果, 試算回数)。1個も間に合わない場合は (0, None, 試算回数)
+        """
+        evaluations = 0
+
+        def feasible(quantity: int) -> list[PlannedStep] | None:
+            nonlocal evaluations
+            evaluations += 1
+            planned = self.plan_quantity(product_id, quantity)
+            return planned if planned[-1][2][-1][1] <= deadline else None
+
+        best_quantity, best_plan = 0, None
+        # 倍々に増やして、間に合わない数量（または上限）を見つける
+        quantity = 1
+        while quantity <= upper_bound:
+            planned = feasible(quantity)
+            if planned is None:
+                break
+            best_quantity, best_plan = quantity, planned
+            quantity *= 2
+
+        # (best_quantity, min(quantity, upper_bound + 1)) の範囲を二分探索する
+        low, high = best_quantity, min(quantity, upper_bound + 1)
+        while high - low > 1:
+            middle = (low + high) // 2
+            planned = feasible(middle)
+            if planned is None:
+                high = middle
+            else:
+                low, best_quantity, best_plan = middle, middle, planned
+
+        return best_quantity, best_plan, evaluations
+
+    def to_epoch(self, value: str) -> int:
+        """ISO形式の日時をエポック秒に変換する（タイムゾーンなしはテナントのタイムゾーン）。"""
+        dt = parse_datetime(value)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=self.tz)
+        return to_epoch_seconds(dt)
+
+    def to_schedules(
+        self,
+        planned: list[PlannedStep],
+        tenant_id: str,
+        order_id: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """試算結果を schedule_order と同じ形式のスケジュールに変換する。"""
+        return [
+            {
+                "tenant_id": tenant_id,
+                "order_id": order_id,
+                "process_routing_id": routing["id"],
+                "equipment_id": machine_id,
+                "start_datetime": from_epoch_seconds(start, self.tz).isoformat(),
+                "end_datetime": from_epoch_seconds(end, self.tz).isoformat(),
+            }
+            for routing, machine_id, segments in planned
+            for start, end in segments
+        ]
+
+
+def build_sweep_response(
+    snapshot: PlanningSnapshot,
+    product_id: int,
+    quantities: list[int],
+    desired_deadline: str | None = None,
+) -> dict[str, Any]:
+    """
+    数量ごとの回答納期とリードタイムの曲線を返す。
+
+    Args:
+        snapshot: 試算に使用するスナップショット
+        product_id: 製品ID
+        quantities: 試算する数量のリスト（結果は同じ順序で返す）
+        desired_deadline: 希望納期（指定された場合は数量ごとに間に合うかを判定する）
+
+    Returns:
+        開始基準時刻（start_time）と、数量ごとの回答納期・リードタイム（points）
+    """
+    completions = snapshot.completion_times(product_id, quantities)
+    points = []
+    for quantity, completion in zip(quantities, completions, strict=True):
+        calculated_deadline = from_epoch_seconds(completion, snapshot.tz).isoformat()
+        lead_time_seconds = completion - snapshot.start
+        points.append(
+            {
+                "quantity": quantity,
+                "calculated_deadline": calculated_deadline,
+                "lead_time_seconds": lead_time_seconds,
+                "lead_time_days": round(lead_time_seconds / SECONDS_PER_DAY, 2),
+                "is_feasible": is_schedule_feasible(
+                    desired_deadline, calculated_deadline
+                ),
+            }
+        )
+
+    return {
+        "product_id": product_id,
+        "start_time": from_epoch_seconds(snapshot.start, snapshot.tz).isoformat(),
+        "points": points,
+    }
+
+
+def build_max_quantity_response(
+    snapshot: PlanningSnapshot,
+    product_id: int,
+    desired_deadline: str,
+    max_quantity: int,
+    product_repo: ProductRepository,
+    equipment_repo: EquipmentRepository,
+) -> dict[str, Any]:
+    """
+    希望納期までに対応可能な最大数量と、その数量の割り当て結果を返す。
+
+    Args:
+        snapshot: 試算に使用するスナップショット
+        product_id: 製品ID
+        desired_deadline: 希望納期（ISO形式。タイムゾーンなしはテナントのタイムゾーン）
+        max_quantity: 探索する数量の上限
+        product_repo: 製品リポジトリ（工程名の取得に使用）
+        equipment_repo: 設備リポジトリ（設備名の取得に使用）
+
+    Returns:
+        最大数量（max_quantity）、その回答納期・工程ごとのスケジュール、試算回数（evaluations）。
+        1個も間に合わない場合は max_quantity=0、回答納期・スケジュールは None
+    """
+    deadline = snapshot.to_epoch(desired_deadline)
+    quantity, planned, evaluations = snapshot.max_quantity_by(
+        product_id, deadline, max_quantity
+    )
+    if planned is None:
+        return {
+            "product_id": product_id,
+            "max_quantity": 0,
+            "calculated_deadline": None,
+            "process_schedules": None,
+            "evaluations": evaluations,
+        }
+
+    schedules = snapshot.to_schedules(planned, tenant_id="")
+    return {
+        "product_id": product_id,
+        "max_quantity": quantity,
+        "calculated_deadline": schedules[-1]["end_datetime"],
+        "process_schedules": build_process_schedules(
+            schedules, product_repo, equipment_repo
+        ),
+        "evaluations": evaluations,
+    }
+
+
+def build_multi_response(
+    snapshot: PlanningSnapshot,
+    lines: list[dict[str, Any]],
+    product_repo: ProductRepository,
+    equipment_repo: EquipmentRepository,
+) -> dict[str, Any]:
+    """
+    複数明細の見積もりを、明細の順に同じ設備の空き時刻へ積み上げて試算する（DBへの保存なし）。
+
+    後の明細は、先の明細が使用する設備の能力を占有済みとして扱う。
+
+    Args:
+        snapshot: 試算に使用するスナップショット（工程・設備グループはまとめて読み込む）
+        lines: 明細のリスト（product_id, quantity, deadline_date）
+        product_repo: 製品リポジトリ（工程名の取得に使用）
+        equipment_repo: 設備リポジトリ（設備名の取得に使用）
+
+    Returns:
+        明細ごとの回答納期・工程ごとのスケジュール（lines）と、
+        全体の回答納期（calculated_deadline）・すべての明細が間に合うか（is_feasible）
+
+    Raises:
+        ValueError: 工程が取得できない場合、または設備グループにメンバーが存在しない場合
+    """
+    snapshot.preload([line["product_id"] for line in lines])
+    timeline = snapshot.timeline.fork()
+
+    results = []
+    completion = snapshot.start
+    for line in lines:
+        product_id = line["product_id"]
+        planned = snapshot.plan(
+            product_id,
+            [
+                routing_duration_seconds(routing, line["quantity"])
+                for routing in snapshot.routings(product_id)
+            ],
+            timeline=timeline,
+        )
+        completion = max(completion, planned[-1][2][-1][1])
+        schedules = snapshot.to_schedules(planned, tenant_id="")
+        calculated_deadline = schedules[-1]["end_datetime"]
+        results.append(
+            {
+                "product_id": product_id,
+                "quantity": line["quantity"],
+                "calculated_deadline": calculated_deadline,
+                "is_feasible": is_schedule_feasible(
+                    line.get("deadline_date"), calculated_deadline
+                ),
+                "process_schedules": build_process_schedules(
+                    schedules, product_repo, equipment_repo
+                ),
+            }
+        )
+
+    return {
+        "lines": results,
+        "calculated_deadline": from_epoch_seconds(completion, snapshot.tz).isoformat(),
+        "is_feasible": all(result["is_feasible"] for result in results),
+    }
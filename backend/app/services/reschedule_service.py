@@ -0,0 +1,517 @@
+"""
+再スケジュール（リスケジュール）サービスモジュール
+
+期間内に作業が残っている確定済みの注文について、未着手の工程をすべて外し、
+イベント駆動のシミュレーションで計画し直す。
+
+- 設備が空く・工程が着手可能になるイベントを時刻順のヒープで処理する
+- 設備が空いている間は、着手可能な工程からディスパッチルール（EDD・SPT・CR）で
+  優先度の最も高い工程を選び、最も早く開始できる設備に割り当てる
+- 再計画しない予約（他の注文・着手済みの工程など）は、設備ごとの稼働不可の区間として扱う
+
+各工程はヒープへの追加・取り出しを定数回行うだけのため、計算量は O(n log n)。
+結果は既存のスケジュールIDを再利用し、1回の apply_changes でまとめて置き換える。
+"""
+
+import heapq
+import itertools
+import math
+from collections.abc import Callable
+from datetime import datetime, tzinfo
+from typing import Any
+
+from app.utils.calendar import from_epoch_seconds, parse_datetime, to_epoch_seconds
+from app.utils.equipment_calendar import (
+    OVERLAY_MAINTENANCE,
+    EquipmentCalendars,
+    Interval,
+)
+from app.utils.time_zone import get_day_boundaries
+
+# ディスパッチルール
+DISPATCH_EDD = "edd"  # 納期の早い順
+DISPATCH_SPT = "spt"  # 所要時間の短い順
+DISPATCH_CR = "cr"  # クリティカルレシオ（納期までの残り時間 / 残作業時間）の小さい順
+
+# 再計画の対象とする注文ステータス
+RESCHEDULABLE_STATUS = "confirmed"
+# 再計画時に予約を削除する注文ステータス
+DROPPED_STATUSES = frozenset({"canceled"})
+
+
+class Operation:
+    """
+    1注文の1工程（複数日に分割された同じ工程のセグメントをまとめたもの）。
+
+    Attributes:
+        order_id: 注文ID
+        process_routing_id: 工程ID
+        sequence_order: 工程順序
+        equipment_group_id: 設備グループID
+        work_seconds: 作業時間（秒。既存のセグメントに含まれる稼働時間の合計）
+        segment_ids: 既存のスケジュールID（開始日時順）
+        tenant_id: テナントID
+        machine_id: 割り当てた設備ID（再計画前は既存の設備ID）
+        segments: 割り当てた区間（エポック秒）のリスト
+    """
+
+    def __init__(
+        self, rows: list[dict[str, Any]], equipment_calendars: EquipmentCalendars
+    ):
+        """
+        Args:
+            rows: 同じ工程のスケジュール行
+            equipment_calendars: 既存のセグメントの稼働時間を求める稼働可能区間テーブル
+                （再計画しない予約を含まないもの）
+        """
+        rows = sorted(rows, key=lambda row: (row["start_datetime"], row["id"]))
+        first = rows[0]
+        self.order_id: int = first["order_id"]
+        self.process_routing_id: int | None = first.get("process_routing_id")
+        self.sequence_order: int = first.get("sequence_order") or 0
+        self.equipment_group_id: int | None = first.get("equipment_group_id")
+        self.segment_ids: list[int] = [row["id"] for row in rows]
+        self.tenant_id: str | None = first.get("tenant_id")
+        self.machine_id: int = first["equipment_id"]
+        self.segments: list[Interval] = [
+            (
+                to_epoch_seconds(parse_datetime(row["start_datetime"])),
+                to_epoch_seconds(parse_datetime(row["end_datetime"])),
+            )
+            for row in rows
+        ]
+        # セグメントの長さには休憩などの稼働時間外が含まれるため、
+        # 設備の稼働時間の累積テーブルの差で作業時間を求める
+        self.work_seconds = sum(
+            equipment_calendars.for_equipment(
+                row["equipment_id"]
+            ).working_seconds_between(start, end)
+            for row, (start, end) in zip(rows, self.segments, strict=True)
+        )
+        if self.work_seconds <= 0:
+            # 稼働時間外に置かれたセグメント（手動調整など）は実時間を作業時間とみなす
+            self.work_seconds = sum(end - start for start, end in self.segments)
+
+    @property
+    def start(self) -> int:
+        return self.segments[0][0]
+
+    @property
+    def end(self) -> int:
+        return self.segments[-1][1]
+
+
+class Job:
+    """
+    再計画する1注文。
+
+    Attributes:
+        order_id: 注文ID
+        deadline: 納期（エポック秒。未設定の場合はNone）
+        release: 最初の工程を開始できる時刻（エポック秒）
+        operations: 再計画する工程（工程順序順）
+        remaining: remaining[i] は i 番目以降の工程の作業時間の合計（秒）
+    """
+
+    def __init__(
+        self,
+        order_id: int,
+        deadline: int | None,
+        release: int,
+        operations: list[Operation],
+    ):
+        self.order_id = order_id
+        self.deadline = deadline
+        self.release = release
+        self.operations = operations
+        self.remaining = list(
+            itertools.accumulate(
+                (op.work_seconds for op in reversed(operations)), initial=0
+            )
+        )[::-1]
+
+    @property
+    def completion(self) -> int:
+        return self.operations[-1].end
+
+
+# (注文, 工程のインデックス, 現在時刻) から優先度のキー（小さいほど優先）を返す関数
+DispatchRule = Callable[[Job, int, int], tuple]
+
+
+def _edd(job: Job, index: int, now: int) -> tuple:
+    deadline = job.deadline if job.deadline is not None else math.inf
+    return (deadline, job.order_id, index)
+
+
+def _spt(job: Job, index: int, now: int) -> tuple:
+    return (job.operations[index].work_seconds, job.order_id, index)
+
+
+def _critical_ratio(job: Job, index: int, now: int) -> tuple:
+    # 工程が着手可能になった時刻で評価する（ヒープ内で優先度を再計算しないため）
+    if job.deadline is None:
+        return (math.inf, job.order_id, index)
+    ratio = (job.deadline - now) / max(job.remaining[index], 1)
+    return (ratio, job.deadline, job.order_id, index)
+
+
+DISPATCH_RULES: dict[str, DispatchRule] = {
+    DISPATCH_EDD: _edd,
+    DISPATCH_SPT: _spt,
+    DISPATCH_CR: _critical_ratio,
+}
+
+
+class ReschedulePlan:
+    """
+    再計画の対象と、再計画しない予約（稼働不可の区間）・削除する予約。
+
+    Attributes:
+        jobs: 再計画する注文
+        blocks: 再計画しない予約（設備ごとの稼働不可の区間。上書きと同じ形式）
+        dropped_ids: 削除する予約（キャンセルされた注文の予約）のスケジュールID
+    """
+
+    def __init__(
+        self,
+        jobs: list[Job],
+        blocks: list[dict[str, Any]],
+        dropped_ids: list[int],
+    ):
+        self.jobs = jobs
+        self.blocks = blocks
+        self.dropped_ids = dropped_ids
+
+    @property
+    def operation_count(self) -> int:
+        return sum(len(job.operations) for job in self.jobs)
+
+    def group_ids(self) -> list[int]:
+        """再計画する工程の設備グループID"""
+        return sorted(
+            {
+                op.equipment_group_id
+                for job in self.jobs
+                for op in job.operations
+                if op.equipment_group_id is not None
+            }
+        )
+
+
+def build_reschedule_plan(
+    rows: list[dict[str, Any]],
+    orders: dict[int, dict[str, Any]],
+    window_start: int,
+    window_end: int,
+    tz: tzinfo,
+    equipment_calendars: EquipmentCalendars,
+) -> ReschedulePlan:
+    """
+    スケジュール行から再計画の対象を抽出する。
+
+    期間内に開始する未着手の工程を持つ確定済みの注文を対象とし、
+    その注文の未着手の工程（期間の終了より後に開始する工程を含む）をすべて再計画する。
+    期間の開始より前に始まっている工程は着手済みとして動かさない。
+
+    Args:
+        rows: 期間の開始以降に終了するスケジュール（ScheduleRepository.get_plan_from の戻り値）
+        orders: 注文IDごとの注文（status, deadline_date を含む）
+        window_start: 期間の開始（エポック秒）
+        window_end: 期間の終了（エポック秒）
+        tz: 日付のみの納期を解釈するタイムゾーン
+        equipment_calendars: 既存の予約の作業時間（稼働時間）を求める稼働可能区間テーブル
+            （設備ごとの上書きを含み、再計画しない予約を含まないもの）
+
+    Returns:
+        ReschedulePlan
+    """
+    by_order: dict[int | None, list[dict[str, Any]]] = {}
+    for row in rows:
+        by_order.setdefault(row.get("order_id"), []).append(row)
+
+    jobs: list[Job] = []
+    blocks: list[dict[str, Any]] = []
+    dropped_ids: list[int] = []
+    for order_id, order_rows in by_order.items():
+        order = orders.get(order_id) if order_id is not None else None
+        status = order.get("status") if order else None
+        if status in DROPPED_STATUSES:
+            dropped_ids.extend(row["id"] for row in order_rows)
+            continue
+
+        job = None
+        if order_id is not None and status == RESCHEDULABLE_STATUS:
+            job = _build_job(
+                order_id,
+                order,
+                order_rows,
+                window_start,
+                window_end,
+                tz,
+                equipment_calendars,
+            )
+        if job is None:
+            blocks.extend(_as_block(row) for row in order_rows)
+            continue
+        jobs.append(job)
+        replanned = {
+            segment_id for op in job.operations for segment_id in op.segment_ids
+        }
+        blocks.extend(
+            _as_block(row) for row in order_rows if row["id"] not in replanned
+        )
+
+    jobs.sort(key=lambda job: job.order_id)
+    return ReschedulePlan(jobs, blocks, sorted(dropped_ids))
+
+
+def dispatch(
+    plan: ReschedulePlan,
+    machines_for_group: Callable[[int], list[int]],
+    equipment_calendars: EquipmentCalendars,
+    rule: str = DISPATCH_EDD,
+) -> None:
+    """
+    再計画する工程を、イベント駆動のシミュレーションで設備に割り当てる。
+
+    結果は各工程の machine_id・segments に反映される。
+
+    Args:
+        plan: 再計画の対象（build_reschedule_plan の戻り値）
+        machines_for_group: 設備グループIDから設備IDのリストを返す関数
+        equipment_calendars: 再計画しない予約を稼働不可の区間として含む稼働可能区間テーブル
+        rule: ディスパッチルール（DISPATCH_RULES のキー）
+
+    Raises:
+        ValueError: ディスパッチルールが不正な場合、または設備グループにメンバーが存在しない場合
+    """
+    if rule not in DISPATCH_RULES:
+        raise ValueError(f"不正なディスパッチルールです: {rule}")
+    priority = DISPATCH_RULES[rule]
+
+    members = group_members(plan, machines_for_group)
+    groups_of: dict[int, list[int]] = {}
+    for group_id, machine_ids in members.items():
+        for machine_id in machine_ids:
+            groups_of.setdefault(machine_id, []).append(group_id)
+
+    sequence = itertools.count()
+    # (時刻, 連番, 注文, 工程のインデックス) は着手可能、(時刻, 連番, None, 設備ID) は設備が空く
+    events: list[tuple[int, int, Job | None, int]] = [
+        (job.release, next(sequence), job, 0) for job in plan.jobs
+    ]
+    heapq.heapify(events)
+    ready: dict[int, list[tuple[tuple, int, Job, int]]] = {
+        group_id: [] for group_id in members
+    }
+    idle = set(groups_of)
+
+    while events:
+        now = events[0][0]
+        touched: set[int] = set()
+        # 同じ時刻のイベントをすべて反映してから割り当てる
+        while events and events[0][0] == now:
+            _, _, job, value = heapq.heappop(events)
+            if job is None:
+                idle.add(value)
+                touched.update(groups_of[value])
+                continue
+            group_id = group_key(job.operations[value])
+            heapq.heappush(
+                ready[group_id], (priority(job, value, now), next(sequence), job, value)
+            )
+            touched.add(group_id)
+
+        for group_id in sorted(touched):
+            queue = ready[group_id]
+            while queue and (candidates := idle.intersection(members[group_id])):
+                _, _, job, index = heapq.heappop(queue)
+                op = job.operations[index]
+                _assign(op, candidates, now, equipment_calendars)
+                idle.discard(op.machine_id)
+                heapq.heappush(events, (op.end, next(sequence), None, op.machine_id))
+                if index + 1 < len(job.operations):
+                    heapq.heappush(events, (op.end, next(sequence), job, index + 1))
+
+
+def build_replacement(
+    plan: ReschedulePlan, tenant_id: str, tz: tzinfo
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[int]]:
+    """
+    再計画の結果を ScheduleRepository.apply_changes の入力形式に変換する。
+
+    工程ごとに既存のスケジュールIDを先頭から再利用し、
+    区間が増えた分は追加、減った分とキャンセルされた注文の予約は削除する。
+
+    Returns:
+        (更新内容のリスト, 追加するスケジュールデータのリスト, 削除するスケジュールIDのリスト)
+    """
+    updates: list[dict[str, Any]] = []
+    inserts: list[dict[str, Any]] = []
+    deletes: list[int] = list(plan.dropped_ids)
+    for job in plan.jobs:
+        for op in job.operations:
+            rows = [
+                {
+                    "equipment_id": op.machine_id,
+                    "start_datetime": from_epoch_seconds(start, tz).isoformat(),
+                    "end_datetime": from_epoch_seconds(end, tz).isoformat(),
+                }
+                for start, end in op.segments
+            ]
+            for segment_id, row in zip(op.segment_ids, rows, strict=False):
+                updates.append({"id": segment_id, **row})
+            for row in rows[len(op.segment_ids) :]:
+                inserts.append(
+                    {
+                        "tenant_id": op.tenant_id or tenant_id,
+                        "order_id": op.order_id,
+                        "process_routing_id": op.process_routing_id,
+                        **row,
+                    }
+                )
+            deletes.extend(op.segment_ids[len(rows) :])
+    return updates, inserts, deletes
+
+
+def summarize_jobs(plan: ReschedulePlan, tz: tzinfo) -> list[dict[str, Any]]:
+    """注文ごとの完了日時・納期・納期遅れ（秒）を返す。"""
+    return [
+        {
+            "order_id": job.order_id,
+            "deadline": (
+                from_epoch_seconds(job.deadline, tz).isoformat()
+                if job.deadline is not None
+                else None
+            ),
+            "completion": from_epoch_seconds(job.completion, tz).isoformat(),
+            "tardiness_seconds": (
+                max(job.completion - job.deadline, 0) if job.deadline is not None else 0
+            ),
+        }
+        for job in plan.jobs
+    ]
+
+
+def deadline_epoch(value: str | None, tz: tzinfo) -> int | None:
+    """
+    注文の納期をエポック秒に変換する。
+
+    日付のみの場合はその日の 0:00、タイムゾーンなしの場合は tz で解釈する
+    （is_schedule_feasible と同じ解釈）。
+    """
+    if not value:
+        return None
+    if len(value) <= 10:
+        return get_day_boundaries(tz).start_of(datetime.fromisoformat(value).date())
+    dt = parse_datetime(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz)
+    return to_epoch_seconds(dt)
+
+
+def _build_job(
+    order_id: int,
+    order: dict[str, Any],
+    rows: list[dict[str, Any]],
+    window_start: int,
+    window_end: int,
+    tz: tzinfo,
+    equipment_calendars: EquipmentCalendars,
+) -> Job | None:
+    """注文の未着手の工程から Job を作る（期間内に開始する未着手の工程がなければNone）。"""
+    by_routing: dict[Any, list[dict[str, Any]]] = {}
+    for row in rows:
+        by_routing.setdefault(
+            row.get("process_routing_id") or ("segment", row["id"]), []
+        ).append(row)
+    operations = sorted(
+        (
+            Operation(routing_rows, equipment_calendars)
+            for routing_rows in by_routing.values()
+        ),
+        key=lambda op: (op.sequence_order, op.start),
+    )
+
+    # 期間の開始より前に始まった工程までは着手済みとして動かさない
+    first = next(
+        (index for index, op in enumerate(operations) if op.start >= window_start),
+        None,
+    )
+    if first is None or operations[first].start > window_end:
+        return None
+    release = max([window_start, *(op.end for op in operations[:first])])
+    return Job(
+        order_id,
+        deadline_epoch(order.get("deadline_date"), tz),
+        release,
+        operations[first:],
+    )
+
+
+def group_key(op: Operation) -> int:
+    """
+    工程を割り当てる設備グループID。
+
+    設備グループが不明な工程（工程マスタ削除済みなど）は、現在の設備だけを含む
+    仮の設備グループ（実在の設備グループIDと重ならない負の値）として扱う。
+    """
+    if op.equipment_group_id is not None:
+        return op.equipment_group_id
+    return -op.machine_id
+
+
+def group_members(
+    plan: ReschedulePlan, machines_for_group: Callable[[int], list[int]]
+) -> dict[int, list[int]]:
+    """
+    再計画する工程の設備グループIDごとの設備IDのリスト（仮の設備グループを含む）。
+
+    Raises:
+        ValueError: 設備グループにメンバーが存在しない場合
+    """
+    members: dict[int, list[int]] = {}
+    for group_id in plan.group_ids():
+        machine_ids = machines_for_group(group_id)
+        if not machine_ids:
+            raise ValueError(f"設備グループID {group_id} に設備が見つかりません")
+        members[group_id] = machine_ids
+    for job in plan.jobs:
+        for op in job.operations:
+            if op.equipment_group_id is None:
+                members.setdefault(group_key(op), [op.machine_id])
+    return members
+
+
+def _assign(
+    op: Operation,
+    candidates: set[int],
+    now: int,
+    equipment_calendars: EquipmentCalendars,
+) -> None:
+    """空いている設備のうち、最も早く開始できる設備に工程を割り当てる。"""
+    start, machine_id = min(
+        (
+            equipment_calendars.for_equipment(machine_id).next_available_epoch(now),
+            machine_id,
+        )
+        for machine_id in candidates
+    )
+    op.machine_id = machine_id
+    op.segments = (
+        equipment_calendars.for_equipment(machine_id).split_epoch(
+            start, op.work_seconds
+        )
+        if op.work_seconds > 0
+        else [(start, start)]
+    )
+
+
+def _as_block(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "equipment_id": row["equipment_id"],
+        "kind": OVERLAY_MAINTENANCE,
+        "start_datetime": row["start_datetime"],
+        "end_datetime": row["end_datetime"],
+    }
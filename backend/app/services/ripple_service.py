@@ -0,0 +1,545 @@
+"""
+連鎖再スケジュール（リップル）サービスモジュール
+
+ガントチャート上で1つのセグメントを移動した際に、
+同じ注文の後続工程と、移動先で衝突する同一設備の予約だけを後ろへずらす。
+再計算の対象は移動の影響を受ける下流の依存関係に限定され、
+計算量・更新件数は実際に動いたセグメント数に比例する。
+
+計画は全体ではなく、影響が及ぶ設備・注文の末尾だけを読み込む（ripple_closure）。
+
+カレンダーの変更（休日の追加など）で稼働時間が変わった日のセグメントは、
+そのセグメントだけを新しいカレンダーで置き直し、下流の依存関係をずらす（ripple_reflow）。
+
+注文の削除・キャンセルで空いた設備の稼働時間には、空いた時刻以降の同じ設備の予約だけを
+前詰めする（compact_machines）。
+"""
+
+import heapq
+from collections.abc import Callable, Iterable
+from datetime import datetime, tzinfo
+from typing import Any
+
+from app.utils.calendar import (
+    CalendarConfig,
+    calculate_working_minutes,
+    from_epoch_seconds,
+    get_next_available_start_time,
+    parse_datetime,
+    split_work_across_days,
+    to_epoch_seconds,
+)
+from app.utils.equipment_calendar import EquipmentAvailability, EquipmentCalendars
+from app.utils.timeline import EquipmentTimeline
+
+
+class PlanSegment:
+    """
+    メモリ上に展開したスケジュールの1セグメント。
+
+    再配置の結果、1つのセグメントが複数日に分割されることがあるため、
+    区間は pieces（(開始, 終了) のリスト）として保持する。
+    """
+
+    def __init__(
+        self, row: dict[str, Any], calendar_config: CalendarConfig | None = None
+    ):
+        self.id: int = row["id"]
+        self.tenant_id: str | None = row.get("tenant_id")
+        self.order_id: int | None = row.get("order_id")
+        self.process_routing_id: int | None = row.get("process_routing_id")
+        self.sequence_order: int = row.get("sequence_order") or 0
+        self.equipment_id: int = row["equipment_id"]
+
+        start = parse_datetime(row["start_datetime"])
+        end = parse_datetime(row["end_datetime"])
+        self.pieces: list[tuple[datetime, datetime]] = [(start, end)]
+
+        # 移動しても保持する作業量（稼働時間）。稼働時間外に置かれている場合は実時間
+        self.work_minutes = calculate_working_minutes(start, end, calendar_config)
+        if self.work_minutes <= 0:
+            self.work_minutes = (end - start).total_seconds() / 60
+
+    @property
+    def start(self) -> datetime:
+        return self.pieces[0][0]
+
+    @property
+    def end(self) -> datetime:
+        return self.pieces[-1][1]
+
+    def as_row(self) -> dict[str, Any]:
+        """検証用に、先頭から末尾までの区間を1行として返す。"""
+        return {
+            "id": self.id,
+            "order_id": self.order_id,
+            "sequence_order": self.sequence_order,
+            "equipment_id": self.equipment_id,
+            "start_datetime": self.start.isoformat(),
+            "end_datetime": self.end.isoformat(),
+        }
+
+    def place_at(
+        self,
+        earliest: datetime,
+        calendar_config: CalendarConfig | None = None,
+        equipment_calendars: EquipmentCalendars | None = None,
+    ) -> None:
+        """
+        作業量を保ったまま、earliest 以降の稼働時間に再配置する。
+
+        equipment_calendars を指定した場合は、設備の稼働可能区間テーブル
+        （保全・臨時稼働を含む）で配置し、calendar_config は使わない。
+        """
+        if self.work_minutes <= 0:
+            self.pieces = [(earliest, earliest + (self.end - self.start))]
+            return
+        if equipment_calendars is not None:
+            availability = equipment_calendars.for_equipment(self.equipment_id)
+            self.pieces = _pieces_on(
+                availability,
+                availability.next_available_epoch(to_epoch_seconds(earliest)),
+                self.work_minutes,
+                self.start.tzinfo,
+            )
+            return
+        start = get_next_available_start_time(
+            earliest, self.work_minutes, calendar_config
+        )
+        self.pieces = split_work_across_days(start, self.work_minutes, calendar_config)
+
+
+def _pieces_on(
+    availability: EquipmentAvailability,
+    start: int,
+    work_minutes: float,
+    tz: tzinfo | None,
+) -> list[tuple[datetime, datetime]]:
+    """start（エポック秒）から作業量分の稼働時間を、稼働可能区間ごとの区間に分割する。"""
+    return [
+        (from_epoch_seconds(s, tz), from_epoch_seconds(e, tz))
+        for s, e in availability.split_epoch(start, round(work_minutes * 60))
+    ]
+
+
+def build_segments(
+    rows: list[dict[str, Any]], calendar_config: CalendarConfig | None = None
+) -> dict[int, PlanSegment]:
+    """
+    スケジュール行（ScheduleRepository.get_plan_from の戻り値）から
+    セグメントの辞書を構築する。
+
+    Returns:
+        {スケジュールID: PlanSegment}
+    """
+    return {row["id"]: PlanSegment(row, calendar_config) for row in rows}
+
+
+def ripple_closure(
+    load_rows: Callable[[list[int], list[int]], list[dict[str, Any]]],
+    replan: Callable[[dict[int, PlanSegment]], list[PlanSegment]],
+    equipment_ids: Iterable[int],
+    order_ids: Iterable[int | None],
+    calendar_config: CalendarConfig | None = None,
+) -> tuple[dict[int, PlanSegment], list[PlanSegment]]:
+    """
+    影響が及ぶ設備・注文の予約だけを読み込んで、連鎖再スケジュールを行う。
+
+    連鎖は同じ注文の後続工程と同じ設備の後続の予約にしか伝播しないため、
+    変更されたセグメントの設備・注文の予約がすべて読み込まれていれば、計画全体を
+    読み込んだ場合と同じ結果になる。読み込んでいない設備・注文のセグメントが変更された場合は、
+    その設備・注文を加えて読み込み直し、計算し直す。
+
+    Args:
+        load_rows: (設備IDのリスト, 注文IDのリスト) のいずれかに属するスケジュール行を返す関数
+            （ScheduleRepository.get_plan_suffix など）
+        replan: 読み込んだ計画を再配置し、変更されたセグメントを返す関数
+            （ripple_move などを呼び出す）
+        equipment_ids: 最初に読み込む設備ID
+        order_ids: 最初に読み込む注文ID（Noneは無視する）
+        calendar_config: 作業量の算出に使用するカレンダー設定
+
+    Returns:
+        (最後に読み込んだ計画, 変更されたセグメントのリスト)
+    """
+    machines = set(equipment_ids)
+    orders = {order_id for order_id in order_ids if order_id is not None}
+    while True:
+        segments = build_segments(
+            load_rows(sorted(machines), sorted(orders)), calendar_config
+        )
+        changed = replan(segments)
+        missing_machines = {segment.equipment_id for segment in changed} - machines
+        missing_orders = {
+            segment.order_id for segment in changed if segment.order_id is not None
+        } - orders
+        if not missing_machines and not missing_orders:
+            return segments, changed
+        machines |= missing_machines
+        orders |= missing_orders
+
+
+def ripple_move(
+    segments: dict[int, PlanSegment],
+    moved_id: int,
+    start: datetime,
+    end: datetime,
+    equipment_id: int,
+    calendar_config: CalendarConfig | None = None,
+    pieces: list[tuple[datetime, datetime]] | None = None,
+    equipment_calendars: EquipmentCalendars | None = None,
+) -> list[PlanSegment]:
+    """
+    セグメントを移動し、影響を受ける下流のセグメントだけを後ろへずらす。
+
+    移動したセグメントは利用者の指定位置に固定し、次の2種類の依存関係を辿る。
+    - 同じ注文の後続セグメント（工程順序 → 開始日時の順）
+    - 同じ設備で後に並ぶセグメント（移動先で衝突する予約は移動セグメントの後ろに並ぶ）
+
+    各セグメントは「前のセグメントの終了時刻」より前に始まっている場合のみ再配置され、
+    再配置されなかったセグメントから先へは伝播しない。
+
+    Args:
+        segments: メモリ上の計画（build_segments の戻り値）。再配置結果で更新される
+        moved_id: 移動するセグメントのID
+        start: 移動後の開始日時
+        end: 移動後の終了日時
+        equipment_id: 移動後の設備ID
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
+        pieces: 移動後のセグメントを複数日に分割して配置する場合の区間リスト
+            （指定時は start, end より優先する）
+        equipment_calendars: 設備ごとの稼働可能区間テーブル
+            （指定時は calendar_config より優先して、ずらした予約の配置に使う）
+
+    Returns:
+        変更されたセグメントのリスト（先頭は移動したセグメント）
+
+    Raises:
+        KeyError: moved_id が計画に含まれない場合
+    """
+    pinned = segments[moved_id]
+    pinned.pieces = pieces if pieces else [(start, end)]
+    pinned.equipment_id = equipment_id
+    return _ripple(segments, [pinned], calendar_config, equipment_calendars)
+
+
+def ripple_insert(
+    segments: dict[int, PlanSegment],
+    inserted: list[PlanSegment],
+    calendar_config: CalendarConfig | None = None,
+    equipment_calendars: EquipmentCalendars | None = None,
+) -> list[PlanSegment]:
+    """
+    配置済みのセグメントを計画に割り込ませ、押し出された予約だけを後ろへずらす。
+
+    割り込ませたセグメントは指定位置に固定し、ripple_move と同じく
+    同じ注文の後続セグメントと、同じ設備で重なる・後に並ぶ予約だけを再配置する。
+
+    Args:
+        segments: メモリ上の計画。割り込ませたセグメントが追加され、再配置結果で更新される
+        inserted: 割り込ませるセグメント（IDは計画内で一意であること）
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
+        equipment_calendars: 設備ごとの稼働可能区間テーブル
+            （指定時は calendar_config より優先して、押し出された予約の配置に使う）
+
+    Returns:
+        変更されたセグメントのリスト（先頭は割り込ませたセグメント）
+    """
+    for segment in inserted:
+        segments[segment.id] = segment
+    return _ripple(segments, inserted, calendar_config, equipment_calendars)
+
+
+def ripple_reflow(
+    segments: dict[int, PlanSegment],
+    reflow_ids: Iterable[int],
+    calendar_config: CalendarConfig | None = None,
+    equipment_calendars: EquipmentCalendars | None = None,
+) -> list[PlanSegment]:
+    """
+    指定したセグメントを新しいカレンダーで置き直し、押し出された予約だけを後ろへずらす。
+
+    対象のセグメントは開始日時の順に、作業量を保ったまま次の遅い方以降の稼働時間へ再配置する。
+    - 現在の開始日時
+    - 同じ設備で先に置き直した対象のセグメントの終了時刻
+    - 同じ注文の前工程の終了時刻
+
+    置き直したセグメントを固定し、ripple_move と同じく同じ注文の後続セグメントと、
+    同じ設備で重なる・後に並ぶ予約だけを再配置する。
+
+    Args:
+        segments: メモリ上の計画（作業量は変更前のカレンダーで算出したもの）。再配置結果で更新される
+        reflow_ids: 置き直すセグメントのID（計画に含まれないIDは無視する）
+        calendar_config: 変更後のカレンダー設定
+        equipment_calendars: 変更後のカレンダー設定に設備ごとの上書きを重ねた稼働可能区間テーブル
+            （指定時は calendar_config より優先する）
+
+    Returns:
+        変更されたセグメントのリスト（先頭は置き直したセグメント）
+    """
+    targets = sorted(
+        (segments[i] for i in set(reflow_ids) if i in segments),
+        key=lambda s: (s.start, s.id),
+    )
+    order_prev, _ = _link_order_chains(segments)
+    machine_end: dict[int, datetime] = {}
+    for segment in targets:
+        earliest = max(
+            [segment.start]
+            + [
+                end
+                for end in (
+                    machine_end.get(segment.equipment_id),
+                    getattr(order_prev.get(segment.id), "end", None),
+                )
+                if end is not None
+            ]
+        )
+        segment.place_at(earliest, calendar_config, equipment_calendars)
+        machine_end[segment.equipment_id] = segment.end
+    return _ripple(segments, targets, calendar_config, equipment_calendars)
+
+
+def _ripple(
+    segments: dict[int, PlanSegment],
+    pinned: list[PlanSegment],
+    calendar_config: CalendarConfig | None,
+    equipment_calendars: EquipmentCalendars | None = None,
+) -> list[PlanSegment]:
+    """固定したセグメントから下流の依存関係を辿り、前のセグメントと重なるものだけを再配置する。"""
+    pinned_ids = {segment.id for segment in pinned}
+    order_prev, order_next = _link_order_chains(segments)
+    machine_prev, machine_next = _link_machine_queues(segments, pinned)
+
+    changed: dict[int, PlanSegment] = {segment.id: segment for segment in pinned}
+    heap: list[tuple[datetime, int]] = []
+
+    def push(segment: PlanSegment | None) -> None:
+        if segment is not None and segment.id not in pinned_ids:
+            heapq.heappush(heap, (segment.start, segment.id))
+
+    for segment in pinned:
+        push(order_next.get(segment.id))
+        push(machine_next.get(segment.id))
+
+    while heap:
+        _, segment_id = heapq.heappop(heap)
+        segment = segments[segment_id]
+
+        predecessors = [
+            p
+            for p in (order_prev.get(segment_id), machine_prev.get(segment_id))
+            if p is not None
+        ]
+        earliest = max((p.end for p in predecessors), default=None)
+        if earliest is None or segment.start >= earliest:
+            continue
+
+        segment.place_at(earliest, calendar_config, equipment_calendars)
+        changed[segment_id] = segment
+        push(order_next.get(segment_id))
+        push(machine_next.get(segment_id))
+
+    return list(changed.values())
+
+
+def compact_machines(
+    segments: dict[int, PlanSegment],
+    freed_from: dict[int, datetime],
+    equipment_calendars: EquipmentCalendars,
+) -> list[PlanSegment]:
+    """
+    空いた稼働時間に、同じ設備の後続の予約を前詰めする。
+
+    対象は freed_from の設備で、空いた時刻以降に始まる予約（設備ごとの末尾）に限る。
+    予約は開始日時の順に、次の遅い方以降で最も早く稼働可能な時刻へ移動する。
+    - 空いた時刻（それより前に始まった予約は動かさず、その終了時刻まで設備は使えない）
+    - 同じ設備で前に並ぶ予約の終了時刻（前詰め後）
+    - 同じ注文の前工程の終了時刻
+
+    前詰めで開始・終了が早まらない予約は動かさない（後ろへずらすことはない）。
+    対象外の設備の予約は動かさないため、後続工程の開始は前工程の前詰めに追従しない。
+
+    Args:
+        segments: メモリ上の計画（build_segments の戻り値）。前詰めの結果で更新される
+        freed_from: 設備IDごとの、稼働時間が空いた時刻
+        equipment_calendars: 設備ごとの稼働可能区間テーブル
+
+    Returns:
+        前詰めしたセグメントのリスト（開始日時順）
+    """
+    order_prev, _ = _link_order_chains(segments)
+    floors = dict(freed_from)
+    suffix: list[PlanSegment] = []
+    for segment in sorted(segments.values(), key=lambda s: (s.start, s.id)):
+        if segment.equipment_id not in floors:
+            continue
+        if segment.start < freed_from[segment.equipment_id]:
+            floors[segment.equipment_id] = max(
+                floors[segment.equipment_id], segment.end
+            )
+        else:
+            suffix.append(segment)
+
+    # 開始日時の順に処理するため、同じ設備・同じ注文の前のセグメントは確定済み
+    changed: list[PlanSegment] = []
+    for segment in suffix:
+        earliest = floors[segment.equipment_id]
+        prev = order_prev.get(segment.id)
+        if prev is not None:
+            earliest = max(earliest, prev.end)
+        if earliest < segment.start and segment.work_minutes > 0:
+            availability = equipment_calendars.for_equipment(segment.equipment_id)
+            start = availability.next_available_epoch(to_epoch_seconds(earliest))
+            if start < to_epoch_seconds(segment.start):
+                pieces = _pieces_on(
+                    availability, start, segment.work_minutes, segment.start.tzinfo
+                )
+                if pieces[-1][1] <= segment.end:
+                    segment.pieces = pieces
+                    changed.append(segment)
+        floors[segment.equipment_id] = max(floors[segment.equipment_id], segment.end)
+    return changed
+
+
+def build_change_set(
+    changed: list[PlanSegment],
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    変更されたセグメントを ScheduleRepository.apply_changes の入力形式に変換する。
+
+    分割されたセグメントは、最初の区間で既存行を更新し、残りの区間を新規行として追加する。
+    保存前のセグメント（IDが負の値）は、すべての区間を新規行として追加する。
+
+    Returns:
+        (更新内容のリスト, 追加するスケジュールデータのリスト)
+    """
+    updates: list[dict[str, Any]] = []
+    inserts: list[dict[str, Any]] = []
+    for segment in changed:
+        first_start, first_end = segment.pieces[0]
+        if segment.id > 0:
+            updates.append(
+                {
+                    "id": segment.id,
+                    "equipment_id": segment.equipment_id,
+                    "start_datetime": first_start.isoformat(),
+                    "end_datetime": first_end.isoformat(),
+                }
+            )
+        for piece_start, piece_end in segment.pieces[1 if segment.id > 0 else 0 :]:
+            inserts.append(
+                {
+                    "tenant_id": segment.tenant_id,
+                    "order_id": segment.order_id,
+                    "process_routing_id": segment.process_routing_id,
+                    "equipment_id": segment.equipment_id,
+                    "start_datetime": piece_start.isoformat(),
+                    "end_datetime": piece_end.isoformat(),
+                }
+            )
+    return updates, inserts
+
+
+def order_completions(segments: Iterable[PlanSegment]) -> dict[int, datetime]:
+    """注文ごとの最後のセグメントの終了日時。"""
+    completions: dict[int, datetime] = {}
+    for segment in segments:
+        if segment.order_id is None:
+            continue
+        end = segment.end
+        if segment.order_id not in completions or end > completions[segment.order_id]:
+            completions[segment.order_id] = end
+    return completions
+
+
+def delayed_orders(
+    previous_end: dict[int, datetime],
+    new_end: dict[int, datetime],
+    order_ids: Iterable[int | None],
+) -> list[dict[str, Any]]:
+    """
+    完了が遅れた注文（order_id, previous_end, new_end, delay_seconds）を注文ID順に返す。
+
+    Args:
+        previous_end: 変更前の注文ごとの完了日時（order_completions の戻り値）
+        new_end: 変更後の注文ごとの完了日時
+        order_ids: 比較する注文ID（変更されたセグメントの注文ID）
+    """
+    return [
+        {
+            "order_id": order_id,
+            "previous_end": previous_end[order_id].isoformat(),
+            "new_end": new_end[order_id].isoformat(),
+            "delay_seconds": int(
+                (new_end[order_id] - previous_end[order_id]).total_seconds()
+            ),
+        }
+        for order_id in sorted({i for i in order_ids if i is not None})
+        if order_id in previous_end
+        and order_id in new_end
+        and new_end[order_id] > previous_end[order_id]
+    ]
+
+
+def _link_order_chains(
+    segments: dict[int, PlanSegment],
+) -> tuple[dict[int, PlanSegment], dict[int, PlanSegment]]:
+    """注文ごとにセグメントを工程順に並べ、前後のセグメントの対応表を作る。"""
+    chains: dict[int | None, list[PlanSegment]] = {}
+    for segment in segments.values():
+        chains.setdefault(segment.order_id, []).append(segment)
+
+    prev: dict[int, PlanSegment] = {}
+    next_: dict[int, PlanSegment] = {}
+    for order_id, chain in chains.items():
+        # 注文に紐づかないセグメント（シミュレーション由来など）は順序関係を持たない
+        if order_id is None:
+            continue
+        chain.sort(key=lambda s: (s.sequence_order, s.start, s.id))
+        for a, b in zip(chain, chain[1:], strict=False):
+            next_[a.id] = b
+            prev[b.id] = a
+    return prev, next_
+
+
+def _link_machine_queues(
+    segments: dict[int, PlanSegment], pinned: list[PlanSegment]
+) -> tuple[dict[int, PlanSegment], dict[int, PlanSegment]]:
+    """
+    設備ごとにセグメントを開始時刻順に並べ、前後のセグメントの対応表を作る。
+
+    固定したセグメントと重なる予約は、固定したセグメントの直後に並べる。
+    """
+    pinned_ids = {segment.id for segment in pinned}
+    timeline = EquipmentTimeline()
+    for segment in segments.values():
+        if segment.id not in pinned_ids:
+            timeline.add(segment.equipment_id, segment.start, segment.end, segment.id)
+
+    # 並び順のキー: 重なる予約は最初に重なる固定したセグメントの直後に置く
+    sort_keys: dict[int, tuple[datetime, int, datetime, int]] = {}
+    for segment in sorted(pinned, key=lambda s: (s.start, s.id)):
+        sort_keys[segment.id] = (segment.start, 0, segment.start, segment.id)
+        for _, _, key in timeline.overlapping(
+            segment.equipment_id, segment.start, segment.end
+        ):
+            sort_keys.setdefault(
+                key, (segment.start, 1, segments[key].start, segments[key].id)
+            )
+
+    queues: dict[int, list[PlanSegment]] = {
+        equipment_id: [segments[key] for _, _, key in timeline.entries(equipment_id)]
+        for equipment_id in timeline.equipment_ids()
+    }
+    for segment in pinned:
+        queues.setdefault(segment.equipment_id, []).append(segment)
+
+    prev: dict[int, PlanSegment] = {}
+    next_: dict[int, PlanSegment] = {}
+    for queue in queues.values():
+        queue.sort(key=lambda s: sort_keys.get(s.id, (s.start, -1, s.start, s.id)))
+        for a, b in zip(queue, queue[1:], strict=False):
+            next_[a.id] = b
+            prev[b.id] = a
+    return prev, next_
@@ -0,0 +1,355 @@
+"""
+What-if シナリオ比較サービスモジュール
+
+現在の計画・注文・設備グループ・稼働カレンダーを1度だけ読み込んだスナップショット
+（ScenarioSnapshot）を、シナリオごとに fork して変更（臨時稼働・保全・設備の追加・
+注文の前倒し）を宣言的に適用し、再スケジュールと同じディスパッチで計画し直して
+KPIを比較する。DBへは書き込まない。
+
+fork は読み込んだデータを共有し、変更した注文・設備グループ・上書きだけを
+シナリオごとに保持する（コピーオンライト）。複数のシナリオはプロセスプールで並列に計算し、
+スナップショットはpickleして1回だけ作ったバイト列を各プロセスへ渡す。
+"""
+
+import copy
+import pickle
+from collections import ChainMap
+from collections.abc import Mapping
+from concurrent.futures import Executor
+from datetime import timedelta, tzinfo
+from typing import Any
+
+import numpy as np
+
+from app.models.transaction.schedule import MAX_OPTIMIZE_WORKERS
+from app.services.calendar_service import DEFAULT_CALENDAR_HORIZON_DAYS
+from app.services.kpi_service import (
+    NO_DEADLINE,
+    NO_ORDER,
+    PlanArrays,
+    evaluate_plan_kpis,
+)
+from app.services.optimize_service import get_search_executor
+from app.services.reschedule_service import (
+    DISPATCH_EDD,
+    ReschedulePlan,
+    build_reschedule_plan,
+    dispatch,
+)
+from app.utils.calendar import (
+    CalendarConfig,
+    from_epoch_seconds,
+    parse_datetime,
+    to_epoch_seconds,
+)
+from app.utils.equipment_calendar import (
+    OVERLAY_EXTRA_SHIFT,
+    OVERLAY_MAINTENANCE,
+    EquipmentCalendars,
+)
+
+# シナリオで追加する仮の設備のIDの起点（実在の設備IDと重ならない値）
+VIRTUAL_EQUIPMENT_ID_BASE = 1_000_000_000
+
+# シナリオの変更の種別
+MODIFICATION_EXTRA_SHIFT = "extra_shift"  # 臨時稼働（残業・休日出勤）
+MODIFICATION_MAINTENANCE = "maintenance"  # 保全（設備の停止）
+MODIFICATION_ADD_MACHINE = "add_machine"  # 設備グループへの設備の追加
+MODIFICATION_EXPEDITE_ORDER = "expedite_order"  # 注文の前倒し（納期の繰り上げ）
+
+# 差分を返すKPI
+COMPARED_KPIS = (
+    "makespan_seconds",
+    "total_tardiness_seconds",
+    "max_tardiness_seconds",
+    "late_order_count",
+)
+
+
+class ScenarioSnapshot:
+    """
+    シナリオの計算に必要なデータのスナップショット。
+
+    Attributes:
+        rows: 期間の開始以降に終了するスケジュール（ScheduleRepository.get_plan_from の戻り値）
+        orders: 注文IDごとの注文（fork では変更した注文だけを子が保持する）
+        members: 設備グループIDごとの設備IDのリスト（同上）
+        overlays: 設備ごとの上書き（equipment_id がNoneの上書きはすべての設備に適用する）
+        calendar_config: テナントのカレンダー設定
+        window_start: 再計画する期間の開始（エポック秒）
+        window_end: 再計画する期間の終了（エポック秒）
+        tz: テナントのタイムゾーン
+    """
+
+    def __init__(
+        self,
+        rows: list[dict[str, Any]],
+        orders: Mapping[int, dict[str, Any]],
+        members: Mapping[int, list[int]],
+        overlays: list[dict[str, Any]],
+        calendar_config: CalendarConfig,
+        window_start: int,
+        window_end: int,
+        tz: tzinfo,
+    ):
+        self.rows = rows
+        self.orders = orders
+        self.members = members
+        self.overlays = overlays
+        self.calendar_config = calendar_config
+        self.window_start = window_start
+        self.window_end = window_end
+        self.tz = tz
+        self._virtual_count = 0
+        # 既存の予約は変更前の上書きで配置されているため、作業時間の算出用に保持する
+        self._booked_overlays = list(overlays)
+
+    def fork(self) -> "ScenarioSnapshot":
+        """読み込んだデータを共有し、変更だけを別に保持する子を作成する。"""
+        child = ScenarioSnapshot(
+            self.rows,
+            ChainMap({}, self.orders),
+            ChainMap({}, self.members),
+            list(self.overlays),
+            self.calendar_config,
+            self.window_start,
+            self.window_end,
+            self.tz,
+        )
+        child._virtual_count = self._virtual_count
+        child._booked_overlays = self._booked_overlays
+        return child
+
+    def detached(self) -> "ScenarioSnapshot":
+        """
+        カレンダー設定を DB・キャッシュを参照しない設定に置き換えた複製を返す
+        （プロセスプールへpickleして渡す前に使う）。
+
+        休日情報は、期間の開始から期間の終了・読み込んだ予約の終了の遅い方の
+        DEFAULT_CALENDAR_HORIZON_DAYS 日後までを読み込んでおく。
+        """
+        latest = max(
+            (
+                to_epoch_seconds(parse_datetime(row["end_datetime"]))
+                for row in self.rows
+            ),
+            default=self.window_end,
+        )
+        snapshot = copy.copy(self)
+        snapshot.calendar_config = self.calendar_config.detached(
+            from_epoch_seconds(self.window_start, self.tz).date() - timedelta(days=1),
+            from_epoch_seconds(max(latest, self.window_end), self.tz).date()
+            + timedelta(days=DEFAULT_CALENDAR_HORIZON_DAYS),
+        )
+        return snapshot
+
+    def apply(self, modification: dict[str, Any]) -> None:
+        """
+        シナリオの変更を適用する。
+
+        Raises:
+            ValueError: 変更の種別が不正な場合、または対象の注文・設備グループが
+                再計画の対象に含まれない場合
+        """
+        kind = modification.get("type")
+        if kind in (MODIFICATION_EXTRA_SHIFT, MODIFICATION_MAINTENANCE):
+            overlay_kind = (
+                OVERLAY_EXTRA_SHIFT
+                if kind == MODIFICATION_EXTRA_SHIFT
+                else OVERLAY_MAINTENANCE
+            )
+            equipment_ids = modification.get("equipment_ids") or [None]
+            self.overlays.extend(
+                {
+                    "equipment_id": equipment_id,
+                    "kind": overlay_kind,
+                    "start_datetime": modification["start_datetime"],
+                    "end_datetime": modification["end_datetime"],
+                }
+                for equipment_id in equipment_ids
+            )
+        elif kind == MODIFICATION_ADD_MACHINE:
+            group_id = modification["equipment_group_id"]
+            if group_id not in self.members:
+                raise ValueError(
+                    f"設備グループID {group_id} は再計画の対象に含まれません"
+                )
+            added = [
+                VIRTUAL_EQUIPMENT_ID_BASE + self._virtual_count + index
+                for index in range(modification.get("count", 1))
+            ]
+            self._virtual_count += len(added)
+            self.members[group_id] = [*self.members[group_id], *added]
+        elif kind == MODIFICATION_EXPEDITE_ORDER:
+            order_id = modification["order_id"]
+            if order_id not in self.orders:
+                raise ValueError(f"注文ID {order_id} は再計画の対象に含まれません")
+            # 納期の指定がない場合は期間の開始を納期とし、EDDで最優先にする
+            self.orders[order_id] = {
+                **self.orders[order_id],
+                "deadline_date": modification.get("deadline_date")
+                or from_epoch_seconds(self.window_start, self.tz).isoformat(),
+            }
+        else:
+            raise ValueError(f"不正なシナリオの変更です: {kind}")
+
+    def equipment_calendars(self, blocks: list[dict[str, Any]]) -> EquipmentCalendars:
+        """シナリオの上書きと再計画しない予約から稼働可能区間テーブルを作る。"""
+        machine_ids = sorted({m for ids in self.members.values() for m in ids})
+        overlays = [
+            {**overlay, "equipment_id": machine_id}
+            for overlay in self.overlays
+            for machine_id in (
+                machine_ids
+                if overlay["equipment_id"] is None
+                else [overlay["equipment_id"]]
+            )
+        ]
+        return EquipmentCalendars(self.calendar_config, overlays + blocks, tz=self.tz)
+
+    def booked_calendars(self) -> EquipmentCalendars:
+        """既存の予約の作業時間を求める稼働可能区間テーブル（シナリオの変更を含まない）。"""
+        machine_ids = sorted({row["equipment_id"] for row in self.rows})
+        overlays = [
+            {**overlay, "equipment_id": machine_id}
+            for overlay in self._booked_overlays
+            for machine_id in (
+                machine_ids
+                if overlay["equipment_id"] is None
+                else [overlay["equipment_id"]]
+            )
+        ]
+        return EquipmentCalendars(self.calendar_config, overlays, tz=self.tz)
+
+
+def run_scenario(
+    snapshot: ScenarioSnapshot, rule: str = DISPATCH_EDD
+) -> dict[str, Any]:
+    """
+    スナップショットに対して再スケジュールと同じディスパッチを行い、KPIを返す。
+
+    Raises:
+        ValueError: ディスパッチルールが不正な場合、または設備グループにメンバーが存在しない場合
+    """
+    plan = build_reschedule_plan(
+        snapshot.rows,
+        dict(snapshot.orders),
+        snapshot.window_start,
+        snapshot.window_end,
+        snapshot.tz,
+        snapshot.booked_calendars(),
+    )
+    equipment_calendars = snapshot.equipment_calendars(plan.blocks)
+    dispatch(
+        plan,
+        lambda group_id: snapshot.members.get(group_id, []),
+        equipment_calendars,
+        rule,
+    )
+    kpis = evaluate_plan_kpis(
+        _plan_arrays(plan),
+        horizon=(snapshot.window_start, snapshot.window_end),
+        equipment_calendars=equipment_calendars,
+    )
+    for machine in kpis["machines"]:
+        machine["is_virtual"] = machine["equipment_id"] >= VIRTUAL_EQUIPMENT_ID_BASE
+    kpis["operation_count"] = plan.operation_count
+    return kpis
+
+
+def compare_scenarios(
+    snapshot: ScenarioSnapshot,
+    scenarios: list[dict[str, Any]],
+    rule: str = DISPATCH_EDD,
+    workers: int = 1,
+    executor: Executor | None = None,
+) -> dict[str, Any]:
+    """
+    変更なし（現在の計画）と各シナリオのKPIを求め、並べて返す。
+
+    Args:
+        snapshot: 読み込んだデータのスナップショット（変更されない）
+        scenarios: シナリオのリスト（name, modifications を含む）
+        rule: ディスパッチルール
+        workers: 並列数（1の場合はプロセスプールを使わずに実行する）
+        executor: シナリオを計算するExecutor（Noneの場合は共有のプロセスプール）
+
+    Returns:
+        baseline（変更なしのKPI）と、シナリオごとのKPIと変更なしとの差分（scenarios）
+
+    Raises:
+        ValueError: シナリオの変更が不正な場合、またはディスパッチに失敗した場合
+    """
+    if executor is None:
+        workers = max(1, min(workers, MAX_OPTIMIZE_WORKERS))
+    parallel = workers > 1 and len(scenarios) > 0
+    if parallel:
+        # キャッシュのカレンダー設定はpickleできないため、fork の前に置き換える
+        snapshot = snapshot.detached()
+
+    forks = [snapshot]
+    for scenario in scenarios:
+        fork = snapshot.fork()
+        for modification in scenario.get("modifications", []):
+            fork.apply(modification)
+        forks.append(fork)
+
+    if not parallel:
+        results = [run_scenario(fork, rule) for fork in forks]
+    else:
+        executor = executor if executor is not None else get_search_executor()
+        payload = pickle.dumps(forks, protocol=pickle.HIGHEST_PROTOCOL)
+        futures = [
+            executor.submit(_run_scenario_at, payload, index, rule)
+            for index in range(len(forks))
+        ]
+        results = [future.result() for future in futures]
+
+    baseline, *scenario_kpis = results
+    return {
+        "baseline": baseline,
+        "scenarios": [
+            {
+                "name": scenario.get("name"),
+                "kpis": kpis,
+                "delta": {key: kpis[key] - baseline[key] for key in COMPARED_KPIS},
+            }
+            for scenario, kpis in zip(scenarios, scenario_kpis, strict=True)
+        ],
+    }
+
+
+def _run_scenario_at(payload: bytes, index: int, rule: str) -> dict[str, Any]:
+    """プロセスプールで実行する1シナリオの計算（スナップショットはpickleしたバイト列で受け取る）。"""
+    return run_scenario(pickle.loads(payload)[index], rule)
+
+
+def _plan_arrays(plan: ReschedulePlan) -> PlanArrays:
+    """再計画した工程のセグメントを、納期付きの配列にする（再計画しない予約は注文なし）。"""
+    order_ids: list[int] = []
+    machine_ids: list[int] = []
+    starts: list[int] = []
+    ends: list[int] = []
+    deadlines: list[int] = []
+    for job in plan.jobs:
+        deadline = job.deadline if job.deadline is not None else NO_DEADLINE
+        for op in job.operations:
+            for start, end in op.segments:
+                order_ids.append(job.order_id)
+                machine_ids.append(op.machine_id)
+                starts.append(start)
+                ends.append(end)
+                deadlines.append(deadline)
+    for block in plan.blocks:
+        order_ids.append(NO_ORDER)
+        machine_ids.append(block["equipment_id"])
+        starts.append(to_epoch_seconds(parse_datetime(block["start_datetime"])))
+        ends.append(to_epoch_seconds(parse_datetime(block["end_datetime"])))
+        deadlines.append(NO_DEADLINE)
+    return PlanArrays(
+        np.array(order_ids, dtype=np.int64),
+        np.array(machine_ids, dtype=np.int64),
+        np.array(starts, dtype=np.int64),
+        np.array(ends, dtype=np.int64),
+        np.array(deadlines, dtype=np.int64),
+    )
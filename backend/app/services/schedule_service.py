@@ -0,0 +1,1335 @@
+"""
+生産スケジュールの編集・再計画サービスモジュール
+
+ガントチャート上の手動調整（単体・まとめて）、期間内の再スケジュール・最適化、
+What-if シナリオの比較、前詰め、注文の確定・特急注文の割り込み・キャンセル・削除に伴う
+計画の変更、設備の故障・カレンダーの変更による再配置を、リポジトリとキャッシュを使って実行する。
+ルーターは HTTP の入出力のみを扱い、ここで送出する例外をステータスコードに変換する。
+
+- ScheduleNotFoundError: 対象のスケジュールが存在しない（404）
+- OrderNotFoundError: 対象の注文が存在しない（404）
+- EquipmentNotFoundError: 対象の設備が存在しない（404）
+- InvalidScheduleRequestError: 日時の指定が不正（422）
+- ScheduleConflictError: 変更後の計画に制約違反がある（409）
+- HoldUnavailableError: 仮押さえが存在しない・期限切れ（409）
+- ValueError: カレンダー・計画の読み込みや計算に失敗した（400）
+"""
+
+from datetime import UTC, date, datetime, timedelta, tzinfo
+from typing import Any
+
+from postgrest.exceptions import APIError
+
+from app.models.master.equipment_schemas import EquipmentOutageCreate
+from app.models.transaction.order_schema import OrderExpediteRequest
+from app.models.transaction.schedule import (
+    MAX_OPTIMIZE_WORKERS,
+    CompactRequest,
+    CompareScenariosRequest,
+    OptimizeRequest,
+    RescheduleRequest,
+    ScheduleBatchUpdate,
+    ScheduleUpdate,
+)
+from app.repositories.supa_infra.common.calendar_repo import CalendarRepository
+from app.repositories.supa_infra.common.shift_pattern_repo import (
+    ShiftPatternRepository,
+)
+from app.repositories.supa_infra.master.equipment_repo import EquipmentRepository
+from app.repositories.supa_infra.master.product_repo import ProductRepository
+from app.repositories.supa_infra.transaction.order_repo import OrderRepository
+from app.repositories.supa_infra.transaction.schedule_repo import ScheduleRepository
+from app.scheduler_logic import get_equipment_ids_by_groups, schedule_order
+from app.services.calendar_impact_service import (
+    CalendarImpact,
+    date_periods,
+    reflow_affected_suffix,
+    summarize_impact,
+)
+from app.services.calendar_service import DEFAULT_CALENDAR_HORIZON_DAYS, CalendarCache
+from app.services.expedite_service import insert_rush_order_suffix
+from app.services.hold_service import CapacityHoldStore
+from app.services.kpi_service import PlanArrays, evaluate_plan_kpis
+from app.services.optimize_service import CompactPlan, parallel_search
+from app.services.outage_service import repair_outage_suffix
+from app.services.quick_quote_service import LoadCache
+from app.services.reschedule_service import (
+    ReschedulePlan,
+    build_replacement,
+    build_reschedule_plan,
+    dispatch,
+    summarize_jobs,
+)
+from app.services.ripple_service import (
+    PlanSegment,
+    build_change_set,
+    build_segments,
+    compact_machines,
+    ripple_closure,
+    ripple_move,
+)
+from app.services.scenario_service import ScenarioSnapshot, compare_scenarios
+from app.services.schedule_validation_service import (
+    find_conflicts,
+    snap_to_working_time,
+)
+from app.utils.calendar import CalendarConfig, parse_datetime, to_epoch_seconds
+from app.utils.equipment_calendar import OVERLAY_MAINTENANCE, EquipmentCalendars
+from app.utils.logger import get_logger
+from app.utils.time_zone import get_day_boundaries
+
+logger = get_logger(__name__)
+
+
+class ScheduleNotFoundError(LookupError):
+    """対象のスケジュールが存在しない"""
+
+
+class OrderNotFoundError(LookupError):
+    """対象の注文が存在しない"""
+
+
+class EquipmentNotFoundError(LookupError):
+    """対象の設備が存在しない"""
+
+
+class InvalidScheduleRequestError(ValueError):
+    """日時の指定が不正（開始が終了以降など）"""
+
+
+class HoldUnavailableError(LookupError):
+    """確定に使う仮押さえが存在しない・期限切れ"""
+
+
+class ScheduleConflictError(Exception):
+    """
+    変更後の計画に制約違反があるため保存しなかった。
+
+    Attributes:
+        conflicts: 検出した制約違反
+        adjustments: 稼働時間への吸着で行った調整
+    """
+
+    def __init__(
+        self, conflicts: list[dict[str, Any]], adjustments: list[dict[str, Any]]
+    ):
+        super().__init__("制約違反があるため更新できません")
+        self.conflicts = conflicts
+        self.adjustments = adjustments
+
+
+class _WindowReplan:
+    """期間内の再計画の対象と、割り当てに使った設備・カレンダー"""
+
+    def __init__(
+        self,
+        plan: ReschedulePlan,
+        members: dict[int, list[int]],
+        equipment_calendars: EquipmentCalendars,
+        tz: tzinfo,
+        window_start: datetime,
+        window_end: datetime,
+    ):
+        self.plan = plan
+        self.members = members
+        self.equipment_calendars = equipment_calendars
+        self.tz = tz
+        self.window_start = window_start
+        self.window_end = window_end
+
+
+class ScheduleService:
+    """
+    テナントの生産スケジュールを編集・再計画する。
+
+    Attributes:
+        repo: スケジュールリポジトリ
+        order_repo: 注文リポジトリ
+        product_repo: プロダクトリポジトリ（設備グループの設備の取得に使用）
+        equipment_repo: 設備リポジトリ（設備別の保全・臨時稼働の取得に使用）
+        calendar_cache: 休日情報キャッシュ
+        load_cache: 設備の作業量キャッシュ（計画を保存したら無効化する）
+        tenant_id: テナントID
+    """
+
+    def __init__(
+        self,
+        repo: ScheduleRepository,
+        order_repo: OrderRepository,
+        product_repo: ProductRepository,
+        equipment_repo: EquipmentRepository,
+        calendar_cache: CalendarCache,
+        load_cache: LoadCache,
+        tenant_id: str,
+    ):
+        self.repo = repo
+        self.order_repo = order_repo
+        self.product_repo = product_repo
+        self.equipment_repo = equipment_repo
+        self.calendar_cache = calendar_cache
+        self.load_cache = load_cache
+        self.tenant_id = tenant_id
+
+    def calendar_config(self, start_date: date, end_date: date) -> CalendarConfig:
+        """キャッシュから指定期間のカレンダー設定を取得する（不足分のみDBから取得）。"""
+        return self.calendar_cache.get_config(
+            self.tenant_id,
+            CalendarRepository(self.repo.client),
+            start_date,
+            end_date,
+            shift_pattern_repo=ShiftPatternRepository(self.repo.client),
+        )
+
+    def get_by_period(
+        self, start_date: str, end_date: str, equipment_group_id: int | None
+    ) -> list[dict[str, Any]]:
+        """期間内のスケジュールを、期間の日付をテナントのタイムゾーンで解釈して取得する。"""
+        calendar_config = self.calendar_config(
+            date.fromisoformat(start_date[:10]), date.fromisoformat(end_date[:10])
+        )
+        return self.repo.get_by_period(
+            start_date,
+            end_date,
+            equipment_group_id,
+            time_zone=calendar_config.time_zone,
+        )
+
+    def find_conflicts(
+        self, start_date: str, end_date: str, equipment_group_id: int | None
+    ) -> list[dict[str, Any]]:
+        """
+        期間内のスケジュールの制約違反を検出する。
+
+        Args:
+            start_date: 検証開始日 (YYYY-MM-DD)
+            end_date: 検証終了日 (YYYY-MM-DD)
+            equipment_group_id: 指定した場合は、この設備グループの工程に関係する違反のみ返す
+
+        Returns:
+            制約違反のリスト
+        """
+        first_day = date.fromisoformat(start_date[:10])
+        last_day = date.fromisoformat(end_date[:10])
+        calendar_config = self.calendar_config(first_day, last_day)
+
+        # 期間の境界はテナントのタイムゾーンの日の境界テーブルから求める
+        period_start, period_end = get_day_boundaries(calendar_config.tz or UTC).period(
+            first_day, last_day
+        )
+        rows = self.repo.get_plan_rows(
+            start=period_start.isoformat(), end=period_end.isoformat()
+        )
+        if not rows:
+            return []
+
+        focus_ids = None
+        if equipment_group_id is not None:
+            # 他グループの工程との重なりも検出できるよう、絞り込みは検出後に行う
+            focus_ids = {
+                row["id"]
+                for row in rows
+                if row.get("equipment_group_id") == equipment_group_id
+            }
+
+        return find_conflicts(rows, calendar_config, focus_ids)
+
+    def evaluate_kpis(self, start_date: str, end_date: str) -> dict[str, Any]:
+        """
+        期間の計画のKPIを求める。
+
+        注文の完了時刻を求めるため、期間と重なるスケジュールの注文は期間外のセグメントも読み込む。
+
+        Args:
+            start_date: 評価開始日 (YYYY-MM-DD)
+            end_date: 評価終了日 (YYYY-MM-DD)
+
+        Returns:
+            kpi_service.evaluate_plan_kpis の戻り値
+        """
+        first_day = date.fromisoformat(start_date[:10])
+        last_day = date.fromisoformat(end_date[:10])
+        calendar_config = self.calendar_config(first_day, last_day)
+
+        tz = calendar_config.tz or UTC
+        period_start, period_end = get_day_boundaries(tz).period(first_day, last_day)
+        rows = self.repo.get_plan_rows(
+            start=period_start.isoformat(), end=period_end.isoformat()
+        )
+        order_ids = sorted(
+            {row["order_id"] for row in rows if row.get("order_id") is not None}
+        )
+        if order_ids:
+            known = {row["id"] for row in rows}
+            rows += [
+                row
+                for row in self.repo.get_plan_rows(order_ids=order_ids)
+                if row["id"] not in known
+            ]
+        orders = self.order_repo.get_by_ids(order_ids)
+
+        overlays = self.equipment_repo.get_calendar_overlays(since=period_start)
+        return evaluate_plan_kpis(
+            PlanArrays.from_rows(rows, orders, tz),
+            horizon=(
+                to_epoch_seconds(period_start),
+                # 期間の終了は end_date の翌日 0:00
+                to_epoch_seconds(period_end) + 1,
+            ),
+            equipment_calendars=EquipmentCalendars(calendar_config, overlays, tz=tz),
+        )
+
+    def batch_update(
+        self, batch_data: ScheduleBatchUpdate, snap: bool
+    ) -> dict[str, Any]:
+        """
+        複数のスケジュールの変更をまとめて検証し、1回の apply_changes で保存する。
+
+        Args:
+            batch_data: 変更内容
+            snap: 日時を変更したスケジュールを稼働時間に吸着させるか
+
+        Returns:
+            更新・追加件数、更新後のスケジュール、吸着の調整内容
+
+        Raises:
+            ScheduleNotFoundError: 存在しないスケジュールが含まれる場合
+            InvalidScheduleRequestError: 開始日時が終了日時以降のスケジュールがある場合
+            ScheduleConflictError: 変更後に制約違反がある場合（どの変更も保存しない）
+        """
+        ids = [item.id for item in batch_data.updates]
+        current_rows = {row["id"]: row for row in self.repo.get_plan_rows(ids=ids)}
+        missing = [
+            schedule_id for schedule_id in ids if schedule_id not in current_rows
+        ]
+        if missing:
+            raise ScheduleNotFoundError(f"Schedules not found: {missing}")
+
+        # 変更を適用した後の状態をメモリ上に作る
+        proposed = {
+            item.id: {**current_rows[item.id], **item.model_dump(exclude_unset=True)}
+            for item in batch_data.updates
+        }
+        for row in proposed.values():
+            if parse_datetime(row["start_datetime"]) >= parse_datetime(
+                row["end_datetime"]
+            ):
+                raise InvalidScheduleRequestError(
+                    f"Schedule {row['id']}: start_datetime must be before end_datetime"
+                )
+
+        segments = build_segments(list(proposed.values()))
+        adjustments: list[dict[str, Any]] = []
+        snapped = [
+            item
+            for item in batch_data.updates
+            if snap
+            and (item.start_datetime is not None or item.end_datetime is not None)
+        ]
+        if snapped:
+            calendar_config = self.calendar_config(
+                min(segments[item.id].start for item in snapped).date(),
+                max(segments[item.id].end for item in snapped).date(),
+            )
+            for item in snapped:
+                current = current_rows[item.id]
+                segment = segments[item.id]
+                segment.pieces, adjusted = snap_to_working_time(
+                    parse_datetime(current["start_datetime"]),
+                    parse_datetime(current["end_datetime"]),
+                    segment.start,
+                    segment.end,
+                    calendar_config,
+                )
+                adjustments.extend({"id": item.id, **a} for a in adjusted)
+
+        # 複数日に分割されたスケジュールは、同じIDの行として検証する
+        checked_rows = [
+            {
+                **proposed[segment.id],
+                "start_datetime": start.isoformat(),
+                "end_datetime": end.isoformat(),
+            }
+            for segment in segments.values()
+            for start, end in segment.pieces
+        ]
+        conflicts = self._detect_conflicts(checked_rows)
+        if conflicts:
+            raise ScheduleConflictError(conflicts, adjustments)
+
+        updates, inserts = build_change_set(list(segments.values()))
+        self.repo.apply_changes(updates, inserts)
+        self.load_cache.invalidate(self.tenant_id)
+        return {
+            "updated_count": len(updates),
+            "inserted_count": len(inserts),
+            "schedules": [{**proposed[update["id"]], **update} for update in updates],
+            "adjustments": adjustments,
+        }
+
+    def reschedule(self, request: RescheduleRequest) -> dict[str, Any]:
+        """
+        期間内に作業が残っている確定済みの注文を、ディスパッチルールに従って計画し直す。
+
+        Returns:
+            再計画の集計（_save_replan の戻り値）
+        """
+        return self._save_replan(request, self._dispatch_window(request))
+
+    def optimize(self, request: OptimizeRequest) -> dict[str, Any]:
+        """
+        ディスパッチルールの結果を初期解として局所探索で改善し、最良解を保存する。
+
+        Returns:
+            再計画の集計に、探索の反復回数・目的関数値・最良解の経過（trace）を加えた辞書
+        """
+        replan = self._dispatch_window(request)
+        compact = CompactPlan(
+            replan.plan,
+            lambda group_id: replan.members.get(group_id, []),
+            replan.equipment_calendars,
+            tardiness_weight=request.tardiness_weight,
+            makespan_weight=request.makespan_weight,
+        )
+        result = parallel_search(
+            compact,
+            request.time_budget_ms / 1000,
+            request.workers or MAX_OPTIMIZE_WORKERS,
+            seed=request.seed,
+        )
+        compact.apply(result.sequence, result.assignment)
+        logger.info(
+            f"Optimized {replan.plan.operation_count} operations in "
+            f"{result.iterations} iterations "
+            f"(objective {result.initial.value} -> {result.best.value})"
+        )
+
+        return {
+            **self._save_replan(request, replan),
+            "iterations": result.iterations,
+            "initial_objective": result.initial.value,
+            "objective": result.best.value,
+            "makespan_seconds": result.best.makespan_seconds,
+            "trace": result.trace,
+        }
+
+    def compare_scenarios(self, request: CompareScenariosRequest) -> dict[str, Any]:
+        """
+        What-if シナリオごとに計画し直し、baseline とKPIを比較する（保存しない）。
+
+        Returns:
+            ルール・期間と、scenario_service.compare_scenarios の戻り値
+        """
+        calendar_config, window_start, window_end = self._parse_window(request)
+        tz = calendar_config.tz or UTC
+        logger.info(
+            f"Comparing {len(request.scenarios)} scenarios from "
+            f"{window_start.isoformat()} to {window_end.isoformat()} "
+            f"(rule={request.rule})"
+        )
+
+        rows = self.repo.get_plan_from(window_start.isoformat())
+        orders = self.order_repo.get_by_ids(
+            sorted({row["order_id"] for row in rows if row.get("order_id") is not None})
+        )
+        snapshot = ScenarioSnapshot(
+            rows,
+            orders,
+            {},
+            self.equipment_repo.get_calendar_overlays(since=window_start),
+            calendar_config,
+            to_epoch_seconds(window_start),
+            to_epoch_seconds(window_end),
+            tz,
+        )
+        group_ids = build_reschedule_plan(
+            rows,
+            orders,
+            snapshot.window_start,
+            snapshot.window_end,
+            tz,
+            snapshot.booked_calendars(),
+        ).group_ids()
+        snapshot.members = get_equipment_ids_by_groups(self.product_repo, group_ids)
+        result = compare_scenarios(
+            snapshot,
+            [scenario.model_dump() for scenario in request.scenarios],
+            rule=request.rule,
+            workers=request.workers or MAX_OPTIMIZE_WORKERS,
+        )
+        return {
+            "rule": request.rule,
+            "window_start": window_start.isoformat(),
+            "window_end": window_end.isoformat(),
+            **result,
+        }
+
+    def compact(self, request: CompactRequest) -> dict[str, Any]:
+        """
+        指定日時以降に始まる予約を、設備ごとに空いた稼働時間へ前詰めする。
+
+        Returns:
+            前詰めしたスケジュール（compacted）と更新・追加件数
+
+        Raises:
+            InvalidScheduleRequestError: 開始日時を解釈できない場合
+        """
+        try:
+            since = (
+                parse_datetime(request.start_datetime)
+                if request.start_datetime
+                else datetime.now(UTC)
+            )
+        except ValueError as e:
+            raise InvalidScheduleRequestError(str(e)) from None
+        calendar_config = self.calendar_config(since.date(), since.date())
+        tz = calendar_config.tz or UTC
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=tz)
+        logger.info(
+            f"Compacting schedules from {since.isoformat()} "
+            f"(equipment_ids={request.equipment_ids}, dry_run={request.dry_run})"
+        )
+
+        rows = self.repo.get_plan_from(since.isoformat())
+        equipment_ids = request.equipment_ids or sorted(
+            {row["equipment_id"] for row in rows}
+        )
+        equipment_calendars = EquipmentCalendars(
+            calendar_config,
+            self.equipment_repo.get_calendar_overlays(since=since),
+            tz=tz,
+        )
+        changed = compact_machines(
+            build_segments(rows, calendar_config),
+            {equipment_id: since for equipment_id in equipment_ids},
+            equipment_calendars,
+        )
+
+        updates, inserts = build_change_set(changed)
+        if updates and not request.dry_run:
+            self.repo.apply_changes(updates, inserts)
+            self.load_cache.invalidate(self.tenant_id)
+        return {
+            "dry_run": request.dry_run,
+            "compacted": [
+                {
+                    "id": segment.id,
+                    "order_id": segment.order_id,
+                    "equipment_id": segment.equipment_id,
+                    "start_datetime": segment.start.isoformat(),
+                    "end_datetime": segment.end.isoformat(),
+                    "segment_count": len(segment.pieces),
+                }
+                for segment in changed
+            ],
+            "updated_count": len(updates),
+            "inserted_count": len(inserts),
+        }
+
+    def confirm_order(
+        self, order_id: int, hold_id: str | None, holds: CapacityHoldStore
+    ) -> list[dict[str, Any]]:
+        """
+        注文のスケジュールを確定・保存し、注文ステータスを confirmed にする。
+
+        hold_id を指定した場合は、再計算せずに仮押さえしたスケジュールを本予約に昇格する。
+
+        Returns:
+            保存したスケジュール
+
+        Raises:
+            OrderNotFoundError: 注文が存在しない場合
+            HoldUnavailableError: 仮押さえが存在しない・期限切れの場合
+            ValueError: 仮押さえの製品・数量が注文と一致しない場合、
+                またはスケジュールを作成できない場合
+        """
+        order = self.order_repo.get_by_id(order_id)
+        if not order:
+            raise OrderNotFoundError("Order not found")
+
+        if hold_id is not None:
+            schedules = self._promote_hold(order, hold_id, holds)
+        else:
+            now = datetime.now(UTC)
+            calendar_config = self.calendar_config(now.date(), now.date())
+            equipment_calendars = EquipmentCalendars(
+                calendar_config, self.equipment_repo.get_calendar_overlays(since=now)
+            )
+            schedules = schedule_order(
+                order_id=order["id"],
+                product_id=order["product_id"],
+                quantity=order["quantity"],
+                product_repo=self.product_repo,
+                schedule_repo=self.repo,
+                tenant_id=self.tenant_id,
+                dry_run=False,
+                calendar_config=calendar_config,
+                reserved_until=holds.reserved_until(self.tenant_id),
+                equipment_calendars=equipment_calendars,
+            )
+        self.load_cache.invalidate(self.tenant_id)
+        self.order_repo.update(order_id, {"status": "confirmed", "is_scheduled": True})
+        return schedules
+
+    def expedite_order(
+        self, order_id: int, request: OrderExpediteRequest
+    ) -> dict[str, Any]:
+        """
+        注文を特急注文として最も早い位置に割り込ませ、押し出された予約を後ろへずらす。
+
+        計画は特急注文の工程の設備グループの設備と特急注文の予約から、連鎖が及ぶ設備・注文の
+        末尾だけを読み込む。変更（特急注文の追加・既存の予約の移動・特急注文の既存の予約の削除）は
+        1回の apply_changes でまとめて保存する（dry_run時を除く）。
+
+        Returns:
+            特急注文のスケジュール（schedules）、押し出された予約（rippled）、
+            完了が遅れた注文（delayed_orders）と更新・追加・削除件数
+
+        Raises:
+            OrderNotFoundError: 注文が存在しない場合
+            InvalidScheduleRequestError: 基準日時を解釈できない場合
+        """
+        order = self.order_repo.get_by_id(order_id)
+        if not order:
+            raise OrderNotFoundError("Order not found")
+        try:
+            now = (
+                parse_datetime(request.start_datetime)
+                if request.start_datetime
+                else datetime.now(UTC)
+            )
+        except ValueError as e:
+            raise InvalidScheduleRequestError(str(e)) from None
+        calendar_config = self.calendar_config(now.date(), now.date())
+        tz = calendar_config.tz or UTC
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=tz)
+
+        routings = self.product_repo.get_routings_by_product(order["product_id"])
+        members = get_equipment_ids_by_groups(
+            self.product_repo, sorted({r["equipment_group_id"] for r in routings})
+        )
+        since = now.isoformat()
+        insertion = insert_rush_order_suffix(
+            lambda equipment_ids, order_ids: self.repo.get_plan_suffix(
+                since, equipment_ids=equipment_ids, order_ids=order_ids
+            ),
+            order,
+            routings,
+            lambda group_id: members.get(group_id, []),
+            EquipmentCalendars(
+                calendar_config,
+                self.equipment_repo.get_calendar_overlays(since=now),
+                tz=tz,
+            ),
+            calendar_config,
+            now,
+            self.tenant_id,
+            tz,
+        )
+
+        updates, inserts, deletes = insertion.change_set()
+        if not request.dry_run:
+            self.repo.apply_changes(updates, inserts, deletes)
+            self.load_cache.invalidate(self.tenant_id)
+            self.order_repo.update(
+                order_id, {"status": "confirmed", "is_scheduled": True}
+            )
+        return {
+            "order_id": order_id,
+            "dry_run": request.dry_run,
+            "schedules": insertion.inserted_rows(),
+            "rippled": [
+                {
+                    "id": segment.id,
+                    "order_id": segment.order_id,
+                    "equipment_id": segment.equipment_id,
+                    "start_datetime": segment.start.isoformat(),
+                    "end_datetime": segment.end.isoformat(),
+                    "segment_count": len(segment.pieces),
+                }
+                for segment in insertion.displaced
+            ],
+            "delayed_orders": insertion.delayed_orders,
+            "updated_count": len(updates),
+            "inserted_count": len(inserts),
+            "deleted_count": len(deletes),
+        }
+
+    def cancel_order(self, order_id: int) -> dict[str, Any]:
+        """
+        注文をキャンセルし、注文ステータスを canceled にする。
+
+        注文の現在以降の予約を削除し、空いた設備の後続の予約を前詰めする（release_order）。
+
+        Returns:
+            削除した予約の件数（released_count）と前詰めしたスケジュール（compacted）
+
+        Raises:
+            OrderNotFoundError: 注文が存在しない場合
+        """
+        released_ids, compacted = self.release_order(order_id)
+        self.order_repo.update(order_id, {"status": "canceled", "is_scheduled": False})
+        return {
+            "status": "canceled",
+            "released_count": len(released_ids),
+            "compacted": [
+                {
+                    "id": segment.id,
+                    "order_id": segment.order_id,
+                    "equipment_id": segment.equipment_id,
+                    "start_datetime": segment.start.isoformat(),
+                    "end_datetime": segment.end.isoformat(),
+                    "segment_count": len(segment.pieces),
+                }
+                for segment in compacted
+            ],
+        }
+
+    def release_order(self, order_id: int) -> tuple[list[int], list[PlanSegment]]:
+        """
+        注文の現在以降の予約を削除し、空いた設備の後続の予約を前詰めする。
+
+        予約の削除と前詰めは1回の apply_changes でまとめて保存する。
+
+        Returns:
+            (削除した予約のIDのリスト, 前詰めしたセグメントのリスト)
+
+        Raises:
+            OrderNotFoundError: 注文が存在しない場合
+        """
+        if not self.order_repo.get_by_id(order_id):
+            raise OrderNotFoundError("Not found")
+        released_ids, compacted = self._plan_release(order_id)
+        if released_ids:
+            updates, inserts = build_change_set(compacted)
+            self.repo.apply_changes(updates, inserts, released_ids)
+            self.load_cache.invalidate(self.tenant_id)
+        return released_ids, compacted
+
+    def delete_order(self, order_id: int) -> None:
+        """
+        注文を削除し、空いた設備の後続の予約を前詰めする。
+
+        注文の予約は連鎖削除されるため、前詰めは削除前に求め、削除後に保存する。
+
+        Raises:
+            OrderNotFoundError: 注文が存在しない場合
+        """
+        released_ids, compacted = self._plan_release(order_id)
+        if not self.order_repo.delete(order_id):
+            raise OrderNotFoundError("Not found")
+        if released_ids:
+            updates, inserts = build_change_set(compacted)
+            if updates:
+                self.repo.apply_changes(updates, inserts)
+            self.load_cache.invalidate(self.tenant_id)
+
+    def register_outage(
+        self, equipment_id: int, outage_data: EquipmentOutageCreate
+    ) -> dict[str, Any]:
+        """
+        設備の故障を登録し、停止期間と重なる予約だけを同じ設備グループの設備へ移す。
+
+        停止期間は保全として設備別稼働カレンダーに登録する。計画は停止した設備・同じ設備グループの
+        設備と、連鎖が及ぶ設備・注文の末尾だけを読み込み（repair_outage_suffix）、
+        予約の変更は1回の apply_changes でまとめて保存する（dry_run時を除く）。
+        予約の変更の保存に失敗した場合は、登録した停止期間を削除して例外を送出し直す。
+
+        Returns:
+            登録した停止期間（overlay）、移した予約（moved）、打ち切った予約（truncated）、
+            後ろへずらした後続工程（rippled）、完了が遅れた注文（delayed_orders）と更新・追加件数
+
+        Raises:
+            EquipmentNotFoundError: 設備が存在しない場合
+        """
+        if not self.equipment_repo.get_by_id(equipment_id):
+            raise EquipmentNotFoundError("Not found")
+        calendar_config = self.calendar_config(
+            outage_data.start_datetime.date(), outage_data.end_datetime.date()
+        )
+        # タイムゾーンなしの日時はテナントのタイムゾーンで解釈する
+        tz = calendar_config.tz or UTC
+        start, end = (
+            dt if dt.tzinfo is not None else dt.replace(tzinfo=tz)
+            for dt in (outage_data.start_datetime, outage_data.end_datetime)
+        )
+
+        since = start.isoformat()
+        # 停止した設備の予約から、移動先になる同じ設備グループの設備を求める
+        own_rows = self.repo.get_plan_suffix(since, equipment_ids=[equipment_id])
+        members = get_equipment_ids_by_groups(
+            self.product_repo,
+            sorted(
+                {
+                    row["equipment_group_id"]
+                    for row in own_rows
+                    if row.get("equipment_group_id") is not None
+                }
+            ),
+        )
+        repair = repair_outage_suffix(
+            lambda equipment_ids, order_ids: self.repo.get_plan_suffix(
+                since, equipment_ids=equipment_ids, order_ids=order_ids
+            ),
+            equipment_id,
+            start,
+            end,
+            datetime.now(UTC),
+            members,
+            calendar_config,
+            self.equipment_repo.get_calendar_overlays(since=start),
+            tz,
+            order_ids=sorted(
+                {row["order_id"] for row in own_rows if row.get("order_id") is not None}
+            ),
+        )
+
+        updates, inserts = repair.change_set()
+        overlay = None
+        if not outage_data.dry_run:
+            overlay = self.equipment_repo.create_calendar_overlay(
+                {
+                    "tenant_id": self.tenant_id,
+                    "equipment_id": equipment_id,
+                    "kind": OVERLAY_MAINTENANCE,
+                    "start_datetime": start.isoformat(),
+                    "end_datetime": end.isoformat(),
+                    "note": outage_data.note,
+                }
+            )
+            if updates or inserts:
+                try:
+                    self.repo.apply_changes(updates, inserts)
+                except Exception:
+                    # 予約を移せなかった場合は、停止期間の登録も取り消す
+                    self.equipment_repo.delete_calendar_overlay(
+                        equipment_id, overlay["id"]
+                    )
+                    raise
+                self.load_cache.invalidate(self.tenant_id)
+
+        return {
+            "equipment_id": equipment_id,
+            "dry_run": outage_data.dry_run,
+            "overlay": overlay,
+            # 打ち切った予約の残りの作業は新しい予約として追加する（id は None）
+            "moved": [
+                {
+                    **segment.as_row(),
+                    "id": segment.id if segment.id > 0 else None,
+                    "segment_count": len(segment.pieces),
+                }
+                for segment in repair.moved
+            ],
+            "truncated": [segment.as_row() for segment in repair.truncated],
+            "rippled": [
+                {**segment.as_row(), "segment_count": len(segment.pieces)}
+                for segment in repair.rippled
+            ],
+            "delayed_orders": repair.delayed_orders,
+            "updated_count": len(updates),
+            "inserted_count": len(inserts),
+        }
+
+    def load_calendar_impact(self, dates: list[date]) -> CalendarImpact:
+        """
+        変更前のカレンダー設定と、変更する日と重なる予約を取得する（カレンダーの書き込み前に呼ぶ）。
+
+        予約は日付の期間で引くため（DB側の期間のインデックスを使用）、計画全体は読み込まない。
+        変更前のカレンダー設定は、書き込み後に範囲外を参照して変更後の休日情報を読み込まないよう、
+        最後の変更日から計画の期間（DEFAULT_CALENDAR_HORIZON_DAYS）先まで読み込む。
+        """
+        if not dates:
+            return CalendarImpact(dates, None, [], [])
+        previous_config = self.calendar_config(
+            min(dates), max(dates) + timedelta(days=DEFAULT_CALENDAR_HORIZON_DAYS)
+        )
+        periods = date_periods(dates, previous_config.tz or UTC)
+        return CalendarImpact(
+            dates, previous_config, periods, self.repo.get_plan_in_periods(periods)
+        )
+
+    def resolve_calendar_impact(
+        self, impact: CalendarImpact, reflow: bool
+    ) -> dict[str, Any]:
+        """
+        影響を受ける予約・注文を返す（カレンダーの書き込み・キャッシュの破棄の後に呼ぶ）。
+
+        reflow の場合は、影響を受ける予約と、それに押し出された後続工程・同じ設備の予約を
+        変更後のカレンダーに設備ごとの保全・臨時稼働を重ねた稼働可能区間で再配置し、
+        1回の apply_changes でまとめて保存する。計画はそれらの設備・注文の末尾だけを読み込む
+        （reflow_affected_suffix）。
+
+        Returns:
+            影響を受ける予約（schedules）・注文（order_ids）。reflow の場合は、置き直した予約
+            （reflowed）、後ろへずらした予約（rippled）、完了が遅れた注文（delayed_orders）と
+            更新・追加件数を含む
+        """
+        result = summarize_impact(impact.rows)
+        if not reflow:
+            return result
+        if not impact.rows:
+            return {
+                **result,
+                "reflowed": [],
+                "rippled": [],
+                "delayed_orders": [],
+                "updated_count": 0,
+                "inserted_count": 0,
+            }
+
+        start_date = min(impact.dates)
+        calendar_config = self.calendar_config(
+            start_date, start_date + timedelta(days=DEFAULT_CALENDAR_HORIZON_DAYS)
+        )
+        since = impact.periods[0][0]
+        equipment_calendars = EquipmentCalendars(
+            calendar_config,
+            self.equipment_repo.get_calendar_overlays(since=parse_datetime(since)),
+            tz=calendar_config.tz or UTC,
+        )
+        calendar_reflow = reflow_affected_suffix(
+            lambda equipment_ids, order_ids: self.repo.get_plan_suffix(
+                since, equipment_ids=equipment_ids, order_ids=order_ids
+            ),
+            impact.rows,
+            impact.previous_config,
+            calendar_config,
+            datetime.now(UTC),
+            equipment_calendars,
+        )
+        updates, inserts = calendar_reflow.change_set()
+        if updates or inserts:
+            self.repo.apply_changes(updates, inserts)
+            self.load_cache.invalidate(self.tenant_id)
+        return {
+            **result,
+            "reflowed": [
+                {**segment.as_row(), "segment_count": len(segment.pieces)}
+                for segment in calendar_reflow.reflowed
+            ],
+            "rippled": [
+                {**segment.as_row(), "segment_count": len(segment.pieces)}
+                for segment in calendar_reflow.rippled
+            ],
+            "delayed_orders": calendar_reflow.delayed_orders,
+            "updated_count": len(updates),
+            "inserted_count": len(inserts),
+        }
+
+    def update(
+        self,
+        schedule_id: int,
+        schedule_data: ScheduleUpdate,
+        *,
+        cascade: bool,
+        snap: bool,
+    ) -> dict[str, Any]:
+        """
+        スケジュールを手動で調整し、変更で生じた制約違反とあわせて返す。
+
+        snap・cascade のいずれかを指定した場合は _replan_update で再配置して保存する。
+        どちらも指定しない場合は指定どおりの値で保存し、違反があっても保存は妨げない。
+
+        Raises:
+            ScheduleNotFoundError: スケジュールが存在しない場合
+            InvalidScheduleRequestError: 開始日時が終了日時以降になる場合
+        """
+        if cascade or snap:
+            return self._replan_update(
+                schedule_id, schedule_data, cascade=cascade, snap=snap
+            )
+
+        try:
+            # exclude_unset=True により、指定されたフィールドのみ更新される
+            result = self.repo.update(
+                schedule_id, schedule_data.model_dump(exclude_unset=True)
+            )
+        except ValueError as e:
+            # レコードが存在しない、または更新に失敗した場合
+            raise ScheduleNotFoundError(str(e)) from None
+        self.load_cache.invalidate(self.tenant_id)
+
+        return {**result, "conflicts": self._detect_conflicts([result])}
+
+    def _dispatch_window(self, request: RescheduleRequest) -> _WindowReplan:
+        """期間内の再計画の対象を読み込み、ディスパッチルールに従って割り当てる。"""
+        calendar_config, window_start, window_end = self._parse_window(request)
+        tz = calendar_config.tz or UTC
+        logger.info(
+            f"Rescheduling from {window_start.isoformat()} to {window_end.isoformat()} "
+            f"(rule={request.rule}, dry_run={request.dry_run})"
+        )
+
+        # 期間の開始以降の計画と、関係する注文・設備の上書きをまとめて読み込む
+        rows = self.repo.get_plan_from(window_start.isoformat())
+        orders = self.order_repo.get_by_ids(
+            sorted({row["order_id"] for row in rows if row.get("order_id") is not None})
+        )
+        overlays = self.equipment_repo.get_calendar_overlays(since=window_start)
+        plan = build_reschedule_plan(
+            rows,
+            orders,
+            to_epoch_seconds(window_start),
+            to_epoch_seconds(window_end),
+            tz,
+            EquipmentCalendars(calendar_config, overlays, tz=tz),
+        )
+        members = get_equipment_ids_by_groups(self.product_repo, plan.group_ids())
+        equipment_calendars = EquipmentCalendars(
+            calendar_config, overlays + plan.blocks, tz=tz
+        )
+        dispatch(
+            plan,
+            lambda group_id: members.get(group_id, []),
+            equipment_calendars,
+            request.rule,
+        )
+        return _WindowReplan(
+            plan, members, equipment_calendars, tz, window_start, window_end
+        )
+
+    def _parse_window(
+        self, request: RescheduleRequest | CompareScenariosRequest
+    ) -> tuple[CalendarConfig, datetime, datetime]:
+        """再計画する期間を解釈し、期間のカレンダー設定とあわせて返す。"""
+        try:
+            window_start = (
+                parse_datetime(request.start_datetime)
+                if request.start_datetime
+                else datetime.now(UTC)
+            )
+            window_end = parse_datetime(request.end_datetime)
+        except ValueError as e:
+            raise InvalidScheduleRequestError(str(e)) from None
+        calendar_config = self.calendar_config(window_start.date(), window_end.date())
+        # タイムゾーンなしの日時はテナントのタイムゾーンで解釈する
+        tz = calendar_config.tz or UTC
+        window_start, window_end = (
+            dt if dt.tzinfo is not None else dt.replace(tzinfo=tz)
+            for dt in (window_start, window_end)
+        )
+        if window_start >= window_end:
+            raise InvalidScheduleRequestError(
+                "start_datetime must be before end_datetime"
+            )
+        return calendar_config, window_start, window_end
+
+    def _save_replan(
+        self, request: RescheduleRequest, replan: _WindowReplan
+    ) -> dict[str, Any]:
+        """再計画の結果を1回の apply_changes で保存し（dry_run時を除く）、集計を返す。"""
+        plan, tz = replan.plan, replan.tz
+        updates, inserts, deletes = build_replacement(plan, self.tenant_id, tz)
+        if not request.dry_run and (updates or inserts or deletes):
+            self.repo.apply_changes(updates, inserts, deletes)
+            self.load_cache.invalidate(self.tenant_id)
+
+        jobs = summarize_jobs(plan, tz)
+        return {
+            "rule": request.rule,
+            "dry_run": request.dry_run,
+            "window_start": replan.window_start.isoformat(),
+            "window_end": replan.window_end.isoformat(),
+            "order_count": len(plan.jobs),
+            "operation_count": plan.operation_count,
+            "updated_count": len(updates),
+            "inserted_count": len(inserts),
+            "deleted_count": len(deletes),
+            "late_order_count": sum(1 for job in jobs if job["tardiness_seconds"] > 0),
+            "total_tardiness_seconds": sum(job["tardiness_seconds"] for job in jobs),
+            "orders": jobs,
+        }
+
+    def _plan_release(self, order_id: int) -> tuple[list[int], list[PlanSegment]]:
+        """
+        注文の現在以降の予約と、その予約を外した場合に前詰めされる予約を求める（保存しない）。
+
+        前詰めは予約が外れた設備ごとに、外れた予約の最初の開始時刻（現在より前の場合は現在）
+        以降に始まる予約だけを対象にする。計画は予約が外れた設備の末尾と、そこに並ぶ注文の
+        前工程の判定に使う予約だけを読み込む。前詰めを計算できない場合（稼働カレンダーの
+        取得に失敗した場合など）は、予約の解放だけを行う。
+
+        Returns:
+            (外れる予約のIDのリスト, 前詰めしたセグメントのリスト)
+        """
+        now = datetime.now(UTC)
+        since = now.isoformat()
+        released = self.repo.get_plan_suffix(since, order_ids=[order_id])
+        if not released:
+            return [], []
+
+        freed_from: dict[int, datetime] = {}
+        for row in released:
+            start = max(now, parse_datetime(row["start_datetime"]))
+            equipment_id = row["equipment_id"]
+            freed_from[equipment_id] = min(freed_from.get(equipment_id, start), start)
+
+        released_ids = sorted(row["id"] for row in released)
+        try:
+            rows = self.repo.get_plan_suffix(since, equipment_ids=sorted(freed_from))
+            # 前詰めの下限になる前工程は、末尾に並ぶ予約の注文の予約から求める
+            order_ids = sorted(
+                {
+                    row["order_id"]
+                    for row in rows
+                    if row.get("order_id") not in (None, order_id)
+                }
+            )
+            if order_ids:
+                known = {row["id"] for row in rows}
+                rows += [
+                    row
+                    for row in self.repo.get_plan_suffix(since, order_ids=order_ids)
+                    if row["id"] not in known
+                ]
+            calendar_config = self.calendar_config(now.date(), now.date())
+            equipment_calendars = EquipmentCalendars(
+                calendar_config, self.equipment_repo.get_calendar_overlays(since=now)
+            )
+            segments = build_segments(
+                [row for row in rows if row.get("order_id") != order_id],
+                calendar_config,
+            )
+            compacted = compact_machines(segments, freed_from, equipment_calendars)
+        except ValueError as e:
+            logger.warning(f"Skipped compaction after releasing order {order_id}: {e}")
+            return released_ids, []
+        return released_ids, compacted
+
+    def _promote_hold(
+        self, order: dict[str, Any], hold_id: str, holds: CapacityHoldStore
+    ) -> list[dict[str, Any]]:
+        """
+        仮押さえを注文の本予約として保存し、仮押さえを解除する。
+
+        同じ仮押さえの同時の確定で本予約が重複しないよう、仮押さえは保存の前に
+        ストアから取り出す。保存できなかった場合は仮押さえを戻す。
+
+        Raises:
+            HoldUnavailableError: 仮押さえが存在しない・期限切れの場合
+            ValueError: 仮押さえの製品・数量が注文と一致しない場合
+        """
+        hold = holds.release(self.tenant_id, hold_id)
+        if hold is None:
+            raise HoldUnavailableError("仮押さえが存在しないか、期限切れです")
+        if hold.product_id != order["product_id"] or hold.quantity != order["quantity"]:
+            holds.restore(hold)
+            raise ValueError("仮押さえの製品・数量が注文内容と一致しません")
+
+        schedules = [
+            {**schedule, "order_id": order["id"]} for schedule in hold.schedules
+        ]
+        try:
+            self.repo.create_many(schedules)
+        except Exception:
+            holds.restore(hold)
+            raise
+        return schedules
+
+    def _detect_conflicts(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        変更後のスケジュールについて、周辺の予約と合わせて制約違反を検出する。
+
+        検証対象は変更したスケジュールと同じ設備・同じ注文の予約に限定し、
+        計画全体は読み込まない（インクリメンタル検証）。
+        複数日に分割されたスケジュールは、同じIDの行を複数渡す。
+
+        Args:
+            rows: 変更後のスケジュールのリスト
+
+        Returns:
+            変更したスケジュールが関係する違反のリスト
+        """
+        window_start = min(parse_datetime(row["start_datetime"]) for row in rows)
+        window_end = max(parse_datetime(row["end_datetime"]) for row in rows)
+
+        neighbors = {
+            row["id"]: row
+            for row in self._get_neighbor_rows(rows, window_start, window_end)
+        }
+        changed_ids = {row["id"] for row in rows}
+        # 取得済みの行（sequence_order などを含む）を変更後の値で置き換える
+        plan = [row for row in neighbors.values() if row["id"] not in changed_ids] + [
+            {**neighbors.get(row["id"], {}), **row} for row in rows
+        ]
+
+        calendar_config = self.calendar_config(window_start.date(), window_end.date())
+        return find_conflicts(plan, calendar_config, changed_ids)
+
+    def _get_neighbor_rows(
+        self,
+        rows: list[dict[str, Any]],
+        window_start: datetime,
+        window_end: datetime,
+    ) -> list[dict[str, Any]]:
+        """
+        検証に必要な周辺のスケジュールを取得する。
+
+        - 同じ設備で、期間 [window_start, window_end] と重なるスケジュール（重なり検証用）
+        - 同じ注文のスケジュール（工程順序検証用）
+        """
+        equipment_ids = sorted({row["equipment_id"] for row in rows})
+        order_ids = sorted(
+            {row["order_id"] for row in rows if row.get("order_id") is not None}
+        )
+
+        neighbors = self.repo.get_plan_rows(
+            equipment_ids=equipment_ids,
+            start=window_start.isoformat(),
+            end=window_end.isoformat(),
+        )
+        if order_ids:
+            neighbors += self.repo.get_plan_rows(order_ids=order_ids)
+        return neighbors
+
+    def _replan_update(
+        self,
+        schedule_id: int,
+        schedule_data: ScheduleUpdate,
+        *,
+        cascade: bool,
+        snap: bool,
+    ) -> dict[str, Any]:
+        """
+        カレンダー規則に基づいてセグメントを再配置し、変更をまとめて1回で保存する。
+
+        - snap: 稼働時間に吸着させ、稼働時間を保ったまま終了日時・日ごとの分割を再計算する
+        - cascade: 下流の依存関係（後続工程・移動先で重なる予約）だけを連鎖的に後ろへずらす
+
+        Returns:
+            cascade の場合は移動したスケジュール（schedule）、連鎖して移動したスケジュール
+            （rippled）、影響を受けた注文ID（affected_order_ids）を含む辞書。
+            それ以外の場合は更新後のスケジュール。
+            いずれも制約違反（conflicts）を含み、snap の場合は分割後の区間（segments）と
+            調整内容（adjustments）も含む。
+        """
+        try:
+            current = self.repo.get_by_id(schedule_id)
+        except APIError:
+            current = None
+        if not current:
+            raise ScheduleNotFoundError(f"Schedule {schedule_id} not found")
+
+        current_start = parse_datetime(current["start_datetime"])
+        current_end = parse_datetime(current["end_datetime"])
+        new_start = (
+            parse_datetime(schedule_data.start_datetime)
+            if schedule_data.start_datetime
+            else current_start
+        )
+        # 終了日時の指定がない場合は、所要時間（実時間）を保ったまま移動する
+        new_end = (
+            parse_datetime(schedule_data.end_datetime)
+            if schedule_data.end_datetime
+            else new_start + (current_end - current_start)
+        )
+        if new_start >= new_end:
+            raise InvalidScheduleRequestError(
+                "start_datetime must be before end_datetime"
+            )
+        equipment_id = schedule_data.equipment_id or current["equipment_id"]
+
+        # 影響範囲は移動前後の早い方の開始時刻以降に限られる
+        since = min(current_start, new_start)
+        calendar_config = self.calendar_config(
+            since.date(),
+            # 計画がこれより後ろへ延びた場合は、参照時にキャッシュが延長される
+            max(current_end, new_end).date(),
+        )
+
+        pieces = [(new_start, new_end)]
+        adjustments: list[dict[str, Any]] = []
+        if snap:
+            pieces, adjustments = snap_to_working_time(
+                current_start, current_end, new_start, new_end, calendar_config
+            )
+        snapped = {"segments": _pieces_to_json(pieces), "adjustments": adjustments}
+
+        if not cascade:
+            segment = build_segments([{**current, "equipment_id": equipment_id}])[
+                schedule_id
+            ]
+            segment.pieces = pieces
+            updates, inserts = build_change_set([segment])
+            self.repo.apply_changes(updates, inserts)
+            self.load_cache.invalidate(self.tenant_id)
+
+            rows = [
+                {**current, **updates[0]},
+                *({**current, **insert, "id": schedule_id} for insert in inserts),
+            ]
+            return {
+                **current,
+                **updates[0],
+                **snapped,
+                "conflicts": self._detect_conflicts(rows),
+            }
+
+        def load_rows(
+            equipment_ids: list[int], order_ids: list[int]
+        ) -> list[dict[str, Any]]:
+            rows = self.repo.get_plan_suffix(
+                since.isoformat(), equipment_ids=equipment_ids, order_ids=order_ids
+            )
+            if not any(row["id"] == schedule_id for row in rows):
+                rows.append(current)
+            return rows
+
+        # 計画全体ではなく、移動前後の設備・注文から連鎖が及ぶ範囲だけを読み込む
+        segments, changed = ripple_closure(
+            load_rows,
+            lambda segments: ripple_move(
+                segments,
+                schedule_id,
+                new_start,
+                new_end,
+                equipment_id,
+                calendar_config,
+                pieces=pieces,
+            ),
+            [current["equipment_id"], equipment_id],
+            [current.get("order_id")],
+            calendar_config,
+        )
+
+        updates, inserts = build_change_set(changed)
+        self.repo.apply_changes(updates, inserts)
+        self.load_cache.invalidate(self.tenant_id)
+
+        # 連鎖移動で解消できない違反（移動先が稼働時間外など）を返す
+        conflicts = find_conflicts(
+            [segment.as_row() for segment in segments.values()],
+            calendar_config,
+            {schedule_id},
+        )
+
+        result: dict[str, Any] = {
+            "schedule": {**current, **updates[0]},
+            "rippled": [
+                {
+                    "id": segment.id,
+                    "order_id": segment.order_id,
+                    "equipment_id": segment.equipment_id,
+                    "start_datetime": segment.start.isoformat(),
+                    "end_datetime": segment.end.isoformat(),
+                    "segment_count": len(segment.pieces),
+                }
+                for segment in changed[1:]
+            ],
+            "affected_order_ids": sorted(
+                {s.order_id for s in changed if s.order_id is not None}
+            ),
+            "conflicts": conflicts,
+        }
+        if snap:
+            result.update(snapped)
+        return result
+
+
+def _pieces_to_json(pieces: list[tuple[datetime, datetime]]) -> list[dict[str, str]]:
+    return [
+        {"start_datetime": start.isoformat(), "end_datetime": end.isoformat()}
+        for start, end in pieces
+    ]
@@ -0,0 +1,292 @@
+"""
+スケジュール検証サービスモジュール
+
+手動調整後のスケジュールについて、以下の制約違反を検出する。
+- overlap: 同一設備でのダブルブッキング
+- precedence: 工程順序違反（後工程が前工程の終了前に開始している）
+- off_hours: 稼働時間外（休日・終業後・休憩中など）に配置されたセグメント
+
+重なりと工程順序は、設備ごと・注文ごとにソートして1回走査する（O(n log n)）。
+また、手動で配置されたセグメントを稼働時間に吸着（スナップ）させる処理も提供する。
+"""
+
+from datetime import datetime
+from typing import Any
+
+from app.utils.calendar import (
+    CalendarConfig,
+    calculate_working_minutes,
+    get_next_available_start_time,
+    is_within_working_hours,
+    parse_datetime,
+    split_work_across_days,
+)
+
+
+class _Item:
+    """検証用に日時を変換済みのセグメント"""
+
+    __slots__ = ("id", "order_id", "sequence_order", "equipment_id", "start", "end")
+
+    def __init__(self, row: dict[str, Any]):
+        self.id: int = row["id"]
+        self.order_id: int | None = row.get("order_id")
+        self.sequence_order: int = row.get("sequence_order") or 0
+        self.equipment_id: int = row["equipment_id"]
+        self.start = parse_datetime(row["start_datetime"])
+        self.end = parse_datetime(row["end_datetime"])
+
+
+def _conflict(
+    conflict_type: str,
+    items: list[_Item],
+    message: str,
+    equipment_id: int | None = None,
+    order_id: int | None = None,
+) -> dict[str, Any]:
+    return {
+        "type": conflict_type,
+        "schedule_ids": [item.id for item in items],
+        "equipment_id": equipment_id,
+        "order_id": order_id,
+        "message": message,
+    }
+
+
+def _involves(items: list[_Item], focus_ids: set[int] | None) -> bool:
+    return focus_ids is None or any(item.id in focus_ids for item in items)
+
+
+def find_overlaps(
+    rows: list[dict[str, Any]], focus_ids: set[int] | None = None
+) -> list[dict[str, Any]]:
+    """
+    同一設備で時間が重なっているセグメントを検出する。
+
+    設備ごとに開始時刻でソートし、それまでで最も遅く終わるセグメントと比較する。
+    重なっているセグメントは少なくとも1回ずつ報告される。
+
+    Args:
+        rows: スケジュールのリスト
+        focus_ids: 指定した場合、このIDを含む違反のみ返す
+
+    Returns:
+        違反のリスト
+    """
+    by_equipment: dict[int, list[_Item]] = {}
+    for row in rows:
+        item = _Item(row)
+        by_equipment.setdefault(item.equipment_id, []).append(item)
+
+    conflicts = []
+    for equipment_id, items in by_equipment.items():
+        items.sort(key=lambda i: (i.start, i.id))
+        active: _Item | None = None
+        for item in items:
+            if active is not None and item.start < active.end:
+                pair = [active, item]
+                if _involves(pair, focus_ids):
+                    conflicts.append(
+                        _conflict(
+                            "overlap",
+                            pair,
+                            f"設備 {equipment_id} でスケジュール {active.id} と "
+                            f"{item.id} が重なっています",
+                            equipment_id=equipment_id,
+                        )
+                    )
+            if active is None or item.end > active.end:
+                active = item
+    return conflicts
+
+
+def find_precedence_violations(
+    rows: list[dict[str, Any]], focus_ids: set[int] | None = None
+) -> list[dict[str, Any]]:
+    """
+    同じ注文の中で、前工程の終了前に開始している後工程を検出する。
+
+    注文ごとに (工程順序, 開始日時) でソートし、
+    より前の工程のうち最も遅く終わるセグメントと比較する。
+
+    Args:
+        rows: スケジュールのリスト（sequence_order を含むこと）
+        focus_ids: 指定した場合、このIDを含む違反のみ返す
+
+    Returns:
+        違反のリスト
+    """
+    by_order: dict[int, list[_Item]] = {}
+    for row in rows:
+        item = _Item(row)
+        if item.order_id is not None:
+            by_order.setdefault(item.order_id, []).append(item)
+
+    conflicts = []
+    for order_id, items in by_order.items():
+        items.sort(key=lambda i: (i.sequence_order, i.start, i.id))
+        # 直前までの工程（現在の工程順序より小さいもの）で最も遅く終わるセグメント
+        previous_latest: _Item | None = None
+        # 現在の工程順序の中で最も遅く終わるセグメント
+        current_latest: _Item | None = None
+        current_sequence: int | None = None
+
+        for item in items:
+            if item.sequence_order != current_sequence:
+                if current_latest is not None and (
+                    previous_latest is None or current_latest.end > previous_latest.end
+                ):
+                    previous_latest = current_latest
+                current_latest = None
+                current_sequence = item.sequence_order
+
+            if previous_latest is not None and item.start < previous_latest.end:
+                pair = [previous_latest, item]
+                if _involves(pair, focus_ids):
+                    conflicts.append(
+                        _conflict(
+                            "precedence",
+                            pair,
+                            f"注文 {order_id} の工程 {item.sequence_order} "
+                            f"(スケジュール {item.id}) が前工程 "
+                            f"(スケジュール {previous_latest.id}) の終了前に開始しています",
+                            order_id=order_id,
+                        )
+                    )
+
+            if current_latest is None or item.end > current_latest.end:
+                current_latest = item
+    return conflicts
+
+
+def find_off_hours(
+    rows: list[dict[str, Any]],
+    calendar_config: CalendarConfig | None = None,
+    focus_ids: set[int] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    稼働時間外に配置されたセグメントを検出する。
+
+    Args:
+        rows: スケジュールのリスト
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
+        focus_ids: 指定した場合、このIDのセグメントのみ検査する
+
+    Returns:
+        違反のリスト
+    """
+    conflicts = []
+    for row in rows:
+        if focus_ids is not None and row["id"] not in focus_ids:
+            continue
+        item = _Item(row)
+        if not is_within_working_hours(item.start, item.end, calendar_config):
+            conflicts.append(
+                _conflict(
+                    "off_hours",
+                    [item],
+                    f"スケジュール {item.id} が稼働時間外に配置されています "
+                    f"({item.start.isoformat()} - {item.end.isoformat()})",
+                    equipment_id=item.equipment_id,
+                    order_id=item.order_id,
+                )
+            )
+    return conflicts
+
+
+def find_conflicts(
+    rows: list[dict[str, Any]],
+    calendar_config: CalendarConfig | None = None,
+    focus_ids: set[int] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    重なり・工程順序・稼働時間外のすべての制約違反を検出する。
+
+    Args:
+        rows: スケジュールのリスト（sequence_order を含むこと）
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
+        focus_ids: 指定した場合、このIDを含む違反のみ返す
+
+    Returns:
+        違反のリスト
+    """
+    return (
+        find_overlaps(rows, focus_ids)
+        + find_precedence_violations(rows, focus_ids)
+        + find_off_hours(rows, calendar_config, focus_ids)
+    )
+
+
+def snap_to_working_time(
+    current_start: datetime,
+    current_end: datetime,
+    requested_start: datetime,
+    requested_end: datetime,
+    calendar_config: CalendarConfig | None = None,
+) -> tuple[list[tuple[datetime, datetime]], list[dict[str, Any]]]:
+    """
+    手動で配置されたセグメントを、スケジューラと同じカレンダー規則で稼働時間に吸着させる。
+
+    所要時間（実時間）が変わらない場合は移動とみなし、移動前の稼働時間（分）を保つ。
+    所要時間が変わった場合はリサイズとみなし、要求された区間に含まれる稼働時間を使う。
+    開始時刻は次の稼働可能時刻へ繰り下げ、終了時刻は稼働時間から再計算し、
+    1日に収まらない場合は翌稼働日以降に分割する。
+
+    Args:
+        current_start: 変更前の開始日時
+        current_end: 変更前の終了日時
+        requested_start: 要求された開始日時
+        requested_end: 要求された終了日時
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
+
+    Returns:
+        (吸着後の区間のリスト, 調整内容のリスト)
+    """
+    work_minutes = 0.0
+    if requested_end - requested_start != current_end - current_start:
+        work_minutes = calculate_working_minutes(
+            requested_start, requested_end, calendar_config
+        )
+    if work_minutes <= 0:
+        work_minutes = calculate_working_minutes(
+            current_start, current_end, calendar_config
+        )
+    if work_minutes <= 0:
+        # 変更前も稼働時間外だった場合は実時間を作業量とみなす
+        work_minutes = (current_end - current_start).total_seconds() / 60
+
+    start = get_next_available_start_time(
+        requested_start, work_minutes, calendar_config
+    )
+    pieces = split_work_across_days(start, work_minutes, calendar_config)
+
+    adjustments: list[dict[str, Any]] = []
+    if start != requested_start:
+        adjustments.append(
+            {
+                "field": "start_datetime",
+                "requested": requested_start.isoformat(),
+                "adjusted": start.isoformat(),
+                "reason": "開始日時を次の稼働時間に移動しました",
+            }
+        )
+    end = pieces[-1][1]
+    if end != requested_end:
+        adjustments.append(
+            {
+                "field": "end_datetime",
+                "requested": requested_end.isoformat(),
+                "adjusted": end.isoformat(),
+                "reason": f"稼働時間 {work_minutes:g} 分を保つよう終了日時を再計算しました",
+            }
+        )
+    if len(pieces) > 1:
+        adjustments.append(
+            {
+                "field": "segments",
+                "requested": 1,
+                "adjusted": len(pieces),
+                "reason": f"稼働時間内に収まらないため {len(pieces)} 日に分割しました",
+            }
+        )
+    return pieces, adjustments
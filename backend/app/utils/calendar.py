@@ -1,12 +1,22 @@
 """
 稼働カレンダーユーティリティモジュール
 
-工場の稼働時間（平日 9:00 - 17:00）に基づき、作業の開始・終了時刻を計算する。
-休憩時間（12:00 - 13:00）は稼働時間から除外される。
-稼働カレンダー（work_calendars）テーブルからの休日情報をサポート。
+工場の稼働時間（デフォルトは平日 9:00 - 17:00）に基づき、作業の開始・終了時刻を計算する。
+休憩時間（デフォルトは 12:00 - 13:00）は稼働時間から除外される。
+稼働カレンダー（work_calendars）テーブルからの休日情報と、
+テナントごとの勤務パターン（shift_patterns）テーブルからのシフト・休憩時間をサポート。
+
+勤務パターンは ShiftPattern として1度だけ稼働区間テーブルにコンパイルされ、
+各関数の時刻判定はこのテーブルに対する二分探索で行う。
+テナントのタイムゾーンが設定されている場合、時刻はそのタイムゾーンの壁時計で判定する。
 """
 
-from datetime import date, datetime, time, timedelta
+import math
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Any
+
+from app.utils.time_zone import resolve_time_zone
 
 # 定数定義
 WORK_START_HOUR = 9
@@ -18,7 +28,263 @@ BREAK_END_HOUR = 13
 BREAK_END_MINUTE = 0
 BREAK_DURATION_MINUTES = 60  # 1時間
 # 実際の稼働時間（休憩時間を除く）
-MAX_DAILY_WORK_HOURS = (WORK_END_HOUR - WORK_START_HOUR) - (BREAK_DURATION_MINUTES / 60)  # 7時間
+MAX_DAILY_WORK_HOURS = (WORK_END_HOUR - WORK_START_HOUR) - (
+    BREAK_DURATION_MINUTES / 60
+)  # 7時間
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _parse_clock(value: str) -> int:
+    """ "HH:MM" 形式の時刻を 0:00 からの経過分に変換する。"""
+    try:
+        hour, minute = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise ValueError(f"時刻は HH:MM 形式で指定してください: {value}") from None
+    minutes = hour * 60 + minute
+    if hour < 0 or not 0 <= minute < 60 or minutes > MINUTES_PER_DAY:
+        raise ValueError(f"時刻は 0:00 - 24:00 の範囲で指定してください: {value}")
+    return minutes
+
+
+def _format_clock(minutes: float) -> str:
+    """稼働日の 0:00 からの経過分を表示用の時刻に変換する（翌日分は「翌」を付ける）。"""
+    days, rest = divmod(int(minutes), MINUTES_PER_DAY)
+    prefix = "翌" if days else ""
+    return f"{prefix}{rest // 60}:{rest % 60:02d}"
+
+
+def _merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """区間を開始順に並べ、重なる・接する区間を結合する。"""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class ShiftPattern:
+    """
+    1日の勤務パターン（シフトと休憩）をコンパイルした稼働区間テーブル。
+
+    時刻はすべて稼働日の 0:00 からの経過分で表し、1440（24:00）を超える値は
+    翌日にまたがる夜勤を表す。連続するシフトは1つのシフト帯（span）に結合され、
+    休憩を除いた稼働区間（interval）は開始順に並んだリストとして保持される。
+    稼働時間の累積値も前計算しておくため、各判定は bisect による O(log n) で行える。
+    """
+
+    def __init__(
+        self,
+        shifts: list[tuple[int, int]],
+        breaks: list[tuple[int, int]] | None = None,
+    ):
+        """
+        Args:
+            shifts: シフトの (開始分, 終了分) のリスト。夜勤は終了分に1440以上を指定する
+            breaks: 休憩の (開始分, 終了分) のリスト。シフトと同じく稼働日の0:00を基準とする
+
+        Raises:
+            ValueError: シフトが空・区間が不正・シフト全体が24時間を超える場合
+        """
+        breaks = breaks if breaks is not None else []
+        if not shifts:
+            raise ValueError("シフトを1つ以上指定してください")
+        for start, end in [*shifts, *breaks]:
+            if not 0 <= start < end <= 2 * MINUTES_PER_DAY:
+                raise ValueError(
+                    f"シフト・休憩の区間が不正です: {_format_clock(start)} - "
+                    f"{_format_clock(end)}"
+                )
+
+        self.shifts = sorted(shifts)
+        self.breaks = sorted(breaks)
+
+        merged_shifts = _merge_ranges(self.shifts)
+        # 前日のシフトと翌日のシフトが重ならないよう、1日分のシフトは24時間以内に収める
+        if merged_shifts[-1][1] - merged_shifts[0][0] > MINUTES_PER_DAY:
+            raise ValueError("シフト全体の長さは24時間以内にしてください")
+
+        merged_breaks = _merge_ranges(self.breaks)
+        intervals: list[tuple[int, int]] = []
+        spans: list[tuple[int, int]] = []
+        for shift_start, shift_end in merged_shifts:
+            pieces = [(shift_start, shift_end)]
+            for break_start, break_end in merged_breaks:
+                pieces = [
+                    part
+                    for piece_start, piece_end in pieces
+                    for part in (
+                        [(piece_start, piece_end)]
+                        if break_end <= piece_start or piece_end <= break_start
+                        else [
+                            (piece_start, min(piece_end, break_start)),
+                            (max(piece_start, break_end), piece_end),
+                        ]
+                    )
+                    if part[0] < part[1]
+                ]
+            if pieces:
+                intervals.extend(pieces)
+                # シフト帯の境界は常に稼働区間の開始・終了に揃える
+                spans.append((pieces[0][0], pieces[-1][1]))
+        if not intervals:
+            raise ValueError("休憩を除いた稼働時間がありません")
+
+        self.intervals = intervals
+        self.spans = spans
+        self.crosses_midnight = spans[-1][1] > MINUTES_PER_DAY
+
+        self._starts = [start for start, _ in intervals]
+        self._ends = [end for _, end in intervals]
+        self._span_starts = [start for start, _ in spans]
+        self._span_ends = [end for _, end in spans]
+        # _cumulative[k]: 先頭から k 個の稼働区間に含まれる稼働時間（分）
+        self._cumulative = [0]
+        for start, end in intervals:
+            self._cumulative.append(self._cumulative[-1] + end - start)
+
+    @classmethod
+    def from_time_ranges(
+        cls,
+        shifts: list[dict[str, str]],
+        breaks: list[dict[str, str]] | None = None,
+    ) -> "ShiftPattern":
+        """
+        "HH:MM" 形式の時刻範囲から勤務パターンを構築する。
+
+        終了時刻が開始時刻以前のシフトは日をまたぐ夜勤として扱う。
+        最初のシフトの開始時刻より前の休憩は、夜勤中（翌日）の休憩として扱う。
+
+        Args:
+            shifts: {"start": "HH:MM", "end": "HH:MM"} のリスト
+            breaks: {"start": "HH:MM", "end": "HH:MM"} のリスト
+
+        Returns:
+            ShiftPattern: コンパイル済みの勤務パターン
+
+        Raises:
+            ValueError: 時刻の形式が不正な場合、または勤務パターンとして不正な場合
+        """
+        shift_ranges = []
+        for item in shifts:
+            start, end = _parse_clock(item["start"]), _parse_clock(item["end"])
+            shift_ranges.append((start, end if end > start else end + MINUTES_PER_DAY))
+
+        first_start = min((start for start, _ in shift_ranges), default=0)
+        break_ranges = []
+        for item in breaks or []:
+            start, end = _parse_clock(item["start"]), _parse_clock(item["end"])
+            if start < first_start:
+                start, end = start + MINUTES_PER_DAY, end + MINUTES_PER_DAY
+            break_ranges.append((start, end if end > start else end + MINUTES_PER_DAY))
+
+        return cls(shift_ranges, break_ranges)
+
+    @property
+    def first_start(self) -> int:
+        """その日の最初のシフトの開始分"""
+        return self.spans[0][0]
+
+    def describe(self) -> str:
+        """エラーメッセージ用に、シフト帯を「9:00 - 17:00」形式で返す。"""
+        return ", ".join(
+            f"{_format_clock(start)} - {_format_clock(end)}"
+            for start, end in self.spans
+        )
+
+    def span_at(self, offset: float) -> int | None:
+        """offset を含むシフト帯の番号を返す（シフト外の場合はNone）。"""
+        index = bisect_right(self._span_starts, offset) - 1
+        if index >= 0 and offset < self._span_ends[index]:
+            return index
+        return None
+
+    def is_working(self, offset: float) -> bool:
+        """offset が稼働区間 [開始, 終了) に含まれるかを判定する。"""
+        index = bisect_right(self._starts, offset) - 1
+        return index >= 0 and offset < self._ends[index]
+
+    def is_working_end(self, offset: float) -> bool:
+        """offset が稼働区間 (開始, 終了] に含まれる（作業の終了時刻にできる）かを判定する。"""
+        index = bisect_left(self._ends, offset)
+        return index < len(self._ends) and self._starts[index] < offset
+
+    def is_break(self, offset: float) -> bool:
+        """offset がシフト帯の中の休憩時間かを判定する。"""
+        return self.span_at(offset) is not None and not self.is_working(offset)
+
+    def span_intervals(self, index: int) -> list[tuple[int, int]]:
+        """指定したシフト帯に含まれる稼働区間を返す。"""
+        span_start, span_end = self.spans[index]
+        return self.intervals[
+            bisect_left(self._starts, span_start) : bisect_left(self._starts, span_end)
+        ]
+
+    def next_working(self, offset: float) -> float | None:
+        """offset 以降で最初に稼働している時刻を返す（その日のシフトに残りがなければNone）。"""
+        index = bisect_right(self._ends, offset)
+        if index == len(self._ends):
+            return None
+        return max(offset, self._starts[index])
+
+    def working_minutes_until(self, offset: float) -> float:
+        """稼働日の 0:00 から offset までに含まれる稼働時間（分）を返す。"""
+        index = bisect_right(self._starts, offset) - 1
+        if index < 0:
+            return 0.0
+        return (
+            self._cumulative[index]
+            + min(offset, self._ends[index])
+            - self._starts[index]
+        )
+
+    def working_minutes_between(self, start: float, end: float) -> float:
+        """start から end までに含まれる稼働時間（分）を返す。"""
+        return max(
+            0.0, self.working_minutes_until(end) - self.working_minutes_until(start)
+        )
+
+    def offset_after(self, offset: float, work_minutes: float) -> float | None:
+        """
+        offset から work_minutes だけ稼働した時点を返す（休憩時間は読み飛ばす）。
+
+        その日のシフト内で作業が終わらない場合はNoneを返す。
+        """
+        target = self.working_minutes_until(offset) + work_minutes
+        index = bisect_left(self._cumulative, target, 1)
+        if index == len(self._cumulative):
+            return None
+        return self._starts[index - 1] + (target - self._cumulative[index - 1])
+
+    def to_dict(self) -> dict[str, Any]:
+        """API応答用に、シフト・休憩・稼働区間を「HH:MM」形式で返す。"""
+
+        def ranges(values: list[tuple[int, int]]) -> list[dict[str, str]]:
+            return [
+                {"start": _format_clock(start), "end": _format_clock(end)}
+                for start, end in values
+            ]
+
+        return {
+            "shifts": ranges(self.shifts),
+            "breaks": ranges(self.breaks),
+            "working_intervals": ranges(self.intervals),
+            "daily_work_minutes": self._cumulative[-1],
+        }
+
+
+# デフォルトの勤務パターン（9:00 - 17:00、休憩 12:00 - 13:00）
+DEFAULT_SHIFT_PATTERN = ShiftPattern(
+    [(WORK_START_HOUR * 60, WORK_END_HOUR * 60)],
+    [
+        (
+            BREAK_START_HOUR * 60 + BREAK_START_MINUTE,
+            BREAK_END_HOUR * 60 + BREAK_END_MINUTE,
+        )
+    ],
+)
 
 
 class CalendarConfig:
@@ -27,10 +293,15 @@ class CalendarConfig:
 
     デフォルトでは平日（月〜金）を稼働日、土日を休日とするが、
     データベースから取得した休日情報と稼働日情報で上書き可能。
+    稼働時間は shift_pattern（デフォルトは 9:00 - 17:00、休憩 12:00 - 13:00）に従う。
     """
 
     def __init__(
-        self, holidays: set[date] | None = None, workdays: set[date] | None = None
+        self,
+        holidays: set[date] | None = None,
+        workdays: set[date] | None = None,
+        shift_pattern: ShiftPattern | None = None,
+        time_zone: str | None = None,
     ):
         """
         Args:
@@ -39,9 +310,40 @@ class CalendarConfig:
             workdays: 稼働日の日付セット（DBから取得した is_holiday=False の日付、
                      土日を稼働日にする場合などに使用）
                      Noneの場合、空のセットを使用
+            shift_pattern: 勤務パターン（DBから取得したテナントのシフト設定）
+                     Noneの場合、デフォルトの勤務パターンを使用
+            time_zone: 稼働日・稼働時間を判定するタイムゾーン（例: "Asia/Tokyo"）
+                     Noneの場合、入力された日時のタイムゾーンのまま判定する
+
+        Raises:
+            ValueError: タイムゾーン名が不正な場合
         """
         self.holidays = holidays if holidays is not None else set()
         self.workdays = workdays if workdays is not None else set()
+        self.shift_pattern = (
+            shift_pattern if shift_pattern is not None else DEFAULT_SHIFT_PATTERN
+        )
+        self.time_zone = time_zone
+        self.tz = resolve_time_zone(time_zone) if time_zone else None
+
+    def detached(self, start_date: date, end_date: date) -> "CalendarConfig":
+        """
+        start_date から end_date までの判定に必要な情報を読み込み済みの、
+        DB・キャッシュを参照しない設定を返す（プロセスをまたいで渡す前に使う）。
+
+        この設定は他のオブジェクトを参照しないため、そのまま返す。
+        """
+        return self
+
+    def localize(self, dt: datetime) -> datetime:
+        """
+        日時をテナントのタイムゾーンに変換する。
+
+        タイムゾーンが未設定の場合、またはタイムゾーンなしの日時はそのまま返す。
+        """
+        if self.tz is None or dt.tzinfo is None:
+            return dt
+        return dt.astimezone(self.tz)
 
     def is_holiday(self, dt: datetime) -> bool:
         """
@@ -53,6 +355,7 @@ class CalendarConfig:
         Returns:
             bool: 休日の場合True、稼働日の場合False
         """
+        dt = self.localize(dt)
         target_date = dt.date()
 
         # 明示的に稼働日として設定されている場合（土日出勤など）
@@ -67,39 +370,147 @@ class CalendarConfig:
         return dt.weekday() >= 5  # 5: 土曜日, 6: 日曜日
 
 
+def parse_datetime(value: str) -> datetime:
+    """ISO8601文字列をdatetimeに変換する（末尾のZにも対応）。"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def to_epoch_seconds(dt: datetime) -> int:
+    """
+    datetimeをエポック秒の整数に変換する（秒未満は切り上げ）。
+
+    タイムゾーンなしの datetime はローカル時刻として扱う。
+    """
+    return math.ceil(dt.timestamp())
+
+
+def from_epoch_seconds(t: int, tz: tzinfo | None = None) -> datetime:
+    """
+    エポック秒を datetime に変換する。
+
+    Args:
+        t: エポック秒
+        tz: 変換先のタイムゾーン（Noneの場合はタイムゾーンなしのローカル時刻）
+    """
+    return datetime.fromtimestamp(t, tz)
+
+
 # デフォルトのカレンダー設定（後方互換性のため）
 _default_config = CalendarConfig()
 
 
-def is_during_break(dt: datetime) -> bool:
+def _resolve_config(calendar_config: CalendarConfig | None) -> CalendarConfig:
+    return calendar_config if calendar_config is not None else _default_config
+
+
+def _midnight(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _offset(dt: datetime, day: datetime) -> float:
+    """稼働日 day の 0:00 から dt までの経過分"""
+    return (dt - day).total_seconds() / 60
+
+
+def _at(day: datetime, offset: float) -> datetime:
+    return day + timedelta(minutes=offset)
+
+
+def _candidate_days(dt: datetime, pattern: ShiftPattern) -> list[datetime]:
+    """dt を含み得るシフトの稼働日（0:00）。夜勤がある場合は前日のシフトも対象とする。"""
+    day = _midnight(dt)
+    if pattern.crosses_midnight:
+        return [day - timedelta(days=1), day]
+    return [day]
+
+
+def _locate_shift(
+    dt: datetime, calendar_config: CalendarConfig
+) -> tuple[datetime, int] | None:
+    """dt を含むシフト帯を (稼働日の0:00, シフト帯の番号) で返す（シフト外の場合はNone）。"""
+    pattern = calendar_config.shift_pattern
+    for day in _candidate_days(dt, pattern):
+        index = pattern.span_at(_offset(dt, day))
+        if index is not None and is_workday(day, calendar_config):
+            return day, index
+    return None
+
+
+def _require_shift(
+    dt: datetime, calendar_config: CalendarConfig
+) -> tuple[datetime, int]:
+    """
+    dt を含むシフト帯を返す。
+
+    Raises:
+        ValueError: dt が稼働日でない場合、または稼働時間外の場合
+    """
+    located = _locate_shift(dt, calendar_config)
+    if located is not None:
+        return located
+    if not is_workday(dt, calendar_config):
+        raise ValueError(f"開始日時が稼働日ではありません: {dt}")
+    raise ValueError(
+        f"開始時刻が稼働時間（{calendar_config.shift_pattern.describe()}）外です: "
+        f"{dt.time()}"
+    )
+
+
+def _next_shift(
+    day: datetime, index: int, calendar_config: CalendarConfig
+) -> tuple[datetime, int]:
+    """指定したシフト帯の次のシフト帯（同日の次のシフト帯、なければ翌稼働日の最初のシフト帯）"""
+    if index + 1 < len(calendar_config.shift_pattern.spans):
+        return day, index + 1
+    day += timedelta(days=1)
+    while not is_workday(day, calendar_config):
+        day += timedelta(days=1)
+    return day, 0
+
+
+def is_during_break(
+    dt: datetime, calendar_config: CalendarConfig | None = None
+) -> bool:
     """
     指定された日時が休憩時間中かどうかを判定する。
 
     Args:
         dt: 判定対象の日時
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
 
     Returns:
         bool: 休憩時間中の場合True、それ以外の場合False
     """
-    break_start = time(BREAK_START_HOUR, BREAK_START_MINUTE)
-    break_end = time(BREAK_END_HOUR, BREAK_END_MINUTE)
-    return break_start <= dt.time() < break_end
+    config = _resolve_config(calendar_config)
+    pattern = config.shift_pattern
+    dt = config.localize(dt)
+    return any(
+        pattern.is_break(_offset(dt, day)) for day in _candidate_days(dt, pattern)
+    )
 
 
-def adjust_start_time_for_break(dt: datetime) -> datetime:
+def adjust_start_time_for_break(
+    dt: datetime, calendar_config: CalendarConfig | None = None
+) -> datetime:
     """
     開始時刻が休憩時間中の場合、休憩明けの時刻に調整する。
 
     Args:
         dt: 調整対象の日時
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
 
     Returns:
         datetime: 調整後の日時（休憩時間中でない場合はそのまま返す）
     """
-    if is_during_break(dt):
-        return dt.replace(
-            hour=BREAK_END_HOUR, minute=BREAK_END_MINUTE, second=0, microsecond=0
-        )
+    config = _resolve_config(calendar_config)
+    pattern = config.shift_pattern
+    dt = config.localize(dt)
+    for day in _candidate_days(dt, pattern):
+        offset = _offset(dt, day)
+        if pattern.is_break(offset):
+            resumed = pattern.next_working(offset)
+            if resumed is not None:
+                return _at(day, resumed)
     return dt
 
 
@@ -114,33 +525,36 @@ def is_workday(dt: datetime, calendar_config: CalendarConfig | None = None) -> b
     Returns:
         bool: 稼働日の場合True、休日の場合False
     """
-    config = calendar_config if calendar_config is not None else _default_config
-    return not config.is_holiday(dt)
+    return not _resolve_config(calendar_config).is_holiday(dt)
 
 
 def get_next_work_start(
     dt: datetime, calendar_config: CalendarConfig | None = None
 ) -> datetime:
     """
-    指定日時以降の、次の稼働開始日時(9:00)を返す。
+    指定日時以降の、次の稼働開始日時（最初のシフトの開始時刻）を返す。
 
     Args:
         dt: 基準となる日時
         calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
 
     Returns:
-        datetime: 次の稼働開始日時（9:00）
+        datetime: 次の稼働開始日時（デフォルトでは9:00）
     """
-    # 既に今日の始業前なら、今日の9:00
-    if is_workday(dt, calendar_config) and dt.time() < time(WORK_START_HOUR, 0):
-        return dt.replace(hour=WORK_START_HOUR, minute=0, second=0, microsecond=0)
+    config = _resolve_config(calendar_config)
+    first_start = config.shift_pattern.first_start
+    dt = config.localize(dt)
+    day = _midnight(dt)
 
-    # それ以外は翌日以降の平日9:00を探す
-    next_dt = dt + timedelta(days=1)
-    next_dt = next_dt.replace(hour=WORK_START_HOUR, minute=0, second=0, microsecond=0)
-    while not is_workday(next_dt, calendar_config):
-        next_dt += timedelta(days=1)
-    return next_dt
+    # 既に今日の始業前なら、今日の始業時刻
+    if is_workday(dt, config) and _offset(dt, day) < first_start:
+        return _at(day, first_start)
+
+    # それ以外は翌日以降の稼働日の始業時刻を探す
+    day += timedelta(days=1)
+    while not is_workday(day, config):
+        day += timedelta(days=1)
+    return _at(day, first_start)
 
 
 def get_next_available_start_time(
@@ -151,7 +565,7 @@ def get_next_available_start_time(
     """
     現在時刻から、開始可能な日時を判定する。
     日をまたぐ作業にも対応しており、その日に少しでも開始できる場合は開始時刻を返す。
-    休憩時間中の開始時刻は、休憩明け（13:00）に調整される。
+    休憩時間中の開始時刻は、休憩明け（デフォルトでは13:00）に調整される。
 
     注意: 実際のスケジュール分割は split_work_across_days 関数で行います。
     この関数は duration_minutes を使用しませんが、後方互換性のために残しています。
@@ -164,25 +578,22 @@ def get_next_available_start_time(
     Returns:
         datetime: 作業を開始可能な日時
     """
-    # 1. まず基本的な稼働時間帯に乗せる
-    if not is_workday(current_dt, calendar_config) or current_dt.time() >= time(
-        WORK_END_HOUR, 0
-    ):
-        # 土日または終業後の場合は、翌営業日の朝
-        start_dt = get_next_work_start(current_dt, calendar_config)
-    elif current_dt.time() < time(WORK_START_HOUR, 0):
-        # 始業前の場合は、その日の9:00
-        start_dt = current_dt.replace(
-            hour=WORK_START_HOUR, minute=0, second=0, microsecond=0
-        )
-    else:
-        # 稼働時間内の場合は、そのまま
-        start_dt = current_dt
+    config = _resolve_config(calendar_config)
+    pattern = config.shift_pattern
+    current_dt = config.localize(current_dt)
 
-    # 2. 休憩時間中の場合は、休憩明けに調整
-    start_dt = adjust_start_time_for_break(start_dt)
+    # 1. 前日（夜勤）・当日のシフトに、current_dt 以降の稼働区間が残っていればそこから開始
+    for day in _candidate_days(current_dt, pattern):
+        if not is_workday(day, config):
+            continue
+        offset = _offset(current_dt, day)
+        start = pattern.next_working(offset)
+        if start is not None:
+            # 稼働時間内の場合は、そのまま
+            return current_dt if start == offset else _at(day, start)
 
-    return start_dt
+    # 2. 休日または終業後の場合は、翌稼働日の始業時刻
+    return get_next_work_start(current_dt, config)
 
 
 def calculate_end_time(
@@ -192,7 +603,7 @@ def calculate_end_time(
 ) -> datetime:
     """
     開始日時と所要時間から終了日時を算出する。
-    作業が休憩時間をまたぐ場合、終了時刻に休憩時間分（1時間）を加算する。
+    作業が休憩時間をまたぐ場合、終了時刻に休憩時間分を加算する。
 
     Args:
         start_dt: 作業開始日時
@@ -203,55 +614,30 @@ def calculate_end_time(
         datetime: 作業終了日時
 
     Raises:
-        ValueError: 開始時刻が稼働時間外の場合、または終了時刻が17:00を超える場合
+        ValueError: 開始時刻が稼働時間外の場合、または終了時刻がシフトの終了時刻を超える場合
     """
-    # 開始時刻が稼働日かつ稼働時間内であることを確認
-    if not is_workday(start_dt, calendar_config):
-        raise ValueError(f"開始日時が稼働日ではありません: {start_dt}")
-
-    if start_dt.time() < time(WORK_START_HOUR, 0) or start_dt.time() >= time(
-        WORK_END_HOUR, 0
-    ):
-        raise ValueError(
-            f"開始時刻が稼働時間（{WORK_START_HOUR}:00 - {WORK_END_HOUR}:00）外です: "
-            f"{start_dt.time()}"
-        )
-
-    # 終了時刻を計算（まず休憩時間を考慮せずに計算）
-    end_dt = start_dt + timedelta(minutes=duration_minutes)
-
-    # 休憩時間をまたぐかチェック
-    break_start = start_dt.replace(
-        hour=BREAK_START_HOUR, minute=BREAK_START_MINUTE, second=0, microsecond=0
-    )
-    break_end = start_dt.replace(
-        hour=BREAK_END_HOUR, minute=BREAK_END_MINUTE, second=0, microsecond=0
-    )
-
-    # 作業が休憩時間をまたぐ場合、終了時刻に休憩時間分を加算
-    if start_dt < break_start and end_dt > break_start:
-        end_dt = end_dt + timedelta(minutes=BREAK_DURATION_MINUTES)
-
-    # 17:00を超えないことを確認
-    work_end_limit = start_dt.replace(
-        hour=WORK_END_HOUR, minute=0, second=0, microsecond=0
-    )
-
-    if end_dt > work_end_limit:
+    config = _resolve_config(calendar_config)
+    pattern = config.shift_pattern
+    start_dt = config.localize(start_dt)
+    day, index = _require_shift(start_dt, config)
+
+    end_offset = pattern.offset_after(_offset(start_dt, day), duration_minutes)
+    span_end = pattern.spans[index][1]
+    if end_offset is None or end_offset > span_end:
         raise ValueError(
             f"作業が稼働時間を超えます。開始: {start_dt}, 所要時間: {duration_minutes}分, "
-            f"終了予定: {end_dt}, 稼働終了: {work_end_limit}"
+            f"稼働終了: {_at(day, span_end)}"
         )
 
-    return end_dt
+    return _at(day, end_offset)
 
 
 def calculate_remaining_work_minutes(
     start_dt: datetime, calendar_config: CalendarConfig | None = None
 ) -> float:
     """
-    指定された開始時刻から、その日の稼働終了時刻(17:00)までの残り時間（分）を計算する。
-    休憩時間が含まれる場合は、その分を差し引く。
+    指定された開始時刻から、そのシフトの終了時刻（デフォルトでは17:00）までの
+    残り稼働時間（分）を計算する。休憩時間は差し引かれる。
 
     Args:
         start_dt: 作業開始日時
@@ -263,37 +649,81 @@ def calculate_remaining_work_minutes(
     Raises:
         ValueError: 開始時刻が稼働時間外の場合
     """
-    # 開始時刻が稼働日かつ稼働時間内であることを確認
-    if not is_workday(start_dt, calendar_config):
-        raise ValueError(f"開始日時が稼働日ではありません: {start_dt}")
+    config = _resolve_config(calendar_config)
+    pattern = config.shift_pattern
+    start_dt = config.localize(start_dt)
+    day, index = _require_shift(start_dt, config)
+    return pattern.working_minutes_between(
+        _offset(start_dt, day), pattern.spans[index][1]
+    )
 
-    if start_dt.time() < time(WORK_START_HOUR, 0) or start_dt.time() >= time(
-        WORK_END_HOUR, 0
-    ):
-        raise ValueError(
-            f"開始時刻が稼働時間（{WORK_START_HOUR}:00 - {WORK_END_HOUR}:00）外です: "
-            f"{start_dt.time()}"
-        )
 
-    # その日の17:00までの残り時間を計算
-    work_end_limit = start_dt.replace(
-        hour=WORK_END_HOUR, minute=0, second=0, microsecond=0
-    )
-    remaining_minutes = (work_end_limit - start_dt).total_seconds() / 60
+def calculate_working_minutes(
+    start_dt: datetime,
+    end_dt: datetime,
+    calendar_config: CalendarConfig | None = None,
+) -> float:
+    """
+    指定期間に含まれる稼働時間（分）を計算する。
+    休日、稼働時間外、休憩時間は除外される。
 
-    # 休憩時間が残り時間に含まれているかチェック
-    break_start = start_dt.replace(
-        hour=BREAK_START_HOUR, minute=BREAK_START_MINUTE, second=0, microsecond=0
-    )
-    break_end = start_dt.replace(
-        hour=BREAK_END_HOUR, minute=BREAK_END_MINUTE, second=0, microsecond=0
-    )
+    Args:
+        start_dt: 期間の開始日時
+        end_dt: 期間の終了日時
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
 
-    # 開始時刻が休憩開始前で、休憩時間が含まれる場合、休憩時間分を差し引く
-    if start_dt < break_start:
-        remaining_minutes -= BREAK_DURATION_MINUTES
+    Returns:
+        float: 稼働時間（分）。期間が空の場合は0
+    """
+    config = _resolve_config(calendar_config)
+    pattern = config.shift_pattern
+    start_dt, end_dt = config.localize(start_dt), config.localize(end_dt)
+    total_minutes = 0.0
+    day = _candidate_days(start_dt, pattern)[0]
+
+    while day < end_dt:
+        if is_workday(day, config):
+            total_minutes += pattern.working_minutes_between(
+                _offset(start_dt, day), _offset(end_dt, day)
+            )
+        day += timedelta(days=1)
 
-    return remaining_minutes
+    return total_minutes
+
+
+def is_within_working_hours(
+    start_dt: datetime,
+    end_dt: datetime,
+    calendar_config: CalendarConfig | None = None,
+) -> bool:
+    """
+    区間が1つの稼働日のシフト帯に収まっているかを判定する。
+    区間が休憩時間をまたぐことは許容するが、休憩時間中に開始・終了する区間は不可。
+
+    Args:
+        start_dt: 区間の開始日時
+        end_dt: 区間の終了日時
+        calendar_config: カレンダー設定（Noneの場合はデフォルト設定を使用）
+
+    Returns:
+        bool: 稼働時間内に収まっている場合True
+    """
+    if start_dt >= end_dt:
+        return False
+    config = _resolve_config(calendar_config)
+    start_dt, end_dt = config.localize(start_dt), config.localize(end_dt)
+    located = _locate_shift(start_dt, config)
+    if located is None:
+        return False
+
+    day, index = located
+    pattern = config.shift_pattern
+    end_offset = _offset(end_dt, day)
+    return (
+        pattern.is_working(_offset(start_dt, day))
+        and end_offset <= pattern.spans[index][1]
+        and pattern.is_working_end(end_offset)
+    )
 
 
 def split_work_across_days(
@@ -302,8 +732,8 @@ def split_work_across_days(
     calendar_config: CalendarConfig | None = None,
 ) -> list[tuple[datetime, datetime]]:
     """
-    所要時間が長い場合、複数の営業日に分割してスケジュールを作成する。
-    各日は9:00-17:00の稼働時間内で作業を行い、17:00を超える場合は翌営業日に繰り越す。
+    所要時間が長い場合、複数のシフト帯（営業日）に分割してスケジュールを作成する。
+    各シフト帯の終了時刻（デフォルトでは17:00）を超える場合は、次のシフト帯に繰り越す。
 
     Args:
         start_dt: 作業開始日時
@@ -321,55 +751,38 @@ def split_work_across_days(
         raise ValueError(f"所要時間は正の値である必要があります: {duration_minutes}分")
 
     # 開始時刻が稼働日かつ稼働時間内であることを確認
-    if not is_workday(start_dt, calendar_config):
-        raise ValueError(f"開始日時が稼働日ではありません: {start_dt}")
-
-    if start_dt.time() < time(WORK_START_HOUR, 0) or start_dt.time() >= time(
-        WORK_END_HOUR, 0
-    ):
-        raise ValueError(
-            f"開始時刻が稼働時間（{WORK_START_HOUR}:00 - {WORK_END_HOUR}:00）外です: "
-            f"{start_dt.time()}"
-        )
+    config = _resolve_config(calendar_config)
+    pattern = config.shift_pattern
+    start_dt = config.localize(start_dt)
+    day, index = _require_shift(start_dt, config)
 
     schedules = []
-    remaining_duration = duration_minutes
+    # 所要時間は秒の整数で管理し、浮動小数点の誤差が繰り越しに累積しないようにする
+    remaining_seconds = round(duration_minutes * 60)
     current_start = start_dt
+    offset = _offset(start_dt, day)
 
-    # 浮動小数点誤差を考慮した比較のための閾値（0.01分 = 0.6秒）
-    epsilon = 0.01
-
-    while remaining_duration > epsilon:
-        # その日の残り稼働時間を計算
-        remaining_today = calculate_remaining_work_minutes(
-            current_start, calendar_config
+    while remaining_seconds > 0:
+        # シフト帯の残り稼働時間（休憩時間を除く）
+        span_end = pattern.spans[index][1]
+        available_seconds = round(
+            pattern.working_minutes_between(offset, span_end) * 60
         )
 
-        if remaining_duration <= remaining_today + epsilon:
-            # 残りの作業が今日の稼働時間内に収まる場合
-            # 休憩時間を考慮した終了時刻を計算
-            end_dt = current_start + timedelta(minutes=remaining_duration)
-            
-            # 休憩時間をまたぐかチェック
-            break_start = current_start.replace(
-                hour=BREAK_START_HOUR, minute=BREAK_START_MINUTE, second=0, microsecond=0
-            )
-            
-            # 作業が休憩時間をまたぐ場合、終了時刻に休憩時間分を加算
-            if current_start < break_start and end_dt > break_start:
-                end_dt = end_dt + timedelta(minutes=BREAK_DURATION_MINUTES)
-            
-            schedules.append((current_start, end_dt))
-            remaining_duration = 0
+        if remaining_seconds <= available_seconds:
+            # 残りの作業がこのシフト帯に収まる場合（休憩時間は読み飛ばして終了時刻を求める）
+            end_offset = pattern.offset_after(offset, remaining_seconds / 60)
+            if end_offset is None or end_offset > span_end:
+                end_offset = span_end
+            schedules.append((current_start, _at(day, end_offset)))
+            remaining_seconds = 0
         else:
-            # 今日の稼働時間を超える場合、17:00まで作業して翌営業日に繰り越す
-            end_of_day = current_start.replace(
-                hour=WORK_END_HOUR, minute=0, second=0, microsecond=0
-            )
-            schedules.append((current_start, end_of_day))
-            remaining_duration -= remaining_today
+            # シフト帯の終了まで作業し、次のシフト帯（翌営業日など）に繰り越す
+            schedules.append((current_start, _at(day, span_end)))
+            remaining_seconds -= available_seconds
 
-            # 翌営業日の9:00から再開
-            current_start = get_next_work_start(end_of_day, calendar_config)
+            day, index = _next_shift(day, index, config)
+            offset = pattern.spans[index][0]
+            current_start = _at(day, offset)
 
     return schedules
@@ -0,0 +1,463 @@
+"""
+設備別稼働カレンダーモジュール
+
+テナントの稼働カレンダー（休日・勤務パターン）に、設備ごとの上書き
+（保全による停止・臨時稼働）を重ね、設備ごとの稼働可能区間テーブルにコンパイルする。
+テーブルは区間の開始・終了と稼働時間の累積値を昇順に保持するため、
+開始可能時刻の検索と作業の分割は bisect による O(log n) で行える。
+
+テーブル内の時刻はエポック秒、稼働時間は秒の整数で保持する。
+稼働日の境界（0:00）はタイムゾーンごとに共有される境界テーブル（DayBoundaries）から求める。
+スケジューリングの内部ではエポック秒のまま計算し、datetime との変換は入出力時のみ行う。
+"""
+
+import copy
+from bisect import bisect_left, bisect_right
+from datetime import UTC, date, datetime, timedelta, tzinfo
+from typing import Any
+
+import numpy as np
+
+from app.utils.calendar import (
+    CalendarConfig,
+    from_epoch_seconds,
+    is_workday,
+    parse_datetime,
+    to_epoch_seconds,
+)
+from app.utils.time_zone import DayBoundaries, get_day_boundaries
+
+# 上書きの種別
+OVERLAY_MAINTENANCE = "maintenance"  # 保全（稼働不可）
+OVERLAY_EXTRA_SHIFT = "extra_shift"  # 臨時稼働（稼働日・稼働時間外でも稼働可）
+
+# 最初にコンパイルする期間（日）。範囲外を参照した場合は期間を倍にして再構築する
+DEFAULT_AVAILABILITY_HORIZON_DAYS = 62
+# 稼働可能区間を探す上限（日）。全日が休日の設定などで無限に探索しないための上限
+MAX_AVAILABILITY_HORIZON_DAYS = 366 * 10
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# (開始エポック秒, 終了エポック秒)
+Interval = tuple[int, int]
+
+
+def _merge_intervals(intervals: list[Interval]) -> list[Interval]:
+    """区間を開始順に並べ、重なる・接する区間を結合する。"""
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class EquipmentAvailability:
+    """
+    1設備の稼働可能区間テーブル。
+
+    稼働可能区間はシフト帯（休憩をはさんで連続して作業できる範囲）ごとにまとめられる。
+    臨時稼働はシフト帯に接していれば結合され、保全はシフト帯を分断する。
+    作業はシフト帯をまたぐ位置で分割される（split_work_across_days と同じ単位）。
+    """
+
+    def __init__(
+        self,
+        calendar_config: CalendarConfig | None = None,
+        overlays: list[dict[str, Any]] | None = None,
+        tz: tzinfo | None = None,
+    ):
+        """
+        Args:
+            calendar_config: テナントのカレンダー設定（Noneの場合はデフォルト設定を使用）
+            overlays: この設備の上書き（kind, start_datetime, end_datetime を含む）
+            tz: 稼働日の境界（0:00）を決めるタイムゾーン（カレンダー設定のタイムゾーンが
+                優先される。どちらもない場合は最初に参照された日時のタイムゾーン）
+        """
+        self._config = (
+            calendar_config if calendar_config is not None else CalendarConfig()
+        )
+        self._tz = self._config.tz or tz
+        self._days: DayBoundaries | None = None
+        extra: list[Interval] = []
+        maintenance: list[Interval] = []
+        for overlay in overlays or []:
+            start = to_epoch_seconds(_as_datetime(overlay["start_datetime"]))
+            end = to_epoch_seconds(_as_datetime(overlay["end_datetime"]))
+            if start >= end:
+                continue
+            if overlay.get("kind") == OVERLAY_EXTRA_SHIFT:
+                extra.append((start, end))
+            else:
+                maintenance.append((start, end))
+        self._extra = _merge_intervals(extra)
+        self._maintenance = _merge_intervals(maintenance)
+        self._maintenance_starts = [start for start, _ in self._maintenance]
+
+        self._origin: int | None = None
+        self._until: int | None = None
+        self._spans: list[Interval] = []
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self._span_of: list[int] = []
+        # _cumulative[k]: 先頭から k 個の稼働区間に含まれる稼働時間（秒）
+        self._cumulative: list[int] = [0]
+
+    @property
+    def tz(self) -> tzinfo:
+        """稼働日の境界を決めるタイムゾーン（未定の場合はUTC）"""
+        return self._tz or UTC
+
+    def detached(self, start_date: date, end_date: date) -> "EquipmentAvailability":
+        """
+        カレンダー設定を CalendarConfig.detached に置き換えた複製を返す
+        （コンパイル済みのテーブルは共有する）。プロセスをまたいで渡す前に使う。
+        """
+        availability = copy.copy(self)
+        availability._config = self._config.detached(start_date, end_date)
+        return availability
+
+    # --- datetime での入出力 ---
+
+    def next_available(self, dt: datetime) -> datetime:
+        """dt 以降で最初に稼働可能な日時を返す（dt が稼働可能区間内ならそのまま返す）。"""
+        self._adopt_tz(dt)
+        start = self.next_available_epoch(to_epoch_seconds(dt))
+        return (
+            dt
+            if start == to_epoch_seconds(dt)
+            else from_epoch_seconds(start, dt.tzinfo)
+        )
+
+    def split(
+        self, start_dt: datetime, duration_minutes: float
+    ) -> list[tuple[datetime, datetime]]:
+        """
+        start_dt から duration_minutes の作業を稼働可能区間に割り当て、シフト帯ごとに分割する。
+
+        所要時間は秒単位に丸めて計算する。
+        """
+        self._adopt_tz(start_dt)
+        pieces = self.split_epoch(
+            to_epoch_seconds(start_dt), round(duration_minutes * 60)
+        )
+        return [
+            (
+                start_dt if index == 0 else from_epoch_seconds(start, start_dt.tzinfo),
+                from_epoch_seconds(end, start_dt.tzinfo),
+            )
+            for index, (start, end) in enumerate(pieces)
+        ]
+
+    # --- エポック秒での計算 ---
+
+    def next_available_epoch(self, t: int) -> int:
+        """
+        t（エポック秒）以降で最初に稼働可能な時刻を返す。
+
+        Raises:
+            ValueError: 探索上限までに稼働可能区間が見つからない場合
+        """
+        self._ensure(t)
+        while True:
+            index = bisect_right(self._ends, t)
+            if index < len(self._ends):
+                return max(t, self._starts[index])
+            self._extend()
+
+    def split_epoch(self, start: int, duration_seconds: int) -> list[Interval]:
+        """
+        start（エポック秒）から duration_seconds 秒の作業を稼働可能区間に割り当て、
+        シフト帯ごとに分割する。
+
+        Args:
+            start: 作業開始時刻（next_available_epoch の戻り値など、稼働可能区間内の時刻）
+            duration_seconds: 作業の所要時間（秒）
+
+        Returns:
+            (開始エポック秒, 終了エポック秒) のタプルのリスト
+
+        Raises:
+            ValueError: 所要時間が0以下の場合、または開始時刻が稼働可能区間外の場合
+        """
+        if duration_seconds <= 0:
+            raise ValueError(
+                f"所要時間は正の値である必要があります: {duration_seconds / 60}分"
+            )
+
+        first, last, end = self._locate_end(start, duration_seconds)
+        first_span, last_span = self._span_of[first], self._span_of[last]
+        return [
+            (
+                max(self._spans[index][0], start),
+                self._spans[index][1] if index < last_span else end,
+            )
+            for index in range(first_span, last_span + 1)
+        ]
+
+    def advance_epoch(self, t: int, working_seconds: int) -> int:
+        """
+        t（エポック秒）以降の稼働時間を working_seconds 秒進めた時刻を返す。
+
+        累積稼働時間の二分探索のみで求め、区間の分割結果は作成しない。
+        working_seconds が0以下の場合は、t 以降で最初に稼働可能な時刻を返す。
+        """
+        start = self.next_available_epoch(t)
+        if working_seconds <= 0:
+            return start
+        return self._locate_end(start, working_seconds)[2]
+
+    def working_seconds_at(self, times: np.ndarray) -> np.ndarray:
+        """
+        各時刻（エポック秒の配列）までの稼働時間の累積値（秒）を、1回の二分探索で求める。
+
+        累積値の起点はテーブルの先頭のため、値そのものではなく2つの時刻の差
+        （その間の稼働時間）として使う。
+
+        Raises:
+            ValueError: 時刻が探索上限を超える場合
+        """
+        times = np.asarray(times, dtype=np.int64)
+        if times.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        self._ensure(int(times.min()))
+        latest = int(times.max())
+        while self._until is not None and latest >= self._until:
+            self._extend()
+        if not self._starts:
+            return np.zeros(times.shape, dtype=np.int64)
+
+        starts = np.asarray(self._starts, dtype=np.int64)
+        lengths = np.asarray(self._ends, dtype=np.int64) - starts
+        cumulative = np.asarray(self._cumulative[:-1], dtype=np.int64)
+        # 各時刻以前に始まる最後の稼働区間（先頭の区間より前の時刻は累積値0）
+        index = np.searchsorted(starts, times, side="right") - 1
+        clipped = np.maximum(index, 0)
+        worked = cumulative[clipped] + np.clip(
+            times - starts[clipped], 0, lengths[clipped]
+        )
+        return np.where(index >= 0, worked, 0)
+
+    def working_seconds_between(self, start: int, end: int) -> int:
+        """
+        start から end まで（エポック秒）の稼働時間（秒）を、累積テーブルの差で求める。
+
+        Raises:
+            ValueError: 時刻が探索上限を超える場合
+        """
+        if end <= start:
+            return 0
+        worked = self.working_seconds_at(np.array([start, end], dtype=np.int64))
+        return int(worked[1] - worked[0])
+
+    def _locate_end(self, start: int, duration_seconds: int) -> tuple[int, int, int]:
+        """
+        start から duration_seconds 秒の作業の (開始区間, 終了区間, 終了時刻) を求める。
+
+        Raises:
+            ValueError: 開始時刻が稼働可能区間外の場合
+        """
+        self._ensure(start)
+        while True:
+            first = bisect_right(self._starts, start) - 1
+            if first < 0 or start >= self._ends[first]:
+                raise ValueError(
+                    f"開始日時が設備の稼働時間外です: {from_epoch_seconds(start, self._tz)}"
+                )
+            target = (
+                self._cumulative[first]
+                + (start - self._starts[first])
+                + duration_seconds
+            )
+            # 累積稼働時間が target に達する稼働区間（_cumulative[last + 1] >= target）
+            last = bisect_left(self._cumulative, target, 1) - 1
+            if last < len(self._starts):
+                break
+            self._extend()
+
+        return first, last, self._starts[last] + (target - self._cumulative[last])
+
+    # --- テーブルの構築 ---
+
+    def _adopt_tz(self, dt: datetime) -> None:
+        if self._tz is None and self._days is None:
+            self._tz = dt.tzinfo
+
+    def _boundaries(self) -> DayBoundaries:
+        """稼働日の境界テーブル（タイムゾーンごとに共有される）"""
+        if self._days is None:
+            self._days = get_day_boundaries(self._tz or UTC)
+        return self._days
+
+    def _ensure(self, t: int) -> None:
+        """t を含む期間がコンパイル済みでなければ、期間を広げて再構築する。"""
+        # 夜勤がある場合は、前日に始まるシフト帯を含めるため前日からコンパイルする
+        lookback = SECONDS_PER_DAY if self._config.shift_pattern.crosses_midnight else 0
+        if (
+            self._origin is not None
+            and self._until is not None
+            and self._origin + lookback <= t < self._until
+        ):
+            return
+        days = self._boundaries()
+        day = days.day_of(t)
+        origin = (
+            days.start_of(day - timedelta(days=1)) if lookback else days.start_of(day)
+        )
+        until = days.start_of(day + timedelta(days=DEFAULT_AVAILABILITY_HORIZON_DAYS))
+        if self._origin is not None and self._until is not None:
+            origin = min(origin, self._origin)
+            until = max(until, self._until)
+        self._compile(origin, until)
+
+    def _extend(self) -> None:
+        """コンパイル済みの期間を倍に延長する。"""
+        assert self._origin is not None and self._until is not None
+        length = self._until - self._origin
+        if length >= MAX_AVAILABILITY_HORIZON_DAYS * SECONDS_PER_DAY:
+            raise ValueError("設備の稼働可能な時間帯が見つかりません")
+        self._compile(self._origin, self._until + length)
+
+    def _compile(self, origin: int, until: int) -> None:
+        """[origin, until) のシフト帯と臨時稼働から稼働可能区間テーブルを構築する。"""
+        pattern = self._config.shift_pattern
+        spans: list[tuple[int, int, list[Interval]]] = []
+
+        # シフトの時刻は、稼働日の境界テーブルから壁時計の時刻として求める
+        days = self._boundaries()
+        day = days.day_of(origin)
+        while days.start_of(day) < until:
+            if is_workday(datetime(day.year, day.month, day.day), self._config):
+                for index, (span_start, span_end) in enumerate(pattern.spans):
+                    spans.append(
+                        (
+                            days.at(day, span_start),
+                            days.at(day, span_end),
+                            [
+                                (days.at(day, s), days.at(day, e))
+                                for s, e in pattern.span_intervals(index)
+                            ],
+                        )
+                    )
+            day += timedelta(days=1)
+
+        # 臨時稼働は origin より前に始まるものも含め、期間内の部分だけを使う
+        for start, end in self._extra:
+            if end > origin and start < until:
+                start, end = max(start, origin), min(end, until)
+                spans.append((start, end, [(start, end)]))
+
+        self._spans, self._starts, self._ends, self._span_of = [], [], [], []
+        self._cumulative = [0]
+        for span in self._merge_spans(spans):
+            for span_start, span_end, intervals in self._cut_by_maintenance(span):
+                self._spans.append((span_start, span_end))
+                for start, end in intervals:
+                    self._starts.append(start)
+                    self._ends.append(end)
+                    self._span_of.append(len(self._spans) - 1)
+                    self._cumulative.append(self._cumulative[-1] + end - start)
+
+        self._origin, self._until = origin, until
+
+    @staticmethod
+    def _merge_spans(
+        spans: list[tuple[int, int, list[Interval]]],
+    ) -> list[tuple[int, int, list[Interval]]]:
+        """重なる・接するシフト帯（臨時稼働を含む）を結合する。"""
+        merged: list[tuple[int, int, list[Interval]]] = []
+        for start, end, intervals in sorted(spans, key=lambda span: span[0]):
+            if merged and start <= merged[-1][1]:
+                prev_start, prev_end, prev_intervals = merged[-1]
+                merged[-1] = (
+                    prev_start,
+                    max(prev_end, end),
+                    _merge_intervals(prev_intervals + intervals),
+                )
+            else:
+                merged.append((start, end, intervals))
+        return merged
+
+    def _cut_by_maintenance(
+        self, span: tuple[int, int, list[Interval]]
+    ) -> list[tuple[int, int, list[Interval]]]:
+        """保全の時間帯でシフト帯を分断し、稼働可能区間だけを残す。"""
+        span_start, span_end, intervals = span
+        first = max(bisect_right(self._maintenance_starts, span_start) - 1, 0)
+        last = bisect_left(self._maintenance_starts, span_end)
+        windows = [
+            (start, end)
+            for start, end in self._maintenance[first:last]
+            if end > span_start
+        ]
+        if not windows:
+            return [span]
+
+        pieces: list[tuple[int, int, list[Interval]]] = []
+        bounds = [span_start]
+        for start, end in windows:
+            bounds.extend([start, end])
+        bounds.append(span_end)
+        for range_start, range_end in zip(bounds[::2], bounds[1::2], strict=True):
+            if range_start >= range_end:
+                continue
+            clipped = [
+                (max(start, range_start), min(end, range_end))
+                for start, end in intervals
+                if start < range_end and end > range_start
+            ]
+            if clipped:
+                pieces.append((clipped[0][0], clipped[-1][1], clipped))
+        return pieces
+
+
+class EquipmentCalendars:
+    """
+    設備ごとの稼働可能区間テーブル（EquipmentAvailability）を保持する。
+
+    テーブルは最初に参照された時点で設備ごとに1度だけコンパイルされる。
+    上書きのない設備は、テナントの稼働カレンダーのみから作った1つのテーブルを共有する。
+    """
+
+    def __init__(
+        self,
+        calendar_config: CalendarConfig | None = None,
+        overlays: list[dict[str, Any]] | None = None,
+        tz: tzinfo | None = None,
+    ):
+        """
+        Args:
+            calendar_config: テナントのカレンダー設定（Noneの場合はデフォルト設定を使用）
+            overlays: 設備ごとの上書き（equipment_id, kind, start_datetime, end_datetime を含む）
+            tz: 稼働日の境界（0:00）を決めるタイムゾーン
+                （Noneの場合は最初に参照された日時のタイムゾーン）
+        """
+        self.calendar_config = calendar_config
+        self.tz = tz
+        self._overlays: dict[int, list[dict[str, Any]]] = {}
+        for overlay in overlays or []:
+            self._overlays.setdefault(overlay["equipment_id"], []).append(overlay)
+        self._shared: EquipmentAvailability | None = None
+        self._by_equipment: dict[int, EquipmentAvailability] = {}
+
+    def shared(self) -> EquipmentAvailability:
+        """テナントの稼働カレンダーのみから作った（設備ごとの上書きのない）テーブルを返す。"""
+        if self._shared is None:
+            self._shared = EquipmentAvailability(self.calendar_config, tz=self.tz)
+        return self._shared
+
+    def for_equipment(self, equipment_id: int) -> EquipmentAvailability:
+        """設備の稼働可能区間テーブルを返す。"""
+        overlays = self._overlays.get(equipment_id)
+        if not overlays:
+            return self.shared()
+        if equipment_id not in self._by_equipment:
+            self._by_equipment[equipment_id] = EquipmentAvailability(
+                self.calendar_config, overlays, tz=self.tz
+            )
+        return self._by_equipment[equipment_id]
+
+
+def _as_datetime(value: datetime | str) -> datetime:
+    return value if isinstance(value, datetime) else parse_datetime(value)
@@ -0,0 +1,173 @@
+"""
+タイムゾーンユーティリティモジュール
+
+テナントのタイムゾーンにおける各日の開始時刻（0:00）を、エポック秒の昇順テーブルとして保持する。
+テーブルはタイムゾーンごとに1度だけ構築・共有され、夏時間の切り替えも反映される。
+日付の判定や期間の境界はこのテーブルに対する二分探索で求めるため、
+呼び出しのたびにタイムゾーン変換を行う必要がない。
+"""
+
+import threading
+from bisect import bisect_right
+from datetime import UTC, date, datetime, timedelta, tzinfo
+from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# テナントのタイムゾーンが未設定の場合に使用するタイムゾーン
+DEFAULT_TIME_ZONE = "UTC"
+# 日の境界テーブルを1度に構築・延長する日数
+DAY_BOUNDARY_BLOCK_DAYS = 366
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def resolve_time_zone(name: str | None) -> tzinfo:
+    """
+    タイムゾーン名（IANA形式、例: "Asia/Tokyo"）を tzinfo に変換する。
+
+    Args:
+        name: タイムゾーン名（Noneまたは空の場合は DEFAULT_TIME_ZONE）
+
+    Raises:
+        ValueError: タイムゾーン名が不正な場合
+    """
+    if not name:
+        name = DEFAULT_TIME_ZONE
+    if name == "UTC":
+        return UTC
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"不正なタイムゾーンです: {name}") from None
+
+
+class DayBoundaries:
+    """
+    1つのタイムゾーンにおける日の境界（各日の 0:00 のエポック秒）テーブル。
+
+    テーブルは DAY_BOUNDARY_BLOCK_DAYS 単位で前後に延長される。
+    """
+
+    def __init__(self, tz: tzinfo):
+        """
+        Args:
+            tz: 日の境界を決めるタイムゾーン
+        """
+        self.tz = tz
+        # (先頭の日付, 各日の 0:00 のエポック秒)。延長時は新しいタプルに差し替える
+        self._table: tuple[date, list[int]] | None = None
+        self._lock = threading.Lock()
+
+    def __reduce__(self) -> tuple[Any, tuple[tzinfo]]:
+        # pickleして別プロセスへ渡した場合は、そのプロセスで共有されるテーブルを使う
+        return (get_day_boundaries, (self.tz,))
+
+    def start_of(self, day: date) -> int:
+        """day の 0:00 のエポック秒を返す。"""
+        first, starts = self._ensure_dates(day, day + timedelta(days=1))
+        return starts[(day - first).days]
+
+    def day_start(self, t: int) -> int:
+        """エポック秒 t を含む日の 0:00 のエポック秒を返す。"""
+        _, starts, index = self._locate(t)
+        return starts[index]
+
+    def day_of(self, t: int) -> date:
+        """エポック秒 t を含む日の日付を返す。"""
+        first, _, index = self._locate(t)
+        return first + timedelta(days=index)
+
+    def day_seconds(self, day: date) -> int:
+        """day の長さ（秒）。夏時間の切り替え日は 24時間とは限らない。"""
+        first, starts = self._ensure_dates(day, day + timedelta(days=1))
+        index = (day - first).days
+        return starts[index + 1] - starts[index]
+
+    def at(self, day: date, minutes: int) -> int:
+        """
+        day の 0:00 から minutes 分後の壁時計の時刻をエポック秒で返す。
+
+        24時間の日は境界テーブルからの加算のみで求め、
+        夏時間の切り替え日のみタイムゾーン変換を行う。
+        """
+        if self.day_seconds(day) == SECONDS_PER_DAY:
+            return self.start_of(day) + minutes * 60
+        local = datetime(day.year, day.month, day.day, tzinfo=self.tz) + timedelta(
+            minutes=minutes
+        )
+        return int(local.timestamp())
+
+    def period(self, start_date: date, end_date: date) -> tuple[datetime, datetime]:
+        """
+        start_date の 0:00 から end_date の終わりまでの期間を UTC の datetime で返す。
+
+        Returns:
+            (期間の開始, 期間の終了) のタプル。終了は end_date の翌日 0:00 の直前（1マイクロ秒前）
+        """
+        start = datetime.fromtimestamp(self.start_of(start_date), UTC)
+        end = datetime.fromtimestamp(
+            self.start_of(end_date + timedelta(days=1)), UTC
+        ) - timedelta(microseconds=1)
+        return start, end
+
+    def _locate(self, t: int) -> tuple[date, list[int], int]:
+        """t を含む日の (先頭の日付, 境界テーブル, インデックス) を返す。"""
+        table = self._table
+        while True:
+            if table is not None:
+                first, starts = table
+                index = bisect_right(starts, t) - 1
+                if 0 <= index < len(starts) - 1:
+                    return first, starts, index
+            # テーブルの範囲外の場合は、t を含む日の前後まで延長する
+            day = datetime.fromtimestamp(t, self.tz).date()
+            table = self._ensure_dates(day - timedelta(days=1), day + timedelta(days=1))
+
+    def _ensure_dates(self, first: date, last: date) -> tuple[date, list[int]]:
+        """first から last までの日の境界を含むテーブルを返す（不足していれば延長する）。"""
+        table = self._table
+        if (
+            table is not None
+            and table[0] <= first
+            and last < table[0] + timedelta(days=len(table[1]))
+        ):
+            return table
+
+        with self._lock:
+            if self._table is None:
+                current_first, starts = first, [self._midnight(first)]
+            else:
+                current_first, starts = self._table
+            if first < current_first:
+                days = max((current_first - first).days, DAY_BOUNDARY_BLOCK_DAYS)
+                new_first = current_first - timedelta(days=days)
+                starts = [
+                    self._midnight(new_first + timedelta(days=offset))
+                    for offset in range(days)
+                ] + starts
+                current_first = new_first
+            current_last = current_first + timedelta(days=len(starts) - 1)
+            if last > current_last:
+                days = max((last - current_last).days, DAY_BOUNDARY_BLOCK_DAYS)
+                starts = starts + [
+                    self._midnight(current_last + timedelta(days=offset))
+                    for offset in range(1, days + 1)
+                ]
+            self._table = (current_first, starts)
+            return self._table
+
+    def _midnight(self, day: date) -> int:
+        return int(datetime(day.year, day.month, day.day, tzinfo=self.tz).timestamp())
+
+
+_boundaries: dict[tzinfo, DayBoundaries] = {}
+_boundaries_lock = threading.Lock()
+
+
+def get_day_boundaries(tz: tzinfo) -> DayBoundaries:
+    """タイムゾーンごとに共有される日の境界テーブルを返す。"""
+    with _boundaries_lock:
+        boundaries = _boundaries.get(tz)
+        if boundaries is None:
+            boundaries = _boundaries[tz] = DayBoundaries(tz)
+        return boundaries
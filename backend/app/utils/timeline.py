@@ -0,0 +1,101 @@
+"""
+設備タイムラインユーティリティモジュール
+
+設備ごとの予約区間を開始時刻順のソート済みリストとして保持し、
+二分探索で区間の追加・削除・重なり検索を行う。
+"""
+
+from bisect import bisect_left, insort
+from collections.abc import Hashable
+from datetime import datetime, timedelta
+from typing import Any
+
+
+class EquipmentTimeline:
+    """
+    設備ごとの予約区間（開始, 終了, キー）を開始時刻順に保持するクラス。
+
+    重なり検索では「最長区間の長さ」を設備ごとに記録しておき、
+    開始時刻が (検索開始 - 最長区間) 以降の区間だけを調べることで
+    O(log n + k) で結果を返す。
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[int, list[tuple[datetime, Hashable, datetime]]] = {}
+        self._max_span: dict[int, timedelta] = {}
+
+    def add(
+        self, equipment_id: int, start: datetime, end: datetime, key: Hashable
+    ) -> None:
+        """
+        予約区間を追加する。
+
+        Args:
+            equipment_id: 設備ID
+            start: 開始日時
+            end: 終了日時
+            key: 区間を識別するキー（スケジュールIDなど）
+        """
+        insort(self._entries.setdefault(equipment_id, []), (start, key, end))
+        span = end - start
+        if span > self._max_span.get(equipment_id, timedelta(0)):
+            self._max_span[equipment_id] = span
+
+    def remove(self, equipment_id: int, start: datetime, key: Hashable) -> None:
+        """
+        予約区間を削除する。
+
+        Raises:
+            KeyError: 該当する区間が存在しない場合
+        """
+        entries = self._entries.get(equipment_id, [])
+        index = bisect_left(entries, (start, key))
+        if index >= len(entries) or entries[index][:2] != (start, key):
+            raise KeyError(f"設備 {equipment_id} に区間 {key} が見つかりません")
+        del entries[index]
+
+    def entries(self, equipment_id: int) -> list[tuple[datetime, datetime, Any]]:
+        """設備の予約区間を開始時刻順に (開始, 終了, キー) のリストで返す。"""
+        return [(s, e, k) for s, k, e in self._entries.get(equipment_id, [])]
+
+    def equipment_ids(self) -> list[int]:
+        """予約区間を持つ設備IDのリストを返す。"""
+        return [eq for eq, entries in self._entries.items() if entries]
+
+    def last_end(self, equipment_id: int) -> datetime | None:
+        """設備の予約区間のうち最も遅い終了日時を返す（区間がない場合はNone）。"""
+        entries = self._entries.get(equipment_id)
+        if not entries:
+            return None
+        # 開始時刻が最長区間ぶん以上前の区間は、最後の区間より先に終わる
+        lower = entries[-1][0] - self._max_span.get(equipment_id, timedelta(0))
+        index = bisect_left(entries, (lower,))
+        return max(e for _, _, e in entries[index:])
+
+    def overlapping(
+        self, equipment_id: int, start: datetime, end: datetime
+    ) -> list[tuple[datetime, datetime, Any]]:
+        """
+        指定区間 [start, end) と重なる予約区間を開始時刻順に返す。
+
+        Args:
+            equipment_id: 設備ID
+            start: 検索区間の開始日時
+            end: 検索区間の終了日時
+
+        Returns:
+            (開始, 終了, キー) のリスト
+        """
+        entries = self._entries.get(equipment_id)
+        if not entries:
+            return []
+
+        lower = start - self._max_span.get(equipment_id, timedelta(0))
+        index = bisect_left(entries, (lower,))
+        result = []
+        while index < len(entries) and entries[index][0] < end:
+            s, k, e = entries[index]
+            if e > start:
+                result.append((s, e, k))
+            index += 1
+        return result
@@ -0,0 +1,69 @@
+-- ==========================================
+-- Apply production schedule changes in bulk
+-- スケジュールの更新・追加・削除を1トランザクションで適用するRPC
+-- ==========================================
+
+-- p_updates: [{id, equipment_id, start_datetime, end_datetime}, ...]
+-- p_inserts: [{tenant_id, order_id, process_routing_id, equipment_id, start_datetime, end_datetime}, ...]
+-- p_deletes: 削除するスケジュールIDの配列
+--
+-- security invoker のため RLS が適用される。
+-- 更新対象が1件でも見つからない（他テナント・削除済み）場合は例外を送出し、
+-- すべての変更をロールバックする（all-or-nothing）。
+create or replace function apply_schedule_changes(
+  p_updates jsonb default '[]'::jsonb,
+  p_inserts jsonb default '[]'::jsonb,
+  p_deletes bigint[] default '{}'
+)
+returns jsonb
+language plpgsql
+security invoker
+as $$
+declare
+  v_updated int;
+  v_inserted int;
+  v_deleted int;
+begin
+  update production_schedules s
+     set equipment_id = u.equipment_id,
+         start_datetime = u.start_datetime,
+         end_datetime = u.end_datetime
+    from jsonb_to_recordset(p_updates) as u(
+      id bigint,
+      equipment_id bigint,
+      start_datetime timestamptz,
+      end_datetime timestamptz
+    )
+   where s.id = u.id;
+  get diagnostics v_updated = row_count;
+
+  if v_updated <> jsonb_array_length(p_updates) then
+    raise exception 'schedule update mismatch: expected %, updated %',
+      jsonb_array_length(p_updates), v_updated
+      using errcode = 'P0002';
+  end if;
+
+  insert into production_schedules (
+    tenant_id, order_id, process_routing_id, equipment_id, start_datetime, end_datetime
+  )
+  select tenant_id, order_id, process_routing_id, equipment_id, start_datetime, end_datetime
+    from jsonb_to_recordset(p_inserts) as i(
+      tenant_id uuid,
+      order_id bigint,
+      process_routing_id bigint,
+      equipment_id bigint,
+      start_datetime timestamptz,
+      end_datetime timestamptz
+    );
+  get diagnostics v_inserted = row_count;
+
+  delete from production_schedules where id = any(p_deletes);
+  get diagnostics v_deleted = row_count;
+
+  return jsonb_build_object(
+    'updated', v_updated,
+    'inserted', v_inserted,
+    'deleted', v_deleted
+  );
+end;
+$$;
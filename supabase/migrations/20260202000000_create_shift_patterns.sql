@@ -0,0 +1,28 @@
+-- ==========================================
+-- Shift Patterns Table
+-- 勤務パターン（シフト・休憩時間）
+-- ==========================================
+
+-- 勤務パターンテーブル
+-- shifts / breaks は {"start": "HH:MM", "end": "HH:MM"} の配列。
+-- 終了時刻が開始時刻以前のシフトは日をまたぐ夜勤として扱う。
+create table shift_patterns (
+  id bigint generated by default as identity primary key,
+  tenant_id uuid references tenants(id) on delete cascade not null,
+  shifts jsonb not null default '[]'::jsonb,
+  breaks jsonb not null default '[]'::jsonb,
+  created_at timestamptz default now(),
+  updated_at timestamptz default now(),
+  -- テナントごとに1つの勤務パターンを持つ
+  unique(tenant_id)
+);
+
+-- RLS (Row Level Security) を有効化
+alter table shift_patterns enable row level security;
+
+-- RLSポリシー: ユーザーは自分の所属するテナントの勤務パターンのみ参照・変更可能
+create policy "Tenant isolation for shift_patterns"
+  on shift_patterns
+  for all
+  using ( is_tenant_member(tenant_id) )
+  with check ( is_tenant_member(tenant_id) );
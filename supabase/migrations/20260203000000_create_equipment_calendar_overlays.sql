@@ -0,0 +1,37 @@
+-- ==========================================
+-- Equipment Calendar Overlays Table
+-- 設備別稼働カレンダー（保全・臨時稼働）
+-- ==========================================
+
+-- 設備別稼働カレンダーテーブル
+-- テナントの稼働カレンダー（work_calendars, shift_patterns）に設備ごとに重ねる時間帯。
+--   maintenance: 保全などで設備を使用できない時間帯
+--   extra_shift: 休日・稼働時間外に臨時で設備を稼働させる時間帯
+create table equipment_calendar_overlays (
+  id bigint generated by default as identity primary key,
+  tenant_id uuid references tenants(id) on delete cascade not null,
+  equipment_id bigint references equipments(id) on delete cascade not null,
+  kind text not null check (kind in ('maintenance', 'extra_shift')),
+  start_datetime timestamptz not null,
+  end_datetime timestamptz not null,
+  note text,
+  created_at timestamptz default now(),
+  updated_at timestamptz default now(),
+  check (start_datetime < end_datetime)
+);
+
+-- インデックス作成（計画期間内の上書きをまとめて取得するため）
+create index idx_equipment_calendar_overlays_tenant_end
+  on equipment_calendar_overlays(tenant_id, end_datetime);
+create index idx_equipment_calendar_overlays_equipment
+  on equipment_calendar_overlays(equipment_id, start_datetime);
+
+-- RLS (Row Level Security) を有効化
+alter table equipment_calendar_overlays enable row level security;
+
+-- RLSポリシー: ユーザーは自分の所属するテナントの設備別カレンダーのみ参照・変更可能
+create policy "Tenant isolation for equipment_calendar_overlays"
+  on equipment_calendar_overlays
+  for all
+  using ( is_tenant_member(tenant_id) )
+  with check ( is_tenant_member(tenant_id) );
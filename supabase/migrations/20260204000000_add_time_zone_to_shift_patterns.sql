@@ -0,0 +1,9 @@
+-- ==========================================
+-- Tenant Time Zone
+-- テナントのタイムゾーン
+-- ==========================================
+
+-- シフト・休憩の時刻（HH:MM）を解釈するタイムゾーン（IANA形式、例: 'Asia/Tokyo'）。
+-- 稼働日の境界（0:00）や期間指定の取得もこのタイムゾーンで判定する。
+alter table shift_patterns
+  add column time_zone text not null default 'UTC';
@@ -0,0 +1,49 @@
+-- ==========================================
+-- Plan Versions Table
+-- 計画バージョン（名前付きスナップショット）
+-- ==========================================
+
+-- 計画バージョンテーブル
+-- 元のバージョン（base_version_id）からの差分（changes）だけを保存し、
+-- 元のないバージョンと一定の世代ごと（depth = 0）にだけ計画全体（timeline）を保存する。
+--   ancestor_ids: 最も古い祖先から親までのバージョンID（系統）
+--   depth: 直近の計画全体を保存したバージョンからの世代数
+--   changes: [{id, before, after}]（スケジュールIDごとの変更前・変更後。存在しない場合は null）
+--   timeline: [{id, order_id, process_routing_id, equipment_id, start_datetime, end_datetime}]
+create table plan_versions (
+  id bigint generated by default as identity primary key,
+  tenant_id uuid references tenants(id) on delete cascade not null,
+  name text not null,
+  base_version_id bigint references plan_versions(id) on delete restrict,
+  ancestor_ids bigint[] not null default '{}',
+  depth integer not null default 0 check (depth >= 0),
+  changes jsonb not null default '[]',
+  timeline jsonb,
+  change_count integer not null default 0,
+  segment_count integer not null default 0,
+  created_at timestamptz default now(),
+  check (depth > 0 or timeline is not null),
+  check (base_version_id is not null or depth = 0)
+);
+
+-- インデックス作成（一覧・派生したバージョンの取得のため）
+create index idx_plan_versions_tenant_created
+  on plan_versions(tenant_id, created_at);
+create index idx_plan_versions_base
+  on plan_versions(base_version_id);
+
+-- RLS (Row Level Security) を有効化
+alter table plan_versions enable row level security;
+
+-- RLSポリシー: ユーザーは自分の所属するテナントの計画バージョンのみ参照可能
+create policy "Users can view their tenant's plan versions"
+  on plan_versions
+  for select
+  using ( is_tenant_member(tenant_id) );
+
+-- RLSポリシー: ユーザーは自分の所属するテナントの計画バージョンを作成可能
+-- バージョンは差分の参照元になるため、更新は許可しない
+create policy "Users can insert their tenant's plan versions"
+  on plan_versions
+  for insert
+  with check ( is_tenant_member(tenant_id) );
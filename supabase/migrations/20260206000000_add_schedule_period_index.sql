@@ -0,0 +1,47 @@
+-- ==========================================
+-- Look up production schedules by period
+-- 日付（期間）と重なるスケジュールを、全件を走査せずに取得するためのインデックスとRPC
+-- ==========================================
+
+-- [start_datetime, end_datetime) の期間のインデックス（期間が重なるスケジュールの検索に使用）
+create index idx_schedules_period on production_schedules
+  using gist (tstzrange(start_datetime, end_datetime, '[)'));
+
+-- p_starts: 期間の開始日時の配列
+-- p_ends: 期間の終了日時の配列（p_starts と同じ位置の要素が1つの期間）
+--
+-- security invoker のため RLS が適用される。
+-- いずれかの期間と重なるスケジュールを、工程順序の情報（sequence_order, equipment_group_id）と
+-- 共に開始日時順で返す。期間ごとに idx_schedules_period を検索する。
+create or replace function get_schedules_in_periods(
+  p_starts timestamptz[],
+  p_ends timestamptz[]
+)
+returns table (
+  id bigint,
+  tenant_id uuid,
+  order_id bigint,
+  process_routing_id bigint,
+  equipment_id bigint,
+  start_datetime timestamptz,
+  end_datetime timestamptz,
+  sequence_order int,
+  equipment_group_id bigint
+)
+language sql
+stable
+security invoker
+as $$
+  select s.id, s.tenant_id, s.order_id, s.process_routing_id, s.equipment_id,
+         s.start_datetime, s.end_datetime, r.sequence_order, r.equipment_group_id
+    from production_schedules s
+    left join process_routings r on r.id = s.process_routing_id
+   where s.id in (
+     select hit.id
+       from unnest(p_starts, p_ends) as p(start_at, end_at)
+       join production_schedules hit
+         on tstzrange(hit.start_datetime, hit.end_datetime, '[)')
+            && tstzrange(p.start_at, p.end_at, '[)')
+   )
+   order by s.start_datetime, s.id;
+$$;